@@ -0,0 +1,111 @@
+"""
+Micro-benchmark: batched text-normalisation kernels vs. the old re.sub chains.
+
+Times each normalisation (src/utils/text_normalize.py) over a synthetic
+forum-like corpus, both ways, and checks the outputs are identical.
+
+Run from project root:
+    python scripts/bench_text_normalize.py
+    python scripts/bench_text_normalize.py --messages 200000 --repeat 5
+"""
+
+import argparse
+import os
+import random
+import re
+import sys
+import time
+
+import pandas as pd
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), "..", "src"))
+
+from utils import text_normalize as tn  # noqa: E402
+
+WORDS = (
+    "ik voel me zo moe vandaag en niemand begrijpt het echt niet "
+    "heeeeeel erg [ENTITY_PER_1] www.site.nl https://x.nl/a?b=1 !! ?! ... "
+    "<p> </p> &amp; &nbsp;"
+).split()
+
+
+def make_corpus(n: int, seed: int = 0) -> pd.Series:
+    rng = random.Random(seed)
+    texts = []
+    for _ in range(n):
+        words = [rng.choice(WORDS) for _ in range(rng.randint(5, 120))]
+        seps = [rng.choice([" ", " ", " ", "  ", "\n", "\n\n\n", "\t"]) for _ in words]
+        texts.append("".join(w + s for w, s in zip(words, seps)))
+    return pd.Series(texts)
+
+
+# ── The chains the kernels replaced, applied the way the callers did ─────────
+
+def old_standardize(s):
+    text = s.fillna("").astype(str)
+    text = text.apply(lambda t: re.sub(r"https?://\S+|www\.\S+", "", t))
+    text = text.apply(lambda t: re.sub(r"([!?.]){2,}", r"\1", t))
+    text = text.apply(lambda t: re.sub(r"[\r\n\t]+", " ", t))
+    text = text.apply(lambda t: re.sub(r" {2,}", " ", t))
+    return text.str.strip()
+
+
+def _old_liwc(text):
+    text = str(text).lower()
+    text = re.sub(r"\[entity_[a-z_]+_\d+\]", " ", text)
+    text = re.sub(r"(.)\1{3,}", r"\1\1", text)
+    text = re.sub(r"[ \t]+", " ", text)
+    text = re.sub(r"\n{3,}", "\n\n", text)
+    return text.strip()
+
+
+def _old_match(text):
+    text = str(text).lower().strip()
+    text = re.sub(r"<[^>]+>", " ", text)
+    text = text.replace("&amp;", "&").replace("&nbsp;", " ").replace("&quot;", '"')
+    text = re.sub(r"&[a-z]+;", " ", text)
+    text = re.sub(r"\s+", " ", text)
+    text = re.sub(r"[^\w\s]", "", text)
+    return text.strip()
+
+
+CASES = [
+    ("standardize", old_standardize, tn.standardize_series),
+    ("normalize_liwc",
+     lambda s: s.fillna("").apply(_old_liwc), tn.normalize_liwc_series),
+    ("match_key (html)",
+     lambda s: s.fillna("").apply(_old_match),
+     lambda s: tn.match_key_series(s, strip_html=True)),
+]
+
+
+def best_of(fn, s, repeat):
+    best, result = float("inf"), None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn(s)
+        best = min(best, time.perf_counter() - start)
+    return best, result
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark text normalisation.")
+    parser.add_argument("--messages", type=int, default=50000,
+                        help="Number of synthetic messages (default: 50000)")
+    parser.add_argument("--repeat", type=int, default=3,
+                        help="Timing runs per case; the best is reported (default: 3)")
+    args = parser.parse_args()
+
+    corpus = make_corpus(args.messages)
+    print(f"{args.messages} messages, {corpus.str.len().sum() / 1e6:.1f}M characters\n")
+    print(f"{'kernel':<18} {'old (s)':>9} {'new (s)':>10} {'speedup':>8}")
+    for name, old, new in CASES:
+        t_old, r_old = best_of(old, corpus, args.repeat)
+        t_new, r_new = best_of(new, corpus, args.repeat)
+        same = r_old.tolist() == r_new.tolist()
+        print(f"{name:<18} {t_old:>9.3f} {t_new:>10.3f} {t_old / t_new:>7.1f}x"
+              + ("" if same else "   OUTPUT DIFFERS"))
+
+
+if __name__ == "__main__":
+    main()
@@ -2,6 +2,8 @@ import pandas as pd
 from collections import Counter
 import re
 
+from utils.corpus import Corpus, tokenize_texts
+
 # --------------------------------------------------
 # Helpers
 # --------------------------------------------------
@@ -121,6 +123,7 @@ def most_common_words(
     lowercase: bool = True,
     remove_stopwords: bool = False,
     stopwords: set[str] = None,
+    corpus: Corpus | None = None,
 ) -> pd.DataFrame:
     """
     Returns the top N most common words in the messages.
@@ -132,10 +135,19 @@ def most_common_words(
         lowercase: Convert words to lowercase.
         remove_stopwords: Whether to remove common stopwords.
         stopwords: Set of stopwords to remove if remove_stopwords=True.
+        corpus: Stored tokenised corpus (utils/corpus.py) to count from when
+            lowercase=True; its tokens are the words of the lowercased text.
     """
     if "MessageText" not in messages.columns:
         raise ValueError("MessageText column not found")
 
+    if corpus is not None and lowercase:
+        docs = tokenize_texts(messages["MessageText"].dropna().astype(str), corpus)
+        keep = docs.token_lengths() >= min_length
+        if remove_stopwords and stopwords is not None:
+            keep &= ~docs.vocab_mask(stopwords)
+        return pd.DataFrame(docs.most_common(top_n, keep), columns=["Word", "Count"])
+
     words = []
 
     for text in messages["MessageText"].dropna().astype(str):
@@ -21,6 +21,7 @@ from analysis import (
     words_per_user_per_month,
     most_common_words,
 )
+from utils.corpus import corpus_dir, load_corpus
 
 # ── Page config ───────────────────────────────────────────────────────────────
 
@@ -33,6 +34,10 @@ st.title("Depression Connect – Exploratory Analysis")
 def get_messages() -> pd.DataFrame:
     return load_messages()
 
+@st.cache_resource
+def get_corpus():
+    return load_corpus(corpus_dir("output"))
+
 @st.cache_data
 def get_metrics(messages: pd.DataFrame) -> dict:
     return compute_all_metrics(messages)
@@ -222,7 +227,8 @@ elif view == "Most Common Words":
     stopwords  = {"de", "het", "een", "en", "van", "in", "is", "ik",
                   "dat", "op", "te", "met", "voor", "zijn", "er"} if remove_sw else None
 
-    df = most_common_words(messages, top_n=top_n, remove_stopwords=remove_sw, stopwords=stopwords)
+    df = most_common_words(messages, top_n=top_n, remove_stopwords=remove_sw, stopwords=stopwords,
+                           corpus=get_corpus())
     st.bar_chart(df.set_index("Word")["Count"])
     st.dataframe(df, use_container_width=True)
 
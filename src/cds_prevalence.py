@@ -22,13 +22,17 @@ import matplotlib
 matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.backends.backend_pdf as pdf_backend
+from scipy import sparse as scipy_sparse
 from scipy import stats as scipy_stats
 from statsmodels.stats.multitest import multipletests
 
-from utils.CDS import process_dataset, load_CDS
-from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
+from utils.CDS import load_CDS
+from utils.cds_matcher import CDSMatches
+from utils.cds_store import add_cds_args, score_texts, score_variants
+from utils.thread_utils import label_roles, strip_entity_placeholders_col
 from utils.spinner import Spinner
-from dataset_io import add_dataset_arg, structured_path, variant_path
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table
+from config import CDS_N_JOBS, CDS_CHUNK_SIZE
 
 warnings.filterwarnings("ignore")
 
@@ -67,8 +71,7 @@ CDS_CATEGORY_COLS = [
 # =============================================================================
 
 def load_messages(path: str | None = None) -> pd.DataFrame:
-    df = pd.read_csv(path or INPUT_PATH)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(path or INPUT_PATH)
     df = df.dropna(subset=[DATE_COL, TEXT_COL]).copy()
     df = strip_entity_placeholders_col(df, TEXT_COL)
     print(f"  Loaded {len(df)} messages from {df[POSTER_COL].nunique()} users.")
@@ -82,35 +85,28 @@ def add_time_columns(df: pd.DataFrame) -> pd.DataFrame:
     return df
 
 
-def get_scored_df(input_path: str | None = None,
-                  scored_path: str | None = None) -> tuple[pd.DataFrame, pd.DataFrame]:
-    """
-    Returns (scored_df, cds_phrases_df).
-    Loads from scored_path (cds_scores.csv) if available, otherwise re-scores from input_path.
-    cds_phrases_df has one column per individual CDS phrase (not category).
-    """
+def _load_for_scoring(input_path: str | None, scored_path: str | None) -> pd.DataFrame:
     scored_path = scored_path or SCORED_PATH
     if os.path.exists(scored_path):
         print(f"  Loading pre-scored data from {scored_path}")
-        df = pd.read_csv(scored_path)
-        df[DATE_COL] = parse_post_dates(df[DATE_COL])
+        df = read_table(scored_path)
     else:
         print("  cds_scores.csv not found — running CDS scoring from scratch…")
         df = load_messages(input_path)
 
     df = label_roles(df)
     df = add_time_columns(df)
+    return df.reset_index(drop=True)
 
-    # Re-score at phrase level if columns aren't already in the file
-    # (exploratory_analysis.py saves category columns but not phrase columns)
-    print("  Scoring individual CDS phrases (for phrase-level ranking)…")
-    raw = pd.DataFrame({"text": df[TEXT_COL].fillna("").str.lower().values})
-    cds_phrases, cds_categories, _ = process_dataset(raw, output="all_variants",
-                                                      language=LIWC_LANGUAGE)
-    cds_phrases = cds_phrases.reset_index(drop=True)
-    cds_categories = cds_categories.reset_index(drop=True)
-    df = df.reset_index(drop=True)
 
+def _phrase_scores(matches: CDSMatches) -> tuple[pd.DataFrame, pd.DataFrame]:
+    # Phrase columns are sparse: memory grows with the matches, not with
+    # messages × phrases
+    return (matches.phrase_frame(sparse=True).reset_index(drop=True),
+            matches.category_frame().reset_index(drop=True))
+
+
+def _attach_categories(df: pd.DataFrame, cds_categories: pd.DataFrame) -> pd.DataFrame:
     # Attach category scores (may already be there, overwrite to be safe)
     for col in cds_categories.columns:
         df[col] = cds_categories[col].values
@@ -118,8 +114,51 @@ def get_scored_df(input_path: str | None = None,
     # Attach CDS flag
     if "CDS" not in df.columns:
         df["CDS"] = (cds_categories.sum(axis=1) > 0).astype(int)
+    return df
+
+
+def get_scored_df(input_path: str | None = None,
+                  scored_path: str | None = None,
+                  dataset: str = "combined",
+                  n_jobs: int | None = CDS_N_JOBS,
+                  chunk_size: int = CDS_CHUNK_SIZE) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    Returns (scored_df, cds_phrases_df).
+    Loads from scored_path (cds_scores.csv) if available, otherwise re-scores from input_path.
+    cds_phrases_df has one (sparse) column per individual CDS phrase (not category).
+    """
+    df = _load_for_scoring(input_path, scored_path)
 
-    return df, cds_phrases
+    # cds_scores.csv has the category columns only; the phrase hits come from
+    # the CDS store (utils/cds_store.py), which matches only unseen texts.
+    print("  Loading individual CDS phrase hits (for phrase-level ranking)…")
+    matches = score_texts(df[TEXT_COL], dataset, OUTPUT_DIR, language=LIWC_LANGUAGE,
+                          n_jobs=n_jobs, chunk_size=chunk_size)
+    cds_phrases, cds_categories = _phrase_scores(matches)
+    return _attach_categories(df, cds_categories), cds_phrases
+
+
+def get_scored_dfs(datasets: list[str], n_jobs: int | None = CDS_N_JOBS,
+                   chunk_size: int = CDS_CHUNK_SIZE) -> dict[str, tuple[pd.DataFrame, pd.DataFrame]]:
+    """
+    get_scored_df() for several variants, phrase-scoring each distinct text
+    once across them. Returns {dataset: (scored_df, cds_phrases_df)}.
+    """
+    frames = {
+        ds: _load_for_scoring(structured_path(OUTPUT_DIR, ds),
+                              variant_path(OUTPUT_DIR, "cds_scores.csv", ds))
+        for ds in datasets
+    }
+    print("  Loading individual CDS phrase hits…")
+    matches = score_variants({ds: df[TEXT_COL] for ds, df in frames.items()},
+                             OUTPUT_DIR, language=LIWC_LANGUAGE,
+                             n_jobs=n_jobs, chunk_size=chunk_size)
+
+    out = {}
+    for ds, df in frames.items():
+        cds_phrases, cds_categories = _phrase_scores(matches.pop(ds))
+        out[ds] = (_attach_categories(df, cds_categories), cds_phrases)
+    return out
 
 
 # =============================================================================
@@ -221,39 +260,44 @@ def compute_category_ranking(df: pd.DataFrame) -> pd.DataFrame:
 # Phrase ranking
 # =============================================================================
 
+def phrase_matrix(cds_phrases: pd.DataFrame) -> scipy_sparse.csr_matrix:
+    """messages × phrases CSR matrix of a phrase frame (sparse or dense columns)."""
+    if len(cds_phrases.columns) and all(isinstance(t, pd.SparseDtype) for t in cds_phrases.dtypes):
+        return cds_phrases.sparse.to_coo().tocsr()
+    return scipy_sparse.csr_matrix(cds_phrases.to_numpy(dtype="int64"))
+
+
 def compute_phrase_ranking(
     df: pd.DataFrame,
     cds_phrases: pd.DataFrame,
 ) -> pd.DataFrame:
     """
     For each individual CDS phrase: how often does it appear, and in which category?
+
+    Counts come from the sparse messages × phrases matrix: column sums for
+    the total, and one mat-vec product per role indicator for posts/replies.
     """
     cds_df = load_CDS(language=LIWC_LANGUAGE)
+    categories = cds_df["categories"]
+    categories = categories[~categories.index.duplicated()]
 
-    rows = []
-    for phrase in cds_phrases.columns:
-        count = int(cds_phrases[phrase].sum())
-        prevalence = count / len(cds_phrases) * 100
-        category = cds_df.loc[phrase, "categories"] if phrase in cds_df.index else "unknown"
-
-        # Split by role
-        phrase_series = cds_phrases[phrase].values
-        post_mask  = (df["role"] == "post").values
-        reply_mask = (df["role"] == "reply").values
-        n_posts_match  = int(phrase_series[post_mask].sum())
-        n_reply_match  = int(phrase_series[reply_mask].sum())
-
-        rows.append({
-            "phrase":            phrase,
-            "category":          category,
-            "total_matches":     count,
-            "prevalence_pct":    round(prevalence, 3),
-            "matches_posts":     n_posts_match,
-            "matches_replies":   n_reply_match,
-        })
+    hits = phrase_matrix(cds_phrases)
+    roles = df["role"].to_numpy()
+    total = np.asarray(hits.sum(axis=0)).ravel()
+    posts = hits.T @ (roles == "post").astype("int64")
+    replies = hits.T @ (roles == "reply").astype("int64")
 
+    phrases = list(cds_phrases.columns)
     return (
-        pd.DataFrame(rows)
+        pd.DataFrame({
+            "phrase":          phrases,
+            "category":        [categories[p] if p in categories.index else "unknown"
+                                for p in phrases],
+            "total_matches":   total.astype("int64"),
+            "prevalence_pct":  [round(c / len(cds_phrases) * 100, 3) for c in total.tolist()],
+            "matches_posts":   np.asarray(posts, dtype="int64"),
+            "matches_replies": np.asarray(replies, dtype="int64"),
+        })
         .sort_values("total_matches", ascending=False)
         .reset_index(drop=True)
     )
@@ -540,18 +584,11 @@ def build_pdf(df: pd.DataFrame, cds_phrases: pd.DataFrame,
 # Main
 # =============================================================================
 
-def main(dataset: str | None = None):
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    ds             = dataset or "combined"
-    input_path     = structured_path(OUTPUT_DIR, ds)
-    scored_path    = variant_path(OUTPUT_DIR, "cds_scores.csv",              ds)
+def _report_variant(ds: str, df: pd.DataFrame, cds_phrases: pd.DataFrame):
     pdf_path_out   = variant_path(OUTPUT_DIR, "cds_prevalence_report.pdf",   ds)
     cat_rank_out   = variant_path(OUTPUT_DIR, "cds_category_ranking.csv",    ds)
     phr_rank_out   = variant_path(OUTPUT_DIR, "cds_phrase_ranking.csv",      ds)
 
-    print("Loading and scoring data…")
-    df, cds_phrases = get_scored_df(input_path=input_path, scored_path=scored_path)
-
     print("\nComputing category ranking…")
     cat_ranking = compute_category_ranking(df)
     cat_ranking.to_csv(cat_rank_out, index=False)
@@ -583,9 +620,38 @@ def main(dataset: str | None = None):
     print(f"  {phr_rank_out}")
 
 
+def main(dataset: str | None = None, datasets: list[str] | None = None,
+         n_jobs: int | None = CDS_N_JOBS, chunk_size: int = CDS_CHUNK_SIZE):
+    """
+    Reports one variant, or several (--all) with each distinct message text
+    phrase-scored once across them.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    datasets = datasets or [dataset or "combined"]
+
+    print("Loading and scoring data…")
+    if len(datasets) == 1:
+        ds = datasets[0]
+        scored = {ds: get_scored_df(input_path=structured_path(OUTPUT_DIR, ds),
+                                    scored_path=variant_path(OUTPUT_DIR, "cds_scores.csv", ds),
+                                    dataset=ds, n_jobs=n_jobs, chunk_size=chunk_size)}
+    else:
+        scored = get_scored_dfs(datasets, n_jobs=n_jobs, chunk_size=chunk_size)
+
+    for ds in datasets:
+        if len(datasets) > 1:
+            print(f"\n{'='*60}\n  Dataset: {ds}\n{'='*60}")
+        _report_variant(ds, *scored.pop(ds))
+
+
 if __name__ == "__main__":
     import argparse
+    from dataset_io import DATASET_CHOICES
     ap = argparse.ArgumentParser(description="CDS prevalence report")
     add_dataset_arg(ap)
+    ap.add_argument("--all", dest="run_all", action="store_true",
+                    help="Run for all three dataset variants, scoring shared messages once")
+    add_cds_args(ap, n_jobs=CDS_N_JOBS, chunk_size=CDS_CHUNK_SIZE)
     args = ap.parse_args()
-    main(dataset=args.dataset)
+    main(dataset=args.dataset, datasets=DATASET_CHOICES if args.run_all else None,
+         n_jobs=args.n_jobs, chunk_size=args.chunk_size)
@@ -10,6 +10,13 @@ PREPROCESS_DIR  = "output/preprocessed"
 # ── Source files ─────────────────────────────────────────────────────────────
 CSV_FILES = ["accounts", "groups", "messages", "topics"]
 
+# ── Stage hand-off format (dataset_io.write_table / read_table) ──────────────
+# "parquet" stores typed columns (timestamps, categorical IDs, integer topic
+# IDs) next to each stage CSV as <name>.parquet; readers prefer it when it is
+# at least as new as the CSV. "csv" keeps the CSV-only behaviour.
+HANDOFF_FORMAT     = "parquet"
+HANDOFF_CSV_EXPORT = True    # also write the CSV (notebooks, Excel export, LIWC-22)
+
 # ── Column names ─────────────────────────────────────────────────────────────
 ID_COLUMN      = "PosterID"
 DATE_COLUMNS         = ["PostDate", "StartDate"]
@@ -66,10 +73,56 @@ MIN_POSTS_PER_USER  = 5     # users with fewer total posts than this are exclude
 LANGUAGE_FILTER     = False   # drop non-English posts
 TARGET_LANGUAGE     = "nl"
 
+# Language detection for LANGUAGE_FILTER (see utils/language_id.py)
+LANGUAGE_N_JOBS     = 1       # detector processes; 1 → in-process, None → one per CPU
+LANGUAGE_SEED       = 0       # langdetect samples randomly; a fixed seed makes it reproducible
+LANGUAGE_PREFILTER  = True    # texts full of Dutch function words are "nl" without langdetect
+LANGUAGE_CACHE      = True    # reuse detected languages across runs/variants
+LANGUAGE_CACHE_FILE = "language_cache.sqlite"   # under PREPROCESS_DIR
+
+# ── CDS scoring (utils/cds_matcher.py, utils/cds_store.py) ──────────────────
+CDS_N_JOBS      = 1       # matcher processes; 1 → in-process, None → one per CPU
+CDS_CHUNK_SIZE  = 2000    # distinct texts per shard sent to a matcher process
+
 # ── Anonymization ─────────────────────────────────────────────────────────────
 ANONYMIZE_TEXT        = True
 REPLACE_ORIGINAL_TEXT = True
 EXPORT_ENTITY_REVIEW  = True
+NER_BATCH_SIZE        = 64    # texts per nlp.pipe batch; 0/None → one message at a time
+NER_N_PROCESS         = 1     # nlp.pipe worker processes (each loads its own model copy)
+NER_CACHE             = True  # reuse entity spans across runs/variants (batch path only)
+NER_CACHE_FILE        = "ner_cache.sqlite"   # under PREPROCESS_DIR
+NER_CACHE_MAX_ENTRIES = 1_000_000   # least-recently-used entries beyond this are evicted
+
+# How preprocess step 6 pseudonymizes PosterIDs (see utils/pseudonyms.py):
+#   "sorted"      user_N by sorted original ID, renumbered every run
+#   "persistent"  user_N in order of first appearance; the mapping is only
+#                 appended to, so a token never changes
+#   "hmac"        user_<16 hex digits> keyed by a secret in PSEUDONYM_KEY_FILE;
+#                 also never changes, and needs no numbering pass
+ID_PSEUDONYMS      = "sorted"
+PSEUDONYM_KEY_FILE = "pseudonym.key"   # under PREPROCESS_DIR; as private as the mapping
+
+# ── Streaming preprocess ──────────────────────────────────────────────────────
+# Rows per chunk for preprocess.py's streaming mode (--chunk-size). None keeps
+# the whole export in memory; a number bounds memory by the chunk instead.
+PREPROCESS_CHUNK_SIZE = None
+
+# ── Preprocess checkpoints ────────────────────────────────────────────────────
+# Pickle each step's DataFrames under PREPROCESS_DIR/checkpoints/ so a rerun
+# resumes after the last step whose inputs and settings are unchanged
+# (override with --from-step / --force). Costs roughly one copy of the data
+# on disk per step. Opt-in (or --checkpoints): the pickles of steps 1–6 hold
+# message text from before NER, and those of steps 1–5 the original
+# PosterIDs; see docs/DATA_GOVERNANCE.md §3.
+PREPROCESS_CHECKPOINTS = False
+
+# ── Preprocess incremental state ──────────────────────────────────────────────
+# Store a hash of every raw message row after a full in-memory run (or pass
+# --save-state), so the next --incremental run only processes new and changed
+# messages. A --incremental run that has to fall back to a full run always
+# stores it.
+PREPROCESS_INCREMENTAL_STATE = False
 
 # ── Pandemic period analysis ─────────────────────────────────────────────────
 # Three periods from PostDate:
@@ -2,7 +2,12 @@
 
 __version__ = "0.1.0"
 
-from .core import anonymize, deanonymize
+from .core import anonymize, anonymize_batch, deanonymize, model_id
+from .model import configure, get_nlp, installed_id, is_available, warm_up
 from .main import main
 
-__all__ = ["anonymize", "deanonymize", "main"]
+__all__ = [
+    "anonymize", "anonymize_batch", "deanonymize", "model_id",
+    "configure", "get_nlp", "installed_id", "is_available", "warm_up",
+    "main",
+]
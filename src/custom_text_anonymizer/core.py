@@ -1,24 +1,16 @@
 import re
-import spacy
-from typing import List, Dict, Tuple
+from typing import Dict, Iterable, Iterator, List, Tuple
 
-nlp = spacy.load("nl_core_news_lg")
+from .model import get_nlp
 
-def recognize_entities(text: str) -> List[Dict]:
-    """
-    Identifies various types of entities in a given text using NER and regex for URLs.
+URL_PATTERN = re.compile(
+    r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
+)
+EMAIL_PATTERN = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
 
-    Args:
-        text: The text to be processed.
 
-    Returns:
-        A list of dictionaries, where each dictionary represents an entity and contains the following keys:
-        - type: The type of entity (e.g., "PERSON", "ORGANIZATION", "LOCATION", "PHONE", "EMAIL", "URL", "PRODUCT").
-        - start: The starting index of the entity in the text.
-        - end: The ending index of the entity in the text.
-        - text: The original text of the entity.
-    """
-    doc = nlp(text)
+def _entities_from_doc(doc, text: str) -> List[Dict]:
+    """Collects NER entities from a processed Doc plus regex URL/email matches."""
     entities = []
 
     # NER-based entity recognition
@@ -32,14 +24,9 @@ def recognize_entities(text: str) -> List[Dict]:
             }
             entities.append(entity)
 
-    url_pattern = re.compile(
-        r"http[s]?://(?:[a-zA-Z]|[0-9]|[$-_@.&+]|[!*\\(\\),]|(?:%[0-9a-fA-F][0-9a-fA-F]))+"
-    )
-    email_pattern = re.compile(r"\b[A-Za-z0-9._%+-]+@[A-Za-z0-9.-]+\.[A-Z|a-z]{2,}\b")
-
     for pattern, entity_type in [
-        (url_pattern, "URL"),
-        (email_pattern, "EMAIL"),
+        (URL_PATTERN, "URL"),
+        (EMAIL_PATTERN, "EMAIL"),
     ]:
         for match in pattern.finditer(text):
             entity = {
@@ -55,17 +42,76 @@ def recognize_entities(text: str) -> List[Dict]:
 
     return entities
 
-def anonymize(text: str) -> Tuple[str, Dict[str, str]]:
+
+def recognize_entities(text: str) -> List[Dict]:
     """
-    Anonymizes the given text by replacing identified entities with placeholders.
+    Identifies various types of entities in a given text using NER and regex for URLs.
+
+    Args:
+        text: The text to be processed.
+
+    Returns:
+        A list of dictionaries, where each dictionary represents an entity and contains the following keys:
+        - type: The type of entity (e.g., "PERSON", "ORGANIZATION", "LOCATION", "PHONE", "EMAIL", "URL", "PRODUCT").
+        - start: The starting index of the entity in the text.
+        - end: The ending index of the entity in the text.
+        - text: The original text of the entity.
+    """
+    return _entities_from_doc(get_nlp()(text), text)
+
+
+def ner_disabled_pipes(model=None) -> List[str]:
+    """
+    Names of the pipeline components NER does not depend on.
+
+    Keeps "ner" plus any shared embedding component (e.g. "tok2vec") that
+    lists "ner" among its listeners, so doc.ents are unchanged when the rest
+    of the pipeline (tagger, parser, lemmatizer, ...) is switched off.
+    """
+    model = model if model is not None else get_nlp()
+    needed = {"ner"}
+    for name, pipe in model.pipeline:
+        if "ner" in getattr(pipe, "listening_components", []):
+            needed.add(name)
+    return [name for name in model.pipe_names if name not in needed]
+
+
+def recognize_entities_batch(
+    texts: Iterable[str], batch_size: int = 64, n_process: int = 1
+) -> Iterator[List[Dict]]:
+    """
+    Batched recognize_entities over many texts via nlp.pipe.
+
+    Runs only the components NER needs (see ner_disabled_pipes) and yields one
+    entity list per input text, in input order.
+
+    Args:
+        texts: The texts to be processed.
+        batch_size: Number of texts spaCy buffers per batch.
+        n_process: Worker processes for nlp.pipe (1 = in-process).
+    """
+    texts = list(texts)
+    docs = get_nlp().pipe(
+        texts,
+        batch_size=batch_size,
+        n_process=n_process,
+        disable=ner_disabled_pipes(),
+    )
+    for text, doc in zip(texts, docs):
+        yield _entities_from_doc(doc, text)
+
+
+def replace_entities(text: str, entities: List[Dict]) -> Tuple[str, Dict[str, str]]:
+    """
+    Replaces the given entities with numbered placeholders ([ENTITY_<TYPE>_<n>]).
 
     Args:
         text: The text to be anonymized.
+        entities: Entities as returned by recognize_entities.
 
     Returns:
-        A tuple containing the anonymized text and the anonymization map.
+        The anonymized text and the anonymization map.
     """
-    entities = recognize_entities(text)
     anonymization_map = {}
     entity_counters = {}
     for entity in reversed(entities):  # Process entities from end to start
@@ -79,6 +125,63 @@ def anonymize(text: str) -> Tuple[str, Dict[str, str]]:
         text = text[: entity["start"]] + placeholder + text[entity["end"] :]
     return text, anonymization_map
 
+
+def anonymize(text: str) -> Tuple[str, Dict[str, str]]:
+    """
+    Anonymizes the given text by replacing identified entities with placeholders.
+
+    Args:
+        text: The text to be anonymized.
+
+    Returns:
+        A tuple containing the anonymized text and the anonymization map.
+    """
+    return replace_entities(text, recognize_entities(text))
+
+
+def model_id() -> str:
+    """Name and version of the loaded spaCy model, e.g. 'nl_core_news_lg-3.8.0'."""
+    meta = get_nlp().meta
+    return f"{meta['lang']}_{meta['name']}-{meta['version']}"
+
+
+def anonymize_batch(
+    texts: Iterable[str],
+    batch_size: int = 64,
+    n_process: int = 1,
+    cache=None,
+    chunk_size: int = 2000,
+) -> Iterator[Tuple[str, Dict[str, str]]]:
+    """
+    Anonymizes many texts at once; same output as calling anonymize() per text.
+
+    Args:
+        texts: The texts to be anonymized.
+        batch_size: Number of texts spaCy buffers per batch.
+        n_process: Worker processes for nlp.pipe (1 = in-process).
+        cache: Optional utils.ner_cache.EntityCache. Texts already in the
+            cache skip NER; new entity lists are written back per chunk.
+        chunk_size: Texts looked up / stored per cache round trip.
+
+    Returns:
+        An iterator of (anonymized text, anonymization map) tuples, in input order.
+    """
+    texts = list(texts)
+    if cache is None:
+        for text, entities in zip(texts, recognize_entities_batch(texts, batch_size, n_process)):
+            yield replace_entities(text, entities)
+        return
+
+    for start in range(0, len(texts), chunk_size):
+        chunk = texts[start:start + chunk_size]
+        entity_lists = cache.get_many(chunk)
+        # Unique uncached texts only — repeats inside a chunk run NER once.
+        todo = list(dict.fromkeys(t for t, e in zip(chunk, entity_lists) if e is None))
+        found = dict(zip(todo, recognize_entities_batch(todo, batch_size, n_process)))
+        cache.put_many(found.keys(), found.values())
+        for text, entities in zip(chunk, entity_lists):
+            yield replace_entities(text, entities if entities is not None else found[text])
+
 def deanonymize(anonymized_text: str, anonymization_map: Dict[str, str]) -> str:
     """
     Restores the original text by replacing placeholders with their corresponding original entities.
@@ -0,0 +1,124 @@
+"""Shared, lazily loaded spaCy model registry for the anonymizer.
+
+core.py and the main.py CLI both get their pipeline from get_nlp(), so the
+Dutch model is loaded at most once per process (per pipe selection) and only
+when text is actually anonymized — importing the package costs nothing.
+"""
+import importlib.metadata
+import importlib.util
+import time
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+DEFAULT_MODEL = "nl_core_news_lg"
+
+_Key = Tuple[str, Optional[Tuple[str, ...]]]
+
+_default: Dict = {"name": DEFAULT_MODEL, "enable": None}
+_models: Dict[_Key, object] = {}
+_load_seconds: Dict[_Key, float] = {}
+_load_hooks: List[Callable[[str, Optional[Tuple[str, ...]], float], None]] = []
+
+
+def _key(name: Optional[str], enable: Optional[Iterable[str]]) -> _Key:
+    name = name or _default["name"]
+    if enable is None:
+        enable = _default["enable"]
+    return name, (tuple(enable) if enable is not None else None)
+
+
+def configure(name: str = DEFAULT_MODEL, enable: Optional[Iterable[str]] = None):
+    """
+    Sets the model (and optionally the only pipes to enable) that get_nlp()
+    returns when called without arguments. Already loaded models are kept.
+    """
+    _default["name"] = name
+    _default["enable"] = tuple(enable) if enable is not None else None
+
+
+def get_nlp(name: Optional[str] = None, enable: Optional[Iterable[str]] = None):
+    """
+    Returns the spaCy pipeline for `name`, loading it on first use.
+
+    Args:
+        name: spaCy package name (default: the configured model).
+        enable: Pipe names to enable; all others are loaded disabled.
+            None keeps the model's own defaults.
+    """
+    key = _key(name, enable)
+    if key not in _models:
+        import spacy
+
+        start = time.perf_counter()
+        if key[1] is None:
+            _models[key] = spacy.load(key[0])
+        else:
+            _models[key] = spacy.load(key[0], enable=list(key[1]))
+        elapsed = time.perf_counter() - start
+        _load_seconds[key] = elapsed
+        for hook in _load_hooks:
+            hook(key[0], key[1], elapsed)
+    return _models[key]
+
+
+def register(nlp, name: Optional[str] = None, enable: Optional[Iterable[str]] = None):
+    """Installs an already built pipeline under (name, enable), e.g. a test double."""
+    _models[_key(name, enable)] = nlp
+
+
+def clear():
+    """Forgets every loaded pipeline (they are reloaded on next use)."""
+    _models.clear()
+    _load_seconds.clear()
+
+
+def is_loaded(name: Optional[str] = None, enable: Optional[Iterable[str]] = None) -> bool:
+    return _key(name, enable) in _models
+
+
+def is_available(name: Optional[str] = None) -> bool:
+    """True if spaCy and the model package are installed (nothing is loaded)."""
+    name = name or _default["name"]
+    return (
+        importlib.util.find_spec("spacy") is not None
+        and importlib.util.find_spec(name) is not None
+    )
+
+
+def installed_id(name: Optional[str] = None) -> Optional[str]:
+    """
+    'name-version' of the installed model package, plus the spaCy version,
+    read from package metadata (nothing is loaded); None if not installed.
+    """
+    name = name or _default["name"]
+    try:
+        return (f"{name}-{importlib.metadata.version(name)}"
+                f"+spacy-{importlib.metadata.version('spacy')}")
+    except importlib.metadata.PackageNotFoundError:
+        return None
+
+
+def add_load_hook(hook: Callable[[str, Optional[Tuple[str, ...]], float], None]):
+    """Registers hook(name, enable, seconds), called after every model load."""
+    _load_hooks.append(hook)
+
+
+def load_times() -> Dict[_Key, float]:
+    """Seconds spent in spacy.load per (name, enable) loaded so far."""
+    return dict(_load_seconds)
+
+
+def warm_up(
+    name: Optional[str] = None,
+    enable: Optional[Iterable[str]] = None,
+    text: str = "Jan woont in Amsterdam.",
+) -> float:
+    """
+    Loads the pipeline (if needed) and runs it once on `text`, so the first
+    real document does not pay for lazy initialisation.
+
+    Returns:
+        Total seconds spent, load included.
+    """
+    start = time.perf_counter()
+    get_nlp(name, enable)(text)
+    return time.perf_counter() - start
@@ -10,12 +10,28 @@
 #
 # "combined" output filenames are unchanged from before (no suffix), keeping
 # any notebooks that hardcode e.g. "output/eda_report_all_users.pdf" working.
+#
+# It also owns the hand-off format between stages: write_table() / read_table()
+# store each stage file as typed Parquet next to its CSV (see HANDOFF_FORMAT
+# in config.py), so readers skip date reparsing and dtype inference and can
+# load only the columns they need.
+#
+# score_once() lets an --all run score each distinct message text once across
+# the three variants ("old" and "new_only" are slices of "combined") and then
+# hand every variant exactly the rows it would have scored on its own.
 # =============================================================================
 
 from __future__ import annotations
 
+import importlib.util
 import os
 
+import numpy as np
+import pandas as pd
+
+from config import DATE_COLUMNS, HANDOFF_FORMAT, HANDOFF_CSV_EXPORT
+from utils.thread_utils import parse_post_dates
+
 DATASET_CHOICES = ["old", "new_only", "combined"]
 DEFAULT_DATASET = "combined"
 
@@ -80,3 +96,213 @@ def subtitle_for(dataset: str) -> str:
         "new_only": "New Data Only",
         "combined": "Combined Dataset",
     }[dataset]
+
+
+# ── Typed stage hand-off (Parquet with CSV export) ───────────────────────────
+
+_PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
+# Stored dictionary-encoded; decoded back to plain strings on read unless the
+# caller asks for categoricals (groupby on a categorical keeps unobserved
+# categories, which the analysis code does not expect).
+CATEGORICAL_COLUMNS = ["PosterID", "GroupName"]
+
+# pandas.read_csv's default NA tokens — applied when typing object columns so
+# a Parquet round trip yields the same missing values as a CSV round trip,
+# where read_csv would turn these strings into NaN.
+CSV_NA_VALUES = {
+    "", "#N/A", "#N/A N/A", "#NA", "-1.#IND", "-1.#QNAN", "-NaN", "-nan",
+    "1.#IND", "1.#QNAN", "<NA>", "N/A", "NA", "NULL", "NaN", "None", "n/a",
+    "nan", "null",
+}
+_NUMERIC_PROBE = 1000   # values checked before attempting a numeric cast
+
+
+def parquet_path(path: str) -> str:
+    """The Parquet sibling of a stage file: foo.csv → foo.parquet."""
+    return os.path.splitext(path)[0] + ".parquet"
+
+
+def _all_boolean(values: pd.Series) -> bool:
+    return values.map(
+        lambda v: isinstance(v, bool) or (isinstance(v, str) and v in ("True", "False"))
+    ).all()
+
+
+def _type_object_column(col: str, s: pd.Series) -> pd.Series:
+    s = s.mask(s.isin(CSV_NA_VALUES))
+    if col in DATE_COLUMNS:
+        return parse_post_dates(s)
+    values = s.dropna()
+    if values.empty:
+        return s
+    if _all_boolean(values.iloc[:_NUMERIC_PROBE]) and _all_boolean(values):
+        return s.map({"True": True, "False": False, True: True, False: False})
+    if pd.to_numeric(values.iloc[:_NUMERIC_PROBE], errors="coerce").notna().all():
+        num = pd.to_numeric(values, errors="coerce")
+        if num.notna().all():
+            num = pd.to_numeric(s, errors="coerce")
+            if (num.dropna() % 1 == 0).all():
+                return num.astype("Int64")
+            return num
+    return s.where(s.isna(), s.astype(str))
+
+
+def to_handoff_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+    """
+    Casts a stage DataFrame to the stored schema: date columns to datetime64,
+    numeric-looking object columns to Int64/float64, "True"/"False" to bool,
+    CATEGORICAL_COLUMNS to category. Mirrors what a CSV round trip infers.
+    """
+    df = df.copy()
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = _type_object_column(col, df[col])
+        elif col in DATE_COLUMNS and not pd.api.types.is_datetime64_any_dtype(df[col]):
+            df[col] = parse_post_dates(df[col])
+    for col in CATEGORICAL_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype("category")
+    return df
+
+
+def write_table(df: pd.DataFrame, path: str, fmt: str = HANDOFF_FORMAT,
+                csv: bool = HANDOFF_CSV_EXPORT) -> None:
+    """
+    Writes a stage output. `path` is the CSV name every script already uses;
+    with fmt="parquet" a typed <name>.parquet is written next to it (after
+    the CSV, so it is the newer of the two) and the CSV only if csv=True.
+    """
+    if fmt not in ("csv", "parquet"):
+        raise ValueError(f"Unknown hand-off format '{fmt}', expected 'csv' or 'parquet'")
+    if fmt == "parquet" and not _PARQUET_AVAILABLE:
+        print("  WARNING: pyarrow not installed – writing CSV only.")
+        fmt, csv = "csv", True
+
+    if fmt == "csv" or csv:
+        df.to_csv(path, index=False)
+    if fmt == "parquet":
+        to_handoff_dtypes(df).to_parquet(parquet_path(path), index=False)
+
+
+def append_table(df: pd.DataFrame, path: str, append: bool) -> None:
+    """
+    Appends a chunk to a stage CSV (append=False starts the file, header
+    included). Used by streaming writers that cannot hold the whole table;
+    any Parquet sibling from an earlier run is removed on the first chunk so
+    read_table() does not prefer it over the new CSV.
+    """
+    if not append:
+        pq = parquet_path(path)
+        if os.path.exists(pq):
+            os.remove(pq)
+        df.to_csv(path, index=False)
+    else:
+        df.to_csv(path, mode="a", header=False, index=False)
+
+
+def _prefer_parquet(path: str) -> bool:
+    pq = parquet_path(path)
+    if not _PARQUET_AVAILABLE or not os.path.exists(pq):
+        return False
+    # A CSV rewritten after the Parquet (by hand or by a csv-only run) wins.
+    return not os.path.exists(path) or os.path.getmtime(pq) >= os.path.getmtime(path)
+
+
+def none_to_nan(s: pd.Series) -> pd.Series:
+    """
+    None → NaN in an object column, as read_csv gives. Unlike fillna(np.nan)
+    the column stays object (fillna downcasts an all-missing one, with a
+    FutureWarning).
+    """
+    return s.where(s.notna(), np.nan)
+
+
+def read_table(path: str, columns: list[str] | None = None,
+               categorical: bool = False) -> pd.DataFrame:
+    """
+    Reads a stage output written by write_table (or a plain CSV).
+
+    Uses the Parquet sibling when present and current — only `columns` are
+    read, dates arrive as datetime64. Otherwise reads the CSV and parses the
+    date columns. `categorical=True` keeps PosterID/GroupName as category.
+    """
+    if _prefer_parquet(path):
+        df = pd.read_parquet(parquet_path(path), columns=columns)
+        for col in df.columns:
+            if isinstance(df[col].dtype, pd.CategoricalDtype) and not categorical:
+                df[col] = df[col].astype(object)
+            if df[col].dtype == object:
+                df[col] = none_to_nan(df[col])
+            elif isinstance(df[col].dtype, pd.Int64Dtype) and not df[col].isna().any():
+                df[col] = df[col].astype("int64")
+        return df
+
+    df = pd.read_csv(path, usecols=columns, low_memory=False)
+    for col in DATE_COLUMNS:
+        if col in df.columns:
+            df[col] = parse_post_dates(df[col])
+    if categorical:
+        for col in CATEGORICAL_COLUMNS:
+            if col in df.columns:
+                df[col] = df[col].astype("category")
+    return df
+
+
+# ── Score once, slice per variant ─────────────────────────────────────────────
+
+# Tag column added while the variants are stacked. Not "source": that column
+# already carries integrate_datasets.py's old/new provenance.
+VARIANT_COL = "variant"
+
+
+def stack_variants(frames: dict[str, pd.DataFrame]) -> pd.DataFrame:
+    """Concatenates {variant: df} into one frame tagged with VARIANT_COL."""
+    return pd.concat(
+        [df.assign(**{VARIANT_COL: ds}) for ds, df in frames.items()],
+        ignore_index=True,
+    )
+
+
+def text_codes(frames: dict[str, pd.DataFrame],
+               text_col: str) -> tuple[pd.Series, dict[str, np.ndarray]]:
+    """
+    Distinct texts across all frames, plus per frame the position of each
+    row's text in that Series (so unique_scores.iloc[codes[ds]] lines up
+    with frames[ds] row by row).
+    """
+    stacked = stack_variants({ds: df[[text_col]] for ds, df in frames.items()})
+    codes, uniques = pd.factorize(stacked[text_col], use_na_sentinel=False)
+    unique = pd.Series(uniques, name=text_col)
+    tags = stacked[VARIANT_COL].to_numpy()
+    return unique, {ds: codes[tags == ds] for ds in frames}
+
+
+def score_once(frames: dict[str, pd.DataFrame], text_col: str,
+               score_fn) -> dict[str, pd.DataFrame]:
+    """
+    Applies a per-message scorer to every frame while scoring each distinct
+    text only once.
+
+    score_fn(df) receives a frame holding just `text_col` (one row per
+    distinct text) and returns a frame with the same rows plus its score
+    columns. The score columns are appended to each input frame in order,
+    with dtypes preserved, so the result equals score_fn applied to each
+    frame separately as long as a row's scores depend on its text alone.
+    """
+    unique, codes = text_codes(frames, text_col)
+    scored = score_fn(unique.to_frame()).reset_index(drop=True)
+    if len(scored) != len(unique):
+        raise ValueError(
+            f"score_fn returned {len(scored)} rows for {len(unique)} distinct texts"
+        )
+    new_cols = [c for c in scored.columns if c != text_col]
+    print(f"  Scored {len(unique)} distinct texts for "
+          f"{sum(len(c) for c in codes.values())} rows across {len(frames)} variant(s).")
+
+    out = {}
+    for ds, df in frames.items():
+        df = df.reset_index(drop=True)
+        picked = scored[new_cols].iloc[codes[ds]].reset_index(drop=True)
+        out[ds] = pd.concat([df.drop(columns=new_cols, errors="ignore"), picked], axis=1)
+    return out
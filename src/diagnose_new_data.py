@@ -8,27 +8,19 @@
 # =============================================================================
 
 import os
-import re
 import pandas as pd
-from difflib import SequenceMatcher
+
+from utils.author_signals import author_signals
+from utils.near_duplicates import near_duplicate_pairs
+from utils.new_exports import CACHE_FILE, load_new_exports
+from utils.text_normalize import match_key_series
 
 DATA_DIR   = "data"
 OUTPUT_DIR = "output"
 NEW_DATA_DIR = "data/new"  # ← put your 4 new CSVs here
 
-# ── Column name mapping for new data ─────────────────────────────────────────
-# Maps new column names to internal standard names
-NEW_COL_MAP = {
-    "Content":        "MessageText",
-    "AuthorID":       "PosterID",
-    "PostDate":       "PostDate",
-    "ForumTopicID":   "ForumTopicID",
-    "ForumGroupID":   "ForumGroupID",
-    "ForumMessageID": "ForumMessageID",
-    "post_type":      "post_type",
-    "Topic_title":    "Topic_title",
-}
-
+# Word-shingle Jaccard similarity for find_near_overlaps()
+NEAR_THRESHOLD = 0.8
 
 # ── Loaders ───────────────────────────────────────────────────────────────────
 
@@ -41,44 +33,20 @@ def load_old_messages() -> pd.DataFrame:
 
 
 def load_new_data() -> pd.DataFrame:
-    """Load and concatenate all 4 new CSV files."""
-    parts = []
-    for fname in os.listdir(NEW_DATA_DIR):
-        if fname.endswith(".csv"):
-            path = os.path.join(NEW_DATA_DIR, fname)
-            print(f"  Loading {path}")
-            df = pd.read_csv(path, sep=";", quotechar='"', on_bad_lines="warn")
-            df["source_file"] = fname
-            parts.append(df)
-
-    if not parts:
-        raise FileNotFoundError(f"No CSV files found in {NEW_DATA_DIR}")
-
-    combined = pd.concat(parts, ignore_index=True)
-    combined = combined.rename(columns=NEW_COL_MAP)
-    combined["PostDate"] = pd.to_datetime(combined["PostDate"], errors="coerce")
+    """Load and concatenate all new CSV files (typed; cached for integrate_datasets)."""
+    combined = load_new_exports(NEW_DATA_DIR, cache_path=os.path.join(OUTPUT_DIR, CACHE_FILE))
     combined["source"] = "new"
     return combined
 
 
-# ── Text normalization for comparison ─────────────────────────────────────────
-
-def _normalize(text: str) -> str:
-    """Lowercase, strip whitespace and punctuation for comparison."""
-    text = str(text).lower().strip()
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"[^\w\s]", "", text)
-    return text
-
-
 # ── Overlap detection ─────────────────────────────────────────────────────────
 
 def find_exact_overlaps(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
     """Find messages with identical normalized text in both datasets."""
     old = old.copy()
     new = new.copy()
-    old["_norm"] = old["MessageText"].fillna("").apply(_normalize)
-    new["_norm"] = new["MessageText"].fillna("").apply(_normalize)
+    old["_norm"] = match_key_series(old["MessageText"])
+    new["_norm"] = match_key_series(new["MessageText"])
 
     # Only compare non-empty texts
     old_texts = old[old["_norm"].str.len() > 20][["PosterID", "PostDate", "_norm", "ForumTopicID"]]
@@ -91,46 +59,40 @@ def find_exact_overlaps(old: pd.DataFrame, new: pd.DataFrame) -> pd.DataFrame:
 def find_near_overlaps(
     old: pd.DataFrame,
     new: pd.DataFrame,
-    sample_size: int = 500,
-    threshold: float = 0.85,
+    threshold: float = NEAR_THRESHOLD,
 ) -> pd.DataFrame:
     """
-    Sample-based near-duplicate detection using SequenceMatcher.
-    Only runs on a sample to keep runtime manageable.
+    Near-duplicate detection over the full exports with MinHash/LSH
+    (utils/near_duplicates.py). similarity is the estimated Jaccard
+    similarity of the word 3-shingles of the normalized texts.
     """
-    old_sample = old[old["MessageText"].fillna("").str.split().str.len() > 10].sample(
-        min(sample_size, len(old)), random_state=42
-    )
-    new_sample = new[new["MessageText"].fillna("").str.split().str.len() > 10].sample(
-        min(sample_size, len(new)), random_state=42
-    )
+    old_long = old[old["MessageText"].fillna("").str.split().str.len() > 10]
+    new_long = new[new["MessageText"].fillna("").str.split().str.len() > 10]
 
-    rows = []
-    for _, o_row in old_sample.iterrows():
-        o_text = _normalize(o_row["MessageText"])
-        for _, n_row in new_sample.iterrows():
-            n_text = _normalize(n_row["MessageText"])
-            ratio = SequenceMatcher(None, o_text, n_text).ratio()
-            if ratio >= threshold:
-                rows.append({
-                    "similarity":       round(ratio, 3),
-                    "old_PosterID":     o_row["PosterID"],
-                    "new_PosterID":     n_row["PosterID"],
-                    "old_PostDate":     o_row["PostDate"],
-                    "new_PostDate":     n_row["PostDate"],
-                    "old_text_snippet": str(o_row["MessageText"])[:100],
-                    "new_text_snippet": str(n_row["MessageText"])[:100],
-                })
-    
-    if not rows:
-        print("  No near-duplicates found in sample.")
+    pairs = near_duplicate_pairs(
+        match_key_series(old_long["MessageText"]).tolist(),
+        match_key_series(new_long["MessageText"]).tolist(),
+        threshold=threshold,
+    )
+    if pairs.empty:
+        print("  No near-duplicates found.")
         return pd.DataFrame(columns=[
             "similarity", "old_PosterID", "new_PosterID",
             "old_PostDate", "new_PostDate",
             "old_text_snippet", "new_text_snippet"
         ])
 
-    return pd.DataFrame(rows).sort_values("similarity", ascending=False)
+    o = old_long.iloc[pairs["left"].to_numpy()]
+    n = new_long.iloc[pairs["right"].to_numpy()]
+    return pd.DataFrame({
+        "similarity":       pairs["similarity"].to_numpy(),
+        "old_PosterID":     o["PosterID"].to_numpy(),
+        "new_PosterID":     n["PosterID"].to_numpy(),
+        "old_PostDate":     o["PostDate"].to_numpy(),
+        "new_PostDate":     n["PostDate"].to_numpy(),
+        "old_text_snippet": o["MessageText"].astype(str).str[:100].to_numpy(),
+        "new_text_snippet": n["MessageText"].astype(str).str[:100].to_numpy(),
+    }).sort_values("similarity", ascending=False, kind="stable")
 
 
 # ── Superuser signals in new data ─────────────────────────────────────────────
@@ -143,16 +105,6 @@ def superuser_signals(new: pd.DataFrame, exact_overlaps: pd.DataFrame) -> pd.Dat
       - very low lexical diversity
       - abnormally uniform posting times
     """
-    signals = []
-
-    authors = new["PosterID"].dropna().unique()
-
-    # Pre-compute first posts per topic
-    new_sorted = new.sort_values("PostDate")
-    first_posts = new_sorted.groupby("ForumTopicID")["PosterID"].first().reset_index()
-    first_posts.columns = ["ForumTopicID", "thread_starter"]
-    thread_starter_counts = first_posts["thread_starter"].value_counts()
-
     # Authors appearing in exact overlaps
     overlap_authors = (
         exact_overlaps["PosterID_new"].value_counts()
@@ -160,32 +112,11 @@ def superuser_signals(new: pd.DataFrame, exact_overlaps: pd.DataFrame) -> pd.Dat
         else pd.Series(dtype=int)
     )
 
-    for author in authors:
-        author_posts = new[new["PosterID"] == author]["MessageText"].fillna("").astype(str)
-        all_words = " ".join(author_posts).lower().split()
-
-        post_count       = len(author_posts)
-        unique_words     = len(set(all_words))
-        total_words      = len(all_words)
-        lexical_diversity = round(unique_words / max(total_words, 1), 3)
-        threads_started  = thread_starter_counts.get(author, 0)
-        overlap_count    = overlap_authors.get(author, 0)
-
-        # Posting hour std — low std = suspiciously regular posting times
-        author_dates = new[new["PosterID"] == author]["PostDate"].dropna()
-        hour_std = round(author_dates.dt.hour.std(), 2) if len(author_dates) > 5 else None
-
-        signals.append({
-            "PosterID":          author,
-            "post_count":        post_count,
-            "threads_started":   threads_started,
-            "threads_started_pct": round(threads_started / max(post_count, 1) * 100, 1),
-            "lexical_diversity": lexical_diversity,
-            "hour_std":          hour_std,
-            "overlap_count":     overlap_count,
-        })
-
-    df = pd.DataFrame(signals).sort_values("overlap_count", ascending=False)
+    # post_count, threads_started(_pct), lexical_diversity and hour_std (low
+    # std = suspiciously regular posting times) in one grouped pass.
+    df = author_signals(new).drop(columns=["total_words"])
+    df["overlap_count"] = overlap_authors.reindex(df["PosterID"], fill_value=0).to_numpy()
+    df = df.sort_values("overlap_count", ascending=False)
 
     # Flag likely superusers — adjust thresholds after reviewing output
     df["superuser_flag"] = (
@@ -227,8 +158,8 @@ def print_report(old, new, exact, near, signals):
         print(exact[["PosterID_old", "PosterID_new", "PostDate_old", "PostDate_new"]].head(10).to_string(index=False))
 
     print(sep)
-    print(f"NEAR-DUPLICATE SAMPLE (threshold=0.85, sample={500})")
-    print(f"  Near-duplicates found in sample: {len(near)}")
+    print(f"NEAR-DUPLICATES (MinHash/LSH, Jaccard ≥ {NEAR_THRESHOLD})")
+    print(f"  Near-duplicate pairs found: {len(near)}")
     if len(near) > 0:
         print(near.head(5).to_string(index=False))
 
@@ -250,7 +181,7 @@ def main():
     print("\nFinding exact overlaps…")
     exact = find_exact_overlaps(old, new)
 
-    print("\nFinding near-duplicates (sample-based, may take a moment)…")
+    print("\nFinding near-duplicates (MinHash/LSH over all messages)…")
     near = find_near_overlaps(old, new)
 
     print("\nAnalyzing superuser signals in new data…")
@@ -24,9 +24,10 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.backends.backend_pdf as pdf_backend
 
-from dataset_io import add_dataset_arg, structured_path, variant_path, subtitle_for
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table, subtitle_for
 from role_analysis import add_role_section_to_pdf
-from utils.thread_utils import strip_entity_placeholders_col, parse_post_dates
+from utils.corpus import corpus_dir, load_corpus
+from utils.thread_utils import strip_entity_placeholders_col
 
 warnings.filterwarnings("ignore")
 
@@ -46,8 +47,7 @@ ACCENT    = "#E8A838"
 # =============================================================================
 
 def load_data(input_path: str) -> pd.DataFrame:
-    df = pd.read_csv(input_path)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(input_path)
     df = df.dropna(subset=[DATE_COL])
     df = strip_entity_placeholders_col(df, TEXT_COL)
     print(f"Loaded {len(df)} messages from {df[POSTER_COL].nunique()} posters.")
@@ -216,7 +216,7 @@ def compute_stats(df: pd.DataFrame) -> dict:
 # Build PDF
 # =============================================================================
 
-def build_pdf(stats: dict, pdf_path: str, subtitle: str = "All Users"):
+def build_pdf(stats: dict, pdf_path: str, subtitle: str = "All Users", corpus=None):
     print(f"Building PDF → {pdf_path}")
 
     with pdf_backend.PdfPages(pdf_path) as pdf:
@@ -263,7 +263,7 @@ def build_pdf(stats: dict, pdf_path: str, subtitle: str = "All Users"):
         save(_bar(m.index.tolist(), m.values, "Popular Months", "Month", rotate=True))
 
         # ── Role-based section: word count, popular words, sentence structure, emoji ──
-        add_role_section_to_pdf(pdf, stats["df_copy"])
+        add_role_section_to_pdf(pdf, stats["df_copy"], corpus=corpus)
 
     print(f"  PDF saved → {pdf_path}")
 
@@ -306,15 +306,17 @@ if __name__ == "__main__":
 
     print(f"\n=== Report 1: All users ({ds}) ===")
     df = load_data(input_path)
+    corpus = load_corpus(corpus_dir(OUTPUT_DIR, ds))
     stats = compute_stats(df)
-    build_pdf(stats, pdf_path=pdf_path, subtitle=f"All Users — {sub}")
+    build_pdf(stats, pdf_path=pdf_path, subtitle=f"All Users — {sub}", corpus=corpus)
 
     df_multi = save_filtered(df, filtered_path)
 
     print(f"\n=== Report 2: Multi-posters only ({ds}) ===")
     print(f"Loaded {len(df_multi)} messages from {df_multi[POSTER_COL].nunique()} posters.")
     stats_multi = compute_stats(df_multi)
-    build_pdf(stats_multi, pdf_path=pdf_path_multi, subtitle=f"Multi-Posters Only — {sub}")
+    build_pdf(stats_multi, pdf_path=pdf_path_multi, subtitle=f"Multi-Posters Only — {sub}",
+              corpus=corpus)
 
     print("\n✓ Done.")
     print(f"  {pdf_path}")
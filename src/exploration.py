@@ -21,7 +21,7 @@ from collections import Counter
 import emoji as emoji_lib
 
 from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
-from dataset_io import add_dataset_arg, structured_path, variant_path
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table
 
 warnings.filterwarnings("ignore")
 
@@ -36,8 +36,7 @@ TOPIC_COL   = "ForumTopicID"
 # ── Loader ────────────────────────────────────────────────────────────────────
 
 def load_messages(path: str = "output/messages_structured.csv") -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(path)
     df = df.dropna(subset=[DATE_COL])
     df = strip_entity_placeholders_col(df, TEXT_COL)
     return df
@@ -36,9 +36,11 @@ import matplotlib.pyplot as plt
 import matplotlib.backends.backend_pdf as pdf_backend
 from scipy import stats
 
-from utils.CDS import process_dataset
-from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
-from dataset_io import add_dataset_arg, structured_path, variant_path, subtitle_for
+from utils.cds_matcher import CDSMatches
+from utils.cds_store import add_cds_args, score_texts, score_variants
+from utils.thread_utils import label_roles, strip_entity_placeholders_col
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table, write_table, subtitle_for
+from config import CDS_N_JOBS, CDS_CHUNK_SIZE
 
 warnings.filterwarnings("ignore")
 
@@ -73,8 +75,7 @@ ALT_GREY  = "#AAAAAA"
 # =============================================================================
 
 def load_data(path: str | None = None) -> pd.DataFrame:
-    df = pd.read_csv(path or INPUT_PATH)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(path or INPUT_PATH)
     df = df.dropna(subset=[DATE_COL, TEXT_COL]).copy()
     df = strip_entity_placeholders_col(df, TEXT_COL)
     print(f"  Loaded {len(df)} messages from {df[POSTER_COL].nunique()} users.")
@@ -93,24 +94,24 @@ def add_time_columns(df: pd.DataFrame) -> pd.DataFrame:
 # CDS scoring — uses the real CDS.py + NL lexicon
 # =============================================================================
 
-# AFTER
-def compute_cds(df: pd.DataFrame) -> pd.DataFrame:
-    print("  Running CDS scoring (this may take a few minutes)…")
-
-    tweets = pd.DataFrame({"text": df[TEXT_COL].fillna("").str.lower().values})
+def compute_cds(df: pd.DataFrame, matches: CDSMatches | None = None,
+                dataset: str = "combined", n_jobs: int | None = CDS_N_JOBS,
+                chunk_size: int = CDS_CHUNK_SIZE) -> pd.DataFrame:
+    """
+    Adds the CDS flag and category columns. matches: the df's hits from the
+    CDS store (score_variants); read from the dataset's store when omitted.
+    """
+    if matches is None:
+        print("  Running CDS scoring…")
+        matches = score_texts(df[TEXT_COL], dataset, OUTPUT_DIR, language="NL",
+                              n_jobs=n_jobs, chunk_size=chunk_size)
 
-    cds_phrases, cds_per_category, cds_per_tweet = process_dataset(
-        tweets, output="all_variants", language="NL"
-    )
+    cds_per_category = matches.category_frame()
 
     df = df.reset_index(drop=True)
-    df["CDS"] = cds_per_tweet["CDS"].values
+    df["CDS"] = matches.flags
     for col in cds_per_category.columns:
-        df[col] = cds_per_category[col].values   # ← loop body ends here
-
-    # These three lines are outside the loop
-    overall = df["CDS"].mean() * 100
-    print(f"  Overall CDS prevalence: {overall:.2f}%")
+        df[col] = cds_per_category[col].values
     return df
 
 
@@ -633,27 +634,15 @@ def build_pdf(df: pd.DataFrame, pdf_path: str | None = None,
 # Main
 # =============================================================================
 
-def main(dataset: str | None = None):
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    ds            = dataset or "combined"
-    input_path    = structured_path(OUTPUT_DIR, ds)
+def _write_variant(ds: str, df: pd.DataFrame):
     pdf_path_out  = variant_path(OUTPUT_DIR, "exploratory_report.pdf", ds)
     cds_path_out  = variant_path(OUTPUT_DIR, "cds_scores.csv",         ds)
     user_cds_out  = variant_path(OUTPUT_DIR, "cds_per_user.csv",       ds)
 
-    print("Loading data…")
-    df = load_data(input_path)
-
-    print("\nLabelling thread roles…")
-    df = label_roles(df)
-
-    print("\nAdding time columns…")
-    df = add_time_columns(df)
-
-    print("\nComputing CDS scores…")
-    df = compute_cds(df)
+    overall = df["CDS"].mean() * 100
+    print(f"  Overall CDS prevalence: {overall:.2f}%")
 
-    df.to_csv(cds_path_out, index=False)
+    write_table(df, cds_path_out)
     print(f"  CDS scores saved → {cds_path_out}")
 
     user_cds = compute_user_cds(df)
@@ -670,9 +659,44 @@ def main(dataset: str | None = None):
     print(f"  {user_cds_out}")
 
 
+def main(dataset: str | None = None, datasets: list[str] | None = None,
+         n_jobs: int | None = CDS_N_JOBS, chunk_size: int = CDS_CHUNK_SIZE):
+    """
+    Runs one variant, or several (--all) with each distinct message text
+    CDS-scored once across them (and only once ever, via the CDS store).
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    datasets = datasets or [dataset or "combined"]
+
+    frames = {}
+    for ds in datasets:
+        print(f"Loading data ({ds})…")
+        df = load_data(structured_path(OUTPUT_DIR, ds))
+
+        print("\nLabelling thread roles…")
+        df = label_roles(df)
+
+        print("\nAdding time columns…")
+        frames[ds] = add_time_columns(df)
+
+    print("\nComputing CDS scores…")
+    matches = score_variants({ds: df[TEXT_COL] for ds, df in frames.items()},
+                             OUTPUT_DIR, language="NL", n_jobs=n_jobs, chunk_size=chunk_size)
+
+    for ds in datasets:
+        if len(datasets) > 1:
+            print(f"\n{'='*60}\n  Dataset: {ds}\n{'='*60}")
+        _write_variant(ds, compute_cds(frames.pop(ds), matches.pop(ds)))
+
+
 if __name__ == "__main__":
     import argparse
+    from dataset_io import DATASET_CHOICES
     ap = argparse.ArgumentParser(description="Exploratory analysis + CDS report")
     add_dataset_arg(ap)
+    ap.add_argument("--all", dest="run_all", action="store_true",
+                    help="Run for all three dataset variants, scoring shared messages once")
+    add_cds_args(ap, n_jobs=CDS_N_JOBS, chunk_size=CDS_CHUNK_SIZE)
     args = ap.parse_args()
-    main(dataset=args.dataset)
+    main(dataset=args.dataset, datasets=DATASET_CHOICES if args.run_all else None,
+         n_jobs=args.n_jobs, chunk_size=args.chunk_size)
@@ -29,16 +29,18 @@ import matplotlib.pyplot as plt
 import matplotlib.backends.backend_pdf as pdf_backend
 import pandas as pd
 
-from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
-from utils.CDS import process_dataset
-from utils.absolutist import absolutist_rate as _absolutist_rate
+from utils.thread_utils import label_roles, strip_entity_placeholders_col
+from utils.cds_store import add_cds_args, score_variants
+from utils.absolutist import absolutist_rates
+from utils.corpus import open_corpus, tokenize_texts
 
 import exploration         as ex
 import exploratory_analysis as ea
 import cds_prevalence      as cp
 import liwc_analysis       as la
 
-from dataset_io import add_dataset_arg, variant_path, subtitle_for
+from dataset_io import add_dataset_arg, variant_path, read_table, subtitle_for, text_codes
+from config import CDS_N_JOBS, CDS_CHUNK_SIZE
 
 warnings.filterwarnings("ignore")
 
@@ -88,35 +90,38 @@ def _section_divider(title: str) -> plt.Figure:
 # Data loading + scoring
 # =============================================================================
 
-def load_and_score(dataset: str | None) -> dict:
-    """Load, label, score CDS and LIWC for the given dataset. Returns a result dict."""
+def _load_variant(ds: str) -> pd.DataFrame:
     from dataset_io import structured_path
-    input_path = structured_path(OUTPUT_DIR, dataset or "combined")
+    input_path = structured_path(OUTPUT_DIR, ds)
 
     print(f"Loading {input_path}…")
-    df = pd.read_csv(input_path)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(input_path)
     df = df.dropna(subset=[DATE_COL, TEXT_COL]).copy()
     df = strip_entity_placeholders_col(df, TEXT_COL)
     print(f"  {len(df)} messages from {df[POSTER_COL].nunique()} users.")
 
     df = label_roles(df)
     df = ea.add_time_columns(df)
-
-    # ── CDS scoring (one call for all outputs) ────────────────────────────────
+    return df.reset_index(drop=True)
+
+
+def load_and_score_all(datasets: list[str], n_jobs: int | None = CDS_N_JOBS,
+                       chunk_size: int = CDS_CHUNK_SIZE) -> dict[str, dict]:
+    """
+    Load, label, score CDS and LIWC for several variants at once. Each
+    distinct message text is scored once (old and new_only are slices of
+    combined) and the scores are sliced back per variant.
+    Returns {dataset: result dict} — see load_and_score().
+    """
+    frames = {ds: _load_variant(ds) for ds in datasets}
+    unique, codes = text_codes(frames, TEXT_COL)
+    print(f"  {len(unique)} distinct texts across {', '.join(datasets)}.")
+
+    # ── CDS hits (from the CDS store; only unseen texts are matched) ──────────
     print("Scoring CDS…")
-    raw = pd.DataFrame({"text": df[TEXT_COL].fillna("").str.lower().values})
-    cds_phrases, cds_per_category, cds_per_tweet = process_dataset(
-        raw, output="all_variants", language="NL"
-    )
-    cds_phrases      = cds_phrases.reset_index(drop=True)
-    cds_per_category = cds_per_category.reset_index(drop=True)
-    df               = df.reset_index(drop=True)
-    df["CDS"]        = cds_per_tweet["CDS"].values
-    for col in cds_per_category.columns:
-        df[col] = cds_per_category[col].values
-    overall = df["CDS"].mean() * 100
-    print(f"  Overall CDS prevalence: {overall:.2f}%")
+    cds = score_variants({ds: df[TEXT_COL] for ds, df in frames.items()},
+                         OUTPUT_DIR, language="NL", n_jobs=n_jobs, chunk_size=chunk_size)
+    scores = pd.DataFrame(index=range(len(unique)))
 
     # ── LIWC scoring (skip gracefully if no dictionary) ───────────────────────
     liwc_cols: list[str] = []
@@ -125,36 +130,60 @@ def load_and_score(dataset: str | None) -> dict:
         term_to_cats, cat_map  = la.load_liwc(la.LIWC_DICT_PATH)
         all_cats               = sorted(set(cat_map.values()))
         term_to_cats, all_cats = la.ensure_fps(term_to_cats, all_cats)
-        df, liwc_cols          = la.score_messages(df, term_to_cats, all_cats)
-        df["absolutist_rate"]  = df[TEXT_COL].apply(_absolutist_rate)
-        df                     = la.add_time_columns(df)
+        tokens                 = tokenize_texts(unique, open_corpus(OUTPUT_DIR, datasets))
+        liwc, liwc_cols        = la.score_messages(unique.to_frame(), term_to_cats, all_cats,
+                                                   tokens=tokens)
+        liwc["absolutist_rate"] = absolutist_rates(tokens)
+        scores = pd.concat([scores, liwc.drop(columns=[TEXT_COL])], axis=1)
     else:
         print(f"  LIWC dictionary not found at {la.LIWC_DICT_PATH} — skipping LIWC section.")
 
-    # ── Pre-compute rankings needed by cds_prevalence figures ─────────────────
-    cat_ranking    = cp.compute_category_ranking(df)
-    phrase_ranking = cp.compute_phrase_ranking(df, cds_phrases)
-
-    return {
-        "df":             df,
-        "cds_phrases":    cds_phrases,
-        "cat_ranking":    cat_ranking,
-        "phrase_ranking": phrase_ranking,
-        "liwc_cols":      liwc_cols,
-    }
+    results = {}
+    for ds, df in frames.items():
+        rows = codes[ds]
+        matches = cds.pop(ds)
+        phrases = matches.phrase_frame(sparse=True).reset_index(drop=True)
+        cds_scores = matches.category_frame().reset_index(drop=True)
+        cds_scores.insert(0, "CDS", matches.flags)
+        df = pd.concat([df, cds_scores, scores.iloc[rows].reset_index(drop=True)], axis=1)
+        if liwc_cols:
+            df = la.add_time_columns(df)
+        overall = df["CDS"].mean() * 100
+        print(f"  [{ds}] Overall CDS prevalence: {overall:.2f}%")
+
+        # ── Pre-compute rankings needed by cds_prevalence figures ─────────────
+        results[ds] = {
+            "df":             df,
+            "cds_phrases":    phrases,
+            "cat_ranking":    cp.compute_category_ranking(df),
+            "phrase_ranking": cp.compute_phrase_ranking(df, phrases),
+            "liwc_cols":      liwc_cols,
+        }
+    return results
+
+
+def load_and_score(dataset: str | None, n_jobs: int | None = CDS_N_JOBS,
+                   chunk_size: int = CDS_CHUNK_SIZE) -> dict:
+    """Load, label, score CDS and LIWC for the given dataset. Returns a result dict."""
+    ds = dataset or "combined"
+    return load_and_score_all([ds], n_jobs=n_jobs, chunk_size=chunk_size)[ds]
 
 
 # =============================================================================
 # Report builder
 # =============================================================================
 
-def build_full_report(dataset: str | None = None):
+def build_full_report(dataset: str | None = None, data: dict | None = None,
+                      n_jobs: int | None = CDS_N_JOBS, chunk_size: int = CDS_CHUNK_SIZE):
+    """data: a load_and_score() result to reuse; scored here when omitted
+    (n_jobs/chunk_size: CDS matching, see utils/cds_store.py)."""
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     ds       = dataset or "combined"
     label    = _DATASET_LABEL.get(dataset, "Combined Dataset")
     pdf_path = variant_path(OUTPUT_DIR, "full_report.pdf", ds)
 
-    data = load_and_score(dataset)
+    if data is None:
+        data = load_and_score(dataset, n_jobs=n_jobs, chunk_size=chunk_size)
     df            = data["df"]
     cds_phrases   = data["cds_phrases"]
     cat_ranking   = data["cat_ranking"]
@@ -210,15 +239,18 @@ def main():
     ap = argparse.ArgumentParser(description="Generate the full consolidated analysis report.")
     add_dataset_arg(ap)
     ap.add_argument("--all", dest="run_all", action="store_true",
-                    help="Run for all three dataset variants sequentially")
+                    help="Run for all three dataset variants, scoring shared messages once")
+    add_cds_args(ap, n_jobs=CDS_N_JOBS, chunk_size=CDS_CHUNK_SIZE)
     args = ap.parse_args()
 
     if args.run_all:
+        results = load_and_score_all(DATASET_CHOICES, n_jobs=args.n_jobs,
+                                     chunk_size=args.chunk_size)
         for ds in DATASET_CHOICES:
             print(f"\n{'='*60}\n  Dataset: {ds}\n{'='*60}")
-            build_full_report(dataset=ds)
+            build_full_report(dataset=ds, data=results.pop(ds))
     else:
-        build_full_report(dataset=args.dataset)
+        build_full_report(dataset=args.dataset, n_jobs=args.n_jobs, chunk_size=args.chunk_size)
 
 
 if __name__ == "__main__":
@@ -17,18 +17,30 @@
 #   output/integrated_topics.csv        – topic titles from new data for review
 #   output/id_bridge.csv                – UUID → integer ID mapping with confidence
 #   output/new_superuser_exclusions.csv – behavioral superuser exclusion list
+#   output/integration_state/           – what --incremental starts from
 #
 # Run with:  python src/integrate_datasets.py
+#            python src/integrate_datasets.py --incremental   # only added exports
 # =============================================================================
 
 from __future__ import annotations
 
+import importlib.util
+import json
 import os
-import re
 import pandas as pd
 import numpy as np
 from difflib import SequenceMatcher
 
+from dataset_io import none_to_nan
+from utils.author_signals import (
+    author_signals, author_stats, merge_author_stats, signals_from_stats, topic_first_posts,
+)
+from utils.checkpoints import file_signature
+from utils.near_duplicates import near_duplicate_pairs
+from utils.new_exports import CACHE_FILE, load_new_exports
+from utils.text_normalize import match_key, match_key_series, text_fingerprints
+
 # ── Directories ───────────────────────────────────────────────────────────────
 DATA_DIR     = "data"
 NEW_DATA_DIR = "data/new"
@@ -40,19 +52,6 @@ OLD_TEXT_COL = "MessageText"
 OLD_DATE_COL = "PostDate"
 OLD_TOPIC_COL = "ForumTopicID"
 
-# ── New data column mapping ───────────────────────────────────────────────────
-NEW_COL_MAP = {
-    "Content":           "MessageText",
-    "AuthorID":          "PosterID",
-    "PostDate":          "PostDate",
-    "PostModifiedDate":  "PostModifiedDate",
-    "ForumTopicID":      "ForumTopicID",
-    "ForumGroupID":      "ForumGroupID",
-    "ForumMessageID":    "ForumMessageID",
-    "post_type":         "post_type",
-    "Topic_title":       "Topic_title",
-}
-
 # ── Account types to exclude from old data ────────────────────────────────────
 SUPERUSER_ACCOUNT_IDS = {1, 4}
 
@@ -72,6 +71,15 @@ THREAD_START_PCT_THRESHOLD      = 50   # above this = seeding behavior
 # One new ID   → many old UUIDs    = SHARED account, exclude if above this count
 SHARED_ACCOUNT_THRESHOLD = 15  # new IDs mapping to more old UUIDs than this are excluded
 
+# ── Near-duplicate matching (MinHash/LSH, utils/near_duplicates.py) ─────────
+# Word-shingle Jaccard similarity at or above which an old and a new message
+# count as the same post lightly edited. None = exact matches only; set here
+# or pass --near-match to add NEAR edges to the bridge and drop near-duplicate
+# re-posts in remove_duplicates().
+NEAR_MATCH_THRESHOLD: float | None = None
+
+_PARQUET_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+
 
 # =============================================================================
 # Helpers
@@ -88,13 +96,40 @@ def write_csv(df: pd.DataFrame, filename: str):
 
 def _normalize(text: str) -> str:
     """Normalize text for comparison — strip HTML, punctuation, whitespace."""
-    text = str(text).lower().strip()
-    text = re.sub(r"<[^>]+>", " ", text)
-    text = text.replace("&amp;", "&").replace("&nbsp;", " ").replace("&quot;", '"')
-    text = re.sub(r"&[a-z]+;", " ", text)
-    text = re.sub(r"\s+", " ", text)
-    text = re.sub(r"[^\w\s]", "", text)
-    return text.strip()
+    return match_key(str(text), strip_html=True)
+
+
+def text_keys(
+    messages: pd.DataFrame,
+    text_col: str = "MessageText",
+    confirm: bool = False,
+) -> pd.DataFrame:
+    """
+    Per message: fp, a 64-bit fingerprint of _normalize(text), and key_len,
+    the length of the normalized text. Computed once in run_integration and
+    shared by build_id_bridge() and remove_duplicates(), which join on fp
+    instead of holding the normalized corpus as strings. confirm=True adds
+    fp2, the second fingerprint the incremental state matches on.
+    """
+    return text_fingerprints(messages[text_col], strip_html=True, confirm=confirm)
+
+
+def _keys_for(messages: pd.DataFrame, keys: pd.DataFrame | None, text_col: str) -> pd.DataFrame:
+    if keys is None:
+        return text_keys(messages, text_col)
+    return keys.loc[messages.index]
+
+
+def _same_text(
+    old_text: pd.Series,
+    new_text: pd.Series,
+    old_rows: pd.Index,
+    new_rows: pd.Index,
+) -> np.ndarray:
+    """Confirms fingerprint matches on the normalized text (hash collisions)."""
+    old_norm = match_key_series(old_text.loc[old_rows], strip_html=True).to_numpy()
+    new_norm = match_key_series(new_text.loc[new_rows], strip_html=True).to_numpy()
+    return old_norm == new_norm
 
 
 # =============================================================================
@@ -127,35 +162,19 @@ def load_old_raw() -> tuple[pd.DataFrame, pd.DataFrame, pd.DataFrame]:
 # Step 2: Load new raw data
 # =============================================================================
 
-def load_new_raw() -> pd.DataFrame:
-    """Load and normalize all new CSV exports."""
+def load_new_raw(files: list[str] | None = None) -> pd.DataFrame:
+    """Load and normalize all new CSV exports (or only `files`, uncached)."""
     print("\n[2] Loading new raw data…")
 
-    parts = []
-    for fname in sorted(os.listdir(NEW_DATA_DIR)):
-        if not fname.endswith(".csv"):
-            continue
-        path = os.path.join(NEW_DATA_DIR, fname)
-        df = pd.read_csv(path, sep=";", quotechar='"', on_bad_lines="skip")
-        df["source_file"] = fname
-        parts.append(df)
-        print(f"  Loaded {path}: {len(df)} rows")
-
-    if not parts:
-        raise FileNotFoundError(f"No CSV files found in {NEW_DATA_DIR}")
-
-    combined = pd.concat(parts, ignore_index=True)
-    combined = combined.rename(columns=NEW_COL_MAP)
+    # Typed and renamed while reading; shared with diagnose_new_data via the cache
+    cache_path = os.path.join(OUTPUT_DIR, CACHE_FILE) if files is None else None
+    combined = load_new_exports(NEW_DATA_DIR, cache_path=cache_path, files=files)
 
     # Drop Group metadata rows
     before = len(combined)
     combined = combined[combined["post_type"] != "Group"].copy()
     print(f"  Dropped {before - len(combined)} 'Group' metadata rows.")
 
-    combined["PostDate"] = pd.to_datetime(combined["PostDate"], errors="coerce")
-    combined["PostModifiedDate"] = pd.to_datetime(
-        combined["PostModifiedDate"], errors="coerce"
-    )
     combined["source"] = "new"
     combined["PosterID"] = combined["PosterID"].astype(str)
 
@@ -167,9 +186,28 @@ def load_new_raw() -> pd.DataFrame:
 # Step 3: Build ID bridge
 # =============================================================================
 
+def _near_matches(
+    old_norm: pd.Series,
+    new_norm: pd.Series,
+    threshold: float,
+) -> pd.DataFrame:
+    """
+    Near-duplicate (old row label, new row label, similarity) pairs between
+    two normalized text columns, excluding texts that are exactly equal.
+    """
+    pairs = near_duplicate_pairs(old_norm.tolist(), new_norm.tolist(), threshold=threshold)
+    pairs["old"] = old_norm.index[pairs["left"].to_numpy()]
+    pairs["new"] = new_norm.index[pairs["right"].to_numpy()]
+    differs = old_norm.loc[pairs["old"]].to_numpy() != new_norm.loc[pairs["new"]].to_numpy()
+    return pairs.loc[differs, ["old", "new", "similarity"]].reset_index(drop=True)
+
+
 def build_id_bridge(
     old_messages: pd.DataFrame,
     new_messages: pd.DataFrame,
+    near_threshold: float | None = NEAR_MATCH_THRESHOLD,
+    old_keys: pd.DataFrame | None = None,
+    new_keys: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
     """
     Builds a mapping table between old UUIDs and new integer IDs.
@@ -178,32 +216,83 @@ def build_id_bridge(
       HIGH      – one-to-one mapping, safe to link
       COLLISION – one old UUID maps to multiple new IDs (corrupted old UUID)
       SHARED    – one new ID maps to many old UUIDs (shared/admin account)
+      NEAR      – only linked by near-duplicate texts (Jaccard ≥ near_threshold);
+                  for review, never used to remap IDs. Only with near_threshold.
+
+    old_keys / new_keys are text_keys() of the two frames, if already computed.
     """
     print("\n[3] Building ID bridge…")
 
-    old = old_messages.copy()
-    new = new_messages.copy()
-    old["_norm"] = old[OLD_TEXT_COL].fillna("").apply(_normalize)
-    new["_norm"] = new["MessageText"].fillna("").apply(_normalize)
+    old_keys = _keys_for(old_messages, old_keys, OLD_TEXT_COL)
+    new_keys = _keys_for(new_messages, new_keys, "MessageText")
 
     # Only match on non-trivial messages (>20 chars normalized)
-    old_texts = old[old["_norm"].str.len() > 20][[
-        OLD_ID_COL, OLD_DATE_COL, OLD_TOPIC_COL, "_norm"
-    ]].rename(columns={OLD_ID_COL: "PosterID_old", OLD_DATE_COL: "PostDate_old",
-                        OLD_TOPIC_COL: "ForumTopicID_old"})
+    old_long = (old_keys["key_len"] > 20).to_numpy()
+    old_texts = old_messages.loc[old_long, [OLD_ID_COL, OLD_DATE_COL, OLD_TOPIC_COL]].rename(
+        columns={OLD_ID_COL: "PosterID_old", OLD_DATE_COL: "PostDate_old",
+                 OLD_TOPIC_COL: "ForumTopicID_old"})
+    old_texts["_fp"] = old_keys.loc[old_long, "fp"].to_numpy()
+
+    new_long = (new_keys["key_len"] > 20).to_numpy()
+    new_texts = new_messages.loc[new_long, ["PosterID", "PostDate", "ForumTopicID"]].rename(
+        columns={"PosterID": "PosterID_new", "PostDate": "PostDate_new",
+                 "ForumTopicID": "ForumTopicID_new"})
+    new_texts["_fp"] = new_keys.loc[new_long, "fp"].to_numpy()
+
+    # Join on the int64 fingerprint; the texts are only compared for the
+    # matched rows, to rule out hash collisions.
+    exact = (
+        old_texts.rename_axis("_row_old").reset_index()
+        .merge(new_texts.rename_axis("_row_new").reset_index(), on="_fp", how="inner")
+    )
+    confirmed = _same_text(old_messages[OLD_TEXT_COL], new_messages["MessageText"],
+                           pd.Index(exact["_row_old"]), pd.Index(exact["_row_new"]))
+    exact = exact[confirmed].drop(columns=["_fp", "_row_old", "_row_new"])
+
+    print(f"  Found {len(exact)} exact text matches across datasets.")
 
-    new_texts = new[new["_norm"].str.len() > 20][[
-        "PosterID", "PostDate", "ForumTopicID", "_norm"
-    ]].rename(columns={"PosterID": "PosterID_new", "PostDate": "PostDate_new",
-                        "ForumTopicID": "ForumTopicID_new"})
+    # Exact matches per (old, new) pair, in order of first appearance
+    pair_counts = (
+        exact.groupby(["PosterID_old", "PosterID_new"], sort=False, dropna=False)
+        .size()
+        .reset_index(name="overlap_count")
+    )
+    mapping = _classify_pairs(pair_counts)
 
-    exact = old_texts.merge(new_texts, on="_norm", how="inner")
-    exact = exact.drop(columns=["_norm"])
+    if near_threshold is not None:
+        near = _near_matches(
+            match_key_series(old_messages.loc[old_texts.index, OLD_TEXT_COL], strip_html=True),
+            match_key_series(new_messages.loc[new_texts.index, "MessageText"], strip_html=True),
+            near_threshold,
+        )
+        edges = pd.DataFrame({
+            "PosterID_old": old_texts.loc[near["old"], "PosterID_old"].to_numpy(),
+            "PosterID_new": new_texts.loc[near["new"], "PosterID_new"].to_numpy(),
+        })
+        near_counts = (
+            edges.groupby(["PosterID_old", "PosterID_new"])
+            .size()
+            .reset_index(name="overlap_count")
+        )
+        known = pd.MultiIndex.from_frame(mapping[["PosterID_old", "PosterID_new"]])
+        near_counts = near_counts[
+            ~pd.MultiIndex.from_frame(near_counts[["PosterID_old", "PosterID_new"]]).isin(known)
+        ]
+        near_counts.insert(2, "confidence", "NEAR")
+        print(f"  NEAR (Jaccard ≥ {near_threshold}) mappings: {len(near_counts)} "
+              f"from {len(near)} near-duplicate message pairs")
+        mapping = pd.concat([mapping, near_counts], ignore_index=True)
 
-    print(f"  Found {len(exact)} exact text matches across datasets.")
+    write_csv(mapping, "id_bridge.csv")
+    return mapping
 
-    # Build raw mapping
-    mapping = exact[["PosterID_old", "PosterID_new"]].drop_duplicates()
+
+def _classify_pairs(pair_counts: pd.DataFrame) -> pd.DataFrame:
+    """
+    Confidence of every (PosterID_old, PosterID_new) pair from its exact
+    overlap_count table: PosterID_old, PosterID_new, confidence, overlap_count.
+    """
+    mapping = pair_counts[["PosterID_old", "PosterID_new"]].copy()
 
     # Count how many new IDs each old UUID maps to
     old_to_new_count = mapping.groupby("PosterID_old")["PosterID_new"].nunique()
@@ -229,14 +318,7 @@ def build_id_bridge(
     print(f"  SHARED account mappings:   {conf_counts.get('SHARED', 0)}")
 
     # Add overlap counts for reference
-    overlap_counts = (
-        exact.groupby(["PosterID_old", "PosterID_new"])
-        .size()
-        .reset_index(name="overlap_count")
-    )
-    mapping = mapping.merge(overlap_counts, on=["PosterID_old", "PosterID_new"], how="left")
-
-    write_csv(mapping, "id_bridge.csv")
+    mapping["overlap_count"] = pair_counts["overlap_count"].to_numpy()
     return mapping
 
 
@@ -244,48 +326,20 @@ def build_id_bridge(
 # Step 4: Detect superusers in new data (behavioral, recomputed each run)
 # =============================================================================
 
-def detect_new_superusers(new_messages: pd.DataFrame) -> set:
+def detect_new_superusers(
+    new_messages: pd.DataFrame,
+    signals_df: pd.DataFrame | None = None,
+) -> set:
     """
     Recomputes behavioral superuser signals on new data.
-    Returns the set of PosterIDs to exclude.
+    Returns the set of PosterIDs to exclude. signals_df: the signals, if
+    already computed (the incremental run derives them from stored sums).
     """
     print("\n[4] Detecting superusers in new data…")
 
-    new = new_messages.copy()
-    new_sorted = new.sort_values("PostDate")
-    first_posts = (
-        new_sorted.groupby("ForumTopicID")["PosterID"]
-        .first()
-        .reset_index()
-    )
-    first_posts.columns = ["ForumTopicID", "thread_starter"]
-    thread_starter_counts = first_posts["thread_starter"].value_counts()
-
-    signals = []
-    for author in new["PosterID"].dropna().unique():
-        author_posts = new[new["PosterID"] == author]["MessageText"].fillna("").astype(str)
-        all_words    = " ".join(author_posts).lower().split()
-
-        post_count        = len(author_posts)
-        unique_words      = len(set(all_words))
-        total_words       = len(all_words)
-        lexical_diversity = round(unique_words / max(total_words, 1), 3)
-        threads_started   = thread_starter_counts.get(author, 0)
-
-        author_dates = new[new["PosterID"] == author]["PostDate"].dropna()
-        hour_std = round(author_dates.dt.hour.std(), 2) if len(author_dates) > 5 else None
-
-        signals.append({
-            "PosterID":             author,
-            "post_count":           post_count,
-            "threads_started":      threads_started,
-            "threads_started_pct":  round(threads_started / max(post_count, 1) * 100, 1),
-            "lexical_diversity":    lexical_diversity,
-            "hour_std":             hour_std,
-            "total_words":          total_words,
-        })
-
-    signals_df = pd.DataFrame(signals)
+    # One grouped pass over all authors (see utils/author_signals.py).
+    if signals_df is None:
+        signals_df = author_signals(new_messages)
 
     # Recomputed flag — all conditions require minimum post counts to avoid
     # false positives on low-volume users
@@ -397,30 +451,51 @@ def filter_new_data(
 def remove_duplicates(
     old_messages: pd.DataFrame,
     new_messages: pd.DataFrame,
+    near_threshold: float | None = NEAR_MATCH_THRESHOLD,
+    old_keys: pd.DataFrame | None = None,
+    new_keys: pd.DataFrame | None = None,
 ) -> pd.DataFrame:
     """
     Remove exact duplicate posts from new data that already exist in old data.
-    Old data takes precedence — keep old, drop new duplicates.
+    Old data takes precedence — keep old, drop new duplicates. With
+    near_threshold, new posts that are near-duplicates of an old post
+    (lightly edited re-posts) are dropped too.
+
+    old_keys / new_keys are text_keys() covering the two frames' rows, if
+    already computed.
     """
     print("\n[7] Removing duplicate posts…")
 
-    old_norms = set(
-        old_messages[OLD_TEXT_COL].fillna("").apply(_normalize)
-        .loc[lambda s: s.str.len() > 20]
-    )
+    old_keys = _keys_for(old_messages, old_keys, OLD_TEXT_COL)
+    new_keys = _keys_for(new_messages, new_keys, "MessageText")
+    old_fps = old_keys.loc[old_keys["key_len"] > 20, "fp"]
 
-    new_messages = new_messages.copy()
-    new_messages["_norm"] = new_messages["MessageText"].fillna("").apply(_normalize)
+    # Fingerprint hits, confirmed on the text of the hit rows only
+    hit = ((new_keys["key_len"] > 20) & new_keys["fp"].isin(old_fps)).to_numpy()
+    hit_rows = new_messages.index[hit]
+    dup_rows = hit_rows[:0]
+    if len(hit_rows):
+        old_rows = old_fps.index[old_fps.isin(new_keys.loc[hit, "fp"]).to_numpy()]
+        old_norms = set(match_key_series(old_messages.loc[old_rows, OLD_TEXT_COL], strip_html=True))
+        hit_norms = match_key_series(new_messages.loc[hit_rows, "MessageText"], strip_html=True)
+        dup_rows = hit_rows[hit_norms.isin(old_norms).to_numpy()]
 
     before = len(new_messages)
-    new_messages = new_messages[
-        ~(
-            (new_messages["_norm"].isin(old_norms)) &
-            (new_messages["_norm"].str.len() > 20)
-        )
-    ].drop(columns=["_norm"])
-
+    new_messages = new_messages[~new_messages.index.isin(dup_rows)]
     print(f"  Removed {before - len(new_messages)} duplicate posts from new data.")
+
+    if near_threshold is not None:
+        long_new = new_keys.loc[new_messages.index, "key_len"] > 20
+        candidates = match_key_series(
+            new_messages.loc[long_new.to_numpy(), "MessageText"], strip_html=True)
+        old_long = match_key_series(
+            old_messages.loc[old_fps.index, OLD_TEXT_COL], strip_html=True)
+        near = _near_matches(pd.Series(old_long.unique()), candidates, near_threshold)
+        near_ids = set(near["new"])
+        new_messages = new_messages[~new_messages.index.isin(near_ids)]
+        print(f"  Removed {len(near_ids)} near-duplicate posts "
+              f"(Jaccard ≥ {near_threshold}) from new data.")
+
     return new_messages
 
 
@@ -441,13 +516,7 @@ def harmonize_schemas(
     print("\n[8] Harmonizing schemas…")
 
     # Build UUID → integer ID map (HIGH confidence only)
-    high_conf = bridge[bridge["confidence"] == "HIGH"][
-        ["PosterID_old", "PosterID_new"]
-    ].drop_duplicates("PosterID_old")
-    uuid_to_int = dict(zip(
-        high_conf["PosterID_old"].astype(str),
-        high_conf["PosterID_new"].astype(str)
-    ))
+    uuid_to_int = high_confidence_map(bridge)
 
     # Remap old UUIDs where we have a HIGH confidence match
     old_messages = old_messages.copy()
@@ -457,11 +526,6 @@ def harmonize_schemas(
     print(f"  Remapped {len(uuid_to_int)} old UUIDs to new integer IDs.")
 
     # Ensure both DataFrames have the same columns
-    shared_cols = [
-        "PosterID", "ForumTopicID", "ForumGroupID",
-        "MessageText", "PostDate", "PostModifiedDate",
-        "source"
-    ]
 
     # Old data may not have ForumGroupID directly — add if missing
     if "ForumGroupID" not in old_messages.columns:
@@ -469,11 +533,36 @@ def harmonize_schemas(
 
     # New data: add ForumMessageID to old for reference if available
     old_out = old_messages.reindex(
-        columns=shared_cols + ["ForumMessageID"] if "ForumMessageID" in old_messages.columns
-        else shared_cols
+        columns=SHARED_COLS + ["ForumMessageID"] if "ForumMessageID" in old_messages.columns
+        else SHARED_COLS
     )
+    new_out, new_topics = _harmonize_new(new_messages)
+
+    return old_out, new_out, new_topics
+
+
+SHARED_COLS = [
+    "PosterID", "ForumTopicID", "ForumGroupID",
+    "MessageText", "PostDate", "PostModifiedDate",
+    "source"
+]
+
+
+def high_confidence_map(bridge: pd.DataFrame) -> dict:
+    """Old UUID → new integer ID for the HIGH confidence bridge rows."""
+    high_conf = bridge[bridge["confidence"] == "HIGH"][
+        ["PosterID_old", "PosterID_new"]
+    ].drop_duplicates("PosterID_old")
+    return dict(zip(
+        high_conf["PosterID_old"].astype(str),
+        high_conf["PosterID_new"].astype(str)
+    ))
+
+
+def _harmonize_new(new_messages: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """New rows in the output schema, plus the topic-review rows."""
     new_out = new_messages.reindex(
-        columns=shared_cols + ["ForumMessageID", "post_type", "source_file"],
+        columns=SHARED_COLS + ["ForumMessageID", "post_type", "source_file"],
         fill_value=pd.NA
     )
 
@@ -482,7 +571,7 @@ def harmonize_schemas(
         new_messages["post_type"] == "Topic"
     ][["ForumTopicID", "PosterID", "PostDate", "Topic_title", "MessageText"]].copy()
 
-    return old_out, new_out, new_topics
+    return new_out, new_topics
 
 
 # =============================================================================
@@ -521,21 +610,350 @@ def combine_and_save(
     write_csv(combined[combined["source"] == "new"],       "messages_new_only.csv")
     write_csv(combined,                                    "messages_combined.csv")
     write_csv(new_topics,                                  "integrated_topics_review.csv")
+    return combined
+
+
+# =============================================================================
+# Incremental integration
+# =============================================================================
+# A full run leaves its state in output/integration_state/. It holds only
+# what later deltas are compared against, so the size of the state does not
+# grow with the number of messages:
+#
+#   manifest.json        signatures of the old export files, the new export
+#                        files integrated so far, the excluded PosterIDs
+#   bridge.parquet       the exact-match ID bridge (pairs + overlap counts)
+#   old_keys.parquet     (fp, fp2, PosterID_old, kept) for each non-trivial
+#                        old message; kept = survives filter_old_data
+#   author_stats.parquet / vocab_sketch.parquet / topic_first.parquet
+#                        sufficient statistics for the superuser signals
+#   held_back.parquet    new rows of excluded authors, released again if
+#                        an author stops being flagged
+#   message_ids.parquet  ForumMessageIDs already in integrated_messages.csv
+#   new_authors.parquet  PosterIDs with new-data rows in the output
+#
+# run_integration(incremental=True) reads only the export files that are not
+# in the manifest, updates the bridge and the signals from the state, and
+# appends the surviving rows to the output CSVs. The appended block is
+# sorted within itself; the files are no longer globally sorted. If a
+# result would change rows already written, a full run is done instead:
+# an old UUID gets a new HIGH mapping, or an author with rows in the output
+# gets excluded. A full run is also done when there is no usable state,
+# when an old export or an already-integrated new export changed, or when
+# near-matching is on (that needs the old texts).
+# =============================================================================
+
+STATE_DIR = "integration_state"     # under OUTPUT_DIR
+_STATE_VERSION = 1
+_STATE_TABLES = [
+    "bridge", "old_keys", "author_stats", "vocab_sketch", "topic_first",
+    "held_back", "message_ids", "new_authors",
+]
+_OLD_INPUTS = ["messages.csv", "topics.csv", "groups.csv"]
+
+
+def _state_path(name: str) -> str:
+    return os.path.join(OUTPUT_DIR, STATE_DIR, name)
+
+
+def _export_signatures(files: list[str] | None = None) -> dict:
+    """{file name: [size, mtime_ns]} of the new exports (or of `files`)."""
+    names = sorted(f for f in os.listdir(NEW_DATA_DIR) if f.endswith(".csv"))
+    if files is not None:
+        names = [f for f in names if f in files]
+    return {f: file_signature(os.path.join(NEW_DATA_DIR, f))[1:] for f in names}
+
+
+def _old_signatures() -> list:
+    return [file_signature(os.path.join(DATA_DIR, f))[1:] for f in _OLD_INPUTS]
+
+
+def save_state(
+    files: dict,
+    tables: dict[str, pd.DataFrame],
+    excluded: set,
+    near_threshold: float | None,
+) -> None:
+    """Writes the tables, then the manifest that makes them valid."""
+    if not _PARQUET_AVAILABLE:
+        print("  WARNING: pyarrow not installed – no state saved for incremental runs.")
+        return
+    os.makedirs(_state_path(""), exist_ok=True)
+    manifest = _state_path("manifest.json")
+    if os.path.exists(manifest):
+        os.remove(manifest)
+    for name in _STATE_TABLES:
+        tables[name].to_parquet(_state_path(f"{name}.parquet"), index=False)
+    with open(manifest, "w", encoding="utf-8") as f:
+        json.dump({
+            "version":        _STATE_VERSION,
+            "old_inputs":     _old_signatures(),
+            "files":          files,
+            "excluded":       sorted(excluded),
+            "near_threshold": near_threshold,
+        }, f, indent=1)
+    print(f"  Saved incremental state → {_state_path('')}")
+
+
+def load_state(near_threshold: float | None) -> tuple[dict | None, str]:
+    """(state, "") or (None, why a full run is needed)."""
+    if near_threshold is not None:
+        return None, "near-matching needs the old texts"
+    manifest_path = _state_path("manifest.json")
+    if not os.path.exists(manifest_path):
+        return None, "no state from an earlier run"
+    with open(manifest_path, encoding="utf-8") as f:
+        manifest = json.load(f)
+    if manifest.get("version") != _STATE_VERSION:
+        return None, "state from an older version"
+    if manifest["near_threshold"] is not None:
+        return None, "the last run used near-matching"
+    if manifest["old_inputs"] != _old_signatures():
+        return None, "the old export changed"
+    current = _export_signatures()
+    if any(current.get(f) != sig for f, sig in manifest["files"].items()):
+        return None, "an already integrated export changed or disappeared"
+
+    state = {name: pd.read_parquet(_state_path(f"{name}.parquet")) for name in _STATE_TABLES}
+    for name in ("bridge", "held_back", "topic_first"):
+        df = state[name]
+        for col in df.columns:
+            if df[col].dtype == object:
+                df[col] = none_to_nan(df[col])
+    state["manifest"] = manifest
+    state["delta_files"] = sorted(set(current) - set(manifest["files"]))
+    return state, ""
+
+
+def _state_tables(
+    bridge: pd.DataFrame,
+    old_keys: pd.DataFrame,
+    author_state: tuple[pd.DataFrame, pd.DataFrame],
+    topic_first: pd.DataFrame,
+    held_back: pd.DataFrame,
+    message_ids: pd.Series,
+    new_authors: pd.Series,
+) -> dict[str, pd.DataFrame]:
+    stats, sketch = author_state
+    bridge = bridge[bridge["confidence"] != "NEAR"].reset_index(drop=True)
+    return {
+        "bridge":       bridge.astype({"PosterID_old": str, "PosterID_new": str}),
+        "old_keys":     old_keys,
+        "author_stats": stats,
+        "vocab_sketch": sketch,
+        "topic_first":  topic_first,
+        "held_back":    held_back.reset_index(drop=True),
+        "message_ids":  pd.DataFrame({"ForumMessageID": message_ids.to_numpy()}),
+        "new_authors":  pd.DataFrame({"PosterID": new_authors.astype(str).unique()}),
+    }
+
+
+def _old_key_table(
+    old_messages: pd.DataFrame,
+    old_keys: pd.DataFrame,
+    old_filtered: pd.DataFrame,
+) -> pd.DataFrame:
+    long = old_keys[old_keys["key_len"] > 20]
+    return pd.DataFrame({
+        "fp":           long["fp"].to_numpy(),
+        "fp2":          long["fp2"].to_numpy(),
+        "PosterID_old": old_messages.loc[long.index, OLD_ID_COL].astype(str).to_numpy(),
+        "kept":         long.index.isin(old_filtered.index),
+    })
+
+
+def update_id_bridge(
+    bridge: pd.DataFrame,
+    old_keys: pd.DataFrame,
+    delta: pd.DataFrame,
+    delta_keys: pd.DataFrame,
+) -> pd.DataFrame:
+    """build_id_bridge() for a delta: adds its exact matches to the stored counts."""
+    print("\n[3] Updating ID bridge…")
+
+    long = (delta_keys["key_len"] > 20).to_numpy()
+    new_texts = pd.DataFrame({
+        "fp":           delta_keys.loc[long, "fp"].to_numpy(),
+        "fp2":          delta_keys.loc[long, "fp2"].to_numpy(),
+        "PosterID_new": delta.loc[long, "PosterID"].to_numpy(),
+    })
+    exact = old_keys[["fp", "fp2", "PosterID_old"]].merge(new_texts, on=["fp", "fp2"])
+    print(f"  Found {len(exact)} exact text matches in the new exports.")
+
+    pair_counts = (
+        pd.concat([
+            bridge[["PosterID_old", "PosterID_new", "overlap_count"]],
+            exact.assign(overlap_count=1)[["PosterID_old", "PosterID_new", "overlap_count"]],
+        ], ignore_index=True)
+        .groupby(["PosterID_old", "PosterID_new"], sort=False, dropna=False)["overlap_count"]
+        .sum()
+        .reset_index()
+    )
+    mapping = _classify_pairs(pair_counts)
+    write_csv(mapping, "id_bridge.csv")
+    return mapping
+
+
+def _drop_old_duplicates(
+    new_messages: pd.DataFrame,
+    new_keys: pd.DataFrame,
+    old_keys: pd.DataFrame,
+) -> pd.DataFrame:
+    """remove_duplicates() against the stored (fp, fp2) of the kept old messages."""
+    print("\n[7] Removing duplicate posts…")
+    kept = old_keys[old_keys["kept"]]
+    old_pairs = pd.MultiIndex.from_arrays([kept["fp"], kept["fp2"]])
+    keys = new_keys.loc[new_messages.index]
+    dup = (
+        (keys["key_len"] > 20).to_numpy()
+        & pd.MultiIndex.from_arrays([keys["fp"], keys["fp2"]]).isin(old_pairs)
+    )
+    print(f"  Removed {int(dup.sum())} duplicate posts from new data.")
+    return new_messages[~dup]
+
+
+def _append_csv(df: pd.DataFrame, filename: str) -> None:
+    """Appends rows in the column order of an existing output file."""
+    path = os.path.join(OUTPUT_DIR, filename)
+    if not os.path.exists(path):
+        write_csv(df, filename)
+        return
+    columns = pd.read_csv(path, nrows=0).columns
+    df.reindex(columns=columns).to_csv(path, mode="a", header=False, index=False)
+    print(f"  Appended {len(df)} rows → {filename}")
+
+
+def append_and_save(
+    new_messages: pd.DataFrame,
+    new_topics: pd.DataFrame,
+    known_ids: pd.Series,
+) -> pd.DataFrame:
+    """
+    combine_and_save() for a delta: appends the new rows to the outputs.
+
+    The outputs are append-ordered: the earlier rows stay where they were and
+    the delta follows, sorted by (ForumTopicID, PostDate). A full run sorts
+    the whole file, so it holds the same rows in a different order.
+    """
+    print("\n[9] Appending to the integrated dataset…")
+
+    if "ForumMessageID" in new_messages.columns:
+        before = len(new_messages)
+        new_messages = new_messages[~new_messages["ForumMessageID"].isin(known_ids)]
+        new_messages = new_messages.drop_duplicates(subset=["ForumMessageID"], keep="first")
+        print(f"  ForumMessageID dedup: {before} → {len(new_messages)}")
+
+    new_messages = new_messages.sort_values(["ForumTopicID", "PostDate"]).reset_index(drop=True)
+    for filename in ("integrated_messages.csv", "messages_new_only.csv", "messages_combined.csv"):
+        _append_csv(new_messages, filename)
+    _append_csv(new_topics, "integrated_topics_review.csv")
+    return new_messages
+
+
+def _run_incremental(state: dict) -> str | None:
+    """
+    Integrates the export files added since the state was saved. Returns
+    why a full run is needed instead, or None once done.
+    """
+    delta_files = state["delta_files"]
+    if not delta_files:
+        print("\n  No new export files since the last integration – nothing to do.")
+        return None
+    print(f"\n  Incremental run over {len(delta_files)} new export file(s): "
+          f"{', '.join(delta_files)}")
+    manifest = state["manifest"]
+    prev_excluded = set(manifest["excluded"])
+
+    delta = load_new_raw(delta_files)
+    old_keys = state["old_keys"]
+    delta_keys = text_keys(delta, confirm=True)
+
+    # 2. Bridge from stored pair counts + the delta's exact matches
+    bridge = update_id_bridge(state["bridge"], old_keys, delta, delta_keys)
+
+    # 3. Signals from stored sufficient statistics + the delta
+    author_state = merge_author_stats(state["author_stats"], state["vocab_sketch"],
+                                      *author_stats(delta))
+    topic_first = topic_first_posts(pd.concat(
+        [state["topic_first"], delta[["ForumTopicID", "PostDate", "PosterID"]]],
+        ignore_index=True,
+    ))
+    superuser_ids = detect_new_superusers(
+        delta, signals_df=signals_from_stats(*author_state, topic_first)
+    )
+    shared_ids = set(bridge[bridge["confidence"] == "SHARED"]["PosterID_new"].astype(str))
+    excluded = superuser_ids | shared_ids
+
+    newly_excluded = (excluded - prev_excluded) & set(state["new_authors"]["PosterID"])
+    if high_confidence_map(bridge) != high_confidence_map(state["bridge"]):
+        return "the HIGH confidence ID mapping changed"
+    if newly_excluded:
+        return f"{len(newly_excluded)} author(s) already in the output are now excluded"
+
+    # Held-back rows of authors who are no longer excluded are integrated
+    # together with the delta.
+    held = state["held_back"]
+    released = held["PosterID"].astype(str).isin(prev_excluded - excluded).to_numpy()
+    candidates = pd.concat([held[released], delta], ignore_index=True)
+    candidate_keys = pd.concat(
+        [text_keys(held[released], confirm=True), delta_keys], ignore_index=True
+    )
+    candidate_keys.index = candidates.index
+    if released.any():
+        print(f"  Releasing {int(released.sum())} held-back posts of authors no longer excluded.")
+
+    # 5.–6. Filter and deduplicate the delta
+    is_excluded = candidates["PosterID"].astype(str).isin(excluded).to_numpy()
+    new_filtered = filter_new_data(candidates, superuser_ids, bridge)
+    new_deduped = _drop_old_duplicates(new_filtered, candidate_keys, old_keys)
+
+    # 7.–8. Harmonize and append
+    print("\n[8] Harmonizing schemas…")
+    new_out, new_topics = _harmonize_new(new_deduped)
+    appended = append_and_save(new_out, new_topics, state["message_ids"]["ForumMessageID"])
+
+    files = {**manifest["files"], **_export_signatures(delta_files)}
+    save_state(files, _state_tables(
+        bridge, old_keys, author_state, topic_first,
+        pd.concat([held[~released], candidates[is_excluded]], ignore_index=True),
+        pd.concat([state["message_ids"]["ForumMessageID"],
+                   appended.get("ForumMessageID", pd.Series(dtype="Int64"))],
+                  ignore_index=True),
+        pd.concat([state["new_authors"]["PosterID"], appended["PosterID"]]),
+    ), excluded, None)
+    return None
 
 
 # =============================================================================
 # Main pipeline
 # =============================================================================
 
-def run_integration():
+def run_integration(
+    near_threshold: float | None = NEAR_MATCH_THRESHOLD,
+    incremental: bool = False,
+):
     ensure_output_dir()
 
+    if incremental:
+        state, reason = load_state(near_threshold)
+        if state is not None:
+            reason = _run_incremental(state)
+            if reason is None:
+                print("\n✓ Incremental integration complete.")
+                return
+        print(f"\n  Full integration instead of incremental: {reason}.")
+
     # 1. Load
     old_messages, topics, groups = load_old_raw()
     new_messages = load_new_raw()
 
+    # Normalized-text fingerprints, computed once for both the bridge and dedup
+    old_keys = text_keys(old_messages, OLD_TEXT_COL, confirm=True)
+    new_keys = text_keys(new_messages)
+
     # 2. Build ID bridge
-    bridge = build_id_bridge(old_messages, new_messages)
+    bridge = build_id_bridge(old_messages, new_messages, near_threshold=near_threshold,
+                             old_keys=old_keys, new_keys=new_keys)
 
     # 3. Detect new superusers (behavioral, recomputed)
     new_superuser_ids = detect_new_superusers(new_messages)
@@ -547,7 +965,8 @@ def run_integration():
     new_filtered = filter_new_data(new_messages, new_superuser_ids, bridge)
 
     # 6. Remove duplicates (keep old, drop new copies)
-    new_deduped = remove_duplicates(old_filtered, new_filtered)
+    new_deduped = remove_duplicates(old_filtered, new_filtered, near_threshold=near_threshold,
+                                    old_keys=old_keys, new_keys=new_keys)
 
     # 7. Harmonize schemas
     old_harmonized, new_harmonized, new_topics = harmonize_schemas(
@@ -555,11 +974,40 @@ def run_integration():
     )
 
     # 8. Combine and save
-    combine_and_save(old_harmonized, new_harmonized, new_topics)
+    combined = combine_and_save(old_harmonized, new_harmonized, new_topics)
+
+    # What --incremental needs to integrate the next export without this run
+    shared_ids = set(bridge[bridge["confidence"] == "SHARED"]["PosterID_new"].astype(str))
+    excluded = new_superuser_ids | shared_ids
+    save_state(_export_signatures(), _state_tables(
+        bridge,
+        _old_key_table(old_messages, old_keys, old_filtered),
+        author_stats(new_messages),
+        topic_first_posts(new_messages),
+        new_messages[new_messages["PosterID"].astype(str).isin(excluded)],
+        combined.get("ForumMessageID", pd.Series(dtype="Int64")),
+        combined.loc[combined["source"] == "new", "PosterID"],
+    ), excluded, near_threshold)
 
     print("\n✓ Integration complete.")
     print("  Next step: run preprocess.py on integrated_messages.csv")
 
 
 if __name__ == "__main__":
-    run_integration()
\ No newline at end of file
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Build the ID bridge and merge old + new data.")
+    parser.add_argument(
+        "--near-match", type=float, default=NEAR_MATCH_THRESHOLD, metavar="JACCARD",
+        help="Also match lightly edited re-posts: add NEAR bridge edges and drop "
+             "new posts whose word-shingle Jaccard similarity to an old post is at "
+             "least this (e.g. 0.8). Default: exact matches only.",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Integrate only the export files added since the last run, from the "
+             "state that run saved in output/integration_state/ (falls back to a "
+             "full run when that is not possible).",
+    )
+    args = parser.parse_args()
+    run_integration(near_threshold=args.near_match, incremental=args.incremental)
\ No newline at end of file
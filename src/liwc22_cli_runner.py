@@ -24,8 +24,8 @@ import subprocess
 import tempfile
 import pandas as pd
 
-from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
-from dataset_io import add_dataset_arg, structured_path, variant_path
+from utils.thread_utils import label_roles, strip_entity_placeholders_col
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table
 
 # ── Configuration ─────────────────────────────────────────────────────────────
 LIWC22_CLI  = os.environ.get(
@@ -61,8 +61,7 @@ LIWC22_SUMMARY_VARS: tuple[str, ...] = ("Analytic", "Clout", "Authentic", "Tone"
 # =============================================================================
 
 def load_messages(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(path)
     df = df.dropna(subset=[DATE_COL, TEXT_COL]).reset_index(drop=True)
     df = strip_entity_placeholders_col(df, TEXT_COL)
     print(f"  {len(df)} messages from {df[POSTER_COL].nunique()} users.")
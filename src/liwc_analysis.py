@@ -35,12 +35,14 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.backends.backend_pdf as pdf_backend
 from collections import defaultdict
+from collections.abc import Mapping
 
 from tqdm import tqdm
-from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
-from utils.absolutist import absolutist_rate as _absolutist_rate
+from utils.thread_utils import label_roles, strip_entity_placeholders_col
+from utils.absolutist import absolutist_rates
+from utils.corpus import Corpus, open_corpus, tokenize_texts
 from utils.spinner import Spinner
-from dataset_io import add_dataset_arg, structured_path, variant_path
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table, write_table, score_once
 
 warnings.filterwarnings("ignore")
 
@@ -157,13 +159,79 @@ def load_liwc_csv(path: str) -> tuple[dict[str, list[str]], dict[str, str]]:
     return term_to_categories, category_map
 
 
-def load_liwc(path: str) -> tuple[dict[str, list[str]], dict[str, str]]:
-    """Auto-detects format and loads the LIWC dictionary."""
+_TRIE_END = ""   # trie node key holding (rank, categories) of a wildcard term
+
+
+class LiwcIndex(Mapping):
+    """
+    Compiled LIWC dictionary.
+
+    Behaves like the plain ``{term: [categories]}`` dict it was built from
+    (iteration order, ``in``, ``[]``), but resolves a token without scanning
+    every term: exact terms sit in a hash map and wildcard terms (``happ*``)
+    in a character trie keyed on their prefix.
+
+    Each term keeps its rank in the original dict so ``lookup`` returns the
+    same term the linear scan in the old ``score_text`` found — the
+    lowest-ranked match wins (standard LIWC behaviour).
+    """
+
+    def __init__(self, term_to_categories: Mapping[str, list[str]]):
+        self._terms: dict[str, list[str]] = dict(term_to_categories)
+        self._exact: dict[str, tuple[int, list[str]]] = {}
+        self._trie: dict = {}
+
+        for rank, (term, cats) in enumerate(self._terms.items()):
+            if term.endswith("*"):
+                node = self._trie
+                for ch in term[:-1]:
+                    node = node.setdefault(ch, {})
+                node[_TRIE_END] = (rank, cats)
+            else:
+                self._exact[term] = (rank, cats)
+
+    def __getitem__(self, term: str) -> list[str]:
+        return self._terms[term]
+
+    def __iter__(self):
+        return iter(self._terms)
+
+    def __len__(self) -> int:
+        return len(self._terms)
+
+    def lookup(self, token: str) -> list[str] | None:
+        """Categories of the first term matching `token`, or None."""
+        best = self._exact.get(token)
+        node = self._trie
+        for ch in token:
+            hit = node.get(_TRIE_END)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+            node = node.get(ch)
+            if node is None:
+                break
+        else:
+            hit = node.get(_TRIE_END)
+            if hit is not None and (best is None or hit[0] < best[0]):
+                best = hit
+        return None if best is None else best[1]
+
+
+def compile_liwc(term_to_categories: Mapping[str, list[str]]) -> LiwcIndex:
+    """Returns `term_to_categories` as a LiwcIndex, compiling it if needed."""
+    if isinstance(term_to_categories, LiwcIndex):
+        return term_to_categories
+    return LiwcIndex(term_to_categories)
+
+
+def load_liwc(path: str) -> tuple[LiwcIndex, dict[str, str]]:
+    """Auto-detects format and loads the LIWC dictionary (compiled for lookup)."""
     ext = os.path.splitext(path)[1].lower()
     if ext == ".csv":
-        return load_liwc_csv(path)
+        term_to_categories, category_map = load_liwc_csv(path)
     else:  # .dic, .tsv, or unknown → try .dic format
-        return load_liwc_dic(path)
+        term_to_categories, category_map = load_liwc_dic(path)
+    return LiwcIndex(term_to_categories), category_map
 
 
 # First-person singular — LIWC category detection and Dutch fallback.
@@ -178,17 +246,22 @@ _FPS_DUTCH         = ["ik", "mij", "me", "mijn", "mezelf"]
 
 
 def ensure_fps(
-    term_to_categories: dict[str, list[str]],
+    term_to_categories: Mapping[str, list[str]],
     all_categories: list[str],
-) -> tuple[dict[str, list[str]], list[str]]:
-    """Ensure first-person singular is tracked; inject Dutch fallback if missing."""
+) -> tuple[Mapping[str, list[str]], list[str]]:
+    """Ensure first-person singular is tracked; inject Dutch fallback if missing.
+
+    A compiled LiwcIndex stays compiled (it is rebuilt with the fallback terms)."""
     has_fps = any(_FPS_LIWC_CATEGORY in cats for cats in term_to_categories.values())
     if not has_fps:
         print("  WARNING: no first-person-singular ('i') category in LIWC dict "
               "— adding Dutch FPS fallback ('fps_dutch').")
+        compiled = isinstance(term_to_categories, LiwcIndex)
         term_to_categories = dict(term_to_categories)
         for word in _FPS_DUTCH:
             term_to_categories.setdefault(word, []).append(_FPS_CATEGORY_NL)
+        if compiled:
+            term_to_categories = LiwcIndex(term_to_categories)
         all_categories = sorted(set(all_categories) | {_FPS_CATEGORY_NL})
     return term_to_categories, all_categories
 
@@ -214,33 +287,88 @@ def _match_term(token: str, term: str) -> bool:
 
 def score_text(
     text: str,
-    term_to_categories: dict[str, list[str]],
+    term_to_categories: Mapping[str, list[str]],
     all_categories: list[str],
 ) -> dict[str, int]:
     """
     Counts how many tokens in `text` match each LIWC category.
 
     Returns a dict { category_name: count }.
-    Wildcards in dictionary terms are respected.
+    Wildcards in dictionary terms are respected. Pass a LiwcIndex (see
+    compile_liwc) when scoring many texts — a plain dict is compiled per call.
     """
+    index = compile_liwc(term_to_categories)
     tokens = _tokenize(text)
     counts = {cat: 0 for cat in all_categories}
 
     for token in tokens:
-        for term, cats in term_to_categories.items():
-            if _match_term(token, term):
-                for cat in cats:
-                    if cat in counts:
-                        counts[cat] += 1
-                break  # first matching term wins (standard LIWC behaviour)
+        # first matching term wins (standard LIWC behaviour)
+        cats = index.lookup(token)
+        if cats is None:
+            continue
+        for cat in cats:
+            if cat in counts:
+                counts[cat] += 1
 
     return counts
 
 
+def liwc_count_matrix(
+    texts,
+    term_to_categories: Mapping[str, list[str]],
+    all_categories: list[str],
+    tokens: Corpus | None = None,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Vectorised LIWC scoring of a sequence of texts.
+
+    Each message is tokenised once into a sparse doc × token count matrix over
+    the corpus vocabulary. Every unique token is resolved against the
+    dictionary exactly once, giving a token × category incidence matrix; their
+    product is the doc × category count matrix.
+
+    tokens: the rows of texts from the stored corpus (utils/corpus.py
+    tokenize_texts); texts are tokenised here if None.
+
+    Returns
+    -------
+    counts     : int64 array (n_texts, len(all_categories)) — same values as
+                 score_text, column order follows all_categories
+    word_count : int64 array (n_texts,) — tokens per text
+    """
+    from scipy import sparse
+
+    index = compile_liwc(term_to_categories)
+    if tokens is None:
+        tokens = Corpus.from_texts(list(texts))
+    doc_token = tokens.doc_term_matrix()
+
+    cat_pos = {cat: j for j, cat in enumerate(all_categories)}
+    rows: list[int] = []
+    cols: list[int] = []
+    for i, token in enumerate(tokens.vocab):
+        cats = index.lookup(token)
+        if cats is None:
+            continue
+        for cat in cats:
+            if cat in cat_pos:
+                rows.append(i)
+                cols.append(cat_pos[cat])
+    incidence = sparse.csr_matrix(
+        (np.ones(len(rows), dtype=np.int64), (rows, cols)),
+        shape=(len(tokens.vocab), len(all_categories)),
+    )
+
+    counts = np.asarray((doc_token @ incidence).todense(), dtype=np.int64)
+    return counts.reshape(len(tokens), len(all_categories)), tokens.lengths
+
+
 def score_messages(
     df: pd.DataFrame,
-    term_to_categories: dict[str, list[str]],
+    term_to_categories: Mapping[str, list[str]],
     all_categories: list[str],
+    method: str = "sparse",
+    tokens: Corpus | None = None,
 ) -> pd.DataFrame:
     """
     Applies LIWC scoring to every row in df[TEXT_COL].
@@ -249,14 +377,28 @@ def score_messages(
       - one count column per LIWC category  (e.g. 'liwc_affect')
       - 'word_count'     – total tokens in the message
       - one pct column per category  (e.g. 'liwc_affect_pct') – count / word_count * 100
+
+    method : "sparse" (default) scores the whole column as one sparse matrix
+             product (see liwc_count_matrix); "loop" calls score_text per
+             message. Both give identical columns.
+    tokens : rows of df[TEXT_COL] from the stored corpus (sparse method only;
+             see liwc_count_matrix)
     """
     print(f"  Scoring {len(df)} messages against {len(all_categories)} LIWC categories…")
 
-    results = []
-    for text in tqdm(df[TEXT_COL].fillna(""), desc="LIWC scoring", unit="msg"):
-        results.append(score_text(text, term_to_categories, all_categories))
-
-    scores_df = pd.DataFrame(results)
+    index = compile_liwc(term_to_categories)
+    texts = df[TEXT_COL].fillna("")
+    if method == "sparse":
+        counts, word_count = liwc_count_matrix(texts, index, all_categories, tokens=tokens)
+        scores_df = pd.DataFrame(counts, columns=list(all_categories))
+    elif method == "loop":
+        results = []
+        for text in tqdm(texts, desc="LIWC scoring", unit="msg"):
+            results.append(score_text(text, index, all_categories))
+        scores_df = pd.DataFrame(results)
+        word_count = texts.apply(lambda t: len(_tokenize(t))).to_numpy()
+    else:
+        raise ValueError(f"Unknown LIWC scoring method '{method}', expected 'sparse' or 'loop'")
 
     # Prefix category columns so they don't clash with other columns
     scores_df = scores_df.add_prefix("liwc_")
@@ -266,12 +408,13 @@ def score_messages(
     df = pd.concat([df, scores_df], axis=1)
 
     # Word count
-    df["word_count"] = df[TEXT_COL].fillna("").apply(lambda t: len(_tokenize(t)))
+    df["word_count"] = word_count
 
-    # Percentage columns
-    for col in liwc_cols:
-        pct_col = col + "_pct"
-        df[pct_col] = (df[col] / df["word_count"].clip(lower=1) * 100).round(3)
+    # Percentage columns (one array op instead of one Series op per category)
+    denom = np.clip(word_count, 1, None).reshape(-1, 1)
+    pct = np.round(scores_df.to_numpy(dtype=np.float64) / denom * 100, 3)
+    pct_df = pd.DataFrame(pct, columns=[col + "_pct" for col in liwc_cols])
+    df = pd.concat([df, pct_df], axis=1)
 
     return df, liwc_cols
 
@@ -556,40 +699,24 @@ def build_pdf(df: pd.DataFrame, liwc_cols: list[str],
 # Main
 # =============================================================================
 
-def main(dataset: str | None = None):
-    os.makedirs(OUTPUT_DIR, exist_ok=True)
-    ds           = dataset or "combined"
-    input_path   = structured_path(OUTPUT_DIR, ds)
-    scores_out   = variant_path(OUTPUT_DIR, "liwc_scores.csv",   ds)
-    user_out     = variant_path(OUTPUT_DIR, "liwc_per_user.csv", ds)
-    pdf_out      = variant_path(OUTPUT_DIR, "liwc_report.pdf",   ds)
-
-    print("Loading messages…")
-    df = pd.read_csv(input_path)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+def _load_variant(ds: str) -> pd.DataFrame:
+    print(f"Loading messages ({ds})…")
+    df = read_table(structured_path(OUTPUT_DIR, ds))
     df = df.dropna(subset=[DATE_COL, TEXT_COL]).copy()
     df = strip_entity_placeholders_col(df, TEXT_COL)
     print(f"  {len(df)} messages from {df[POSTER_COL].nunique()} users.")
 
     df = label_roles(df)
     df = add_time_columns(df)
+    return df
 
-    print(f"\nLoading LIWC dictionary from {LIWC_DICT_PATH}…")
-    if not os.path.exists(LIWC_DICT_PATH):
-        raise FileNotFoundError(
-            f"LIWC dictionary not found at: {LIWC_DICT_PATH}\n"
-            "Set LIWC_DICT_PATH at the top of this script to your .dic or .csv file."
-        )
-    term_to_categories, category_map = load_liwc(LIWC_DICT_PATH)
-    all_categories = sorted(set(category_map.values()))
-
-    term_to_categories, all_categories = ensure_fps(term_to_categories, all_categories)
 
-    print("\nScoring messages…")
-    df, liwc_cols = score_messages(df, term_to_categories, all_categories)
-    df["absolutist_rate"] = df[TEXT_COL].apply(_absolutist_rate)
+def _write_variant(ds: str, df: pd.DataFrame, liwc_cols: list[str]):
+    scores_out   = variant_path(OUTPUT_DIR, "liwc_scores.csv",   ds)
+    user_out     = variant_path(OUTPUT_DIR, "liwc_per_user.csv", ds)
+    pdf_out      = variant_path(OUTPUT_DIR, "liwc_report.pdf",   ds)
 
-    df.to_csv(scores_out, index=False)
+    write_table(df, scores_out)
     print(f"  Saved scored messages → {scores_out}")
 
     user_df = per_user_summary(df, liwc_cols)
@@ -611,9 +738,53 @@ def main(dataset: str | None = None):
     print(f"  {pdf_out}")
 
 
+def main(dataset: str | None = None, datasets: list[str] | None = None):
+    """
+    Scores and reports one variant, or — with datasets=[...] (--all) — several
+    in one run. Each distinct message text is scored once across the
+    requested variants (old and new_only are slices of combined); every
+    variant still gets the same CSVs and PDF as a separate run.
+    """
+    os.makedirs(OUTPUT_DIR, exist_ok=True)
+    datasets = datasets or [dataset or "combined"]
+    frames = {ds: _load_variant(ds) for ds in datasets}
+
+    print(f"\nLoading LIWC dictionary from {LIWC_DICT_PATH}…")
+    if not os.path.exists(LIWC_DICT_PATH):
+        raise FileNotFoundError(
+            f"LIWC dictionary not found at: {LIWC_DICT_PATH}\n"
+            "Set LIWC_DICT_PATH at the top of this script to your .dic or .csv file."
+        )
+    term_to_categories, category_map = load_liwc(LIWC_DICT_PATH)
+    all_categories = sorted(set(category_map.values()))
+
+    term_to_categories, all_categories = ensure_fps(term_to_categories, all_categories)
+
+    print("\nScoring messages…")
+    liwc_cols: list[str] = []
+    corpus = open_corpus(OUTPUT_DIR, datasets)
+
+    def _score(texts: pd.DataFrame) -> pd.DataFrame:
+        tokens = tokenize_texts(texts[TEXT_COL], corpus)
+        scored, cols = score_messages(texts, term_to_categories, all_categories, tokens=tokens)
+        scored["absolutist_rate"] = absolutist_rates(tokens)
+        liwc_cols.extend(cols)
+        return scored
+
+    scored = score_once(frames, TEXT_COL, _score)
+
+    for ds in datasets:
+        if len(datasets) > 1:
+            print(f"\n{'='*60}\n  Dataset: {ds}\n{'='*60}")
+        _write_variant(ds, scored[ds], liwc_cols)
+
+
 if __name__ == "__main__":
     import argparse
+    from dataset_io import DATASET_CHOICES
     ap = argparse.ArgumentParser(description="LIWC analysis report")
     add_dataset_arg(ap)
+    ap.add_argument("--all", dest="run_all", action="store_true",
+                    help="Run for all three dataset variants, scoring shared messages once")
     args = ap.parse_args()
-    main(dataset=args.dataset)
+    main(dataset=args.dataset, datasets=DATASET_CHOICES if args.run_all else None)
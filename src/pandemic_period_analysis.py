@@ -53,10 +53,11 @@ import matplotlib.backends.backend_pdf as pdf_backend
 from config import PANDEMIC_CUTOFF_DATE, PANDEMIC_END_DATE
 from dataset_io import (
     add_dataset_arg, structured_path, variant_path, subtitle_for, DATASET_CHOICES,
+    read_table,
 )
 from utils.spinner import Spinner
-from utils.absolutist import absolutist_rate
-from utils.thread_utils import parse_post_dates
+from utils.absolutist import absolutist_rates
+from utils.corpus import corpus_dir, load_corpus, tokenize_texts
 import liwc_analysis
 from liwc22_cli_runner import LIWC22_STRUCTURAL_COLS, LIWC22_SUMMARY_VARS
 
@@ -134,8 +135,7 @@ def assign_period(dates: pd.Series, cutoff: str, end: str) -> pd.Series:
 # =============================================================================
 
 def _load_dated_csv(path: str, usecols=None) -> pd.DataFrame:
-    df = pd.read_csv(path, usecols=usecols, low_memory=False)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(path, columns=usecols)
     return df.dropna(subset=[DATE_COL])
 
 
@@ -198,8 +198,8 @@ def compute_absolutist_fallback(dataset: str) -> pd.DataFrame | None:
     if not os.path.exists(path):
         return None
     df = _load_dated_csv(path, usecols=[POSTER_COL, DATE_COL, TEXT_COL])
-    tqdm.pandas(desc="Absolutist scoring", unit="msg")
-    df["absolutist_rate"] = df[TEXT_COL].fillna("").progress_apply(absolutist_rate)
+    corpus = load_corpus(corpus_dir(OUTPUT_DIR, dataset))
+    df["absolutist_rate"] = absolutist_rates(tokenize_texts(df[TEXT_COL], corpus))
     return df[[POSTER_COL, DATE_COL, "absolutist_rate"]]
 
 
@@ -12,19 +12,31 @@
 #   5. normalize_text()            – lowercase, whitespace, repeated chars
 #   6. sanity_check_lengths()      – warn on suspiciously short messages
 #   7. save_outputs()              – write messages_structured.csv
+#   8. save_corpus()               – tokenised corpus of the message texts
 #
 # Input:  output/preprocessed/messages_community[_dataset].csv
 # Output: output/messages_structured[_dataset].csv
+#         output/corpus/<dataset>/   (utils/corpus.py)
+#
+# --incremental (run_incremental) redoes steps 3–5 only for the threads a
+# new preprocess run touched and merges them into the existing output.
 # =============================================================================
 
 from __future__ import annotations
 
 import os
-import re
+import numpy as np
 import pandas as pd
 
 from config import PREPROCESS_DIR, OUTPUT_DIR, INTRO_GROUP_KEYWORDS, MIN_POSTS_PER_USER
-from utils.thread_utils import parse_post_dates
+from dataset_io import parquet_path, read_table, write_table
+from utils.incremental import (
+    MESSAGE_KEY, changed_keys, clear_state, key_problem, load_state, message_keys,
+    row_hashes, save_state,
+)
+from utils.corpus import corpus_dir, write_corpus
+from utils.text_normalize import normalize_liwc, normalize_liwc_series
+from utils.thread_utils import strip_entity_placeholders
 
 # ── Config ────────────────────────────────────────────────────────────────────
 TEXT_COLUMN = "MessageText"
@@ -47,7 +59,7 @@ def ensure_output_dir():
 
 def write_csv(df: pd.DataFrame, filename: str):
     path = os.path.join(OUTPUT_DIR, filename)
-    df.to_csv(path, index=False)
+    write_table(df, path)
     print(f"  Saved: {path}")
 
 
@@ -56,12 +68,8 @@ def write_csv(df: pd.DataFrame, filename: str):
 def load_cleaned_data(dataset: str | None = None) -> pd.DataFrame:
     input_file = get_input_path(dataset)
     print(f"\n[1] Loading cleaned data from {input_file}...")
-    df = pd.read_csv(input_file)
+    df = read_table(input_file)
     print(f"  Loaded {len(df)} messages, {df['ForumTopicID'].nunique()} threads.")
-
-    if DATE_COLUMN in df.columns:
-        df[DATE_COLUMN] = parse_post_dates(df[DATE_COLUMN])
-
     return df
 
 
@@ -177,14 +185,9 @@ def _normalize_dutch_text(text: str) -> str:
     """
     Light normalization for Dutch NLP / LIWC feature extraction.
     Preserves punctuation and sentence boundaries; normalizes whitespace
-    and pathological character repetition.
+    and pathological character repetition (see utils/text_normalize.py).
     """
-    text = str(text).lower()
-    text = re.sub(r"\[entity_[a-z_]+_\d+\]", " ", text)  # drop anonymization placeholders
-    text = re.sub(r"(.)\1{3,}", r"\1\1", text)   # 4+ repeated chars → 2
-    text = re.sub(r"[ \t]+", " ", text)           # collapse horizontal whitespace
-    text = re.sub(r"\n{3,}", "\n\n", text)        # max two consecutive newlines
-    return text.strip()
+    return normalize_liwc(str(text))
 
 
 def normalize_text(messages: pd.DataFrame) -> pd.DataFrame:
@@ -196,7 +199,7 @@ def normalize_text(messages: pd.DataFrame) -> pd.DataFrame:
 
     messages = messages.copy()
     messages["text_normalized"] = (
-        messages[TEXT_COLUMN].fillna("").apply(_normalize_dutch_text)
+        normalize_liwc_series(messages[TEXT_COLUMN])
     )
     print("  Done → column 'text_normalized' added.")
     return messages
@@ -238,23 +241,149 @@ def save_outputs(messages: pd.DataFrame, dataset: str | None = None):
     )
 
 
+def save_corpus(messages: pd.DataFrame, dataset: str | None = None):
+    """
+    Tokenises the distinct message texts (entity placeholders stripped, as the
+    analyses load them) into output/corpus/<dataset>/. Texts already in the
+    stored corpus are not tokenised again.
+    """
+    print("\n[8] Saving tokenised corpus...")
+    if TEXT_COLUMN not in messages.columns:
+        print(f"  SKIP: column '{TEXT_COLUMN}' not found.")
+        return
+    directory = corpus_dir(OUTPUT_DIR, dataset)
+    texts = messages[TEXT_COLUMN].fillna("").map(strip_entity_placeholders)
+    corpus = write_corpus(texts, directory)
+    print(f"  Saved: {directory} ({len(corpus)} distinct texts, "
+          f"{len(corpus.tokens)} tokens, {len(corpus.vocab)} token types)")
+
+
+# ── Incremental state ─────────────────────────────────────────────────────────
+#
+# Every run stores a hash per input row (keyed on ForumMessageID, see
+# utils/incremental.py). An incremental run compares the input against it
+# and treats a thread as affected when one of its messages is new, changed
+# or removed, or entered or left the filtered set (the min-posts filter is
+# per user, so a new post can bring back a user's older posts in other
+# threads). Thread fields are recomputed for affected threads only, and text
+# is normalized for new and changed messages only; all other rows are taken
+# from the last output as they are.
+
+_STATE_VERSION = 1
+
+
+def _state_path(dataset: str | None) -> str:
+    return os.path.join(OUTPUT_DIR, "incremental", f"structured_{dataset or 'default'}.npz")
+
+
+def _state_settings(columns) -> list:
+    return [_STATE_VERSION, sorted(INTRO_GROUP_KEYWORDS), MIN_POSTS_PER_USER,
+            sorted(map(str, columns))]
+
+
+def save_row_state(messages: pd.DataFrame, dataset: str | None = None) -> None:
+    """Stores the input row hashes for the next incremental run."""
+    path = _state_path(dataset)
+    if key_problem(messages):
+        clear_state(path)
+        return
+    save_state(path, _state_settings(messages.columns),
+               keys=message_keys(messages), hashes=row_hashes(messages))
+
+
+def affected_threads(
+    kept: pd.DataFrame,
+    previous: pd.DataFrame,
+    changed: np.ndarray,
+    removed: np.ndarray,
+) -> set:
+    """
+    ForumTopicIDs whose rows differ from the last output: kept is the part
+    of the input that passes the filters, previous the last structured
+    output.
+    """
+    dirty = np.union1d(changed, removed)
+    left = previous[MESSAGE_KEY].isin(dirty) | ~previous[MESSAGE_KEY].isin(kept[MESSAGE_KEY])
+    entered = kept[MESSAGE_KEY].isin(changed) | ~kept[MESSAGE_KEY].isin(previous[MESSAGE_KEY])
+    return set(previous.loc[left, "ForumTopicID"]) | set(kept.loc[entered, "ForumTopicID"])
+
+
+def run_incremental(dataset: str | None = None):
+    """
+    run() for an input that changed in a few messages since the last run.
+    Falls back to run() without a usable state or earlier output.
+    """
+    ensure_output_dir()
+    output_path = os.path.join(OUTPUT_DIR, get_output_name(dataset))
+
+    messages = load_cleaned_data(dataset)
+    reason = key_problem(messages)
+    if not reason:
+        state, reason = load_state(_state_path(dataset), _state_settings(messages.columns))
+    if not reason and not (os.path.exists(output_path)
+                           or os.path.exists(parquet_path(output_path))):
+        reason = "no output from an earlier run"
+    if reason:
+        print(f"\n  Running full postprocessing instead: {reason}.")
+        return run(dataset)
+
+    keys, hashes = message_keys(messages), row_hashes(messages)
+    changed, removed = changed_keys(state["keys"], state["hashes"], keys, hashes)
+    print(f"  {len(changed)} new or changed, {len(removed)} removed messages since the last run.")
+
+    kept = filter_min_posts(filter_intro_groups(messages))
+    previous = read_table(output_path)
+    affected = affected_threads(kept, previous, changed, removed)
+    print(f"\n[3–5] Rebuilding {len(affected)} affected threads…")
+
+    redo = kept[kept["ForumTopicID"].isin(affected)]
+    redo = label_thread_success(build_thread_structure(redo))
+    if TEXT_COLUMN in redo.columns:
+        fresh = (redo[MESSAGE_KEY].isin(changed)
+                 | ~redo[MESSAGE_KEY].isin(previous[MESSAGE_KEY])).to_numpy()
+        redo["text_normalized"] = redo[MESSAGE_KEY].map(
+            previous.set_index(MESSAGE_KEY)["text_normalized"]
+        ).astype(object)
+        redo.loc[fresh, "text_normalized"] = normalize_liwc_series(redo.loc[fresh, TEXT_COLUMN])
+        print(f"  Normalized {int(fresh.sum())} new or changed messages.")
+
+    unchanged = previous[~previous["ForumTopicID"].isin(affected)]
+    redo = redo.drop(columns=["GroupName"], errors="ignore")[list(previous.columns)]
+    messages_out = (
+        pd.concat([unchanged, redo], ignore_index=True)
+        .sort_values("ForumTopicID", kind="stable")
+        .reset_index(drop=True)
+    )
+    sanity_check_lengths(messages_out)
+    save_outputs(messages_out, dataset)
+    save_corpus(messages_out, dataset)
+    save_row_state(messages, dataset)
+
+    print("\n✓ Incremental postprocessing complete.")
+
+
 # ── Main ──────────────────────────────────────────────────────────────────────
 
-def run(dataset: str | None = None):
+def run(dataset: str | None = None, incremental: bool = False):
     """
     dataset: "old", "new_only", "combined", or None (default).
     Reads messages_community{_dataset}.csv and writes messages_structured{_dataset}.csv.
+    incremental: see run_incremental().
     """
+    if incremental:
+        return run_incremental(dataset)
     ensure_output_dir()
 
-    messages = load_cleaned_data(dataset)
-    messages = filter_intro_groups(messages)
+    source = load_cleaned_data(dataset)
+    messages = filter_intro_groups(source)
     messages = filter_min_posts(messages)
     messages = build_thread_structure(messages)
     messages = label_thread_success(messages)
     messages = normalize_text(messages)
     sanity_check_lengths(messages)
     save_outputs(messages, dataset)
+    save_corpus(messages, dataset)
+    save_row_state(source, dataset)
 
     print("\n✓ Postprocessing complete.")
     print(f"  Next step: run liwc_extractor.py on {get_output_name(dataset)}")
@@ -269,5 +398,10 @@ if __name__ == "__main__":
         default=None,
         help="Which preprocessed dataset to process. Omit to use messages_community.csv directly.",
     )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Rebuild only the threads whose messages changed since the last run.",
+    )
     args = parser.parse_args()
-    run(dataset=args.dataset)
+    run(dataset=args.dataset, incremental=args.incremental)
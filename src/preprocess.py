@@ -8,7 +8,7 @@
 #   3b. remove_moderators()      – drop confirmed moderator posters
 #   4. clean_dataframe()         – strip HTML, convert dates
 #   5. filter_text_quality()     – min length, language
-#   6. anonymize_ids()           – replace PosterID with user_N
+#   6. anonymize_ids()           – replace PosterID with user tokens
 #   7. anonymize_text_columns()  – NER-based text anonymization
 #   8. save_outputs()            – attach GroupName, write community CSV
 #
@@ -19,38 +19,58 @@
 from __future__ import annotations
 
 import os
+import html
 import re
-import warnings
+import numpy as np
 import pandas as pd
-from bs4 import BeautifulSoup, MarkupResemblesLocatorWarning
 
 from tqdm import tqdm
 
 from config import (
     DATA_DIR, OUTPUT_DIR, PREPROCESS_DIR,
-    CSV_FILES, ID_COLUMN, DATE_COLUMNS, TEXT_COLUMN,
+    CSV_FILES, ID_COLUMN, DATE_COLUMNS, TEXT_COLUMN, TEXT_COLUMNS_TO_CLEAN,
     SUPERUSER_ACCOUNT_IDS, COMMUNITY_ACCOUNT_IDS,
     MODERATOR_POSTER_IDS,
     MIN_WORD_COUNT, LANGUAGE_FILTER, TARGET_LANGUAGE,
+    LANGUAGE_N_JOBS, LANGUAGE_SEED, LANGUAGE_PREFILTER, LANGUAGE_CACHE, LANGUAGE_CACHE_FILE,
     ANONYMIZE_TEXT, REPLACE_ORIGINAL_TEXT, EXPORT_ENTITY_REVIEW,
+    ID_PSEUDONYMS, PSEUDONYM_KEY_FILE,
+    NER_BATCH_SIZE, NER_N_PROCESS, NER_CACHE, NER_CACHE_FILE, NER_CACHE_MAX_ENTRIES,
+    PREPROCESS_CHUNK_SIZE, PREPROCESS_CHECKPOINTS, PREPROCESS_INCREMENTAL_STATE,
     INTEGRATED_OLD_PATH, INTEGRATED_NEW_PATH, INTEGRATED_COMBINED_PATH,
 )
 from utils.thread_utils import parse_post_dates
+from utils.ner_cache import EntityCache
+from utils.language_id import LANGDETECT_AVAILABLE, cache_namespace, detect_languages
+from utils.text_normalize import standardize_series
+from utils.checkpoints import StageCheckpoints
+from utils.pseudonyms import Pseudonymizer
+from utils.incremental import (
+    MESSAGE_KEY, changed_keys, clear_state, key_problem, load_state, message_keys,
+    row_hashes, save_state,
+)
+from dataset_io import append_table, parquet_path, read_table, write_table
 
 _ANON_AVAILABLE = False
 _LANGDETECT_AVAILABLE = False
 
 if LANGUAGE_FILTER:
-    try:
-        from langdetect import detect, LangDetectException
-        _LANGDETECT_AVAILABLE = True
-    except ImportError:
+    _LANGDETECT_AVAILABLE = LANGDETECT_AVAILABLE
+    if not _LANGDETECT_AVAILABLE:
         print("WARNING: langdetect not installed – language filter disabled.")
 
 if ANONYMIZE_TEXT:
     try:
         from custom_text_anonymizer import anonymize as ta_anonymize
-        _ANON_AVAILABLE = True
+        from custom_text_anonymizer import anonymize_batch as ta_anonymize_batch
+        from custom_text_anonymizer import model_id as ta_model_id
+        from custom_text_anonymizer import installed_id as ta_installed_id
+        from custom_text_anonymizer import is_available as ta_is_available
+        from custom_text_anonymizer import warm_up as ta_warm_up
+        # The spaCy model itself is loaded lazily, on the first anonymized text.
+        _ANON_AVAILABLE = ta_is_available()
+        if not _ANON_AVAILABLE:
+            print("WARNING: custom_text_anonymizer unavailable (spaCy or nl_core_news_lg not installed)")
     except Exception as e:
         print(f"WARNING: custom_text_anonymizer unavailable ({type(e).__name__}: {e})")
         print("  → Run with: conda activate thesis_env && PYTHONPATH=./src python src/preprocess.py")
@@ -70,8 +90,12 @@ def read_csv(name: str, **kwargs) -> pd.DataFrame:
     return pd.read_csv(path, on_bad_lines="warn", **kwargs)
 
 
-def write_csv(df: pd.DataFrame, filename: str):
-    df.to_csv(os.path.join(PREPROCESS_DIR, filename), index=False)
+def write_csv(df: pd.DataFrame, filename: str, append: bool = False):
+    path = os.path.join(PREPROCESS_DIR, filename)
+    if append and os.path.exists(path):
+        df.to_csv(path, mode="a", header=False, index=False)
+    else:
+        df.to_csv(path, index=False)
 
 
 # ── Step 1: Load raw data ─────────────────────────────────────────────────────
@@ -83,6 +107,22 @@ _DATASET_PATHS = {
 }
 
 
+def _messages_source(dataset: str | None) -> tuple[str, str]:
+    """(path, on_bad_lines) of the messages file load_raw_data() reads."""
+    if dataset is not None:
+        path = _DATASET_PATHS[dataset]
+        if not os.path.exists(path):
+            raise FileNotFoundError(
+                f"Dataset file not found: {path}\n"
+                "Run integrate_datasets.py first."
+            )
+        return path, "skip"
+    integrated_path = os.path.join(OUTPUT_DIR, "integrated_messages.csv")
+    if os.path.exists(integrated_path):
+        return integrated_path, "skip"
+    return os.path.join(DATA_DIR, "messages.csv"), "warn"
+
+
 def load_raw_data(dataset: str | None = None) -> dict[str, pd.DataFrame]:
     """
     Load messages and metadata CSVs.
@@ -95,22 +135,14 @@ def load_raw_data(dataset: str | None = None) -> dict[str, pd.DataFrame]:
     print("\n[1] Loading raw data…")
     dfs = {}
 
+    path, on_bad_lines = _messages_source(dataset)
     if dataset is not None:
-        path = _DATASET_PATHS[dataset]
-        if not os.path.exists(path):
-            raise FileNotFoundError(
-                f"Dataset file not found: {path}\n"
-                "Run integrate_datasets.py first."
-            )
         print(f"  Loading {dataset} dataset from {path}")
-        dfs["messages"] = pd.read_csv(path, on_bad_lines="skip")
+    elif on_bad_lines == "skip":
+        print(f"  Loading integrated messages from {path}")
     else:
-        integrated_path = os.path.join(OUTPUT_DIR, "integrated_messages.csv")
-        if os.path.exists(integrated_path):
-            print(f"  Loading integrated messages from {integrated_path}")
-            dfs["messages"] = pd.read_csv(integrated_path, on_bad_lines="skip")
-        else:
-            dfs["messages"] = read_csv("messages")
+        print(f"  Loading {path}")
+    dfs["messages"] = pd.read_csv(path, on_bad_lines=on_bad_lines)
 
     for name in ["topics", "groups", "accounts"]:
         dfs[name] = read_csv(name)
@@ -175,6 +207,19 @@ def remove_superusers(messages: pd.DataFrame, superuser_ids: set) -> pd.DataFram
 
 # ── Step 3b: Remove confirmed moderator posters ───────────────────────────────
 
+def first_posts(messages: pd.DataFrame) -> pd.DataFrame:
+    """The first message of every thread (by DATE_COLUMNS[0])."""
+    return (
+        messages.sort_values(["ForumTopicID", DATE_COLUMNS[0]])
+        .drop_duplicates(subset=["ForumTopicID"], keep="first")
+    )
+
+
+def moderator_thread_ids(first: pd.DataFrame, moderator_ids: set = MODERATOR_POSTER_IDS) -> set:
+    """Threads whose first post (see first_posts) is by a moderator."""
+    return set(first.loc[first[ID_COLUMN].isin(moderator_ids), "ForumTopicID"])
+
+
 def remove_moderators(
     messages: pd.DataFrame,
     moderator_ids: set = MODERATOR_POSTER_IDS,
@@ -187,15 +232,7 @@ def remove_moderators(
     date_col = DATE_COLUMNS[0]
 
     if date_col in messages.columns:
-        first_posts = (
-            messages.sort_values(["ForumTopicID", date_col])
-            .drop_duplicates(subset=["ForumTopicID"], keep="first")
-        )
-        mod_threads = set(
-            first_posts.loc[
-                first_posts[ID_COLUMN].isin(moderator_ids), "ForumTopicID"
-            ]
-        )
+        mod_threads = moderator_thread_ids(first_posts(messages), moderator_ids)
         messages = messages[~messages["ForumTopicID"].isin(mod_threads)].copy()
         print(f"  Removed {len(mod_threads)} moderator-initiated threads.")
     else:
@@ -213,32 +250,195 @@ def remove_moderators(
 
 # ── Step 4: Clean dataframes (HTML stripping, date parsing) ──────────────────
 
+# A tag (quoted attributes may contain ">"), comment, doctype or processing
+# instruction — but not a bare "<" as in "a < b" or "<3". Runs of adjacent
+# tags collapse to one space, like get_text(separator=" ") does.
+_HTML_TAGS = re.compile(
+    r"""(?:<(?:/?[A-Za-z](?:"[^"]*"|'[^']*'|[^'">])*|!--.*?--|![^>]*|\?[^>]*)>)+""",
+    re.DOTALL,
+)
+_HTML_SCRIPT = re.compile(r"<(script|style)\b[^>]*>.*?</\1\s*>", re.DOTALL | re.IGNORECASE)
+
+
 def _parse_html(text: str) -> str:
-    return BeautifulSoup(str(text), "html.parser").get_text(separator=" ").strip()
+    """
+    HTML → plain text with one compiled-regex pass plus html.unescape; gives
+    the same result as BeautifulSoup(text, "html.parser")
+    .get_text(separator=" ").strip() on forum markup, without building a tree.
+    """
+    return html.unescape(_HTML_TAGS.sub(" ", _HTML_SCRIPT.sub(" ", str(text)))).strip()
+
+
+def _clean_html_cell(value):
+    if not isinstance(value, str):
+        return value
+    if "<" in value or "&" in value:
+        return _parse_html(value)
+    return value.strip()
+
+
+def strip_html_column(s: pd.Series) -> pd.Series:
+    """
+    _parse_html over a column, sending only cells that contain "<" or "&" to
+    the converter; other strings are just stripped. Missing values stay
+    missing.
+    """
+    return s.map(_clean_html_cell)
+
+
+# Forum quotes: one left-to-right pass over the [quote]/[/quote] tags with a
+# stack of open positions. Every matched pair yields a removed span; a span that starts
+# before the previous ones swallows them (the outer quote of a nested pair
+# closes last), so the span list stays sorted and disjoint. Tags that never
+# pair up — an unclosed [quote] or a stray [/quote] — are dropped on their own
+# and the text around them is kept: it is the poster's, not a quotation.
+
+_QUOTE_TAG = re.compile(r"\[(/?)quote\b[^\]\[]*\]", re.IGNORECASE)
+_QUOTE_LINE = re.compile(r"^>.*$", re.MULTILINE)
+_QUOTE_HINT = re.compile(r"\[/?quote\b|^>", re.IGNORECASE | re.MULTILINE)
+_BLANK_LINES = re.compile(r"\n{3,}")
+
+
+def _quote_spans(text: str) -> list[tuple[int, int]]:
+    spans: list[tuple[int, int]] = []
+    opened: list[int] = []
+    for tag in _QUOTE_TAG.finditer(text):
+        if not tag.group(1):
+            opened.append(tag.start())
+        elif opened:
+            start = opened.pop()
+            while spans and spans[-1][0] >= start:
+                spans.pop()
+            spans.append((start, tag.end()))
+        else:
+            spans.append(tag.span())
+    if opened:
+        # Still open at the end: the stack holds outermost tags only (any tag
+        # inside a matched pair was popped by it), so no span overlaps them.
+        spans.extend((start, _QUOTE_TAG.match(text, start).end()) for start in opened)
+        spans.sort()
+    return spans
+
+
+def strip_forum_quotes(text: str) -> tuple[str, int]:
+    """
+    Removes [quote]...[/quote] blocks (nested ones included) and "> " quoted
+    lines from one message.
+
+    Returns:
+        (text, removed) — the cleaned text and the number of characters of
+        quoted text (tags included) that were cut out.
+    """
+    removed = 0
+    spans = _quote_spans(text)
+    if spans:
+        parts, pos = [], 0
+        for start, end in spans:
+            parts.append(text[pos:start])
+            removed += end - start
+            pos = end
+        parts.append(text[pos:])
+        text = "".join(parts)
+
+    if ">" in text:
+        removed += sum(len(m.group()) for m in _QUOTE_LINE.finditer(text))
+        text = _QUOTE_LINE.sub("", text)
+    return _BLANK_LINES.sub("\n\n", text).strip(), removed
 
 
 def _strip_forum_quotes(text: str) -> str:
-    text = re.sub(r"\[quote[^\]]*\].*?\[/quote\]", "", text, flags=re.DOTALL | re.IGNORECASE)
-    text = re.sub(r"^>.*$", "", text, flags=re.MULTILINE)
-    text = re.sub(r"\n{3,}", "\n\n", text).strip()
-    return text
+    return strip_forum_quotes(text)[0]
 
 
-def clean_dataframe(df: pd.DataFrame) -> pd.DataFrame:
-    warnings.filterwarnings("ignore", category=MarkupResemblesLocatorWarning)
+def strip_quote_column(s: pd.Series) -> tuple[pd.Series, pd.Series]:
+    """
+    strip_forum_quotes over a column. Only cells that contain a quote tag or
+    a ">" line go through the parser; the rest just get the blank-line and
+    whitespace normalisation. Missing values stay missing (and count 0).
+
+    Returns:
+        (text, removed) — the cleaned column and the per-message number of
+        quoted characters removed, both on s's index.
+    """
+    text = s.copy()
+    removed = pd.Series(0, index=s.index, dtype="int64")
+    is_str = s.map(lambda v: isinstance(v, str)).astype(bool)
+    if not is_str.any():
+        return text, removed
+
+    strings = s[is_str].astype(str)
+    quoted = strings.str.contains(_QUOTE_HINT, na=False)
+
+    plain = strings[~quoted]
+    text.loc[plain.index] = plain.str.replace(_BLANK_LINES, "\n\n", regex=True).str.strip()
+
+    if quoted.any():
+        results = [strip_forum_quotes(t) for t in strings[quoted]]
+        idx = strings.index[quoted.to_numpy()]
+        text.loc[idx] = [r[0] for r in results]
+        removed.loc[idx] = [r[1] for r in results]
+    return text, removed
+
+
+# Per-message count of quoted characters strip_quote_column removed. Kept in
+# messages_cleaned.csv; messages_community*.csv does not carry it.
+QUOTE_CHARS_COLUMN = "quote_chars_removed"
+QUOTE_SUMMARY_TOP_N = 5
+
+
+def quote_counts(messages: pd.DataFrame) -> pd.DataFrame:
+    """Per ForumTopicID: messages, messages with a quote and quoted characters
+    removed (QUOTE_CHARS_COLUMN). Counts of several chunks can be summed."""
+    removed = messages[QUOTE_CHARS_COLUMN].fillna(0).astype("int64")
+    return (
+        pd.DataFrame({"ForumTopicID": messages["ForumTopicID"].to_numpy(),
+                      "messages": 1, "quoted_messages": (removed > 0).astype("int64"),
+                      "quote_chars": removed.to_numpy()})
+        .groupby("ForumTopicID").sum()
+    )
+
+
+def print_quote_summary(counts: pd.DataFrame, top_n: int = QUOTE_SUMMARY_TOP_N):
+    """Totals and the threads with the most quoted text removed."""
+    if counts.empty or not counts["quote_chars"].any():
+        print("  No forum quotes removed.")
+        return
+    print(f"  Removed {int(counts['quote_chars'].sum())} quoted characters from "
+          f"{int(counts['quoted_messages'].sum())} messages in "
+          f"{int((counts['quoted_messages'] > 0).sum())} threads. Most quote-heavy threads:")
+    for topic, row in counts.nlargest(top_n, "quote_chars").iterrows():
+        if not row["quote_chars"]:
+            break
+        print(f"    ForumTopicID {topic}: {row['quote_chars']} chars in "
+              f"{row['quoted_messages']}/{row['messages']} messages")
+
 
+def clean_dataframe(df: pd.DataFrame, quote_chars_column: str | None = None) -> pd.DataFrame:
+    """
+    Drops fully blank rows, strips HTML from the free-text columns, removes
+    forum quotes from the message text and parses the date columns.
+
+    Args:
+        quote_chars_column: If given, the number of quoted characters removed
+            from each message is stored in this column (to spot quote-heavy
+            threads).
+    """
     df = df.replace(r"^\s*$", pd.NA, regex=True).dropna(how="all").reset_index(drop=True)
 
+    # Only free-text columns carry markup; IDs, dates and numbers keep their dtype.
     for col in df.columns:
-        df[col] = df[col].astype(str).apply(_parse_html)
+        if col in TEXT_COLUMNS_TO_CLEAN:
+            df[col] = strip_html_column(df[col])
 
     if TEXT_COLUMN in df.columns:
-        df[TEXT_COLUMN] = df[TEXT_COLUMN].apply(_strip_forum_quotes)
+        df[TEXT_COLUMN], removed = strip_quote_column(df[TEXT_COLUMN])
+        if quote_chars_column:
+            df[quote_chars_column] = removed
 
     for col in DATE_COLUMNS:
         if col in df.columns:
-            # astype(str) above turned real NaN into the string "nan"/"<NA>";
-            # those never were dates, so exclude them from the loss check.
+            # Stringified NaN ("nan"/"<NA>", e.g. from a dtype=str read) never
+            # were dates, so exclude them from the loss check.
             raw = df[col].astype(str)
             had_value = ~raw.str.lower().isin({"nan", "nat", "<na>", "none", ""})
             df[col] = parse_post_dates(df[col])
@@ -261,13 +461,7 @@ def standardize_text(df: pd.DataFrame) -> pd.DataFrame:
         return df
 
     df = df.copy()
-    text = df[TEXT_COLUMN].fillna("").astype(str)
-
-    text = text.apply(lambda t: re.sub(r"https?://\S+|www\.\S+", "", t))
-    text = text.apply(lambda t: re.sub(r"([!?.]){2,}", r"\1", t))
-    text = text.apply(lambda t: re.sub(r"[\r\n\t]+", " ", t))
-    text = text.apply(lambda t: re.sub(r" {2,}", " ", t))
-    text = text.str.strip()
+    text = standardize_series(df[TEXT_COLUMN])
 
     df[f"{TEXT_COLUMN}_normalized"] = text.str.lower()
     df[TEXT_COLUMN] = text
@@ -281,13 +475,12 @@ def _word_count(text: str) -> int:
     return len(str(text).split())
 
 
-def _detect_language(text: str) -> str:
-    if not _LANGDETECT_AVAILABLE:
-        return TARGET_LANGUAGE
-    try:
-        return detect(str(text))
-    except Exception:
-        return "unknown"
+def open_language_cache() -> EntityCache:
+    """Detected-language cache (PREPROCESS_DIR/LANGUAGE_CACHE_FILE)."""
+    return EntityCache(
+        os.path.join(PREPROCESS_DIR, LANGUAGE_CACHE_FILE),
+        namespace=cache_namespace(LANGUAGE_SEED),
+    )
 
 
 def filter_text_quality(
@@ -305,9 +498,14 @@ def filter_text_quality(
 
     if language_filter and _LANGDETECT_AVAILABLE:
         before = len(df)
-        tqdm.pandas(desc="Language detection", unit="msg")
-        df["_lang"] = df[TEXT_COLUMN].progress_apply(_detect_language)
-        df = df[df["_lang"] == target_lang].drop(columns=["_lang"])
+        cache = open_language_cache() if LANGUAGE_CACHE else None
+        try:
+            langs = detect_languages(df[TEXT_COLUMN], n_jobs=LANGUAGE_N_JOBS, seed=LANGUAGE_SEED,
+                                     cache=cache, prefilter=LANGUAGE_PREFILTER)
+        finally:
+            if cache is not None:
+                cache.close()
+        df = df[(langs == target_lang).to_numpy()]
         print(f"  Language filter ({target_lang}): {before} → {len(df)} messages.")
 
     return df
@@ -315,13 +513,52 @@ def filter_text_quality(
 
 # ── Step 6: ID anonymization ──────────────────────────────────────────────────
 
-def anonymize_ids(dfs: dict[str, pd.DataFrame]) -> dict[str, str]:
-    all_ids: set = set()
+def open_pseudonymizer(mode: str | None = None) -> Pseudonymizer | None:
+    """Stable pseudonymizer for `mode` (default ID_PSEUDONYMS), None for "sorted"."""
+    mode = mode or ID_PSEUDONYMS
+    if mode == "sorted":
+        return None
+    return Pseudonymizer(
+        os.path.join(PREPROCESS_DIR, "anonymization_mapping.csv"), mode,
+        key_path=os.path.join(PREPROCESS_DIR, PSEUDONYM_KEY_FILE),
+    )
+
+
+def anonymize_ids(
+    dfs: dict[str, pd.DataFrame],
+    extra_ids: set | None = None,
+    pseudonyms: Pseudonymizer | None = None,
+) -> dict:
+    """
+    Replaces ID_COLUMN in every frame with user tokens and writes the mapping.
+    extra_ids are included in the mapping without being in any frame (the
+    chunked pipeline passes the IDs it has already streamed to disk).
+
+    With ID_PSEUDONYMS = "sorted" (and no pseudonyms given) the tokens are
+    user_N, N by sorted original ID, and the mapping is rewritten. Otherwise
+    the stored mapping is extended through a Pseudonymizer (see
+    utils/pseudonyms.py): known IDs keep their tokens.
+    """
+    if pseudonyms is None:
+        pseudonyms = open_pseudonymizer()
+    if pseudonyms is not None:
+        for df in dfs.values():
+            if ID_COLUMN in df.columns:
+                df[ID_COLUMN] = pseudonyms.tokens(df[ID_COLUMN])
+        if extra_ids:
+            pseudonyms.tokens(pd.Series(list(extra_ids), dtype=object))
+        n_new = pseudonyms.save()
+        print(f"  Pseudonymized poster IDs ({pseudonyms.mode}): {n_new} new, "
+              f"{len(pseudonyms.mapping)} in the mapping.")
+        return pseudonyms.mapping
+
+    all_ids: set = set(extra_ids or ())
     for df in dfs.values():
         if ID_COLUMN in df.columns:
             all_ids.update(df[ID_COLUMN].dropna())
 
-    mapping = {uid: f"user_{i + 1}" for i, uid in enumerate(sorted(all_ids))}
+    # key=str: IDs may be ints, floats or strings (clean_dataframe keeps dtypes)
+    mapping = {uid: f"user_{i + 1}" for i, uid in enumerate(sorted(all_ids, key=str))}
 
     for df in dfs.values():
         if ID_COLUMN in df.columns:
@@ -341,12 +578,48 @@ def _strip_at_mentions(text: str) -> str:
     return re.sub(r"@(\w+)", lambda m: m.group(1).replace("_", " "), text)
 
 
+def open_ner_cache() -> EntityCache:
+    """Entity-span cache (PREPROCESS_DIR/NER_CACHE_FILE), namespaced by the
+    loaded spaCy model's name + version."""
+    return EntityCache(
+        os.path.join(PREPROCESS_DIR, NER_CACHE_FILE),
+        namespace=ta_model_id(),
+        max_entries=NER_CACHE_MAX_ENTRIES,
+    )
+
+
+def _anonymize_texts(
+    texts: list[str],
+    desc: str,
+    batch_size: int | None = NER_BATCH_SIZE,
+    n_process: int = NER_N_PROCESS,
+    cache: EntityCache | None = None,
+) -> list[tuple[str, dict]]:
+    """(anonymized text, entity map) per text — batched via nlp.pipe when
+    batch_size is set, else one ta_anonymize call per message."""
+    if batch_size:
+        results = ta_anonymize_batch(
+            texts, batch_size=batch_size, n_process=n_process, cache=cache
+        )
+        return list(tqdm(results, total=len(texts), desc=desc, unit="msg"))
+    return [ta_anonymize(text) for text in tqdm(texts, desc=desc, unit="msg")]
+
+
 def anonymize_text_column(
     df: pd.DataFrame,
     column: str,
     export_review: bool = EXPORT_ENTITY_REVIEW,
     replace_original: bool = REPLACE_ORIGINAL_TEXT,
+    batch_size: int | None = NER_BATCH_SIZE,
+    n_process: int = NER_N_PROCESS,
+    use_cache: bool = NER_CACHE,
+    append: bool = False,
 ) -> pd.DataFrame:
+    """
+    Anonymizes df[column] and logs the entities per row to
+    entities_<column>.csv (plus a review CSV). append=True adds to those
+    logs instead of replacing them, for the chunked pipeline.
+    """
     if column not in df.columns:
         print(f"  SKIP anonymization: column '{column}' not found.")
         return df
@@ -354,13 +627,20 @@ def anonymize_text_column(
         print("  SKIP anonymization: custom_text_anonymizer unavailable.")
         return df
 
-    anon_texts, anon_entities = [], []
-    for text in tqdm(df[column].fillna("").astype(str),
-                     desc=f"Anonymising {column}", unit="msg"):
-        cleaned = _strip_at_mentions(text)
-        anon, entities = ta_anonymize(cleaned)
-        anon_texts.append(anon)
-        anon_entities.append(entities)
+    cleaned = [_strip_at_mentions(text) for text in df[column].fillna("").astype(str)]
+    cache = open_ner_cache() if use_cache and batch_size else None
+    try:
+        results = _anonymize_texts(
+            cleaned, f"Anonymising {column}", batch_size, n_process, cache
+        )
+    finally:
+        if cache is not None:
+            st = cache.stats()
+            print(f"  NER cache: {st['hits']} hits, {st['misses']} misses "
+                  f"({st['hit_rate']:.1%}), {st['entries']} entries stored.")
+            cache.close()
+    anon_texts = [anon for anon, _ in results]
+    anon_entities = [entities for _, entities in results]
 
     df = df.copy()
     df[f"{column}_anon"] = anon_texts
@@ -374,6 +654,7 @@ def anonymize_text_column(
     write_csv(
         pd.DataFrame({ref_col: df[ref_col], "column": column, "entities": anon_entities}),
         f"entities_{column}.csv",
+        append=append,
     )
 
     if export_review:
@@ -383,6 +664,7 @@ def anonymize_text_column(
                 "anonymized_text": df[f"{column}_anon"],
             }),
             f"review_anonymization_{column}.csv",
+            append=append,
         )
 
     if replace_original:
@@ -404,118 +686,259 @@ def anonymize_text_columns(df: pd.DataFrame, columns: list[str] | None = None) -
     return df
 
 
+_ENTITY_RE = re.compile(r"\[ENTITY_[A-Z]+_\d+\]")
+
+
+def strip_entity_placeholders(messages: pd.DataFrame) -> pd.DataFrame:
+    """
+    Step 7b: removes [ENTITY_X_N] placeholders from TEXT_COLUMN and
+    re-derives the normalized column from the cleaned text.
+    """
+    messages[TEXT_COLUMN] = (
+        messages[TEXT_COLUMN]
+        .str.replace(_ENTITY_RE, "", regex=True)
+        .str.replace(r"  +", " ", regex=True)
+        .str.strip()
+    )
+    norm_col = f"{TEXT_COLUMN}_normalized"
+    if norm_col in messages.columns:
+        messages[norm_col] = messages[TEXT_COLUMN].str.lower()
+    return messages
+
+
 # ── Step 8: Save outputs ──────────────────────────────────────────────────────
 
-def save_outputs(
+def _topic_key(x):
+    try:
+        return str(int(float(x)))
+    except (ValueError, TypeError):
+        return None
+
+
+def topic_fields(
+    messages: pd.DataFrame,
+    topic_to_account: dict,
+    topic_to_group: dict,
+) -> tuple[pd.Series, pd.Series]:
+    """(AccountID, GroupName) of every message's topic."""
+    topic_to_account_str = {str(int(float(k))): v for k, v in topic_to_account.items()}
+    keys = messages["ForumTopicID"].apply(_topic_key)
+    account = keys.map(topic_to_account_str)
+    group = keys.map(lambda k: topic_to_group.get(k, ""))
+    return account, group
+
+
+def build_community(
     messages: pd.DataFrame,
     topic_to_account: dict,
     topic_to_group: dict,
     dataset: str | None = None,
-):
-    messages = messages.copy()
+) -> pd.DataFrame:
+    """Community messages with GroupName attached (row-wise, so chunk-safe)."""
     using_integrated = dataset is not None or os.path.exists(
         os.path.join(OUTPUT_DIR, "integrated_messages.csv")
     )
-
-    def safe_topic_key(x):
-        try:
-            return str(int(float(x)))
-        except (ValueError, TypeError):
-            return None
-
-    topic_to_account_str = {str(int(float(k))): v for k, v in topic_to_account.items()}
-
-    messages["AccountID"] = (
-        messages["ForumTopicID"]
-        .apply(safe_topic_key)
-        .map(topic_to_account_str)
-    )
+    account, group = topic_fields(messages, topic_to_account, topic_to_group)
 
     if using_integrated:
         community = messages
     else:
-        matched = messages["AccountID"].notna().sum()
-        print(f"  Matched {matched}/{len(messages)} messages to an account.")
-        community = messages[
-            messages["AccountID"].isin(COMMUNITY_ACCOUNT_IDS)
-        ].drop(columns=["AccountID"])
+        print(f"  Matched {account.notna().sum()}/{len(messages)} messages to an account.")
+        in_community = account.isin(COMMUNITY_ACCOUNT_IDS)
+        community, group = messages[in_community], group[in_community]
 
     community = community.copy()
-    community["GroupName"] = community["ForumTopicID"].apply(
-        lambda x: topic_to_group.get(safe_topic_key(x), "") if pd.notna(x) else ""
-    )
+    community["GroupName"] = group.to_numpy()
+
+    return community.drop(columns=["AccountID", QUOTE_CHARS_COLUMN], errors="ignore")
 
-    community = community.drop(columns=["AccountID"], errors="ignore")
 
+def community_filename(dataset: str | None) -> str:
     suffix = f"_{dataset}" if dataset and dataset != "combined" else ""
-    filename = f"messages_community{suffix}.csv"
-    write_csv(community, filename)
+    return f"messages_community{suffix}.csv"
+
+
+def save_outputs(
+    messages: pd.DataFrame,
+    topic_to_account: dict,
+    topic_to_group: dict,
+    dataset: str | None = None,
+):
+    community = build_community(messages, topic_to_account, topic_to_group, dataset)
+    filename = community_filename(dataset)
+    write_table(community, os.path.join(PREPROCESS_DIR, filename))
     print(f"  Wrote {len(community)} messages → {filename}")
 
 
 # ── Main pipeline ─────────────────────────────────────────────────────────────
 
-def run_pipeline(dataset: str | None = None):
-    """
-    dataset: "old", "new_only", "combined", or None (reads data/messages.csv).
-    Outputs are named messages_community.csv, messages_community_old.csv,
-    or messages_community_new_only.csv accordingly.
-    """
-    ensure_output_dir()
-
+def _skip_removal(dataset: str | None) -> bool:
     # Skip superuser/moderator removal only for "combined" (integrate_datasets.py
     # already filtered it) and for the legacy single-export path when
     # integrated_messages.csv exists on disk.  For "old" and "new_only" we always
     # run the removal because those slices are not guaranteed to be clean.
-    skip_removal = dataset == "combined" or (
+    return dataset == "combined" or (
         dataset is None
         and os.path.exists(os.path.join(OUTPUT_DIR, "integrated_messages.csv"))
     )
 
-    # 1. Load
-    dfs = load_raw_data(dataset)
 
-    # 2. Build maps
-    print("\n[2] Building topic → account map…")
+def _load_topic_maps() -> tuple[dict, dict]:
     raw_topics = pd.read_csv(os.path.join(DATA_DIR, "topics.csv"))
     raw_groups = pd.read_csv(os.path.join(DATA_DIR, "groups.csv"))
-    topic_to_account, topic_to_group = build_topic_account_map({
+    return build_topic_account_map({
         "topics": raw_topics,
         "groups": raw_groups,
     })
 
-    if skip_removal:
-        print("\n[3] Skipping superuser/moderator removal – already applied in integrate_datasets.py")
-    else:
-        # 3. Superuser removal
-        print("\n[3] Identifying superusers…")
-        superuser_ids = get_superuser_ids(dfs["messages"], topic_to_account)
-        dfs["messages"] = remove_superusers(dfs["messages"], superuser_ids)
 
-        # 3b. Moderator removal
-        print("\n[3b] Removing moderators…")
-        dfs["messages"] = remove_moderators(dfs["messages"])
+# Bump when a step's code changes what it produces, so old checkpoints are
+# not resumed from.
+_CHECKPOINT_VERSION = 4
+
+PIPELINE_STEPS = ["1", "3", "4", "4b", "5", "6", "7"]
+
+
+def open_checkpoints(
+    dataset: str | None,
+    from_step: str | None = None,
+    force: bool = False,
+    enabled: bool = PREPROCESS_CHECKPOINTS,
+) -> StageCheckpoints:
+    """Checkpoints for one run_pipeline variant, fingerprinted on the source
+    CSVs and the settings each step reads."""
+    messages_path, _ = _messages_source(dataset)
+    inputs = [messages_path] + [
+        os.path.join(DATA_DIR, f"{name}.csv") for name in ["topics", "groups", "accounts"]
+    ]
+    directory = os.path.join(PREPROCESS_DIR, "checkpoints", dataset or "default")
+    return StageCheckpoints(directory, inputs, step_settings(dataset),
+                            from_step=from_step, force=force, enabled=enabled)
+
+
+def step_settings(dataset: str | None) -> list[tuple[str, dict]]:
+    """(step, settings it reads) for every checkpointed step."""
+    return [
+        ("1",  {"version": _CHECKPOINT_VERSION, "dataset": dataset}),
+        ("3",  {"skip_removal": _skip_removal(dataset),
+                "superuser_accounts": SUPERUSER_ACCOUNT_IDS,
+                "moderators": MODERATOR_POSTER_IDS,
+                "id_column": ID_COLUMN}),
+        ("4",  {"text_column": TEXT_COLUMN, "date_columns": DATE_COLUMNS,
+                "text_columns_to_clean": sorted(TEXT_COLUMNS_TO_CLEAN)}),
+        ("4b", {}),
+        ("5",  {"min_words": MIN_WORD_COUNT,
+                "language_filter": LANGUAGE_FILTER and _LANGDETECT_AVAILABLE,
+                "target_language": TARGET_LANGUAGE,
+                "language_seed": LANGUAGE_SEED,
+                "language_prefilter": LANGUAGE_PREFILTER}),
+        ("6",  {"id_column": ID_COLUMN, "pseudonyms": ID_PSEUDONYMS}),
+        # The NER model package and spaCy versions (from package metadata, so
+        # fingerprinting does not load the model): an upgrade reruns step 7.
+        ("7",  {"anonymize": ANONYMIZE_TEXT,
+                "available": _ANON_AVAILABLE,
+                "ner_model": ta_installed_id() if _ANON_AVAILABLE else None,
+                "replace_original": REPLACE_ORIGINAL_TEXT}),
+    ]
+
+
+def run_pipeline(
+    dataset: str | None = None,
+    chunk_size: int | None = PREPROCESS_CHUNK_SIZE,
+    from_step: str | None = None,
+    force: bool = False,
+    checkpoints: bool = PREPROCESS_CHECKPOINTS,
+    incremental: bool = False,
+    save_state: bool = PREPROCESS_INCREMENTAL_STATE,
+):
+    """
+    dataset: "old", "new_only", "combined", or None (reads data/messages.csv).
+    Outputs are named messages_community.csv, messages_community_old.csv,
+    or messages_community_new_only.csv accordingly.
+    chunk_size: stream messages in batches of this many rows
+    (run_pipeline_chunked) instead of loading the whole export.
+    from_step / force / checkpoints: see open_checkpoints(). By default the
+    run resumes after the last step with a valid checkpoint; from_step
+    reruns that step and everything after it, force reruns everything.
+    incremental: process only the messages that are new or changed since
+    the last run (run_pipeline_incremental).
+    save_state: store the row state a later incremental run compares with.
+    """
+    if incremental:
+        return run_pipeline_incremental(dataset)
+    if chunk_size:
+        return run_pipeline_chunked(dataset, chunk_size)
+
+    ensure_output_dir()
+    skip_removal = _skip_removal(dataset)
+    ckpt = open_checkpoints(dataset, from_step, force, checkpoints)
+    if ckpt.resume_step:
+        print(f"\n  Resuming after step [{ckpt.resume_step}] "
+              f"(checkpoint in {ckpt.directory}; --force to rerun everything)")
+        dfs = ckpt.load()
+
+    # 1. Load
+    if ckpt.should_run("1"):
+        dfs = load_raw_data(dataset)
+        ckpt.save("1", dfs)
+    # The raw rows (and later the step-3 survivors) for the incremental state;
+    # steps 3+ replace dfs["messages"] rather than changing it.
+    raw_messages = dfs["messages"] if ckpt.should_run("3") else None
+    survivors = None
+
+    # 2. Build maps
+    print("\n[2] Building topic → account map…")
+    topic_to_account, topic_to_group = _load_topic_maps()
+
+    if ckpt.should_run("3"):
+        if skip_removal:
+            print("\n[3] Skipping superuser/moderator removal – already applied in integrate_datasets.py")
+        else:
+            # 3. Superuser removal
+            print("\n[3] Identifying superusers…")
+            superuser_ids = get_superuser_ids(dfs["messages"], topic_to_account)
+            dfs["messages"] = remove_superusers(dfs["messages"], superuser_ids)
+
+            # 3b. Moderator removal
+            print("\n[3b] Removing moderators…")
+            dfs["messages"] = remove_moderators(dfs["messages"])
+        survivors = dfs["messages"].index
+        ckpt.save("3", dfs)
 
     # 4. Clean all DataFrames
-    print("\n[4] Cleaning dataframes (HTML, dates, quote stripping)…")
-    for name in dfs:
-        dfs[name] = clean_dataframe(dfs[name])
+    if ckpt.should_run("4"):
+        print("\n[4] Cleaning dataframes (HTML, dates, quote stripping)…")
+        for name in dfs:
+            dfs[name] = clean_dataframe(
+                dfs[name], quote_chars_column=QUOTE_CHARS_COLUMN if name == "messages" else None
+            )
+        print_quote_summary(quote_counts(dfs["messages"]))
+        ckpt.save("4", dfs)
 
     # 4b. Standardize text
-    print("\n[4b] Standardizing text…")
-    dfs["messages"] = standardize_text(dfs["messages"])
+    if ckpt.should_run("4b"):
+        print("\n[4b] Standardizing text…")
+        dfs["messages"] = standardize_text(dfs["messages"])
+        ckpt.save("4b", dfs)
 
     # 5. Text quality filters (messages only)
-    print("\n[5] Filtering text quality…")
-    dfs["messages"] = filter_text_quality(dfs["messages"])
+    if ckpt.should_run("5"):
+        print("\n[5] Filtering text quality…")
+        dfs["messages"] = filter_text_quality(dfs["messages"])
+        ckpt.save("5", dfs)
 
     # 6. ID anonymization
-    print("\n[6] Anonymizing poster IDs…")
-    anonymize_ids(dfs)
-
-    # 7. Text anonymization
-    if ANONYMIZE_TEXT:
+    if ckpt.should_run("6"):
+        print("\n[6] Anonymizing poster IDs…")
+        anonymize_ids(dfs)
+        ckpt.save("6", dfs)
+
+    # 7. Text anonymization. A crash part-way resumes from checkpoint 6; the
+    # NER cache commits every chunk, so finished texts are not re-run.
+    if ANONYMIZE_TEXT and ckpt.should_run("7"):
         print("\n[7] Anonymizing text…")
+        if _ANON_AVAILABLE:
+            print(f"  NER model ready in {ta_warm_up():.1f}s.")
         dfs["messages"] = anonymize_text_columns(dfs["messages"], columns=[TEXT_COLUMN])
         dfs["topics"]   = anonymize_text_columns(dfs["topics"],   columns=["Name"])
 
@@ -523,19 +946,9 @@ def run_pipeline(dataset: str | None = None):
         # don't appear as words in word-frequency and LIWC analyses downstream.
         # The anonymizer review CSV and entity log are already written above.
         print("\n[7b] Stripping entity placeholder tokens…")
-        _entity_re = re.compile(r"\[ENTITY_[A-Z]+_\d+\]")
-        dfs["messages"][TEXT_COLUMN] = (
-            dfs["messages"][TEXT_COLUMN]
-            .str.replace(_entity_re, "", regex=True)
-            .str.replace(r"  +", " ", regex=True)
-            .str.strip()
-        )
+        dfs["messages"] = strip_entity_placeholders(dfs["messages"])
         print("  Done.")
-
-        # Re-derive the normalized column from the now-cleaned text.
-        norm_col = f"{TEXT_COLUMN}_normalized"
-        if norm_col in dfs["messages"].columns:
-            dfs["messages"][norm_col] = dfs["messages"][TEXT_COLUMN].str.lower()
+        ckpt.save("7", dfs)
 
     # 8. Write cleaned files + community output
     print("\n[8] Saving outputs…")
@@ -543,11 +956,362 @@ def run_pipeline(dataset: str | None = None):
         write_csv(df, f"{name}_cleaned.csv")
 
     save_outputs(dfs["messages"], topic_to_account, topic_to_group, dataset)
+    if save_state:
+        save_row_state(dataset, raw_messages, survivors, topic_to_account, topic_to_group)
 
     print("\n✓ Pipeline complete.")
+    if ckpt.enabled:
+        print(f"  Checkpoints (text before NER, original PosterIDs) are kept in "
+              f"{ckpt.directory} – delete them when no longer needed.")
     return dfs
 
 
+# ── Incremental pipeline ──────────────────────────────────────────────────────
+#
+# After a new export most messages are the same as in the last run. A full
+# in-memory run with save_state (and the full run --incremental falls back
+# to) therefore stores, per raw message row keyed on ForumMessageID, a hash
+# of the row (plus the account and group of its topic) and whether it
+# survived step 3, in output/preprocessed/incremental/<dataset>.npz, from
+# the rows step 1 loaded. run_pipeline_incremental:
+#
+#   - loads the export and runs step 3 over all of it (superusers and
+#     moderator threads are export-wide, and cheap to find)
+#   - sends only new or changed rows, and rows step 3 used to remove but no
+#     longer does, through steps 4–7 (HTML, filters, NER)
+#   - numbers new posters after the existing user_N tokens, so the tokens of
+#     known posters do not change
+#   - drops changed, removed and now-excluded rows from messages_community*
+#     and merges the new rows in, in export order
+#
+# The *_cleaned.csv by-products and the topic names are only rewritten by
+# full runs; the entity logs get the new rows appended. Without a usable
+# state (first run, settings changed, ForumMessageID missing or not unique)
+# a full run_pipeline runs instead.
+
+def _state_path(dataset: str | None) -> str:
+    return os.path.join(PREPROCESS_DIR, "incremental", f"{dataset or 'default'}.npz")
+
+
+def _state_settings(dataset: str | None, columns) -> list:
+    return [_CHECKPOINT_VERSION, step_settings(dataset), sorted(map(str, columns))]
+
+
+def _row_state(
+    messages: pd.DataFrame,
+    topic_to_account: dict,
+    topic_to_group: dict,
+    skip_removal: bool,
+    survivors: pd.Index | None = None,
+) -> dict[str, np.ndarray]:
+    """
+    keys, content hashes and step-3 survival of the raw message rows.
+    survivors: index of the rows step 3 kept, if it already ran.
+    """
+    account, group = topic_fields(messages, topic_to_account, topic_to_group)
+    hashes = row_hashes(messages.assign(_AccountID=account, _GroupName=group))
+    if skip_removal:
+        kept = np.ones(len(messages), dtype=bool)
+    else:
+        if survivors is None:
+            superuser_ids = get_superuser_ids(messages, topic_to_account)
+            survivors = remove_moderators(remove_superusers(messages, superuser_ids)).index
+        kept = messages.index.isin(survivors)
+    return {"keys": message_keys(messages), "hashes": hashes, "kept": kept}
+
+
+def save_row_state(
+    dataset: str | None,
+    messages: pd.DataFrame | None,
+    survivors: pd.Index | None,
+    topic_to_account: dict,
+    topic_to_group: dict,
+) -> None:
+    """
+    Stores the row state of the current export for the next incremental run.
+    messages: the raw rows step 1 loaded; None when the run resumed from a
+    checkpoint after step 1 (the export is not read again for it).
+    """
+    print("\n[8b] Saving row hashes for incremental runs…")
+    problem = "resumed from a checkpoint, raw rows not loaded" if messages is None else (
+        key_problem(messages))
+    if problem:
+        clear_state(_state_path(dataset))
+        print(f"  SKIP: {problem} – the next --incremental run will be a full run.")
+        return
+    rows = _row_state(messages, topic_to_account, topic_to_group, _skip_removal(dataset),
+                      survivors)
+    save_state(_state_path(dataset), _state_settings(dataset, messages.columns), **rows)
+    print(f"  Stored {len(messages)} row hashes → {_state_path(dataset)}")
+
+
+def run_pipeline_incremental(dataset: str | None = None) -> dict[str, pd.DataFrame]:
+    """
+    run_pipeline for an export that differs from the last run's in a few
+    messages: see the section comment above. Returns {"messages": the rows
+    that were processed}, or run_pipeline's result after a full run.
+    """
+    ensure_output_dir()
+    state_path = _state_path(dataset)
+    community_path = os.path.join(PREPROCESS_DIR, community_filename(dataset))
+    outputs = [os.path.join(PREPROCESS_DIR, "anonymization_mapping.csv")]
+
+    dfs = load_raw_data(dataset)
+    messages = dfs["messages"]
+    reason = key_problem(messages)
+    if not reason:
+        state, reason = load_state(state_path, _state_settings(dataset, messages.columns))
+    if not reason and not (
+        all(os.path.exists(p) for p in outputs)
+        and (os.path.exists(community_path) or os.path.exists(parquet_path(community_path)))
+    ):
+        reason = "outputs of the last run are missing"
+    if reason:
+        print(f"\n  Running the full pipeline instead: {reason}.")
+        return run_pipeline(dataset, chunk_size=None, save_state=True)
+
+    print("\n[2] Building topic → account map…")
+    topic_to_account, topic_to_group = _load_topic_maps()
+
+    print("\n[3] Comparing with the last run (superuser/moderator removal on all rows)…")
+    rows = _row_state(messages, topic_to_account, topic_to_group, _skip_removal(dataset))
+    changed, removed = changed_keys(state["keys"], state["hashes"], rows["keys"], rows["hashes"])
+    was_kept = np.isin(rows["keys"], state["keys"][state["kept"]])
+    todo = rows["kept"] & (np.isin(rows["keys"], changed) | ~was_kept)
+    retained = rows["keys"][rows["kept"] & ~todo]
+    print(f"  {len(changed)} new or changed, {len(removed)} removed messages; "
+          f"{int(todo.sum())} to process, {len(retained)} unchanged.")
+
+    delta = messages[todo]
+    if len(delta):
+        print("\n[4] Cleaning new messages (HTML, dates, quote stripping)…")
+        delta = clean_dataframe(delta, quote_chars_column=QUOTE_CHARS_COLUMN)
+        print_quote_summary(quote_counts(delta))
+        print("\n[4b] Standardizing text…")
+        delta = standardize_text(delta)
+        print("\n[5] Filtering text quality…")
+        delta = filter_text_quality(delta)
+
+        print("\n[6] Anonymizing poster IDs (extending the existing mapping)…")
+        frames = {"messages": delta}
+        # A "sorted" mapping is extended like a persistent one, so known
+        # posters keep their tokens.
+        anonymize_ids(frames, pseudonyms=open_pseudonymizer() or open_pseudonymizer("persistent"))
+        delta = frames["messages"]
+
+        if ANONYMIZE_TEXT:
+            print("\n[7] Anonymizing text…")
+            if _ANON_AVAILABLE:
+                print(f"  NER model ready in {ta_warm_up():.1f}s.")
+            delta = anonymize_text_column(delta, TEXT_COLUMN, append=True)
+            print("\n[7b] Stripping entity placeholder tokens…")
+            if TEXT_COLUMN in delta.columns:
+                delta = strip_entity_placeholders(delta)
+
+    print("\n[8] Merging into the community output…")
+    previous = read_table(community_path)
+    previous = previous[previous[MESSAGE_KEY].isin(retained)]
+    new_rows = (build_community(delta, topic_to_account, topic_to_group, dataset)
+                if len(delta) else previous.iloc[:0])
+    community = pd.concat([previous, new_rows], ignore_index=True)
+    order = pd.Index(rows["keys"]).get_indexer(message_keys(community))
+    community = community.iloc[np.argsort(order, kind="stable")].reset_index(drop=True)
+    write_table(community, community_path)
+    print(f"  Kept {len(previous)}, added {len(new_rows)} → "
+          f"{len(community)} messages in {community_filename(dataset)}")
+
+    save_state(state_path, _state_settings(dataset, messages.columns), **rows)
+
+    print("\n✓ Incremental pipeline complete.")
+    return {"messages": delta}
+
+
+# ── Streaming (chunked) pipeline ──────────────────────────────────────────────
+#
+# Same steps as run_pipeline, but messages never sit in memory as a whole:
+#
+#   scan    – two passes over the ID/topic/date columns only: superuser IDs
+#             (step 3) and the first post per thread (step 3b, O(threads))
+#   pass 1  – per chunk: remove superusers/moderators, clean, standardize,
+#             filter (steps 3–5); survivors are spooled to disk and their
+#             PosterIDs collected. With a stable ID_PSEUDONYMS mode the IDs
+#             are replaced right here instead, so raw IDs never reach the
+#             spool and no ID set is held.
+#   mapping – step 6 over the collected IDs (same user_N numbering)
+#   pass 2  – per spooled chunk: map IDs, NER (step 7, via the NER cache),
+#             strip placeholders, append to messages_cleaned.csv, the entity
+#             logs and messages_community*.csv (step 8)
+#
+# Chunks are read with dtype=str so every chunk sees identical values
+# (per-chunk type inference would turn "12" into "12.0" only in chunks that
+# happen to contain a missing value). The community file is written as CSV
+# only; any stale Parquet sibling is removed.
+
+def _read_message_chunks(path: str, chunk_size: int, on_bad_lines: str = "skip", **kwargs):
+    return pd.read_csv(path, chunksize=chunk_size, dtype=str,
+                       on_bad_lines=on_bad_lines, **kwargs)
+
+
+def _scan_removals(
+    path: str,
+    on_bad_lines: str,
+    chunk_size: int,
+    topic_to_account: dict,
+) -> tuple[set, set]:
+    """(superuser poster IDs, moderator-initiated thread IDs) for the export."""
+    print("\n[3] Scanning for superusers…")
+    superuser_ids: set = set()
+    for chunk in _read_message_chunks(path, chunk_size, on_bad_lines,
+                                      usecols=["ForumTopicID", ID_COLUMN]):
+        topic = pd.to_numeric(chunk["ForumTopicID"], errors="coerce")
+        account = topic.map(topic_to_account)
+        superuser_ids.update(
+            chunk.loc[account.isin(SUPERUSER_ACCOUNT_IDS), ID_COLUMN].dropna()
+        )
+    print(f"  Identified {len(superuser_ids)} superuser posters to exclude.")
+
+    print("\n[3b] Scanning for moderator-initiated threads…")
+    mod_threads: set = set()
+    date_col = DATE_COLUMNS[0]
+    if not MODERATOR_POSTER_IDS:
+        print("  No moderator IDs configured – skipping.")
+        return superuser_ids, mod_threads
+    try:
+        chunks = _read_message_chunks(path, chunk_size, on_bad_lines,
+                                      usecols=["ForumTopicID", date_col, ID_COLUMN])
+        first = None
+        for chunk in chunks:
+            chunk = chunk[~chunk[ID_COLUMN].isin(superuser_ids)]
+            parts = [chunk] if first is None else [first, chunk]
+            first = first_posts(pd.concat(parts, ignore_index=True))
+    except ValueError:   # date column missing from usecols
+        print(f"  WARNING: date column '{date_col}' not found; skipping thread-level filter.")
+        return superuser_ids, mod_threads
+    if first is not None:
+        mod_threads = moderator_thread_ids(first)
+    print(f"  {len(mod_threads)} moderator-initiated threads to remove.")
+    return superuser_ids, mod_threads
+
+
+def run_pipeline_chunked(dataset: str | None = None,
+                         chunk_size: int = 50_000) -> dict[str, pd.DataFrame]:
+    """
+    Streaming variant of run_pipeline with memory bounded by chunk_size rows
+    of messages. Writes the same files; returns the (small) metadata frames
+    only, since the messages are never held in memory together.
+    """
+    ensure_output_dir()
+    clear_state(_state_path(dataset))      # the stored row hashes go stale
+    skip_removal = _skip_removal(dataset)
+    suffix = f"_{dataset}" if dataset and dataset != "combined" else ""
+    spool = os.path.join(PREPROCESS_DIR, f"_stream_filtered{suffix}.csv")
+    community_path = os.path.join(PREPROCESS_DIR, community_filename(dataset))
+
+    # 1. Metadata is small; messages are only located here
+    print(f"\n[1] Loading metadata (messages streamed in chunks of {chunk_size})…")
+    path, on_bad_lines = _messages_source(dataset)
+    print(f"  Streaming messages from {path}")
+    meta = {name: read_csv(name) for name in ["topics", "groups", "accounts"]}
+
+    # 2. Build maps
+    print("\n[2] Building topic → account map…")
+    topic_to_account, topic_to_group = _load_topic_maps()
+
+    # 3. Superuser/moderator scan
+    if skip_removal:
+        print("\n[3] Skipping superuser/moderator removal – already applied in integrate_datasets.py")
+        superuser_ids, mod_threads = set(), set()
+    else:
+        superuser_ids, mod_threads = _scan_removals(
+            path, on_bad_lines, chunk_size, topic_to_account
+        )
+
+    # 4–5. Clean, standardize, filter – chunk by chunk, spooled to disk
+    print("\n[4–5] Cleaning, standardizing and filtering messages…")
+    excluded_posters = superuser_ids | MODERATOR_POSTER_IDS
+    pseudonyms = open_pseudonymizer()
+    poster_ids: set = set()
+    n_read = n_kept = 0
+    quotes: list[pd.DataFrame] = []
+    chunks = _read_message_chunks(path, chunk_size, on_bad_lines)
+    for i, chunk in enumerate(chunks):
+        n_read += len(chunk)
+        if not skip_removal:
+            chunk = chunk[
+                ~chunk[ID_COLUMN].isin(excluded_posters)
+                & ~chunk["ForumTopicID"].isin(mod_threads)
+            ]
+        chunk = clean_dataframe(chunk, quote_chars_column=QUOTE_CHARS_COLUMN)
+        quotes.append(quote_counts(chunk))
+        chunk = standardize_text(chunk)
+        chunk = filter_text_quality(chunk)
+        if pseudonyms is not None:
+            chunk[ID_COLUMN] = pseudonyms.tokens(chunk[ID_COLUMN])
+        else:
+            poster_ids.update(chunk[ID_COLUMN].dropna())
+        n_kept += len(chunk)
+        chunk.to_csv(spool, mode="a" if i else "w", header=not i, index=False)
+        del chunk
+    print(f"  Kept {n_kept} of {n_read} messages.")
+    print_quote_summary(pd.concat(quotes).groupby(level=0).sum() if quotes else
+                        quote_counts(pd.DataFrame(columns=["ForumTopicID", QUOTE_CHARS_COLUMN])))
+
+    for name in meta:
+        meta[name] = clean_dataframe(meta[name])
+
+    # 6. ID anonymization (mapping over every kept PosterID)
+    print("\n[6] Anonymizing poster IDs…")
+    mapping = anonymize_ids(meta, extra_ids=poster_ids, pseudonyms=pseudonyms)
+    del poster_ids
+
+    if ANONYMIZE_TEXT:
+        print("\n[7] Anonymizing text…")
+        if _ANON_AVAILABLE:
+            print(f"  NER model ready in {ta_warm_up():.1f}s.")
+        meta["topics"] = anonymize_text_columns(meta["topics"], columns=["Name"])
+
+    # 7–8. Per chunk: map IDs, NER, strip placeholders, append outputs
+    print("\n[7–8] Anonymizing text and writing outputs chunk by chunk…")
+    n_community = 0
+    offset = 0
+    # The spool holds already-cleaned strings: keep "nan"/"" exactly as written.
+    spooled = pd.read_csv(spool, chunksize=chunk_size, dtype=str,
+                          keep_default_na=False, na_filter=False)
+    for i, chunk in enumerate(spooled):
+        chunk.index = range(offset, offset + len(chunk))
+        offset += len(chunk)
+        if pseudonyms is None:
+            chunk[ID_COLUMN] = chunk[ID_COLUMN].map(mapping)
+        if ANONYMIZE_TEXT:
+            chunk = anonymize_text_column(chunk, TEXT_COLUMN, append=bool(i))
+            if TEXT_COLUMN in chunk.columns:
+                chunk = strip_entity_placeholders(chunk)
+        write_csv(chunk, "messages_cleaned.csv", append=bool(i))
+        community = build_community(chunk, topic_to_account, topic_to_group, dataset)
+        append_table(community, community_path, append=bool(i))
+        n_community += len(community)
+    os.remove(spool)
+
+    print("\n[8] Saving metadata…")
+    for name, df in meta.items():
+        write_csv(df, f"{name}_cleaned.csv")
+    print(f"  Wrote {n_community} messages → {community_filename(dataset)}")
+
+    print("\n✓ Pipeline complete.")
+    return meta
+
+
+def run_all(**options):
+    """
+    Runs the pipeline for old, new_only and combined in one process (same
+    order as `make preprocess-all`). The NER model is loaded once, and since
+    combined is the union of the two slices its texts are all NER cache hits.
+    """
+    for dataset in ["old", "new_only", "combined"]:
+        print(f"\n{'='*60}\n  Dataset: {dataset}\n{'='*60}")
+        run_pipeline(dataset=dataset, **options)
+
+
 if __name__ == "__main__":
     import argparse
     parser = argparse.ArgumentParser()
@@ -557,5 +1321,53 @@ if __name__ == "__main__":
         default=None,
         help="Which integrated dataset to process. Omit to use data/messages.csv directly.",
     )
+    parser.add_argument(
+        "--chunk-size",
+        type=int,
+        default=PREPROCESS_CHUNK_SIZE,
+        help="Stream messages in chunks of this many rows (bounded memory).",
+    )
+    parser.add_argument(
+        "--from-step",
+        choices=PIPELINE_STEPS,
+        default=None,
+        help="Ignore checkpoints from this step on and rerun it and everything after.",
+    )
+    parser.add_argument(
+        "--force",
+        action="store_true",
+        help="Ignore all checkpoints and rerun every step.",
+    )
+    parser.add_argument(
+        "--checkpoints",
+        action="store_true",
+        default=PREPROCESS_CHECKPOINTS,
+        help="Checkpoint every step under output/preprocessed/checkpoints/ to resume "
+             "after a crash (holds text from before pseudonymisation).",
+    )
+    parser.add_argument(
+        "--all",
+        dest="run_all",
+        action="store_true",
+        help="Process old, new_only and combined in one run (model loaded once).",
+    )
+    parser.add_argument(
+        "--incremental",
+        action="store_true",
+        help="Only process messages that are new or changed since the last run "
+             "(by ForumMessageID and content hash) and merge them into the output.",
+    )
+    parser.add_argument(
+        "--save-state",
+        action="store_true",
+        default=PREPROCESS_INCREMENTAL_STATE,
+        help="After a full in-memory run, store row hashes for the next --incremental run.",
+    )
     args = parser.parse_args()
-    run_pipeline(dataset=args.dataset)
+    options = {"chunk_size": args.chunk_size, "from_step": args.from_step,
+               "force": args.force, "checkpoints": args.checkpoints,
+               "incremental": args.incremental, "save_state": args.save_state}
+    if args.run_all:
+        run_all(**options)
+    else:
+        run_pipeline(dataset=args.dataset, **options)
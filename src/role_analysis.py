@@ -19,8 +19,9 @@ import numpy as np
 import pandas as pd
 import matplotlib.pyplot as plt
 
+from utils.corpus import Corpus, tokenize_texts
 from utils.thread_utils import (
-    label_roles, tokenize_words, sentence_stats, extract_emojis
+    label_roles, sentence_stats_frame, extract_emojis
 )
 
 PRIMARY   = "#2E5E8E"
@@ -52,13 +53,20 @@ def compute_role_stats(
     stopwords: set | None = None,
     top_n_words: int = 25,
     top_n_emoji: int = 20,
+    corpus: Corpus | None = None,
 ) -> dict:
-    """Compute all post-vs-reply analyses in one pass."""
+    """
+    Compute all post-vs-reply analyses in one pass. corpus: the stored
+    tokenised corpus (utils/corpus.py) to take word tokens from; texts it
+    lacks are tokenised here.
+    """
     if stopwords is None:
         stopwords = DEFAULT_STOPWORDS
 
     df = label_roles(df, topic_col=topic_col, date_col=date_col)
     texts = df[text_col].fillna("").astype(str)
+    words = tokenize_texts(texts, corpus).letters()
+    roles = df["role"].to_numpy()
 
     # ── Word count by role ────────────────────────────────────────────────────
     word_counts = texts.apply(lambda t: len(t.split()))
@@ -70,18 +78,14 @@ def compute_role_stats(
     )
 
     # ── Popular words by role (raw frequency) ─────────────────────────────────
+    keep = ~words.vocab_mask(stopwords) & (words.token_lengths() > 1)
     popular_words: dict[str, list] = {}
     for role in ["post", "reply"]:
-        mask = df["role"] == role
-        counter: Counter = Counter()
-        for t in texts[mask]:
-            words = [w for w in tokenize_words(t) if w not in stopwords and len(w) > 1]
-            counter.update(words)
-        popular_words[role] = counter.most_common(top_n_words)
+        role_words = words.take(np.flatnonzero(roles == role))
+        popular_words[role] = role_words.most_common(top_n_words, keep)
 
     # ── Sentence structure by role ─────────────────────────────────────────────
-    sent_records = texts.apply(sentence_stats)
-    sent_df = pd.DataFrame(list(sent_records))
+    sent_df = sentence_stats_frame(texts, words)
     sent_df["role"] = df["role"].values
     sentence_by_role = sent_df.groupby("role").agg(
         sentences_per_message    =("n_sentences",       "mean"),
@@ -316,12 +320,13 @@ def fig_unique_emojis_table(unique_emojis: dict, top_n: int = 20) -> plt.Figure:
 # PDF entry point
 # =============================================================================
 
-def add_role_section_to_pdf(pdf, df: pd.DataFrame, stopwords: set | None = None) -> dict:
+def add_role_section_to_pdf(pdf, df: pd.DataFrame, stopwords: set | None = None,
+                            corpus: Corpus | None = None) -> dict:
     """
     Appends the full role-based section to an open matplotlib PdfPages object.
     Returns the computed stats dict so the caller can inspect values if needed.
     """
-    stats = compute_role_stats(df, stopwords=stopwords)
+    stats = compute_role_stats(df, stopwords=stopwords, corpus=corpus)
 
     def save(fig):
         pdf.savefig(fig, bbox_inches="tight")
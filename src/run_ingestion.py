@@ -19,7 +19,10 @@ import diagnose_new_data
 import integrate_datasets
 
 
-def main():
+def main(
+    near_threshold: float | None = integrate_datasets.NEAR_MATCH_THRESHOLD,
+    incremental: bool = False,
+):
     print("=" * 60)
     print("Step 1: Diagnosing new data (read-only)…")
     print("=" * 60)
@@ -32,7 +35,7 @@ def main():
     print("=" * 60)
     print("Step 2: Integrating datasets…")
     print("=" * 60)
-    integrate_datasets.run_integration()
+    integrate_datasets.run_integration(near_threshold=near_threshold, incremental=incremental)
 
     print()
     print("✓ Ingestion complete.")
@@ -40,4 +43,17 @@ def main():
 
 
 if __name__ == "__main__":
-    main()
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Diagnose, then integrate, old + new exports.")
+    parser.add_argument(
+        "--near-match", type=float, default=integrate_datasets.NEAR_MATCH_THRESHOLD,
+        metavar="JACCARD",
+        help="Passed to integrate_datasets.py: also link/drop lightly edited re-posts.",
+    )
+    parser.add_argument(
+        "--incremental", action="store_true",
+        help="Passed to integrate_datasets.py: integrate only exports added since the last run.",
+    )
+    args = parser.parse_args()
+    main(near_threshold=args.near_match, incremental=args.incremental)
@@ -16,9 +16,11 @@ matplotlib.use("Agg")
 import matplotlib.pyplot as plt
 import matplotlib.backends.backend_pdf as pdf_backend
 
-from utils.thread_utils import label_roles, strip_entity_placeholders_col, parse_post_dates
+from utils.thread_utils import label_roles, strip_entity_placeholders_col
 from liwc_analysis import load_liwc, score_messages, ensure_fps
-from dataset_io import add_dataset_arg, structured_path, variant_path
+from dataset_io import add_dataset_arg, structured_path, variant_path, read_table
+from utils.cds_store import add_cds_args
+from config import CDS_N_JOBS, CDS_CHUNK_SIZE
 
 DATE_COL   = "PostDate"
 POSTER_COL = "PosterID"
@@ -36,8 +38,7 @@ PALETTE   = ["#2E5E8E", "#E8A838", "#5A9E6F", "#C0392B", "#8E44AD"]
 # =============================================================================
 
 def load_data(path: str) -> pd.DataFrame:
-    df = pd.read_csv(path)
-    df[DATE_COL] = parse_post_dates(df[DATE_COL])
+    df = read_table(path)
     df = df.dropna(subset=[DATE_COL])
     return strip_entity_placeholders_col(df, TEXT_COL)
 
@@ -118,16 +119,24 @@ def select_users(df: pd.DataFrame, n: int, mode: str) -> tuple[list[str], pd.Dat
 # Scoring
 # =============================================================================
 
-def score_cds(df: pd.DataFrame) -> tuple[pd.DataFrame, list[str]]:
-    """Returns per-message CDS category flags with PosterID and PostDate."""
-    from utils.CDS import process_dataset
+def score_cds(df: pd.DataFrame, dataset: str | None = None, n_jobs: int | None = CDS_N_JOBS,
+              chunk_size: int = CDS_CHUNK_SIZE) -> tuple[pd.DataFrame, list[str]]:
+    """
+    Returns per-message CDS category flags with PosterID and PostDate.
+    dataset: read the hits from that variant's CDS store (utils/cds_store.py);
+    None matches the texts directly.
+    """
+    from utils.cds_matcher import compile_cds
+    from utils.cds_store import score_texts
 
-    working = df[[POSTER_COL, DATE_COL, TEXT_COL]].copy()
-    working["text"] = working[TEXT_COL].fillna("").str.lower()
+    if dataset is None:
+        matches = compile_cds("NL").match(df[TEXT_COL], n_jobs=n_jobs, chunk_size=chunk_size)
+    else:
+        matches = score_texts(df[TEXT_COL], dataset, OUTPUT_DIR, language="NL",
+                              n_jobs=n_jobs, chunk_size=chunk_size)
 
-    cds_cats = process_dataset(working, output="per_category", language="NL")
-    cds_cats = cds_cats.reset_index(drop=True)
-    meta = working[[POSTER_COL, DATE_COL]].reset_index(drop=True)
+    cds_cats = matches.category_frame().reset_index(drop=True)
+    meta = df[[POSTER_COL, DATE_COL]].reset_index(drop=True)
     result = pd.concat([meta, cds_cats], axis=1)
     cat_cols = list(cds_cats.columns)
     return result, cat_cols
@@ -285,9 +294,12 @@ def _time_series_page(monthly_df: pd.DataFrame, top_users: list[str],
 # =============================================================================
 
 def run(input_path: str | None = None, dataset: str | None = None,
-        top_n: int = 5, select: str = "count"):
+        top_n: int = 5, select: str = "count",
+        n_jobs: int | None = CDS_N_JOBS, chunk_size: int = CDS_CHUNK_SIZE):
     os.makedirs(OUTPUT_DIR, exist_ok=True)
     ds = dataset or "combined"
+    # The CDS store is keyed by variant, so only a variant's own file uses it
+    store_ds = ds if input_path is None else None
     if input_path is None:
         input_path = structured_path(OUTPUT_DIR, ds)
     # Give the sustained-engagement zoom-in its own filename so it doesn't
@@ -312,7 +324,7 @@ def run(input_path: str | None = None, dataset: str | None = None,
         }
 
     print("Scoring CDS…")
-    cds_df, cds_cols = score_cds(df_top)
+    cds_df, cds_cols = score_cds(df_top, dataset=store_ds, n_jobs=n_jobs, chunk_size=chunk_size)
     cds_monthly = aggregate_monthly(cds_df, cds_cols) if cds_cols else pd.DataFrame()
 
     print("Scoring LIWC…")
@@ -360,6 +372,8 @@ if __name__ == "__main__":
                              "'sustained' = high volume AND long active span, "
                              "compared by posting shape.")
     parser.add_argument("--input", help="Override input file path (ignores --dataset)")
+    add_cds_args(parser, n_jobs=CDS_N_JOBS, chunk_size=CDS_CHUNK_SIZE)
     args = parser.parse_args()
 
-    run(input_path=args.input, dataset=args.dataset, top_n=args.top, select=args.select)
+    run(input_path=args.input, dataset=args.dataset, top_n=args.top, select=args.select,
+        n_jobs=args.n_jobs, chunk_size=args.chunk_size)
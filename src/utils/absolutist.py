@@ -1,6 +1,8 @@
 from __future__ import annotations
 import re
 
+import numpy as np
+
 # Dutch absolutist words — translated from the 19-word English set in
 # Al-Mosaiwi & Johnstone (2018), who found absolutist word use elevated in
 # depression/anxiety forums and specific to them (vs. general negative affect).
@@ -46,3 +48,12 @@ def absolutist_rate(text: str, wordlist: list[str] = ABSOLUTIST_WORDS_NL) -> flo
         return 0.0
     word_set = set(wordlist)
     return round(sum(1 for t in tokens if t in word_set) / len(tokens) * 100, 3)
+
+
+def absolutist_rates(tokens, wordlist: list[str] = ABSOLUTIST_WORDS_NL) -> np.ndarray:
+    """absolutist_rate of every row of a utils.corpus.Corpus (see tokenize_texts)."""
+    words = tokens.letters()
+    hits, totals = words.count_in(wordlist).tolist(), words.lengths.tolist()
+    # Python round() on the same floats, so the values equal absolutist_rate's
+    return np.array([round(h / n * 100, 3) if n else 0.0 for h, n in zip(hits, totals)],
+                    dtype=np.float64)
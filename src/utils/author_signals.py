@@ -0,0 +1,254 @@
+# =============================================================================
+# author_signals.py  –  per-author behavioural signals in one grouped pass
+#
+# integrate_datasets.detect_new_superusers and diagnose_new_data.
+# superuser_signals both need, for every PosterID:
+#
+#   post_count, threads_started, threads_started_pct,
+#   lexical_diversity (unique / total lower-cased tokens), hour_std,
+#   total_words
+#
+# They used to filter the whole message table once or twice per author
+# (O(authors × messages)). Here the table is factorised on PosterID once:
+# counts come from bincount, tokens are exploded once and their (author,
+# token) pairs deduplicated as integer codes, and posting hours are sorted by
+# author so each author's hours are one contiguous slice.
+#
+# Values are bit-identical to the old per-author loop: rows come out in order
+# of first appearance (the old .unique() order), and each rounding uses the
+# same function on the same float the loop produced — Python round() for
+# lexical_diversity, NumPy's for the np.float64 percentages and hour std,
+# which is computed with pandas' two-pass algorithm over the author's hours
+# in their original order.
+#
+# For incremental integration the same signals can be rebuilt from stored
+# sufficient statistics (author_stats / merge_author_stats /
+# signals_from_stats): per author the post and word counts, the count, sum
+# and sum of squares of posting hours, and a k-minimum-values sketch of the
+# vocabulary (the VOCAB_SKETCH_SIZE smallest 64-bit token hashes). Merging
+# two exports' statistics adds the sums and keeps the smallest hashes of
+# the union. unique-word counts are exact up to VOCAB_SKETCH_SIZE distinct
+# words and estimated beyond that (relative error about 1/√k). hour_std
+# comes from the sums instead of a second pass; the hours are small
+# integers, so the sums are exact and only the last rounding step can
+# differ.
+# =============================================================================
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+SIGNAL_COLUMNS = [
+    "PosterID", "post_count", "threads_started", "threads_started_pct",
+    "lexical_diversity", "hour_std", "total_words",
+]
+
+# hour_std needs more than this many dated posts
+MIN_DATED_POSTS_FOR_HOUR_STD = 5
+
+STAT_COLUMNS = [
+    "PosterID", "post_count", "total_words", "dated_posts", "hour_sum", "hour_sumsq",
+]
+
+# Distinct token hashes kept per author by the vocabulary sketch
+VOCAB_SKETCH_SIZE = 1024
+
+
+def thread_starter_counts(messages: pd.DataFrame) -> pd.Series:
+    """Number of topics each PosterID posted first in (by PostDate)."""
+    first = messages.sort_values("PostDate").groupby("ForumTopicID")["PosterID"].first()
+    return first.value_counts()
+
+
+def _hour_std(hours: np.ndarray) -> float:
+    # Series.std(): two-pass variance over float64 values, ddof=1.
+    values = hours.astype("f8")
+    avg = values.sum(dtype=np.float64) / len(values)
+    var = ((avg - values) ** 2).sum(dtype=np.float64) / (len(values) - 1)
+    return np.round(np.sqrt(var), 2)
+
+
+def author_signals(messages: pd.DataFrame) -> pd.DataFrame:
+    """
+    SIGNAL_COLUMNS for every non-null PosterID in `messages` (which needs
+    PosterID, MessageText, PostDate as datetimes, and ForumTopicID), one row
+    per author in order of first appearance. hour_std is NaN for authors with
+    MIN_DATED_POSTS_FOR_HOUR_STD or fewer dated posts.
+    """
+    has_author = messages["PosterID"].notna().to_numpy()
+    df = messages.loc[has_author, ["PosterID", "MessageText", "PostDate"]]
+    codes, authors = pd.factorize(df["PosterID"])
+    n = len(authors)
+
+    post_count = np.bincount(codes, minlength=n)
+
+    starters = thread_starter_counts(messages)
+    threads_started = starters.reindex(authors, fill_value=0).to_numpy(dtype="int64")
+    threads_started_pct = np.round(threads_started / np.maximum(post_count, 1) * 100, 1)
+
+    # Tokens: one exploded column for the whole table, deduplicated per author
+    # on (author code, token code) integer pairs.
+    tokens = df["MessageText"].fillna("").astype(str).str.lower().str.split()
+    token_author = np.repeat(codes, tokens.str.len().to_numpy())
+    flat = [t for words in tokens for t in words]
+    total_words = np.bincount(token_author, minlength=n)
+    if flat:
+        token_codes, vocab = pd.factorize(pd.Series(flat, dtype=object))
+        pairs = np.unique(token_author.astype("int64") * len(vocab) + token_codes)
+        unique_words = np.bincount(pairs // len(vocab), minlength=n)
+    else:
+        unique_words = np.zeros(n, dtype="int64")
+    lexical_diversity = [
+        round(u / max(t, 1), 3) for u, t in zip(unique_words.tolist(), total_words.tolist())
+    ]
+
+    # Hours: stable sort by author keeps each author's posts in table order.
+    dated = df["PostDate"].notna().to_numpy()
+    hour_codes = codes[dated]
+    hours = df["PostDate"][dated].dt.hour.to_numpy()
+    order = np.argsort(hour_codes, kind="stable")
+    hours, hour_codes = hours[order], hour_codes[order]
+    bounds = np.searchsorted(hour_codes, np.arange(n + 1))
+    hour_std = np.full(n, np.nan)
+    for code in np.flatnonzero(np.diff(bounds) > MIN_DATED_POSTS_FOR_HOUR_STD):
+        hour_std[code] = _hour_std(hours[bounds[code]:bounds[code + 1]])
+
+    return pd.DataFrame({
+        "PosterID":            authors,
+        "post_count":          post_count.astype("int64"),
+        "threads_started":     threads_started,
+        "threads_started_pct": threads_started_pct,
+        "lexical_diversity":   lexical_diversity,
+        "hour_std":            hour_std,
+        "total_words":         total_words.astype("int64"),
+    })
+
+
+# ── Sufficient statistics (incremental integration) ──────────────────────────
+
+def topic_first_posts(messages: pd.DataFrame) -> pd.DataFrame:
+    """
+    ForumTopicID, PostDate, PosterID of the first post (by PostDate) in every
+    topic — what thread_starter_counts counts. Merging two exports' tables
+    and calling this again on the result gives the first posts of the union.
+    """
+    dated = messages[["ForumTopicID", "PostDate", "PosterID"]].dropna(subset=["PosterID"])
+    first = dated.sort_values("PostDate", kind="stable").drop_duplicates("ForumTopicID")
+    return first.reset_index(drop=True)
+
+
+def _vocab_sketch(author: np.ndarray, token_hash: np.ndarray,
+                  k: int = VOCAB_SKETCH_SIZE) -> tuple[np.ndarray, np.ndarray]:
+    """The k smallest distinct hashes per author code, as (author, hash) pairs."""
+    order = np.lexsort((token_hash, author))
+    author, token_hash = author[order], token_hash[order]
+    new = np.r_[True, (author[1:] != author[:-1]) | (token_hash[1:] != token_hash[:-1])]
+    author, token_hash = author[new], token_hash[new]
+    start = np.searchsorted(author, author)          # first position of each author
+    keep = np.arange(len(author)) - start < k
+    return author[keep], token_hash[keep]
+
+
+def author_stats(messages: pd.DataFrame) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """
+    (stats, sketch) for every non-null PosterID in `messages`: stats has
+    STAT_COLUMNS, one row per author in order of first appearance; sketch
+    has PosterID, hash (uint64) — each author's vocabulary sketch.
+    """
+    has_author = messages["PosterID"].notna().to_numpy()
+    df = messages.loc[has_author, ["PosterID", "MessageText", "PostDate"]]
+    codes, authors = pd.factorize(df["PosterID"])
+    n = len(authors)
+
+    tokens = df["MessageText"].fillna("").astype(str).str.lower().str.split()
+    token_author = np.repeat(codes, tokens.str.len().to_numpy())
+    flat = [t for words in tokens for t in words]
+    token_hash = (pd.util.hash_array(np.array(flat, dtype=object)) if flat
+                  else np.empty(0, dtype=np.uint64))
+    sketch_author, sketch_hash = _vocab_sketch(token_author, token_hash)
+
+    dated = df["PostDate"].notna().to_numpy()
+    hours = df["PostDate"][dated].dt.hour.to_numpy(dtype="int64")
+    stats = pd.DataFrame({
+        "PosterID":    authors,
+        "post_count":  np.bincount(codes, minlength=n).astype("int64"),
+        "total_words": np.bincount(token_author, minlength=n).astype("int64"),
+        "dated_posts": np.bincount(codes[dated], minlength=n).astype("int64"),
+        "hour_sum":    np.bincount(codes[dated], weights=hours, minlength=n).astype("int64"),
+        "hour_sumsq":  np.bincount(codes[dated], weights=hours ** 2, minlength=n).astype("int64"),
+    })
+    sketch = pd.DataFrame({"PosterID": authors[sketch_author], "hash": sketch_hash})
+    return stats, sketch
+
+
+def merge_author_stats(
+    stats: pd.DataFrame,
+    sketch: pd.DataFrame,
+    more_stats: pd.DataFrame,
+    more_sketch: pd.DataFrame,
+) -> tuple[pd.DataFrame, pd.DataFrame]:
+    """Statistics of two exports combined, as if author_stats ran on both."""
+    both = pd.concat([stats, more_stats], ignore_index=True)
+    merged = both.groupby("PosterID", sort=False)[STAT_COLUMNS[1:]].sum().reset_index()
+
+    hashes = pd.concat([sketch, more_sketch], ignore_index=True)
+    codes = pd.Index(merged["PosterID"]).get_indexer(hashes["PosterID"])
+    author, value = _vocab_sketch(codes, hashes["hash"].to_numpy(dtype=np.uint64))
+    return merged, pd.DataFrame({"PosterID": merged["PosterID"].to_numpy()[author],
+                                 "hash": value})
+
+
+def _distinct_estimate(sketch: pd.DataFrame, authors: pd.Index,
+                       k: int = VOCAB_SKETCH_SIZE) -> np.ndarray:
+    codes = authors.get_indexer(sketch["PosterID"])
+    counts = np.bincount(codes, minlength=len(authors))
+    estimate = counts.astype("float64")
+    full = np.flatnonzero(counts >= k)
+    if len(full):
+        # KMV estimate: (k - 1) / (k-th smallest hash as a fraction of 2⁶⁴)
+        kth = sketch.groupby(codes)["hash"].max().reindex(full).to_numpy(dtype=np.uint64)
+        estimate[full] = (k - 1) / (kth.astype("float64") / 2.0 ** 64)
+    return estimate
+
+
+def signals_from_stats(
+    stats: pd.DataFrame,
+    sketch: pd.DataFrame,
+    first_posts: pd.DataFrame,
+) -> pd.DataFrame:
+    """
+    SIGNAL_COLUMNS from author_stats() output (possibly merged across
+    exports) and topic_first_posts() of the same messages.
+    """
+    authors = pd.Index(stats["PosterID"])
+    post_count = stats["post_count"].to_numpy(dtype="int64")
+    total_words = stats["total_words"].to_numpy(dtype="int64")
+
+    starters = first_posts["PosterID"].value_counts()
+    threads_started = starters.reindex(authors, fill_value=0).to_numpy(dtype="int64")
+    threads_started_pct = np.round(threads_started / np.maximum(post_count, 1) * 100, 1)
+
+    unique_words = np.rint(_distinct_estimate(sketch, authors)).tolist()
+    lexical_diversity = [
+        round(u / max(t, 1), 3) for u, t in zip(unique_words, total_words.tolist())
+    ]
+
+    n = stats["dated_posts"].to_numpy(dtype="int64")
+    s = stats["hour_sum"].to_numpy(dtype="int64")
+    sq = stats["hour_sumsq"].to_numpy(dtype="int64")
+    enough = n > MIN_DATED_POSTS_FOR_HOUR_STD
+    hour_std = np.full(len(stats), np.nan)
+    # Integer numerator: exact for any realistic number of posts
+    var = (n[enough] * sq[enough] - s[enough] ** 2) / (n[enough] * (n[enough] - 1))
+    hour_std[enough] = np.round(np.sqrt(var), 2)
+
+    return pd.DataFrame({
+        "PosterID":            authors,
+        "post_count":          post_count,
+        "threads_started":     threads_started,
+        "threads_started_pct": threads_started_pct,
+        "lexical_diversity":   lexical_diversity,
+        "hour_std":            hour_std,
+        "total_words":         total_words,
+    })
@@ -0,0 +1,314 @@
+# =============================================================================
+# cds_matcher.py  –  single-pass CDS phrase matching over a whole text column
+#
+# utils/CDS.py (gitignored, with the lexicon) scores a message by calling
+# find_CDS_in_text(phrase, variants, text) for every phrase: one regex
+# search per phrase per message, ~265 scans of every text for the NL set.
+# CDSMatcher compiles the phrases and variants of load_CDS() once into an
+# Aho-Corasick automaton over tokens and finds every phrase occurrence in a
+# message in one left-to-right pass.
+#
+# Matching is the same as the per-phrase search `\b<phrase>\b` on the
+# lowercased text (phrases and variants are literal text, lowercased):
+#
+#   - a text is split into tokens: runs of word characters (\w+) and single
+#     other characters (each space and punctuation mark is its own token).
+#     Every \b position lies between two tokens, so a phrase matches at a
+#     \b-bounded position exactly when its token sequence occurs in the text.
+#   - a phrase that begins (ends) with a non-word character only matches
+#     where a word character precedes (follows) it, which is what \b demands
+#     there.
+#
+# Results come back sparse (CDSMatches): per message, the sorted ids of the
+# phrases and categories it contains (CSR indptr/indices arrays, 0/1
+# semantics like find_CDS_in_text) and the any-phrase CDS flag. Each
+# distinct text is matched once. process_dataset() here is a drop-in for
+# utils.CDS.process_dataset with the same outputs.
+#
+# With n_jobs > 1 the distinct texts are split into shards of chunk_size and
+# matched in a process pool (spawned, not forked: callers already run
+# pyarrow/tqdm threads). Each worker compiles the automaton once (from
+# CDSMatcher.spec) and the shards are put back in their original order, so
+# the result is the same as in one process.
+# =============================================================================
+
+from __future__ import annotations
+
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+from functools import lru_cache
+
+import numpy as np
+import pandas as pd
+from scipy import sparse as scipy_sparse
+from tqdm import tqdm
+
+from utils.checkpoints import settings_digest
+from utils.text_rows import concat_rows, csr_rows, take_rows, text_keys
+
+OUTPUTS = ("per_tweet", "per_category", "per_phrase", "all_variants")
+CHUNK_SIZE = 2000
+
+_TOKEN_RE = re.compile(r"(\w+)|(\W)")
+
+
+def _tokens(text: str) -> list[tuple[str, str]]:
+    """(word, "") or ("", other character) for every token of text."""
+    return _TOKEN_RE.findall(text)
+
+
+def _as_list(value) -> list[str]:
+    if isinstance(value, (list, tuple, np.ndarray)):
+        return [str(v) for v in value]
+    if value is None or (isinstance(value, float) and np.isnan(value)):
+        return []
+    return [str(value)]
+
+
+class CDSMatches:
+    """Sparse CDS hits of a text column.
+
+    phrase_indptr/phrase_indices: message i contains the phrases
+    phrase_indices[phrase_indptr[i]:phrase_indptr[i + 1]] (ids into
+    `phrases`), likewise for categories; flags is the 0/1 CDS column.
+    """
+
+    def __init__(self, index: pd.Index, phrases: list[str], categories: list[str],
+                 phrase_indptr: np.ndarray, phrase_indices: np.ndarray,
+                 category_indptr: np.ndarray, category_indices: np.ndarray):
+        self.index = index
+        self.phrases = phrases
+        self.categories = categories
+        self.phrase_indptr = phrase_indptr
+        self.phrase_indices = phrase_indices
+        self.category_indptr = category_indptr
+        self.category_indices = category_indices
+        self.flags = (np.diff(phrase_indptr) > 0).astype("int64")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def take(self, rows: np.ndarray, index: pd.Index | None = None) -> "CDSMatches":
+        """The hits of the given row positions (on a fresh RangeIndex unless
+        an index is given)."""
+        rows = np.asarray(rows, dtype=np.int64)
+        return CDSMatches(pd.RangeIndex(len(rows)) if index is None else index,
+                          self.phrases, self.categories,
+                          *take_rows(self.phrase_indptr, self.phrase_indices, rows),
+                          *take_rows(self.category_indptr, self.category_indices, rows))
+
+    def _matrix(self, indptr, indices, n_cols) -> scipy_sparse.csr_matrix:
+        data = np.ones(len(indices), dtype="int64")
+        return scipy_sparse.csr_matrix((data, indices, indptr), shape=(len(self.index), n_cols))
+
+    def phrase_matrix(self) -> scipy_sparse.csr_matrix:
+        """messages × phrases 0/1 matrix (scipy CSR; memory O(matches))."""
+        return self._matrix(self.phrase_indptr, self.phrase_indices, len(self.phrases))
+
+    def category_matrix(self) -> scipy_sparse.csr_matrix:
+        """messages × categories 0/1 matrix (scipy CSR)."""
+        return self._matrix(self.category_indptr, self.category_indices, len(self.categories))
+
+    def _frame(self, matrix: scipy_sparse.csr_matrix, columns: list[str],
+               as_sparse: bool) -> pd.DataFrame:
+        if as_sparse:
+            return pd.DataFrame.sparse.from_spmatrix(matrix, index=self.index, columns=columns)
+        return pd.DataFrame(matrix.toarray(), index=self.index, columns=columns)
+
+    def phrase_frame(self, sparse: bool = False) -> pd.DataFrame:
+        """0/1 per phrase and message (process_dataset's per_phrase);
+        sparse=True gives Sparse[int64] columns instead of dense ones."""
+        return self._frame(self.phrase_matrix(), self.phrases, sparse)
+
+    def category_frame(self, sparse: bool = False) -> pd.DataFrame:
+        """0/1 per category and message (process_dataset's per_category)."""
+        return self._frame(self.category_matrix(), self.categories, sparse)
+
+    def flag_frame(self) -> pd.DataFrame:
+        """The CDS column (process_dataset's per_tweet)."""
+        return pd.DataFrame({"CDS": self.flags}, index=self.index)
+
+
+class CDSMatcher:
+    """Aho-Corasick automaton over the tokens of every phrase and variant.
+
+    Usage::
+
+        matcher = CDSMatcher.from_lexicon(load_CDS(language="NL"))
+        matches = matcher.match(df["MessageText"])
+        df["CDS"] = matches.flags
+    """
+
+    def __init__(self, phrases: list[str], variants: list[list[str]],
+                 categories: list[list[str]]):
+        self.phrases = list(phrases)
+        self.categories = list(dict.fromkeys(c for cats in categories for c in cats))
+        cat_id = {c: i for i, c in enumerate(self.categories)}
+        self.phrase_categories = [sorted({cat_id[c] for c in cats}) for cats in categories]
+        self._category_csr = csr_rows(self.phrase_categories)
+        # What a worker process needs to compile the same matcher
+        self.spec = (self.phrases, [list(v) for v in variants], [list(c) for c in categories])
+        # Identifies the lexicon, e.g. for results stored on disk
+        self.digest = settings_digest(list(self.spec))
+
+        self._goto: list[dict[str, int]] = [{}]
+        self._out: list[list[tuple]] = [[]]
+        self._vocab: set[str] = set()
+        for pid, (phrase, alts) in enumerate(zip(self.phrases, variants)):
+            for pattern in dict.fromkeys([phrase, *alts]):
+                self._add(pattern.lower(), pid)
+        self._link()
+
+    @classmethod
+    def from_lexicon(cls, cds: pd.DataFrame) -> "CDSMatcher":
+        """From load_CDS() output: one row per phrase (the index) with
+        'variants' (list) and 'categories' (name, or list of names)."""
+        return cls([str(p) for p in cds.index],
+                   [_as_list(v) for v in cds["variants"]],
+                   [_as_list(c) for c in cds["categories"]])
+
+    # ── Building ──────────────────────────────────────────────────────────────
+
+    def _add(self, pattern: str, pid: int) -> None:
+        tokens = _tokens(pattern)
+        if not tokens:
+            return
+        state = 0
+        for word, other in tokens:
+            tok = word or other
+            self._vocab.add(tok)
+            nxt = self._goto[state].get(tok)
+            if nxt is None:
+                nxt = len(self._goto)
+                self._goto[state][tok] = nxt
+                self._goto.append({})
+                self._out.append([])
+            state = nxt
+        # (phrase id, pattern length in tokens, needs a word token before it,
+        #  needs a word token after it)
+        self._out[state].append((pid, len(tokens), not tokens[0][0], not tokens[-1][0]))
+
+    def _link(self) -> None:
+        self._fail = [0] * len(self._goto)
+        queue = list(self._goto[0].values())
+        for state in queue:
+            for tok, nxt in self._goto[state].items():
+                fail = self._fail[state]
+                while fail and tok not in self._goto[fail]:
+                    fail = self._fail[fail]
+                self._fail[nxt] = self._goto[fail].get(tok, 0)
+                self._out[nxt] = self._out[nxt] + self._out[self._fail[nxt]]
+                queue.append(nxt)
+
+    # ── Matching ──────────────────────────────────────────────────────────────
+
+    def find(self, text: str) -> list[int]:
+        """Sorted ids of the phrases occurring in text (already lowercased)."""
+        goto, fail, out, vocab = self._goto, self._fail, self._out, self._vocab
+        tokens = _tokens(text)
+        last = len(tokens) - 1
+        found: set[int] = set()
+        state = 0
+        for pos, (word, other) in enumerate(tokens):
+            tok = word or other
+            if tok not in vocab:
+                state = 0
+                continue
+            while state and tok not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(tok, 0)
+            for pid, length, word_before, word_after in out[state]:
+                if word_before and (pos < length or not tokens[pos - length][0]):
+                    continue
+                if word_after and (pos == last or not tokens[pos + 1][0]):
+                    continue
+                found.add(pid)
+        return sorted(found)
+
+    def matches(self, index: pd.Index, indptr: np.ndarray, indices: np.ndarray) -> CDSMatches:
+        """CDSMatches from phrase hits in CSR form; the category hits follow."""
+        n_cats = max(len(self.categories), 1)
+        rows = np.repeat(np.arange(len(index), dtype=np.int64), np.diff(indptr))
+        hit_ptr, cats = take_rows(*self._category_csr, indices)
+        pairs = np.unique(np.repeat(rows, np.diff(hit_ptr)) * n_cats + cats)
+        cat_ptr = np.zeros(len(index) + 1, dtype=np.int64)
+        cat_ptr[1:] = np.cumsum(np.bincount(pairs // n_cats, minlength=len(index)))
+        return CDSMatches(index, self.phrases, self.categories, indptr, indices,
+                          cat_ptr, (pairs % n_cats).astype(np.int32))
+
+    def find_all(self, texts: list[str], n_jobs: int | None = 1,
+                 chunk_size: int = CHUNK_SIZE) -> tuple[np.ndarray, np.ndarray]:
+        """CSR rows of find() for every text, in order. n_jobs > 1 (None: one
+        per CPU) matches shards of chunk_size texts in a process pool."""
+        chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+        workers = min(n_jobs or os.cpu_count() or 1, len(chunks))
+        if workers <= 1:
+            return csr_rows([self.find(t) for t in texts])
+        # spawn, not fork: the caller may already run pyarrow/tqdm threads, and
+        # the workers rebuild the matcher from spec either way.
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(self.spec,),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            shards = list(tqdm(pool.map(_find_chunk, chunks), total=len(chunks),
+                               desc="CDS matching", unit="chunk"))
+        return concat_rows(shards)
+
+    def match(self, texts: pd.Series, n_jobs: int | None = 1,
+              chunk_size: int = CHUNK_SIZE) -> CDSMatches:
+        """Phrase and category hits of every value of texts (lowercased here;
+        missing values are treated as ""). n_jobs, chunk_size: see find_all."""
+        codes, uniques = pd.factorize(text_keys(texts))
+        hits = self.find_all(list(uniques), n_jobs=n_jobs, chunk_size=chunk_size)
+        return self.matches(texts.index, *take_rows(*hits, codes))
+
+
+# ── Sharded matching (runs in the worker processes) ───────────────────────────
+
+_worker_matcher: CDSMatcher | None = None
+
+
+def _init_worker(spec: tuple) -> None:
+    # Compiled once per worker, not once per shard
+    global _worker_matcher
+    _worker_matcher = CDSMatcher(*spec)
+
+
+def _find_chunk(texts: list[str]) -> tuple[np.ndarray, np.ndarray]:
+    return csr_rows([_worker_matcher.find(t) for t in texts])
+
+
+@lru_cache(maxsize=None)
+def compile_cds(language: str = "NL") -> CDSMatcher:
+    """The matcher for load_CDS(language), built once per process."""
+    from utils.CDS import load_CDS
+    return CDSMatcher.from_lexicon(load_CDS(language=language))
+
+
+def process_dataset(tweets: pd.DataFrame, output: str = "per_tweet", language: str = "EN",
+                    sparse: bool = False, n_jobs: int | None = 1, chunk_size: int = CHUNK_SIZE):
+    """
+    utils.CDS.process_dataset on the compiled matcher: scores tweets["text"]
+    and returns the per_tweet (CDS), per_category or per_phrase frame on
+    tweets' index, or all three (phrases, categories, per_tweet) for
+    output="all_variants".
+
+    sparse: return the phrase frame with Sparse[int64] columns, so it takes
+    memory per match instead of per message × phrase
+    (.sparse.to_coo().tocsr() gives the scipy CSR matrix).
+    n_jobs, chunk_size: matcher processes and texts per shard (CDSMatcher.find_all).
+    """
+    if "text" not in tweets.columns:
+        raise ValueError("tweets must have a 'text' column")
+    if output not in OUTPUTS:
+        raise NotImplementedError(f"Unknown output '{output}', expected one of {OUTPUTS}")
+
+    matches = compile_cds(language).match(tweets["text"], n_jobs=n_jobs, chunk_size=chunk_size)
+    if output == "per_tweet":
+        return matches.flag_frame()
+    if output == "per_category":
+        return matches.category_frame()
+    if output == "per_phrase":
+        return matches.phrase_frame(sparse=sparse)
+    return matches.phrase_frame(sparse=sparse), matches.category_frame(), matches.flag_frame()
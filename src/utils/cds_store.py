@@ -0,0 +1,151 @@
+# =============================================================================
+# cds_store.py  –  phrase-level CDS hits stored once per dataset variant
+#
+# exploratory_analysis, cds_prevalence, full_report and user_longitudinal all
+# score the same message texts at phrase level. cds_scores.csv only keeps the
+# category columns, so each of them used to run the matcher again. The store
+# keeps the phrase × message hit matrix on disk instead:
+#
+#   output/cds/cds_phrases_<variant>.npz    (compressed)
+#     hashes            64-bit hash of every distinct (lowercased) text
+#     indptr, indices   CSR rows of phrase ids, one row per hash
+#     phrases, categories, phrase_category_indptr/indices
+#                       the lexicon the ids refer to
+#     lexicon           CDSMatcher.digest; another lexicon starts a new store
+#
+# score_variants() hashes a variant's text column, reads the rows of the
+# texts the store already has, and matches only the texts it has not seen
+# (scoring each of them once across the requested variants) before saving
+# the store again. A rerun on unchanged data matches nothing.
+# =============================================================================
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.cds_matcher import CHUNK_SIZE, CDSMatcher, CDSMatches, compile_cds
+from utils.text_rows import csr_rows, take_rows, text_hashes, text_keys
+
+STORE_SUBDIR = "cds"
+_STORE_VERSION = 1
+
+
+def store_path(output_dir: str, dataset: str) -> str:
+    return os.path.join(output_dir, STORE_SUBDIR, f"cds_phrases_{dataset}.npz")
+
+
+class CDSStore:
+    """Phrase hits of every distinct text scored for one variant."""
+
+    def __init__(self, path: str, matcher: CDSMatcher):
+        self.path = path
+        self.matcher = matcher
+        self.hashes = np.zeros(0, dtype=np.uint64)
+        self.indptr = np.zeros(1, dtype=np.int64)
+        self.indices = np.zeros(0, dtype=np.int32)
+        self.dirty = False
+        if os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        with np.load(self.path) as stored:
+            if (int(stored["version"]) != _STORE_VERSION
+                    or str(stored["lexicon"]) != self.matcher.digest):
+                print(f"  {self.path} was made with another CDS lexicon – starting over.")
+                return
+            self.hashes = stored["hashes"]
+            self.indptr = stored["indptr"]
+            self.indices = stored["indices"]
+
+    def __len__(self) -> int:
+        return len(self.hashes)
+
+    def unknown(self, keys: pd.Series) -> pd.Series:
+        """The distinct keys (text_keys) the store has no hits for."""
+        keys = keys.drop_duplicates()
+        return keys[~np.isin(text_hashes(keys), self.hashes)]
+
+    def add(self, keys: pd.Series, matches: CDSMatches) -> None:
+        """Stores the hits of distinct, unknown keys (matches row by row)."""
+        if not len(keys):
+            return
+        self.hashes = np.concatenate([self.hashes, text_hashes(keys)])
+        self.indptr = np.concatenate([self.indptr, self.indptr[-1] + matches.phrase_indptr[1:]])
+        self.indices = np.concatenate([self.indices, matches.phrase_indices])
+        self.dirty = True
+
+    def lookup(self, texts: pd.Series) -> CDSMatches:
+        """Hits of every value of texts, on its index; all must be known."""
+        pos = pd.Index(self.hashes).get_indexer(text_hashes(text_keys(texts)))
+        if (pos < 0).any():
+            raise KeyError(f"{int((pos < 0).sum())} texts are not in {self.path}")
+        return self.matcher.matches(texts.index, *take_rows(self.indptr, self.indices, pos))
+
+    def save(self) -> None:
+        if not self.dirty:
+            return
+        m = self.matcher
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        tmp = self.path + ".tmp"
+        with open(tmp, "wb") as f:
+            np.savez_compressed(
+                f, version=np.array(_STORE_VERSION), lexicon=np.array(m.digest),
+                hashes=self.hashes, indptr=self.indptr, indices=self.indices,
+                phrases=np.array(m.phrases, dtype=str), categories=np.array(m.categories, dtype=str),
+                **dict(zip(("phrase_category_indptr", "phrase_category_indices"),
+                           csr_rows(m.phrase_categories))),
+            )
+        os.replace(tmp, self.path)
+        self.dirty = False
+
+
+def add_cds_args(parser, n_jobs: int | None = 1, chunk_size: int = CHUNK_SIZE):
+    """--n-jobs / --chunk-size for the scripts that score CDS."""
+    parser.add_argument("--n-jobs", type=int, default=n_jobs,
+                        help=f"CDS matcher processes (default: {n_jobs}; 1 = in-process, "
+                             "0 = one per CPU)")
+    parser.add_argument("--chunk-size", type=int, default=chunk_size,
+                        help=f"Distinct texts per CDS matching shard (default: {chunk_size})")
+    return parser
+
+
+def score_variants(
+    texts: dict[str, pd.Series],
+    output_dir: str,
+    language: str = "NL",
+    n_jobs: int | None = 1,
+    chunk_size: int = CHUNK_SIZE,
+) -> dict[str, CDSMatches]:
+    """
+    {dataset: CDSMatches of its text column (on the column's index)}, read
+    from each variant's store. Texts missing from a store are matched once
+    across all the variants (in n_jobs processes, chunk_size texts per
+    shard) and added to it.
+    """
+    matcher = compile_cds(language)
+    stores = {ds: CDSStore(store_path(output_dir, ds), matcher) for ds in texts}
+    unknown = {ds: stores[ds].unknown(text_keys(col)) for ds, col in texts.items()}
+
+    todo = pd.concat(unknown.values(), ignore_index=True).drop_duplicates()
+    print(f"  CDS store: {len(todo)} new distinct texts to match"
+          f" ({', '.join(f'{ds}: {len(s)} stored' for ds, s in stores.items())}).")
+    scored = matcher.match(todo, n_jobs=n_jobs, chunk_size=chunk_size)
+    todo_index = pd.Index(todo)
+
+    out = {}
+    for ds, col in texts.items():
+        store = stores[ds]
+        store.add(unknown[ds], scored.take(todo_index.get_indexer(unknown[ds])))
+        store.save()
+        out[ds] = store.lookup(col)
+    return out
+
+
+def score_texts(texts: pd.Series, dataset: str, output_dir: str, language: str = "NL",
+                n_jobs: int | None = 1, chunk_size: int = CHUNK_SIZE) -> CDSMatches:
+    """score_variants() for one variant."""
+    return score_variants({dataset: texts}, output_dir, language,
+                          n_jobs=n_jobs, chunk_size=chunk_size)[dataset]
@@ -0,0 +1,147 @@
+# =============================================================================
+# checkpoints.py  –  resumable stage checkpoints for preprocess.run_pipeline
+#
+# After each numbered step the pipeline pickles its DataFrames to
+# output/preprocessed/checkpoints/<run>/step_<id>.pkl and records a
+# fingerprint in manifest.json. A step's fingerprint chains:
+#
+#   inputs  – path, size and mtime of every source CSV
+#   config  – the settings that step depends on (MIN_WORD_COUNT, ...)
+#   previous step's fingerprint
+#
+# so changing an input file or a setting invalidates that step and every
+# later one, while earlier checkpoints stay usable. A rerun loads the last
+# valid checkpoint and continues from the step after it.
+#
+# Step 7 (NER) is not checkpointed mid-step here: the NER cache
+# (utils/ner_cache.py) commits entity spans every chunk, so a rerun of step 7
+# after a crash re-runs NER only for the texts that were not yet committed.
+# =============================================================================
+
+from __future__ import annotations
+
+import hashlib
+import json
+import os
+
+import pandas as pd
+
+_MANIFEST = "manifest.json"
+
+
+def file_signature(path: str) -> list:
+    """(path, size, mtime_ns) — cheap stand-in for hashing a multi-GB export."""
+    if not os.path.exists(path):
+        return [path, None, None]
+    st = os.stat(path)
+    return [path, st.st_size, st.st_mtime_ns]
+
+
+def settings_digest(payload) -> str:
+    """Short stable hash of a JSON-able payload (sets are sorted first)."""
+    blob = json.dumps(payload, sort_keys=True, default=_jsonable)
+    return hashlib.blake2b(blob.encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _jsonable(value):
+    if isinstance(value, (set, frozenset)):
+        return sorted(value, key=str)
+    return str(value)
+
+
+class StageCheckpoints:
+    """Fingerprinted per-step DataFrame checkpoints for one pipeline run.
+
+    Usage::
+
+        ckpt = StageCheckpoints(directory, inputs=[...], steps=[
+            ("1", {"dataset": ds}),
+            ("5", {"min_words": MIN_WORD_COUNT}),
+        ])
+        if ckpt.resume_step:
+            dfs = ckpt.load()
+        if ckpt.should_run("1"):
+            dfs = ...
+            ckpt.save("1", dfs)
+
+    steps are (step id, settings) in pipeline order. from_step ignores the
+    checkpoints of that step and all later ones; force ignores all of them.
+    With enabled=False nothing is read or written.
+    """
+
+    def __init__(
+        self,
+        directory: str,
+        inputs: list[str],
+        steps: list[tuple[str, dict]],
+        from_step: str | None = None,
+        force: bool = False,
+        enabled: bool = True,
+    ):
+        self.directory = directory
+        self.enabled = enabled
+        self.order = [step for step, _ in steps]
+        if from_step is not None and from_step not in self.order:
+            raise ValueError(f"Unknown step '{from_step}', expected one of {self.order}")
+
+        self.fingerprints: dict[str, str] = {}
+        previous = settings_digest([file_signature(p) for p in inputs])
+        for step, settings in steps:
+            previous = settings_digest([previous, step, settings])
+            self.fingerprints[step] = previous
+
+        self.resume_step: str | None = None
+        if enabled and not force:
+            limit = self.order.index(from_step) if from_step is not None else len(self.order)
+            manifest = self._read_manifest()
+            for step in reversed(self.order[:limit]):
+                if manifest.get(step) == self.fingerprints[step] and os.path.exists(self._path(step)):
+                    self.resume_step = step
+                    break
+
+    # ── Paths / manifest ──────────────────────────────────────────────────────
+
+    def _path(self, step: str) -> str:
+        return os.path.join(self.directory, f"step_{step}.pkl")
+
+    def _read_manifest(self) -> dict[str, str]:
+        path = os.path.join(self.directory, _MANIFEST)
+        if not os.path.exists(path):
+            return {}
+        with open(path, encoding="utf-8") as f:
+            return json.load(f)
+
+    def _write_manifest(self, manifest: dict[str, str]):
+        path = os.path.join(self.directory, _MANIFEST)
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(manifest, f, indent=2)
+        os.replace(tmp, path)
+
+    # ── Resume / save ─────────────────────────────────────────────────────────
+
+    def should_run(self, step: str) -> bool:
+        """False for steps covered by the checkpoint being resumed from."""
+        if self.resume_step is None:
+            return True
+        return self.order.index(step) > self.order.index(self.resume_step)
+
+    def load(self) -> dict[str, pd.DataFrame]:
+        return pd.read_pickle(self._path(self.resume_step))
+
+    def save(self, step: str, dfs: dict[str, pd.DataFrame]):
+        """Stores step's output and drops the (now stale) later checkpoints."""
+        if not self.enabled:
+            return
+        os.makedirs(self.directory, exist_ok=True)
+        manifest = self._read_manifest()
+        for later in self.order[self.order.index(step) + 1:]:
+            manifest.pop(later, None)
+            if os.path.exists(self._path(later)):
+                os.remove(self._path(later))
+
+        tmp = self._path(step) + ".tmp"
+        pd.to_pickle(dfs, tmp)
+        os.replace(tmp, self._path(step))
+        manifest[step] = self.fingerprints[step]
+        self._write_manifest(manifest)
@@ -0,0 +1,264 @@
+# =============================================================================
+# corpus.py  –  tokenised message corpus, built once by postprocess
+#
+# LIWC scoring, the absolutist rate, word frequencies and sentence stats each
+# ran their own regex over every MessageText (with the loop scorer,
+# liwc_analysis tokenised each text twice: to score it and for word_count).
+# postprocess now tokenises every distinct analysed text once and writes
+#
+#   output/corpus/<variant>/
+#     vocab.txt     one token per line; a token's id is its line number
+#     tokens.npy    int32 token ids of all texts, back to back
+#     offsets.npy   int64 CSR offsets: text i is tokens[offsets[i]:offsets[i + 1]]
+#     hashes.npy    uint64 hash of every (lowercased) text, to find its row
+#     meta.json     format version and sizes, written last
+#
+# Tokens are the \w+ runs of the lowercased text — liwc_analysis._tokenize's
+# tokens. The texts are MessageText with the [ENTITY_*_N] placeholders
+# stripped, as every analysis loads it. letters() gives tokenize_words'
+# letter-only tokens ([^\W\d_]+ runs always lie inside one \w+ run) by
+# splitting the vocabulary once instead of the texts.
+#
+# load_corpus() memory-maps the arrays. Corpus.lookup(texts) returns the rows
+# of any text column in its order and tokenises only the texts the corpus
+# does not have, so results stay exact on subsets, on edited texts and on a
+# stale corpus. Counting over the rows is then NumPy work on token ids.
+# =============================================================================
+
+from __future__ import annotations
+
+import json
+import os
+import re
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from utils.text_rows import concat_rows, take_rows, text_hashes, text_keys
+
+CORPUS_SUBDIR = "corpus"
+_CORPUS_VERSION = 1
+
+_TOKEN_RE = re.compile(r"\w+")
+_LETTERS_RE = re.compile(r"[^\W\d_]+")
+
+
+def corpus_dir(output_dir: str, dataset: str | None = None) -> str:
+    """output/corpus/<variant>; None is the combined (unsuffixed) output."""
+    return os.path.join(output_dir, CORPUS_SUBDIR, dataset or "combined")
+
+
+def _tokenize(keys: pd.Series, vocab: dict[str, int], pattern=_TOKEN_RE):
+    offsets = [0]
+    tokens: list[int] = []
+    for text in tqdm(keys, desc="Tokenising", unit="msg", disable=len(keys) < 10_000):
+        for token in pattern.findall(text):
+            tokens.append(vocab.setdefault(token, len(vocab)))
+        offsets.append(len(tokens))
+    return np.asarray(offsets, dtype=np.int64), np.asarray(tokens, dtype=np.int32)
+
+
+class Corpus:
+    """Token ids of a sequence of texts, one CSR row per text.
+
+    Usage::
+
+        corpus = load_corpus(corpus_dir(OUTPUT_DIR, "combined"))
+        docs = tokenize_texts(df["MessageText"], corpus)   # rows of df
+        docs.lengths                 # tokens per message
+        docs.doc_term_matrix()       # scipy CSR, messages × vocab
+        docs.letters().count_in({"altijd", "nooit"})
+    """
+
+    def __init__(self, vocab: list[str], offsets: np.ndarray, tokens: np.ndarray,
+                 hashes: np.ndarray | None = None):
+        self.vocab = vocab
+        self.offsets = offsets
+        self.tokens = tokens
+        self.hashes = hashes
+
+    @classmethod
+    def from_texts(cls, texts, vocab: list[str] | None = None) -> Corpus:
+        """Tokenises every value of texts; new tokens extend vocab."""
+        keys = text_keys(texts)
+        ids = {token: i for i, token in enumerate(vocab or [])}
+        offsets, tokens = _tokenize(keys, ids)
+        return cls(list(ids), offsets, tokens, text_hashes(keys))
+
+    def __len__(self) -> int:
+        return len(self.offsets) - 1
+
+    @property
+    def lengths(self) -> np.ndarray:
+        """Tokens per row (int64)."""
+        return np.diff(self.offsets)
+
+    def doc_ids(self) -> np.ndarray:
+        """The row of every token."""
+        return np.repeat(np.arange(len(self)), self.lengths)
+
+    def take(self, rows) -> Corpus:
+        offsets, tokens = take_rows(self.offsets, self.tokens, rows)
+        hashes = None if self.hashes is None else np.asarray(self.hashes)[rows]
+        return Corpus(self.vocab, offsets, tokens, hashes)
+
+    def term_counts(self) -> np.ndarray:
+        """Occurrences of every vocabulary token over all rows."""
+        return np.bincount(self.tokens, minlength=len(self.vocab))
+
+    def vocab_mask(self, words) -> np.ndarray:
+        """Boolean mask of the vocabulary entries in words."""
+        words = set(words)
+        return np.fromiter((t in words for t in self.vocab), dtype=bool, count=len(self.vocab))
+
+    def token_lengths(self) -> np.ndarray:
+        """Characters of every vocabulary token."""
+        return np.fromiter(map(len, self.vocab), dtype=np.int64, count=len(self.vocab))
+
+    def count_in(self, words) -> np.ndarray:
+        """Per row, how many of its tokens are in words."""
+        hit = self.vocab_mask(words)[self.tokens]
+        return np.bincount(self.doc_ids()[hit], minlength=len(self))
+
+    def most_common(self, top_n: int, keep: np.ndarray | None = None) -> list[tuple[str, int]]:
+        """
+        Counter(all tokens).most_common(top_n): by count, ties in order of
+        first occurrence. keep: vocabulary mask of the tokens to count.
+        """
+        stream = np.asarray(self.tokens) if keep is None else self.tokens[keep[self.tokens]]
+        ids, first, counts = np.unique(stream, return_index=True, return_counts=True)
+        order = np.lexsort((first, -counts))[:top_n]
+        return [(self.vocab[i], int(c)) for i, c in zip(ids[order].tolist(), counts[order])]
+
+    def doc_term_matrix(self):
+        """Row × vocabulary token counts as a scipy CSR matrix (int64)."""
+        from scipy import sparse
+
+        # Copies: sum_duplicates() sorts the index arrays in place.
+        matrix = sparse.csr_matrix(
+            (np.ones(len(self.tokens), dtype=np.int64), np.array(self.tokens),
+             np.array(self.offsets)),
+            shape=(len(self), len(self.vocab)),
+        )
+        matrix.sum_duplicates()
+        return matrix
+
+    def letters(self) -> Corpus:
+        """
+        The same rows as thread_utils.tokenize_words tokens: each token split
+        into its runs of letters (digits and "_" dropped), over a new vocabulary.
+        """
+        ids: dict[str, int] = {}
+        sub_ptr, sub_ids = _tokenize(pd.Series(self.vocab, dtype=object), ids, _LETTERS_RE)
+        token_ptr, tokens = take_rows(sub_ptr, sub_ids, self.tokens)
+        return Corpus(list(ids), token_ptr[np.asarray(self.offsets)], tokens, self.hashes)
+
+    def lookup(self, texts) -> Corpus:
+        """
+        Rows for every value of texts, in order. Texts the corpus does not
+        have are tokenised here. The corpus must hold distinct texts (as a
+        stored one does).
+        """
+        keys = text_keys(texts)
+        hashes = text_hashes(keys)
+        pos = pd.Index(self.hashes).get_indexer(hashes)
+        missing = pos < 0
+        if not missing.any():
+            return self.take(pos)
+
+        # The texts the corpus lacks go into a small corpus of their own; rows
+        # are gathered from the two, so a memory-mapped corpus is not copied.
+        extra = Corpus.from_texts(keys[missing].drop_duplicates(), vocab=self.vocab)
+        found = np.flatnonzero(~missing)
+        stacked = concat_rows([
+            take_rows(self.offsets, self.tokens, pos[found]),
+            take_rows(extra.offsets, extra.tokens,
+                      pd.Index(extra.hashes).get_indexer(hashes[missing])),
+        ])
+        order = np.empty(len(pos), dtype=np.int64)
+        order[found] = np.arange(len(found))
+        order[missing] = len(found) + np.arange(int(missing.sum()))
+        return Corpus(extra.vocab, *take_rows(*stacked, order), hashes)
+
+    def save(self, directory: str) -> None:
+        os.makedirs(directory, exist_ok=True)
+        meta = os.path.join(directory, "meta.json")
+        if os.path.exists(meta):
+            os.remove(meta)
+
+        def _replace(name, write):
+            # Files are replaced, never rewritten: a reader may have them mapped.
+            tmp = os.path.join(directory, name + ".tmp")
+            write(tmp)
+            os.replace(tmp, os.path.join(directory, name))
+
+        for name, values in (("tokens", self.tokens), ("offsets", self.offsets),
+                             ("hashes", self.hashes)):
+            _replace(f"{name}.npy", lambda p, v=values: _save_array(p, v))
+        _replace("vocab.txt", lambda p: _write_text(p, "\n".join(self.vocab)))
+        _write_text(meta, json.dumps({
+            "version": _CORPUS_VERSION, "texts": len(self), "tokens": len(self.tokens),
+            "vocab": len(self.vocab),
+        }))
+
+
+def _save_array(path: str, values) -> None:
+    with open(path, "wb") as f:
+        np.save(f, np.asarray(values))
+
+
+def _write_text(path: str, text: str) -> None:
+    with open(path, "w", encoding="utf-8") as f:
+        f.write(text)
+
+
+def load_corpus(directory: str) -> Corpus | None:
+    """The corpus stored in directory, memory-mapped; None if there is none."""
+    try:
+        with open(os.path.join(directory, "meta.json"), encoding="utf-8") as f:
+            meta = json.load(f)
+    except FileNotFoundError:
+        return None
+    if meta.get("version") != _CORPUS_VERSION:
+        print(f"  {directory} holds an older corpus format – ignoring it.")
+        return None
+
+    with open(os.path.join(directory, "vocab.txt"), encoding="utf-8") as f:
+        text = f.read()
+    vocab = text.split("\n") if text else []
+    arrays = {name: np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r")
+              for name in ("tokens", "offsets", "hashes")}
+    if (len(vocab), len(arrays["tokens"]), len(arrays["hashes"])) != (
+            meta["vocab"], meta["tokens"], meta["texts"]):
+        print(f"  {directory} is incomplete – ignoring it.")
+        return None
+    return Corpus(vocab, arrays["offsets"], arrays["tokens"], arrays["hashes"])
+
+
+def open_corpus(output_dir: str, datasets) -> Corpus | None:
+    """The stored corpus of the first of datasets that has one."""
+    for ds in datasets:
+        corpus = load_corpus(corpus_dir(output_dir, ds))
+        if corpus is not None:
+            return corpus
+    return None
+
+
+def tokenize_texts(texts, corpus: Corpus | None = None) -> Corpus:
+    """Rows of texts, from corpus where it has them, else tokenised here."""
+    if corpus is None:
+        return Corpus.from_texts(texts)
+    return corpus.lookup(texts)
+
+
+def write_corpus(texts: pd.Series, directory: str) -> Corpus:
+    """
+    Stores the distinct values of texts in directory. Rows of texts the
+    stored corpus already has are reused, not tokenised again; its vocabulary
+    is kept (token ids stay the same) and new tokens are appended.
+    """
+    keys = text_keys(texts).drop_duplicates()
+    corpus = tokenize_texts(keys, load_corpus(directory))
+    corpus.save(directory)
+    return corpus
@@ -0,0 +1,97 @@
+# =============================================================================
+# incremental.py  –  per-message content hashes for incremental reruns
+#
+# preprocess.py --incremental and postprocess.py --incremental keep, next to
+# their outputs, one 64-bit hash per input row keyed on ForumMessageID. On
+# the next run the input is hashed again and compared:
+#
+#   new or changed  ForumMessageIDs whose hash is missing or different: only
+#                   these rows go through the expensive steps again
+#   removed         ForumMessageIDs that are gone from the input: their rows
+#                   are dropped from the outputs
+#
+# A row's hash covers every column by value, with integral float columns
+# written as integers, so a column that gains a missing value (and is read as
+# float instead of int) does not change the hashes of the other rows.
+#
+# The state is one .npz file per output: the arrays plus a digest of the
+# settings it was made with. A state made with other settings is not used.
+# =============================================================================
+
+from __future__ import annotations
+
+import os
+
+import numpy as np
+import pandas as pd
+
+from utils.checkpoints import settings_digest
+
+MESSAGE_KEY = "ForumMessageID"
+
+
+def key_problem(df: pd.DataFrame, key: str = MESSAGE_KEY) -> str:
+    """Why df cannot be diffed on `key` ("" if it can)."""
+    if key not in df.columns:
+        return f"no {key} column"
+    ids = pd.to_numeric(df[key], errors="coerce")
+    if ids.isna().any() or (ids % 1 != 0).any():
+        return f"{key} has missing or non-integer values"
+    if ids.duplicated().any():
+        return f"{key} is not unique"
+    return ""
+
+
+def message_keys(df: pd.DataFrame, key: str = MESSAGE_KEY) -> np.ndarray:
+    return pd.to_numeric(df[key]).to_numpy(dtype="int64")
+
+
+def _canonical(s: pd.Series) -> pd.Series:
+    if pd.api.types.is_float_dtype(s) and (s.dropna() % 1 == 0).all():
+        s = s.astype("Int64")
+    return s.astype(str)
+
+
+def row_hashes(df: pd.DataFrame) -> np.ndarray:
+    """uint64 hash of every row's values (columns taken in name order)."""
+    canon = pd.DataFrame({col: _canonical(df[col]) for col in sorted(df.columns, key=str)})
+    return pd.util.hash_pandas_object(canon, index=False).to_numpy(dtype=np.uint64)
+
+
+def changed_keys(
+    old_keys: np.ndarray,
+    old_hashes: np.ndarray,
+    keys: np.ndarray,
+    hashes: np.ndarray,
+) -> tuple[np.ndarray, np.ndarray]:
+    """(keys that are new or whose hash changed, old keys that are gone)."""
+    pos = pd.Index(old_keys).get_indexer(keys)
+    known = pos >= 0
+    changed = ~known
+    changed[known] = old_hashes[pos[known]] != hashes[known]
+    removed = old_keys[~np.isin(old_keys, keys)]
+    return keys[changed], removed
+
+
+def save_state(path: str, settings, **arrays: np.ndarray) -> None:
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        np.savez(f, settings=np.array(settings_digest(settings)), **arrays)
+    os.replace(tmp, path)
+
+
+def load_state(path: str, settings) -> tuple[dict[str, np.ndarray] | None, str]:
+    """(arrays, "") or (None, why the state cannot be used)."""
+    if not os.path.exists(path):
+        return None, "no state from an earlier run"
+    with np.load(path) as state:
+        arrays = {name: state[name] for name in state.files}
+    if str(arrays.pop("settings")) != settings_digest(settings):
+        return None, "the settings changed since the last run"
+    return arrays, ""
+
+
+def clear_state(path: str) -> None:
+    if os.path.exists(path):
+        os.remove(path)
@@ -0,0 +1,161 @@
+# =============================================================================
+# language_id.py  –  fast, reproducible language detection for step 5
+#
+# preprocess.filter_text_quality (with LANGUAGE_FILTER) used to call
+# langdetect.detect once per message on one core. langdetect is randomised
+# (it samples n-grams), so reruns could disagree, and it takes milliseconds
+# per text. detect_languages():
+#
+#   1. detects each distinct text once
+#   2. prefilter: a text in which Dutch function words make up at least
+#      PREFILTER_MIN_RATIO of the words (and at least PREFILTER_MIN_MARKERS
+#      of them) is "nl" without running the detector. The marker words are
+#      ones that are rare in English, German, French and Spanish ("het",
+#      "een", "niet", "ook", …). This is one vectorised regex count over all
+#      texts and covers most forum posts; only ambiguous texts reach step 4.
+#   3. cache: languages found earlier are looked up by text hash in an
+#      EntityCache (it stores any JSON value), namespaced on the langdetect
+#      version and seed
+#   4. detection: the rest is split into chunks and detected in a process
+#      pool. Every worker seeds langdetect's DetectorFactory, so each text
+#      gets the same language whatever the chunking, worker count or order.
+#      The pool is opt-in (n_jobs) and spawns its workers rather than forking
+#      a process that already runs threads.
+# =============================================================================
+
+from __future__ import annotations
+
+import importlib.metadata
+import importlib.util
+import multiprocessing
+import os
+import re
+from concurrent.futures import ProcessPoolExecutor
+
+import numpy as np
+import pandas as pd
+from tqdm import tqdm
+
+from utils.ner_cache import EntityCache
+
+LANGDETECT_AVAILABLE = importlib.util.find_spec("langdetect") is not None
+
+UNKNOWN = "unknown"
+
+PREFILTER_MIN_RATIO = 0.2
+PREFILTER_MIN_MARKERS = 2
+CHUNK_SIZE = 1000
+
+# Frequent Dutch function words that are not also common words in English,
+# German, French or Spanish ("de", "in", "is", "en", "die", "je", "als" are
+# left out for that reason).
+DUTCH_MARKERS = frozenset({
+    "het", "een", "ik", "niet", "voor", "zijn", "maar", "ook", "wel", "nog",
+    "dat", "wat", "heb", "hebt", "hebben", "ben", "bent", "mij", "mijn", "naar",
+    "geen", "toch", "veel", "heel", "echt", "omdat", "jij", "jullie", "wij",
+    "zij", "hij", "hem", "haar", "hun", "ze", "zo", "dan", "deze", "bij", "uit",
+    "door", "dus", "kan", "kun", "moet", "zou", "worden", "wordt", "gaat",
+    "gaan", "weet", "denk", "voel", "goed", "jou", "jouw", "zelf", "iets",
+    "niets", "alleen", "waar", "hoe", "waarom", "want", "erg", "beetje",
+    "even", "weer", "altijd", "nooit", "van", "op", "om",
+})
+
+_MARKER_RE = re.compile(r"\b(?:" + "|".join(sorted(DUTCH_MARKERS)) + r")\b")
+_WORD_RE = re.compile(r"\w+")
+
+
+def looks_dutch(
+    texts: pd.Series,
+    min_ratio: float = PREFILTER_MIN_RATIO,
+    min_markers: int = PREFILTER_MIN_MARKERS,
+) -> np.ndarray:
+    """Boolean mask of texts that are Dutch by their share of marker words."""
+    lower = texts.fillna("").astype(str).str.lower()
+    markers = lower.str.count(_MARKER_RE).to_numpy()
+    words = lower.str.count(_WORD_RE).to_numpy()
+    return (markers >= min_markers) & (markers >= min_ratio * words)
+
+
+def cache_namespace(seed: int) -> str:
+    version = importlib.metadata.version("langdetect") if LANGDETECT_AVAILABLE else "none"
+    return f"langdetect-{version}-seed{seed}"
+
+
+# ── Detector (runs in the worker processes) ───────────────────────────────────
+
+def _init_worker(seed: int) -> None:
+    from langdetect import DetectorFactory
+    DetectorFactory.seed = seed
+
+
+def _detect_one(text: str) -> str:
+    from langdetect import detect
+    try:
+        return detect(text)
+    except Exception:
+        return UNKNOWN
+
+
+def _detect_chunk(texts: list[str]) -> list[str]:
+    return [_detect_one(t) for t in texts]
+
+
+def _detect_all(texts: list[str], n_jobs: int | None, chunk_size: int, seed: int) -> list[str]:
+    chunks = [texts[i:i + chunk_size] for i in range(0, len(texts), chunk_size)]
+    workers = min(n_jobs or os.cpu_count() or 1, len(chunks))
+    progress = {"total": len(chunks), "desc": "Language detection", "unit": "chunk"}
+    if workers <= 1:
+        _init_worker(seed)
+        results = list(tqdm(map(_detect_chunk, chunks), **progress))
+    else:
+        # spawn, not fork: preprocess already runs pyarrow/tqdm threads here
+        with ProcessPoolExecutor(max_workers=workers, initializer=_init_worker,
+                                 initargs=(seed,),
+                                 mp_context=multiprocessing.get_context("spawn")) as pool:
+            results = list(tqdm(pool.map(_detect_chunk, chunks), **progress))
+    return [lang for chunk in results for lang in chunk]
+
+
+def detect_languages(
+    texts: pd.Series,
+    n_jobs: int | None = 1,
+    seed: int = 0,
+    cache: EntityCache | None = None,
+    prefilter: bool = True,
+    chunk_size: int = CHUNK_SIZE,
+) -> pd.Series:
+    """
+    Language code (langdetect's, e.g. "nl") of every value of texts, on its
+    index; "unknown" where langdetect finds no features. Missing values are
+    treated as "".
+
+    n_jobs: detector processes (1: in this process; None: one per CPU).
+    cache:  EntityCache namespaced with cache_namespace(seed), or None.
+    """
+    codes, uniques = pd.factorize(texts.fillna("").astype(str))
+    uniques = pd.Series(uniques, dtype=object)
+    langs = np.full(len(uniques), None, dtype=object)
+
+    n_prefiltered = n_cached = 0
+    if prefilter:
+        dutch = looks_dutch(uniques)
+        langs[dutch] = "nl"
+        n_prefiltered = int(dutch.sum())
+
+    todo = np.flatnonzero(pd.isna(langs))
+    if cache is not None and len(todo):
+        found = np.array(cache.get_many(uniques.iloc[todo].tolist()), dtype=object)
+        hit = ~pd.isna(found)
+        langs[todo[hit]] = found[hit]
+        n_cached = int(hit.sum())
+        todo = todo[~hit]
+
+    if len(todo):
+        detected = _detect_all(uniques.iloc[todo].tolist(), n_jobs, chunk_size, seed)
+        langs[todo] = detected
+        if cache is not None:
+            cache.put_many(uniques.iloc[todo].tolist(), detected)
+
+    print(f"  Language ID over {len(uniques)} distinct texts: {n_prefiltered} by stopword "
+          f"prefilter, {n_cached} from cache, {len(todo)} detected.")
+    return pd.Series(langs[codes], index=texts.index, dtype=object)
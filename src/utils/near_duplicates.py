@@ -0,0 +1,186 @@
+# =============================================================================
+# near_duplicates.py  –  MinHash + LSH near-duplicate search between corpora
+#
+# Finds pairs (left message, right message) whose texts have a word-shingle
+# Jaccard similarity of at least `threshold`, without comparing all pairs:
+#
+#   1. shingles   every run of SHINGLE_SIZE consecutive words of a text
+#                 (a shorter text is one shingle), hashed with pandas'
+#                 stable hash_array — no Python loop per shingle
+#   2. MinHash    for each of NUM_PERM multiply-add-shift hash functions
+#                 ((a·x + b) mod 2⁶⁴) >> 32, the minimum over a text's
+#                 shingles; the fraction of equal
+#                 signature positions estimates the Jaccard similarity
+#   3. LSH        the signature is cut into `bands` bands of `rows` values;
+#                 texts sharing any whole band land in the same bucket and
+#                 become candidate pairs. (bands, rows) is chosen for the
+#                 threshold so few pairs above it are missed.
+#   4. verify     candidates are kept if their signature estimate reaches the
+#                 threshold
+#
+# Everything runs as NumPy/pandas array operations, so the cost grows with
+# the number of shingles (plus the candidate pairs), not with |left|·|right|.
+# Buckets with more than max_bucket texts (boilerplate such as "bedankt
+# voor je reactie") are skipped: they would add many pairs and those texts
+# are better caught by exact matching.
+#
+# Texts should be normalised first (text_normalize.match_key).
+# =============================================================================
+
+from __future__ import annotations
+
+from typing import Sequence
+
+import numpy as np
+import pandas as pd
+
+NUM_PERM = 128
+SHINGLE_SIZE = 3
+MAX_BUCKET = 50
+
+_SHIFT = np.uint64(32)
+_MASK32 = np.uint64(0xFFFFFFFF)
+_MIX = np.array([0x9E3779B97F4A7C15, 0xC2B2AE3D27D4EB4F, 0x165667B19E3779F9,
+                 0xD6E8FEB86659FD93, 0xFF51AFD7ED558CCD, 0xC4CEB9FE1A85EC53],
+                dtype=np.uint64)
+_CHUNK = 1 << 16                      # shingles hashed per MinHash block
+
+
+def lsh_params(threshold: float, num_perm: int = NUM_PERM) -> tuple[int, int]:
+    """
+    (bands, rows) with bands·rows ≤ num_perm minimising the summed false
+    positive and false negative probability mass around `threshold` (the
+    usual LSH S-curve trade-off).
+    """
+    s = np.linspace(0.0, 1.0, 201)
+    best, best_cost = (1, num_perm), np.inf
+    for rows in range(1, num_perm + 1):
+        bands = num_perm // rows
+        p = 1.0 - (1.0 - s ** rows) ** bands
+        cost = np.trapezoid(np.where(s < threshold, p, 1.0 - p), s)
+        if cost < best_cost:
+            best, best_cost = (bands, rows), cost
+    return best
+
+
+def _shingle_hashes(texts: Sequence[str], shingle_size: int) -> tuple[np.ndarray, np.ndarray]:
+    """(doc index, 32-bit shingle hash) for every shingle of every text."""
+    words = pd.Series(list(texts), dtype=object).str.split()
+    counts = words.str.len().to_numpy(dtype="int64")
+    flat = [w for ws in words for w in ws]
+    if not flat:
+        return np.empty(0, dtype="int64"), np.empty(0, dtype=np.uint64)
+
+    token_hash = pd.util.hash_array(np.array(flat, dtype=object))
+    doc = np.repeat(np.arange(len(counts)), counts)
+    start = np.repeat(np.cumsum(counts) - counts, counts)
+    pos = np.arange(len(flat)) - start              # position inside its text
+    n = np.repeat(counts, counts)
+
+    # A shingle starts at every position with shingle_size words left in the
+    # text; a text shorter than that is one shingle starting at word 0.
+    first = (pos + shingle_size <= n) | ((n < shingle_size) & (pos == 0))
+    idx = np.flatnonzero(first)
+    value = np.zeros(len(idx), dtype=np.uint64)
+    for j in range(shingle_size):
+        inside = pos[idx] + j < n[idx]
+        h = token_hash[np.minimum(idx + j, len(flat) - 1)]
+        value += np.where(inside, h * _MIX[j % len(_MIX)], np.uint64(0))
+    value = (value >> _SHIFT) ^ (value & _MASK32)
+    return doc[idx], value
+
+
+def minhash_signatures(
+    texts: Sequence[str],
+    num_perm: int = NUM_PERM,
+    shingle_size: int = SHINGLE_SIZE,
+    seed: int = 1,
+) -> tuple[np.ndarray, np.ndarray]:
+    """
+    Returns:
+        (signatures, has_shingles) — a len(texts) × num_perm uint32 array and
+        a boolean mask of texts that had any words (the others must not be
+        compared: their signatures are all equal).
+    """
+    rng = np.random.default_rng(seed)
+    a = rng.integers(0, 1 << 64, num_perm, dtype=np.uint64, endpoint=False) | np.uint64(1)
+    b = rng.integers(0, 1 << 64, num_perm, dtype=np.uint64, endpoint=False)
+
+    doc, value = _shingle_hashes(texts, shingle_size)
+    sig = np.full((len(texts), num_perm), np.iinfo(np.uint32).max, dtype=np.uint32)
+    if len(doc):
+        # doc is sorted; blocks of ~_CHUNK shingles are cut on text
+        # boundaries so no reduceat segment straddles two blocks.
+        bounds = np.flatnonzero(np.r_[True, doc[1:] != doc[:-1]])
+        cut = np.searchsorted(bounds, np.arange(0, len(doc), _CHUNK), side="right") - 1
+        blocks = np.r_[bounds[np.unique(cut)], len(doc)]
+        for lo, hi in zip(blocks[:-1], blocks[1:]):
+            # num_perm × shingles, so each reduceat segment is contiguous
+            h = ((a[:, None] * value[None, lo:hi] + b[:, None]) >> _SHIFT).astype(np.uint32)
+            seg = bounds[(bounds >= lo) & (bounds < hi)]
+            sig[doc[seg]] = np.minimum.reduceat(h, seg - lo, axis=1).T
+    has_shingles = np.zeros(len(texts), dtype=bool)
+    has_shingles[doc] = True
+    return sig, has_shingles
+
+
+def _band_keys(sig: np.ndarray, bands: int, rows: int) -> np.ndarray:
+    keys = np.zeros((len(sig), bands), dtype=np.uint64)
+    for band in range(bands):
+        block = sig[:, band * rows:(band + 1) * rows].astype(np.uint64)
+        key = np.zeros(len(sig), dtype=np.uint64)
+        for j in range(rows):
+            key = key * _MIX[0] + block[:, j]
+        keys[:, band] = key
+    return keys
+
+
+def near_duplicate_pairs(
+    left: Sequence[str],
+    right: Sequence[str],
+    threshold: float = 0.8,
+    num_perm: int = NUM_PERM,
+    shingle_size: int = SHINGLE_SIZE,
+    max_bucket: int = MAX_BUCKET,
+    seed: int = 1,
+) -> pd.DataFrame:
+    """
+    Near-duplicate pairs between two collections of (normalised) texts.
+
+    Returns:
+        DataFrame with columns left, right (positions into the inputs) and
+        similarity (estimated Jaccard, rounded to 3 decimals), sorted by
+        (left, right). Pairs of identical texts are included.
+    """
+    columns = ["left", "right", "similarity"]
+    n_left = len(left)
+    sig, ok = minhash_signatures(list(left) + list(right), num_perm, shingle_size, seed)
+    bands, rows = lsh_params(threshold, num_perm)
+    keys = _band_keys(sig, bands, rows)
+
+    side = np.r_[np.zeros(n_left, dtype=bool), np.ones(len(sig) - n_left, dtype=bool)]
+    docs = np.flatnonzero(ok)
+    candidates = []
+    for band in range(bands):
+        table = pd.DataFrame({"key": keys[docs, band], "doc": docs})
+        size = table.groupby("key")["doc"].transform("size")
+        table = table[size <= max_bucket]
+        is_right = side[table["doc"].to_numpy()]
+        pairs = table[~is_right].merge(table[is_right], on="key", suffixes=("_l", "_r"))
+        if len(pairs):
+            candidates.append(pairs[["doc_l", "doc_r"]].to_numpy())
+    if not candidates:
+        return pd.DataFrame({c: pd.Series(dtype=t) for c, t in
+                             zip(columns, ["int64", "int64", "float64"])})
+
+    pairs = np.unique(np.concatenate(candidates), axis=0)
+    similarity = np.empty(len(pairs))
+    for lo in range(0, len(pairs), _CHUNK):
+        left_doc, right_doc = pairs[lo:lo + _CHUNK, 0], pairs[lo:lo + _CHUNK, 1]
+        similarity[lo:lo + _CHUNK] = (sig[left_doc] == sig[right_doc]).mean(axis=1)
+    keep = similarity >= threshold
+    return pd.DataFrame({
+        "left": pairs[keep, 0].astype("int64"),
+        "right": (pairs[keep, 1] - n_left).astype("int64"),
+        "similarity": np.round(similarity[keep], 3),
+    })
@@ -0,0 +1,153 @@
+# =============================================================================
+# ner_cache.py  –  persistent content-addressed cache of NER entity spans
+#
+# preprocess.py runs NER over every message on every run, and the "old" and
+# "new_only" variants are subsets of "combined", so `make preprocess-all`
+# sees most texts twice. Forum text also repeats (signatures, pasted
+# crisis-line numbers, cross-posts). The cache stores the entity list
+# recognize_entities() produced for a text, keyed by a hash of
+# (model namespace, text), in a single SQLite file under output/preprocessed/.
+#
+# The cache holds entity spans, not anonymized text, so placeholder numbering
+# is always recomputed by the anonymizer and stays identical to a cold run.
+# =============================================================================
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import time
+from typing import Iterable
+
+_SQL_CHUNK = 500   # keys per IN (...) query, well under SQLite's variable limit
+
+
+class EntityCache:
+    """SQLite-backed {hash(namespace, text): entity list} store with LRU eviction.
+
+    Usage::
+
+        with EntityCache("output/preprocessed/ner_cache.sqlite",
+                         namespace="nl_core_news_lg-3.8.0") as cache:
+            found = cache.get_many(texts)       # None for misses
+            cache.put_many(new_texts, new_entities)
+
+    namespace should identify everything that determines the spans (model
+    name + version); entries from another namespace never match. When more
+    than max_entries rows are stored, the least recently used are dropped.
+    """
+
+    def __init__(self, path: str, namespace: str, max_entries: int | None = 1_000_000):
+        self.path = path
+        self.namespace = namespace
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+        self._conn = sqlite3.connect(path)
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS entities ("
+            " key TEXT PRIMARY KEY,"
+            " namespace TEXT NOT NULL,"
+            " entities TEXT NOT NULL,"
+            " last_used REAL NOT NULL)"
+        )
+        self._conn.execute(
+            "CREATE INDEX IF NOT EXISTS entities_last_used ON entities (last_used)"
+        )
+        self._conn.commit()
+
+    # ── Keys ──────────────────────────────────────────────────────────────────
+
+    def key(self, text: str) -> str:
+        h = hashlib.blake2b(digest_size=16)
+        h.update(self.namespace.encode("utf-8"))
+        h.update(b"\0")
+        h.update(text.encode("utf-8"))
+        return h.hexdigest()
+
+    # ── Lookup / store ────────────────────────────────────────────────────────
+
+    def get_many(self, texts: list[str]) -> list[list[dict] | None]:
+        """Cached entity list per text (None on a miss), in input order."""
+        keys = [self.key(t) for t in texts]
+        found: dict[str, list[dict]] = {}
+        unique = list(dict.fromkeys(keys))
+        for i in range(0, len(unique), _SQL_CHUNK):
+            chunk = unique[i:i + _SQL_CHUNK]
+            rows = self._conn.execute(
+                f"SELECT key, entities FROM entities WHERE key IN ({','.join('?' * len(chunk))})",
+                chunk,
+            )
+            for key, payload in rows:
+                found[key] = json.loads(payload)
+
+        if found:
+            now = time.time()
+            self._conn.executemany(
+                "UPDATE entities SET last_used = ? WHERE key = ?",
+                [(now, k) for k in found],
+            )
+            self._conn.commit()
+
+        result = [found.get(k) for k in keys]
+        n_hits = sum(r is not None for r in result)
+        self.hits += n_hits
+        self.misses += len(result) - n_hits
+        return result
+
+    def put_many(self, texts: Iterable[str], entity_lists: Iterable[list[dict]]):
+        """Stores entity lists for texts, then evicts down to max_entries."""
+        now = time.time()
+        rows = [
+            (self.key(t), self.namespace, json.dumps(ents, ensure_ascii=False), now)
+            for t, ents in zip(texts, entity_lists)
+        ]
+        if not rows:
+            return
+        self._conn.executemany(
+            "INSERT OR REPLACE INTO entities (key, namespace, entities, last_used) "
+            "VALUES (?, ?, ?, ?)",
+            rows,
+        )
+        self._conn.commit()
+        self.evict()
+
+    # ── Maintenance ───────────────────────────────────────────────────────────
+
+    def __len__(self) -> int:
+        return self._conn.execute("SELECT COUNT(*) FROM entities").fetchone()[0]
+
+    def evict(self, max_entries: int | None = None) -> int:
+        """Drops least-recently-used rows beyond max_entries; returns rows removed."""
+        limit = self.max_entries if max_entries is None else max_entries
+        if limit is None:
+            return 0
+        excess = len(self) - limit
+        if excess <= 0:
+            return 0
+        self._conn.execute(
+            "DELETE FROM entities WHERE key IN ("
+            " SELECT key FROM entities ORDER BY last_used ASC LIMIT ?)",
+            (excess,),
+        )
+        self._conn.commit()
+        return excess
+
+    def stats(self) -> dict[str, int | float]:
+        lookups = self.hits + self.misses
+        return {
+            "hits":     self.hits,
+            "misses":   self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "entries":  len(self),
+        }
+
+    def close(self):
+        self._conn.close()
+
+    def __enter__(self) -> "EntityCache":
+        return self
+
+    def __exit__(self, *exc) -> None:
+        self.close()
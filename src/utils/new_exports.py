@@ -0,0 +1,228 @@
+# =============================================================================
+# new_exports.py  –  typed, parallel loader for the new-format CSV exports
+#
+# diagnose_new_data.py and integrate_datasets.py both read every
+# data/new/*.csv (semicolon-separated). `make ingest` runs them back to
+# back, so load_new_exports():
+#
+#   - reads the files in parallel: one thread per file, with pyarrow's
+#     multithreaded CSV reader (which releases the GIL)
+#   - renames columns with NEW_COL_MAP and types them with NEW_SCHEMA in the
+#     same worker. Text columns become strings with pandas' default NA
+#     tokens, IDs become integers (NaN-free columns as int64, the rest as
+#     Int64), and dates are parsed with parse_post_dates.
+#   - counts the skipped malformed lines per file and reports them
+#   - caches the result as Parquet, keyed on each file's name, size and
+#     mtime, so the second script in a run reads the cache and does not
+#     parse the CSVs again
+#
+# Without pyarrow the files are read serially with pandas' C engine, and
+# there is no cache.
+# =============================================================================
+
+from __future__ import annotations
+
+import importlib.util
+import json
+import os
+import warnings
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from dataset_io import CSV_NA_VALUES, none_to_nan
+from utils.thread_utils import parse_post_dates
+
+_PYARROW_AVAILABLE = importlib.util.find_spec("pyarrow") is not None
+if _PYARROW_AVAILABLE:
+    import pyarrow as pa
+    import pyarrow.csv as pa_csv
+    import pyarrow.parquet as pq
+
+# ── Column mapping and schema (internal names) ────────────────────────────────
+NEW_COL_MAP = {
+    "Content":           "MessageText",
+    "AuthorID":          "PosterID",
+    "PostDate":          "PostDate",
+    "PostModifiedDate":  "PostModifiedDate",
+    "ForumTopicID":      "ForumTopicID",
+    "ForumGroupID":      "ForumGroupID",
+    "ForumMessageID":    "ForumMessageID",
+    "post_type":         "post_type",
+    "Topic_title":       "Topic_title",
+}
+
+NEW_SCHEMA = {
+    "MessageText":      "string",
+    "PosterID":         "string",
+    "PostDate":         "datetime",
+    "PostModifiedDate": "datetime",
+    "ForumTopicID":     "int",
+    "ForumGroupID":     "int",
+    "ForumMessageID":   "int",
+    "post_type":        "string",
+    "Topic_title":      "string",
+}
+
+CACHE_FILE = "new_exports.parquet"
+_CACHE_VERSION = 1
+_CACHE_KEY = b"new_exports"
+
+def _int_column(s: pd.Series) -> pd.Series:
+    """int64 if every value is integral, Int64 if some are missing, else float."""
+    num = pd.to_numeric(s, errors="coerce")
+    if num.notna().all() and (num % 1 == 0).all():
+        return num.astype("int64")
+    if (num.dropna() % 1 == 0).all():
+        return num.astype("Int64")
+    return num
+
+
+def _apply_schema(df: pd.DataFrame) -> pd.DataFrame:
+    """Cast renamed columns to NEW_SCHEMA; other columns are left as read."""
+    for col, kind in NEW_SCHEMA.items():
+        if col not in df.columns:
+            continue
+        if kind == "datetime":
+            df[col] = parse_post_dates(df[col])
+        elif kind == "int":
+            df[col] = _int_column(df[col])
+        elif df[col].dtype == object:
+            df[col] = none_to_nan(df[col])
+    return df
+
+
+def _read_arrow(path: str) -> tuple[pd.DataFrame, int]:
+    bad_lines = []
+
+    def skip(row):
+        bad_lines.append(row.text)
+        return "skip"
+
+    raw_names = list(NEW_COL_MAP)
+    table = pa_csv.read_csv(
+        path,
+        parse_options=pa_csv.ParseOptions(
+            delimiter=";", quote_char='"', newlines_in_values=True,
+            invalid_row_handler=skip,
+        ),
+        # Everything in the schema arrives as text; _apply_schema types it,
+        # coercing malformed values to NaN/NaT the way the old loaders did.
+        convert_options=pa_csv.ConvertOptions(
+            column_types={c: pa.string() for c in raw_names},
+            null_values=sorted(CSV_NA_VALUES), strings_can_be_null=True,
+        ),
+    )
+    table = table.rename_columns([NEW_COL_MAP.get(c, c) for c in table.column_names])
+    return _apply_schema(table.to_pandas()), len(bad_lines)
+
+
+def _read_pandas(path: str) -> tuple[pd.DataFrame, int]:
+    with warnings.catch_warnings(record=True) as caught:
+        warnings.simplefilter("always", pd.errors.ParserWarning)
+        df = pd.read_csv(path, sep=";", quotechar='"', on_bad_lines="warn",
+                         dtype={c: str for c, k in NEW_COL_MAP.items()
+                                if NEW_SCHEMA.get(k) == "string"})
+    bad_lines = sum(str(w.message).count("Skipping line") for w in caught)
+    return _apply_schema(df.rename(columns=NEW_COL_MAP)), bad_lines
+
+
+def _manifest(paths: list[str]) -> list[list]:
+    return [[os.path.basename(p), os.path.getsize(p), os.stat(p).st_mtime_ns] for p in paths]
+
+
+def _read_cache(cache_path: str, manifest: list[list]) -> tuple[pd.DataFrame, dict] | None:
+    if not os.path.exists(cache_path):
+        return None
+    try:
+        meta = json.loads(pq.read_schema(cache_path).metadata[_CACHE_KEY])
+    except (KeyError, TypeError, ValueError, OSError, pa.ArrowException):
+        return None
+    if meta.get("version") != _CACHE_VERSION or meta.get("files") != manifest:
+        return None
+    df = pd.read_parquet(cache_path)
+    for col in df.columns:
+        if df[col].dtype == object:
+            df[col] = none_to_nan(df[col])
+    return df, meta["bad_lines"]
+
+
+def _write_cache(df: pd.DataFrame, cache_path: str, manifest: list[list],
+                 bad_lines: dict) -> None:
+    table = pa.Table.from_pandas(df, preserve_index=False)
+    meta = {"version": _CACHE_VERSION, "files": manifest, "bad_lines": bad_lines}
+    table = table.replace_schema_metadata(
+        {**(table.schema.metadata or {}), _CACHE_KEY: json.dumps(meta).encode()}
+    )
+    os.makedirs(os.path.dirname(cache_path) or ".", exist_ok=True)
+    tmp = cache_path + ".tmp"
+    pq.write_table(table, tmp)
+    os.replace(tmp, cache_path)
+
+
+def load_new_exports(
+    new_data_dir: str,
+    cache_path: str | None = None,
+    n_jobs: int | None = None,
+    files: list[str] | None = None,
+) -> pd.DataFrame:
+    """
+    All *.csv files in new_data_dir (in filename order), renamed to the
+    internal column names and typed per NEW_SCHEMA, with a source_file column.
+    'Group' metadata rows are kept; callers filter what they need.
+
+    cache_path: Parquet cache, reused while no export was added, removed or
+                changed. None disables caching.
+    n_jobs:     files read concurrently (default: one thread per file, up to
+                the CPU count).
+    files:      read only these file names (e.g. the exports added since the
+                last integration).
+    """
+    fnames = sorted(f for f in os.listdir(new_data_dir) if f.endswith(".csv")
+                    and (files is None or f in files))
+    if not fnames:
+        raise FileNotFoundError(f"No CSV files found in {new_data_dir}")
+    paths = [os.path.join(new_data_dir, f) for f in fnames]
+
+    use_cache = cache_path is not None and _PYARROW_AVAILABLE
+    manifest = _manifest(paths) if use_cache else []
+    cached = _read_cache(cache_path, manifest) if use_cache else None
+    if cached is not None:
+        combined, bad_lines = cached
+        print(f"  Loaded {len(combined)} rows from cache {cache_path} "
+              f"({len(fnames)} files unchanged)")
+        for fname, n in bad_lines.items():
+            if n:
+                print(f"    {fname}: {n} malformed lines were skipped")
+        return combined
+
+    if _PYARROW_AVAILABLE:
+        workers = n_jobs or min(len(paths), os.cpu_count() or 1)
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            results = list(pool.map(_read_arrow, paths))
+    else:
+        print("WARNING: pyarrow not installed – new exports are read serially, without cache.")
+        results = [_read_pandas(p) for p in paths]
+
+    parts, bad_lines = [], {}
+    for path, fname, (df, n_bad) in zip(paths, fnames, results):
+        df["source_file"] = fname
+        parts.append(df)
+        bad_lines[fname] = n_bad
+        print(f"  Loaded {path}: {len(df)} rows, {n_bad} malformed lines skipped")
+
+    # Every file is typed already. The concat only needs reconciling where
+    # files differ: int64 in one and Int64 (gaps) in another, or a column
+    # that one file lacks.
+    combined = pd.concat(parts, ignore_index=True)
+    for col, kind in NEW_SCHEMA.items():
+        if col not in combined.columns:
+            continue
+        if kind == "int":
+            combined[col] = _int_column(combined[col])
+        elif kind == "datetime" and not pd.api.types.is_datetime64_any_dtype(combined[col]):
+            combined[col] = parse_post_dates(combined[col])
+    if use_cache:
+        _write_cache(combined, cache_path, manifest, bad_lines)
+        print(f"  Cached as {cache_path}")
+    return combined
@@ -0,0 +1,118 @@
+# =============================================================================
+# pseudonyms.py  –  stable PosterID pseudonyms for streaming/incremental runs
+#
+# preprocess.anonymize_ids numbers posters user_1..user_N by sorted original
+# ID. That needs every ID before the first row can be written, and one new
+# poster renumbers everyone after them, which invalidates every downstream
+# artifact keyed on PosterID. Pseudonymizer assigns tokens that never change
+# once given, in a single pass, chunk by chunk:
+#
+#   "persistent"  user_N in order of first appearance, N continuing after
+#                 the stored table
+#   "hmac"        user_ + the first 16 hex digits of HMAC-SHA256(secret, ID).
+#                 The secret is a random 32-byte key created on first use;
+#                 whoever holds it can recompute (and so re-identify) tokens,
+#                 so it must stay as private as the mapping itself.
+#
+# Both append the IDs they saw for the first time to the mapping table
+# (anonymization_mapping.csv), which is only ever appended to. An ID already
+# in the table keeps its token, whichever mode gave it — so switching from
+# the sorted numbering to a stable mode keeps the existing tokens.
+# =============================================================================
+
+from __future__ import annotations
+
+import hashlib
+import hmac
+import os
+import secrets
+
+import pandas as pd
+
+MODES = ("persistent", "hmac")
+
+_KEY_BYTES = 32
+_HMAC_HEX_DIGITS = 16
+
+
+def load_mapping(path: str) -> dict[str, str]:
+    """{original ID as text: token} from a mapping table ({} if there is none)."""
+    if not os.path.exists(path):
+        return {}
+    table = pd.read_csv(path, dtype=str, keep_default_na=False)
+    return dict(zip(table["OriginalID"], table["AnonymizedID"]))
+
+
+def load_or_create_key(path: str) -> bytes:
+    """The HMAC secret at `path`, created (readable by the owner only) if missing."""
+    if os.path.exists(path):
+        with open(path, "rb") as f:
+            return f.read()
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    key = secrets.token_bytes(_KEY_BYTES)
+    fd = os.open(path, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600)
+    with os.fdopen(fd, "wb") as f:
+        f.write(key)
+    print(f"  Created pseudonym key {path} – keep it private and do not lose it.")
+    return key
+
+
+class Pseudonymizer:
+    """PosterID → token map that only ever grows.
+
+    Usage::
+
+        pseudonyms = Pseudonymizer("output/preprocessed/anonymization_mapping.csv")
+        for chunk in chunks:
+            chunk["PosterID"] = pseudonyms.tokens(chunk["PosterID"])
+        pseudonyms.save()      # appends the IDs seen for the first time
+
+    IDs are compared as text, so 12 and "12" are the same poster.
+    """
+
+    def __init__(self, mapping_path: str, mode: str = "persistent", key_path: str | None = None):
+        if mode not in MODES:
+            raise ValueError(f"Unknown pseudonym mode '{mode}', expected one of {MODES}")
+        if mode == "hmac" and key_path is None:
+            raise ValueError("mode 'hmac' needs a key_path")
+        self.mapping_path = mapping_path
+        self.mode = mode
+        self.mapping = load_mapping(mapping_path)
+        self._stored = len(self.mapping)
+        self._new: list[str] = []
+        self._key = load_or_create_key(key_path) if mode == "hmac" else None
+
+    def _assign(self, uid: str) -> str:
+        if self._key is not None:
+            digest = hmac.new(self._key, uid.encode("utf-8"), hashlib.sha256).hexdigest()
+            return f"user_{digest[:_HMAC_HEX_DIGITS]}"
+        return f"user_{len(self.mapping) + 1}"
+
+    def tokens(self, ids: pd.Series) -> pd.Series:
+        """Token for every value of ids (missing values stay missing)."""
+        present = ids.notna()
+        keys = ids.astype(str).where(present)
+        found = keys.map(self.mapping)
+        for uid in keys[present & found.isna()].unique():
+            self.mapping[uid] = self._assign(uid)
+            self._new.append(uid)
+        return keys.map(self.mapping)
+
+    @property
+    def new_ids(self) -> list[str]:
+        """IDs first seen since the table was loaded or last saved."""
+        return list(self._new)
+
+    def save(self) -> int:
+        """Appends the new IDs to the mapping table; returns how many."""
+        if not self._new:
+            return 0
+        rows = pd.DataFrame({"OriginalID": self._new,
+                             "AnonymizedID": [self.mapping[uid] for uid in self._new]})
+        os.makedirs(os.path.dirname(self.mapping_path) or ".", exist_ok=True)
+        exists = os.path.exists(self.mapping_path)
+        rows.to_csv(self.mapping_path, mode="a" if exists else "w", header=not exists, index=False)
+        n = len(self._new)
+        self._stored += n
+        self._new = []
+        return n
@@ -0,0 +1,176 @@
+# =============================================================================
+# text_normalize.py  –  shared, precompiled text normalisation kernels
+#
+# Three normalisations used across the pipeline:
+#
+#   standardize()      preprocess step 6: drop URLs, collapse repeated
+#                      sentence punctuation and whitespace (case kept)
+#   normalize_liwc()   postprocess step 5: lowercase, drop anonymisation
+#                      placeholders, cap character repetition, tidy spacing
+#   match_key()        integrate_datasets / diagnose_new_data: lowercase,
+#                      whitespace- and punctuation-free comparison key
+#
+# text_fingerprints() reduces match keys to stable 64-bit hashes, so a
+# corpus can be joined on an int64 column instead of on its full text.
+#
+# Each is a fixed list of precompiled (pattern, replacement) rules. The
+# *_series() functions do not run the rules once per message: they join a
+# batch of messages with a NUL separator, run every rule once over the joined
+# string (one C-level scan per rule for the whole batch instead of one Python
+# call per rule per message), and split the result again. No rule can match
+# across the separator — the character classes exclude "\x00" — so each
+# message comes out exactly as if it had been normalised on its own. A batch
+# in which a message itself contains NUL falls back to per-message calls.
+#
+# The patterns are written so that they only match text that actually
+# changes: "(?: [ \t]|\t)[ \t]*" skips the single spaces between words that
+# "[ \t]+" used to replace with themselves, and run-shaped patterns avoid a
+# group reference per match. (Fusing all rules into one alternation with a
+# replacement callback was tried too; the per-match Python callback made it
+# slower than the chain.)
+# =============================================================================
+
+from __future__ import annotations
+
+import re
+
+import numpy as np
+import pandas as pd
+
+_SEP = "\x00"
+_BATCH_SIZE = 10_000
+
+Rules = list[tuple[re.Pattern, str]]
+
+
+def _apply(text: str, rules: Rules) -> str:
+    for pattern, repl in rules:
+        text = pattern.sub(repl, text)
+    return text
+
+
+# ── standardize ───────────────────────────────────────────────────────────────
+
+_STANDARDIZE: Rules = [
+    (re.compile(r"https?://[^\s\x00]+|www\.[^\s\x00]+"), ""),
+    (re.compile(r"[!?.]+(?=[!?.])"), ""),            # "?!." → "."
+    (re.compile(r"[\r\n\t]+"), " "),
+    (re.compile(r" {2,}"), " "),
+]
+
+
+def standardize(text: str) -> str:
+    return _apply(text, _STANDARDIZE).strip()
+
+
+# ── normalize_liwc ────────────────────────────────────────────────────────────
+
+_LIWC: Rules = [
+    (re.compile(r"\[entity_[a-z_]+_\d+\]"), " "),   # anonymization placeholders
+    (re.compile(r"([^\n\x00])\1\1\1+"), r"\1\1"),   # 4+ repeated chars → 2
+    (re.compile(r"(?: [ \t]|\t)[ \t]*"), " "),       # collapse horizontal whitespace
+    (re.compile(r"\n{3,}"), "\n\n"),                # max two consecutive newlines
+]
+
+
+def normalize_liwc(text: str) -> str:
+    return _apply(text.lower(), _LIWC).strip()
+
+
+# ── match_key ─────────────────────────────────────────────────────────────────
+# Leading/trailing whitespace only ever turns into a leading/trailing space,
+# so the final strip() covers the strip() the callers used to do up front.
+
+_HTML: Rules = [
+    (re.compile(r"<[^>\x00]+>"), " "),
+    (re.compile(r"&amp;"), "&"),
+    (re.compile(r"&nbsp;"), " "),
+    (re.compile(r"&quot;"), '"'),
+    (re.compile(r"&[a-z]+;"), " "),
+]
+_MATCH: Rules = [
+    (re.compile(r"(?: \s|[^\S ])\s*"), " "),
+    (re.compile(r"[^\w\s\x00]+"), ""),
+]
+
+
+def _match_rules(strip_html: bool) -> Rules:
+    return _HTML + _MATCH if strip_html else _MATCH
+
+
+def match_key(text: str, strip_html: bool = False) -> str:
+    return _apply(text.lower(), _match_rules(strip_html)).strip()
+
+
+# ── Series entry points ───────────────────────────────────────────────────────
+
+def _normalize_series(
+    s: pd.Series,
+    rules: Rules,
+    lower: bool = False,
+    batch_size: int = _BATCH_SIZE,
+) -> pd.Series:
+    """rules over every value of s (missing values as ""), then strip()."""
+    values = s.fillna("").astype(str).tolist()
+    out: list[str] = []
+    for start in range(0, len(values), batch_size):
+        batch = values[start:start + batch_size]
+        joined = _SEP.join(batch)
+        if joined.count(_SEP) != len(batch) - 1:
+            out.extend(_apply(t.lower() if lower else t, rules) for t in batch)
+            continue
+        if lower:
+            joined = joined.lower()
+        out.extend(_apply(joined, rules).split(_SEP))
+    return pd.Series(out, index=s.index, dtype=object, name=s.name).str.strip()
+
+
+def standardize_series(s: pd.Series) -> pd.Series:
+    return _normalize_series(s, _STANDARDIZE)
+
+
+def normalize_liwc_series(s: pd.Series) -> pd.Series:
+    return _normalize_series(s, _LIWC, lower=True)
+
+
+def match_key_series(s: pd.Series, strip_html: bool = False) -> pd.Series:
+    return _normalize_series(s, _match_rules(strip_html), lower=True)
+
+
+_CONFIRM_HASH_KEY = "depressieconnect"   # 16 bytes, independent of pandas' default
+
+
+def text_fingerprints(
+    s: pd.Series,
+    strip_html: bool = False,
+    batch_size: int = 100_000,
+    confirm: bool = False,
+) -> pd.DataFrame:
+    """
+    Stable 64-bit fingerprint of match_key() for every value of s.
+
+    Keys are computed batch by batch and only their hash and length are
+    kept, so the normalised text of one batch at most is in memory. The hash
+    is pandas' hash_array (SipHash with a fixed key): identical keys always
+    get identical fingerprints, across runs and machines. Different keys
+    colliding is unlikely but possible — confirm on the text where it matters.
+
+    confirm=True adds fp2, a second fingerprint under an independent hash
+    key, for when the text is no longer at hand to confirm a match: equal
+    (fp, fp2) pairs of different keys are a 128-bit collision.
+
+    Returns:
+        DataFrame on s's index with columns fp (int64), key_len (length of
+        the match key, for the "non-trivial message" filters) and, with
+        confirm, fp2 (int64).
+    """
+    empty = np.empty(0, dtype="int64")
+    cols = {"fp": [empty], "key_len": [empty]} | ({"fp2": [empty]} if confirm else {})
+    for start in range(0, len(s), batch_size):
+        keys = match_key_series(s.iloc[start:start + batch_size], strip_html=strip_html)
+        values = keys.to_numpy(dtype=object)
+        cols["fp"].append(pd.util.hash_array(values).view("int64"))
+        cols["key_len"].append(keys.str.len().to_numpy(dtype="int64"))
+        if confirm:
+            cols["fp2"].append(pd.util.hash_array(values, hash_key=_CONFIRM_HASH_KEY).view("int64"))
+    return pd.DataFrame({c: np.concatenate(parts) for c, parts in cols.items()}, index=s.index)
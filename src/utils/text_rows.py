@@ -0,0 +1,54 @@
+# =============================================================================
+# text_rows.py  –  text keys, text hashes and CSR rows shared by the stores
+#
+# The CDS matcher and store (cds_matcher.py, cds_store.py) and the token
+# corpus (corpus.py) all keep one row per distinct lowercased text and find
+# a text's row by the 64-bit hash of that key. A row is a CSR slice:
+# row i is indices[indptr[i]:indptr[i + 1]].
+#
+# take_rows() reads only the indptr entries of the rows it takes, so taking a
+# few rows of a memory-mapped corpus does not read the whole array.
+# =============================================================================
+
+from __future__ import annotations
+
+import numpy as np
+import pandas as pd
+
+
+def text_keys(texts) -> pd.Series:
+    """texts as matched and tokenised: lowercased, missing values as ""."""
+    return pd.Series(texts, dtype=object).fillna("").astype(str).str.lower()
+
+
+def text_hashes(keys: pd.Series) -> np.ndarray:
+    return pd.util.hash_pandas_object(keys, index=False).to_numpy(dtype=np.uint64)
+
+
+def csr_rows(rows: list[list[int]]) -> tuple[np.ndarray, np.ndarray]:
+    indptr = np.zeros(len(rows) + 1, dtype=np.int64)
+    indptr[1:] = np.cumsum([len(r) for r in rows])
+    indices = np.fromiter((i for r in rows for i in r), dtype=np.int32, count=int(indptr[-1]))
+    return indptr, indices
+
+
+def concat_rows(parts: list[tuple[np.ndarray, np.ndarray]]) -> tuple[np.ndarray, np.ndarray]:
+    """CSR (indptr, indices) pairs stacked row-wise, in order."""
+    indptr = [np.zeros(1, dtype=np.int64)]
+    offset = 0
+    for ptr, _ in parts:
+        indptr.append(ptr[1:] + offset)
+        offset += int(ptr[-1])
+    return (np.concatenate(indptr),
+            np.concatenate([idx for _, idx in parts] or [np.zeros(0, dtype=np.int32)]))
+
+
+def take_rows(indptr: np.ndarray, indices: np.ndarray,
+              codes) -> tuple[np.ndarray, np.ndarray]:
+    """The CSR rows at positions codes, in that order (rows may repeat)."""
+    codes = np.asarray(codes, dtype=np.int64)
+    lengths = (indptr[codes + 1] - indptr[codes]).astype(np.int64)
+    out_ptr = np.zeros(len(codes) + 1, dtype=np.int64)
+    np.cumsum(lengths, out=out_ptr[1:])
+    offsets = np.repeat(indptr[codes] - out_ptr[:-1], lengths)
+    return out_ptr, np.asarray(indices)[offsets + np.arange(out_ptr[-1])]
@@ -5,6 +5,7 @@
 from __future__ import annotations
 
 import re
+import numpy as np
 import pandas as pd
 
 POSTER_COL = "PosterID"
@@ -115,6 +116,39 @@ def sentence_stats(text: str) -> dict:
     }
 
 
+def sentence_stats_frame(texts: pd.Series, words=None) -> pd.DataFrame:
+    """
+    sentence_stats of every value of texts as one DataFrame (same columns
+    and values). words: the rows of texts as a utils.corpus.Corpus of
+    tokenize_words tokens (Corpus.letters()); tokenised here if None.
+    """
+    if words is None:
+        from utils.corpus import Corpus
+        words = Corpus.from_texts(texts).letters()
+    texts = texts.astype(str).reset_index(drop=True)
+    stripped = texts.str.strip()
+
+    n_sentences = texts.map(lambda t: len(split_sentences(t))).to_numpy()
+    n_sentences = np.where((n_sentences == 0) & (stripped != "").to_numpy(), 1, n_sentences)
+    n_words = words.lengths
+    n_chars = np.bincount(words.doc_ids(), weights=words.token_lengths()[words.tokens],
+                          minlength=len(words))
+    with np.errstate(divide="ignore", invalid="ignore"):
+        per_sentence = np.where(n_sentences > 0, n_words / n_sentences, 0.0)
+        avg_length = np.where(n_words > 0, n_chars / n_words, 0.0)
+
+    return pd.DataFrame({
+        "n_sentences":        n_sentences.astype(np.int64),
+        "n_words":            n_words.astype(np.int64),
+        "words_per_sentence": per_sentence,
+        "avg_word_length":    avg_length,
+        "n_questions":        texts.str.count(r"\?").to_numpy(dtype=np.int64),
+        "n_exclamations":     texts.str.count("!").to_numpy(dtype=np.int64),
+        "n_commas":           texts.str.count(",").to_numpy(dtype=np.int64),
+        "ends_in_question":   stripped.str.endswith("?").to_numpy(dtype=bool),
+    })
+
+
 # ── Emoji helper ──────────────────────────────────────────────────────────────
 
 # Broad emoji Unicode ranges; no external dependency needed.
@@ -311,3 +311,56 @@ class TestComputeCategoryRanking:
         result = compute_category_ranking(self._make_df())
         row = result[result["category"] == "Catastrophizing"].iloc[0]
         assert row["n_matches_total"] == 3
+
+
+# ---------------------------------------------------------------------------
+# compute_phrase_ranking  (cds_prevalence.py)
+# ---------------------------------------------------------------------------
+
+import numpy as np
+
+import cds_prevalence
+from cds_prevalence import compute_phrase_ranking, phrase_matrix
+
+
+class TestComputePhraseRanking:
+    LEXICON = pd.DataFrame({"categories": ["Labeling", "Overgeneralizing", "Mindreading"],
+                            "variants": [[], [], []]},
+                           index=["ik ben", "nooit", "ze denken"])
+
+    @pytest.fixture(autouse=True)
+    def _lexicon(self, monkeypatch):
+        monkeypatch.setattr(cds_prevalence, "load_CDS", lambda language: self.LEXICON)
+
+    def _inputs(self):
+        df = pd.DataFrame({"role": ["post", "reply", "reply", "post", "reply"]})
+        phrases = pd.DataFrame({
+            "ik ben":    [1, 0, 1, 1, 0],
+            "nooit":     [0, 0, 0, 0, 0],
+            "ze denken": [0, 1, 1, 0, 1],
+            "verdwenen": [1, 0, 0, 0, 0],   # not in the lexicon any more
+        })
+        return df, phrases
+
+    def test_counts_by_role(self):
+        df, phrases = self._inputs()
+        result = compute_phrase_ranking(df, phrases).set_index("phrase")
+        assert result.loc["ik ben", "total_matches"] == 3
+        assert result.loc["ik ben", "matches_posts"] == 2
+        assert result.loc["ik ben", "matches_replies"] == 1
+        assert result.loc["ze denken", "matches_replies"] == 3
+        assert result.loc["ze denken", "prevalence_pct"] == 60.0
+        assert result.loc["verdwenen", "category"] == "unknown"
+        assert result.loc["nooit", "category"] == "Overgeneralizing"
+
+    def test_sorted_descending_by_total(self):
+        df, phrases = self._inputs()
+        assert compute_phrase_ranking(df, phrases)["total_matches"].is_monotonic_decreasing
+
+    def test_sparse_columns_give_same_ranking(self):
+        df, phrases = self._inputs()
+        sparse = phrases.astype(pd.SparseDtype("int64", 0))
+        assert phrase_matrix(sparse).nnz == 7
+        pd.testing.assert_frame_equal(compute_phrase_ranking(df, sparse),
+                                      compute_phrase_ranking(df, phrases))
+        assert compute_phrase_ranking(df, sparse)["total_matches"].dtype == np.int64
@@ -0,0 +1,247 @@
+"""
+Tests for src/utils/cds_matcher.py — the single-pass matcher must find
+exactly the phrases that one `\\b<phrase>\\b` search per phrase and variant
+finds (find_CDS_in_text), and process_dataset must keep its output shapes.
+Also src/utils/cds_store.py — stored hits are reused and only unseen texts
+are matched.
+"""
+
+import argparse
+import random
+import re
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from utils import cds_matcher as cm
+
+
+# Small stand-in for load_CDS(): phrase index, variants, categories
+LEXICON = pd.DataFrame(
+    {
+        "variants": [[], ["ik ben een"], [], ["iedereen haat"], [], [], ["'t is"]],
+        "categories": ["Labeling", "Labeling", "Overgeneralizing", "Overgeneralizing",
+                       "Catastrophizing", "Catastrophizing", "Mindreading"],
+    },
+    index=["Ik ben", "Ik ben een mislukking", "nooit", "iedereen", "het ergste",
+           "een ramp", "het is"],
+)
+
+
+def _find_regex(phrase, variants, text):
+    """The per-phrase search the matcher replaces."""
+    for pattern in [phrase, *variants]:
+        if re.search(r"\b" + re.escape(pattern.lower()) + r"\b", text):
+            return 1
+    return 0
+
+
+def _reference(texts):
+    return pd.DataFrame(
+        [[_find_regex(p, LEXICON.loc[p, "variants"], t.lower()) for p in LEXICON.index]
+         for t in texts],
+        columns=list(LEXICON.index),
+    )
+
+
+@pytest.fixture
+def matcher():
+    return cm.CDSMatcher.from_lexicon(LEXICON)
+
+
+class TestCDSMatcher:
+    def test_finds_phrase_and_variant(self, matcher):
+        assert matcher.find("ik ben moe") == [0]
+        assert matcher.find("iedereen haat mij") == [3]
+        assert matcher.find("ik ben een mislukking") == [0, 1]
+
+    def test_word_boundaries(self, matcher):
+        assert matcher.find("ik bent") == []
+        assert matcher.find("nooitmeer") == []
+        assert matcher.find("zo'n ramp, nooit!") == [2]
+        assert matcher.find("ik  ben") == []   # two spaces: no match, as with the regex
+
+    def test_overlapping_phrases_all_found(self, matcher):
+        assert matcher.find("het is het ergste, een ramp") == [4, 5, 6]
+
+    def test_leading_punctuation_needs_word_before(self, matcher):
+        # \b before "'" only holds after a word character
+        assert matcher.find("zeg 't is zo") == []
+        assert matcher.find("zeg't is zo") == [6]
+
+    def test_matches_per_phrase_search_on_random_texts(self, matcher):
+        rng = random.Random(0)
+        words = ["ik", "ben", "een", "mislukking", "nooit", "iedereen", "haat", "het",
+                 "ergste", "ramp", "is", "t", "bent", "nooitmeer", "Ik", "BEN"]
+        seps = [" ", " ", " ", "  ", ", ", "'", "!", ".", "-", "\n"]
+        texts = ["".join(rng.choice(words) + rng.choice(seps) for _ in range(rng.randint(0, 12)))
+                 for _ in range(400)]
+        result = matcher.match(pd.Series(texts)).phrase_frame().reset_index(drop=True)
+        pd.testing.assert_frame_equal(result, _reference(texts))
+
+    def test_match_is_sparse_and_maps_categories(self, matcher):
+        texts = pd.Series(["ik ben een mislukking", "mooi weer", None, "ik ben een mislukking",
+                           "een ramp, nooit"], index=[10, 11, 12, 13, 14])
+        matches = matcher.match(texts)
+        assert matches.phrase_indptr.tolist() == [0, 2, 2, 2, 4, 6]
+        assert matches.phrase_indices.tolist() == [0, 1, 0, 1, 2, 5]
+        assert matches.flags.tolist() == [1, 0, 0, 1, 1]
+        cats = matches.category_frame()
+        assert list(cats.index) == [10, 11, 12, 13, 14]
+        assert cats.loc[14].to_dict() == {"Labeling": 0, "Overgeneralizing": 1,
+                                          "Catastrophizing": 1, "Mindreading": 0}
+
+    def test_sparse_outputs_match_dense(self, matcher):
+        texts = pd.Series(["ik ben een mislukking", "mooi weer", "een ramp, nooit"])
+        matches = matcher.match(texts)
+        matrix = matches.phrase_matrix()
+        assert matrix.shape == (3, len(LEXICON)) and matrix.nnz == 4
+        assert (matrix.toarray() == matches.phrase_frame().to_numpy()).all()
+        frame = matches.phrase_frame(sparse=True)
+        assert all(isinstance(t, pd.SparseDtype) for t in frame.dtypes)
+        pd.testing.assert_frame_equal(frame.sparse.to_dense(), matches.phrase_frame())
+
+    def test_sharded_pool_matches_single_process(self, matcher):
+        rng = random.Random(1)
+        words = ["ik", "ben", "een", "mislukking", "nooit", "iedereen", "haat", "ramp", "zo"]
+        texts = pd.Series([" ".join(rng.choice(words) for _ in range(rng.randint(0, 8)))
+                           for _ in range(300)])
+        single = matcher.match(texts, n_jobs=1)
+        for _ in range(2):   # same result on every run
+            pooled = matcher.match(texts, n_jobs=3, chunk_size=7)
+            np.testing.assert_array_equal(pooled.phrase_indptr, single.phrase_indptr)
+            np.testing.assert_array_equal(pooled.phrase_indices, single.phrase_indices)
+            np.testing.assert_array_equal(pooled.category_indices, single.category_indices)
+        pd.testing.assert_frame_equal(pooled.phrase_frame(), single.phrase_frame())
+
+    def test_concat_rows_keeps_order(self):
+        parts = [cm.csr_rows([[1], []]), cm.csr_rows([]), cm.csr_rows([[0, 2]])]
+        indptr, indices = cm.concat_rows(parts)
+        assert indptr.tolist() == [0, 1, 1, 3]
+        assert indices.tolist() == [1, 0, 2]
+
+    def test_multiple_categories_per_phrase(self):
+        lexicon = pd.DataFrame({"variants": [[]], "categories": [["A", "B"]]},
+                               index=["altijd"])
+        cats = cm.CDSMatcher.from_lexicon(lexicon).match(pd.Series(["altijd"])).category_frame()
+        assert cats.iloc[0].tolist() == [1, 1]
+
+
+class TestProcessDataset:
+    @pytest.fixture(autouse=True)
+    def _lexicon(self, monkeypatch, matcher):
+        monkeypatch.setattr(cm, "compile_cds", lambda language="NL": matcher)
+
+    def test_all_variants(self):
+        tweets = pd.DataFrame({"text": ["Ik ben een mislukking", "hallo"]})
+        phrases, cats, per_tweet = cm.process_dataset(tweets, output="all_variants", language="NL")
+        assert list(phrases.columns) == list(LEXICON.index)
+        assert phrases.iloc[0].sum() == 2
+        assert list(cats.columns) == ["Labeling", "Overgeneralizing", "Catastrophizing",
+                                      "Mindreading"]
+        assert per_tweet["CDS"].tolist() == [1, 0]
+        assert per_tweet["CDS"].dtype == np.int64
+
+    def test_sparse_phrase_output(self):
+        tweets = pd.DataFrame({"text": ["nooit", "hallo"]})
+        phrases, _, _ = cm.process_dataset(tweets, output="all_variants", sparse=True)
+        assert phrases.sparse.density == 1 / (2 * len(LEXICON))
+        assert phrases["nooit"].sum() == 1
+
+    def test_single_outputs(self):
+        tweets = pd.DataFrame({"text": ["nooit"]})
+        assert cm.process_dataset(tweets, output="per_tweet")["CDS"].iloc[0] == 1
+        assert cm.process_dataset(tweets, output="per_category")["Overgeneralizing"].iloc[0] == 1
+        assert cm.process_dataset(tweets, output="per_phrase")["nooit"].iloc[0] == 1
+
+    def test_raises_on_missing_text_column(self):
+        with pytest.raises(ValueError, match="text"):
+            cm.process_dataset(pd.DataFrame({"content": ["hallo"]}))
+
+    def test_raises_on_invalid_output_type(self):
+        with pytest.raises(NotImplementedError):
+            cm.process_dataset(pd.DataFrame({"text": ["hallo"]}), output="invalid_type")
+
+
+class TestAgainstCDSModule:
+    """Same hits as utils/CDS.py where that (gitignored) module is present."""
+
+    def test_matches_find_CDS_in_text(self):
+        CDS = pytest.importorskip("utils.CDS")
+        cds = CDS.load_CDS(language="NL")
+        texts = ["ik ben een mislukking", "niemand vindt mij leuk", "alles gaat altijd mis",
+                 "ik weet zeker dat ze me haten", "mooi weer vandaag"]
+        expected = pd.DataFrame(
+            [[CDS.find_CDS_in_text(p, cds.loc[p, "variants"], t) for p in cds.index]
+             for t in texts],
+            columns=list(cds.index),
+        )
+        matches = cm.CDSMatcher.from_lexicon(cds).match(pd.Series(texts))
+        pd.testing.assert_frame_equal(matches.phrase_frame(), expected, check_dtype=False)
+
+
+# ---------------------------------------------------------------------------
+# CDS store  (utils/cds_store.py)
+# ---------------------------------------------------------------------------
+
+from utils import cds_store
+
+
+class TestCDSStore:
+    @pytest.fixture
+    def counting(self, monkeypatch, matcher):
+        """The fixture lexicon, counting the texts sent to the matcher."""
+        seen = []
+        match = matcher.match
+
+        def counted(texts, **kwargs):
+            seen.extend(texts)
+            return match(texts, **kwargs)
+
+        monkeypatch.setattr(matcher, "match", counted)
+        monkeypatch.setattr(cds_store, "compile_cds", lambda language="NL": matcher)
+        return seen
+
+    def _texts(self):
+        return pd.Series(["Ik ben een mislukking", "mooi weer", "nooit", "mooi weer", None],
+                         index=[5, 6, 7, 8, 9])
+
+    def test_rerun_reads_store_without_matching(self, tmp_path, counting, matcher):
+        first = cds_store.score_texts(self._texts(), "old", str(tmp_path))
+        assert len(counting) == 4    # distinct texts, missing as ""
+        assert (tmp_path / "cds" / "cds_phrases_old.npz").exists()
+
+        counting.clear()
+        again = cds_store.score_texts(self._texts(), "old", str(tmp_path))
+        assert counting == []
+        pd.testing.assert_frame_equal(again.phrase_frame(), first.phrase_frame())
+        pd.testing.assert_frame_equal(again.category_frame(),
+                                      matcher.match(self._texts()).category_frame())
+
+    def test_only_new_texts_are_matched(self, tmp_path, counting):
+        cds_store.score_texts(self._texts(), "old", str(tmp_path))
+        counting.clear()
+        texts = pd.Series(["een ramp", "nooit", "MOOI WEER"])
+        result = cds_store.score_texts(texts, "old", str(tmp_path))
+        assert counting == ["een ramp"]
+        assert result.flags.tolist() == [1, 1, 0]
+
+    def test_variants_have_own_stores_and_share_matching(self, tmp_path, counting):
+        texts = {"old": pd.Series(["nooit", "hallo"]),
+                 "combined": pd.Series(["nooit", "hallo", "een ramp"])}
+        result = cds_store.score_variants(texts, str(tmp_path))
+        assert sorted(counting) == ["een ramp", "hallo", "nooit"]
+        assert result["old"].flags.tolist() == [1, 0]
+        assert result["combined"].flags.tolist() == [1, 0, 1]
+        assert "--n-jobs" in cds_store.add_cds_args(argparse.ArgumentParser()).format_help()
+        assert len(cds_store.CDSStore(cds_store.store_path(str(tmp_path), "old"),
+                                      cds_store.compile_cds())) == 2
+
+    def test_other_lexicon_starts_over(self, tmp_path, counting, monkeypatch):
+        cds_store.score_texts(self._texts(), "old", str(tmp_path))
+        other = cm.CDSMatcher.from_lexicon(LEXICON.drop(index="nooit"))
+        monkeypatch.setattr(cds_store, "compile_cds", lambda language="NL": other)
+        result = cds_store.score_texts(pd.Series(["nooit"]), "old", str(tmp_path))
+        assert result.flags.tolist() == [0]
+        assert "nooit" not in result.phrases
@@ -0,0 +1,145 @@
+"""
+Tests for src/utils/corpus.py — the stored token ids must give the same
+tokens, counts and rates as the per-text tokenisers they replace
+(liwc_analysis._tokenize, thread_utils.tokenize_words / sentence_stats,
+absolutist_rate, most_common_words), and postprocess writes the corpus.
+"""
+
+import random
+from collections import Counter
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from analysis import most_common_words
+from liwc_analysis import _tokenize, liwc_count_matrix, score_text
+from role_analysis import compute_role_stats
+from utils.absolutist import absolutist_rate, absolutist_rates
+from utils.corpus import Corpus, corpus_dir, load_corpus, tokenize_texts, write_corpus
+from utils.thread_utils import sentence_stats, sentence_stats_frame, tokenize_words
+
+
+def _random_texts(n=300, seed=0):
+    rng = random.Random(seed)
+    words = ["Ik", "ben", "altijd", "moe", "NOOIT", "héél", "2x", "abc_def", "R2D2", "zo",
+             "iedereen", "?", "!", "...", "ok", "über"]
+    seps = [" ", " ", ", ", ". ", "! ", "? ", "\n", "-", "  "]
+    return pd.Series(["".join(rng.choice(words) + rng.choice(seps)
+                              for _ in range(rng.randint(0, 15))) for _ in range(n)])
+
+
+def _rows(corpus):
+    return [[corpus.vocab[t] for t in corpus.tokens[corpus.offsets[i]:corpus.offsets[i + 1]]]
+            for i in range(len(corpus))]
+
+
+@pytest.fixture
+def texts():
+    return _random_texts()
+
+
+class TestCorpus:
+    def test_tokens_match_liwc_tokenize(self, texts):
+        assert _rows(Corpus.from_texts(texts)) == [_tokenize(t) for t in texts]
+
+    def test_letters_match_tokenize_words(self, texts):
+        assert _rows(Corpus.from_texts(texts).letters()) == [tokenize_words(t) for t in texts]
+
+    def test_missing_text_is_empty_row(self):
+        corpus = Corpus.from_texts(pd.Series(["a b", None]))
+        assert corpus.lengths.tolist() == [2, 0]
+        assert corpus.tokens.dtype == np.int32
+
+    def test_doc_term_matrix_counts(self):
+        corpus = Corpus.from_texts(pd.Series(["ik ik ben", "ben"]))
+        assert corpus.doc_term_matrix().toarray().tolist() == [[2, 1], [0, 1]]
+        assert corpus.term_counts().tolist() == [2, 2]
+
+    def test_most_common_keeps_counter_order(self, texts):
+        corpus = Corpus.from_texts(texts)
+        expected = Counter(t for text in texts for t in _tokenize(text)).most_common(8)
+        assert corpus.most_common(8) == expected
+
+    def test_lookup_takes_rows_and_tokenises_unknown(self, texts):
+        stored = Corpus.from_texts(texts.drop_duplicates())
+        wanted = pd.Series(["NIEUW woord", texts[3], None, texts[0], "nieuw"])
+        rows = stored.lookup(wanted)
+        assert _rows(rows) == [_tokenize(t) for t in wanted.fillna("")]
+        assert rows.vocab[:len(stored.vocab)] == stored.vocab
+
+    def test_save_and_memory_mapped_load(self, tmp_path, texts):
+        written = write_corpus(texts, str(tmp_path))
+        loaded = load_corpus(str(tmp_path))
+        assert isinstance(loaded.tokens, np.memmap)
+        assert loaded.vocab == written.vocab
+        assert len(loaded) == texts.str.lower().nunique()
+        assert _rows(tokenize_texts(texts, loaded)) == [_tokenize(t) for t in texts]
+
+    def test_lookup_on_memory_mapped_corpus_keeps_it_mapped(self, tmp_path, texts):
+        write_corpus(texts, str(tmp_path))
+        loaded = load_corpus(str(tmp_path))
+        wanted = pd.Series([texts[5], "onbekend woord", texts[5], "", "ONBEKEND"])
+        rows = loaded.lookup(wanted)
+        assert _rows(rows) == [_tokenize(t) for t in wanted]
+        assert rows.hashes.tolist() == loaded.lookup(wanted.str.lower()).hashes.tolist()
+        assert isinstance(loaded.tokens, np.memmap) and len(loaded) == texts.str.lower().nunique()
+
+    def test_rewrite_reuses_stored_rows(self, tmp_path, monkeypatch):
+        write_corpus(pd.Series(["een twee", "drie"]), str(tmp_path))
+        seen = []
+        original = Corpus.from_texts.__func__
+
+        def spy(cls, texts, vocab=None):
+            seen.extend(texts)
+            return original(cls, texts, vocab)
+
+        monkeypatch.setattr(Corpus, "from_texts", classmethod(spy))
+        corpus = write_corpus(pd.Series(["drie", "Vier"]), str(tmp_path))
+        assert seen == ["vier"]
+        assert _rows(load_corpus(str(tmp_path))) == [["drie"], ["vier"]]
+        assert len(corpus) == 2
+
+    def test_missing_corpus_loads_as_none(self, tmp_path):
+        assert load_corpus(str(tmp_path / "nope")) is None
+        assert corpus_dir("output") == corpus_dir("output", "combined")
+
+
+class TestConsumers:
+    def test_absolutist_rates_match_per_text(self, texts):
+        expected = [absolutist_rate(t) for t in texts]
+        assert absolutist_rates(Corpus.from_texts(texts)).tolist() == expected
+
+    def test_sentence_stats_frame_matches_per_text(self, texts):
+        texts = pd.concat([texts, pd.Series(["", "  ", "!!!", "Waarom? "])], ignore_index=True)
+        expected = pd.DataFrame([sentence_stats(t) for t in texts])
+        pd.testing.assert_frame_equal(sentence_stats_frame(texts), expected)
+
+    def test_liwc_count_matrix_from_stored_tokens(self, tmp_path, texts):
+        terms = {"altijd": ["absolutist"], "ik": ["i"], "moe*": ["tired"]}
+        cats = ["absolutist", "i", "tired"]
+        write_corpus(texts, str(tmp_path))
+        stored = load_corpus(str(tmp_path))
+        counts, word_count = liwc_count_matrix(texts, terms, cats,
+                                               tokens=tokenize_texts(texts, stored))
+        assert counts.tolist() == [[score_text(t, terms, cats)[c] for c in cats] for t in texts]
+        assert word_count.tolist() == [len(_tokenize(t)) for t in texts]
+
+    def test_most_common_words_from_corpus(self, tmp_path, texts):
+        messages = pd.DataFrame({"MessageText": texts})
+        write_corpus(texts, str(tmp_path))
+        kwargs = dict(top_n=10, remove_stopwords=True, stopwords={"ik", "zo"})
+        pd.testing.assert_frame_equal(
+            most_common_words(messages, corpus=load_corpus(str(tmp_path)), **kwargs),
+            most_common_words(messages, **kwargs), check_dtype=False,
+        )
+
+    def test_role_popular_words_match_counter(self, texts):
+        df = pd.DataFrame({"MessageText": texts, "ForumTopicID": np.arange(len(texts)) % 40,
+                           "PostDate": pd.date_range("2021-01-01", periods=len(texts), freq="h")})
+        stats = compute_role_stats(df, stopwords={"ik"}, top_n_words=10)
+        roles = stats["df_roles"]
+        for role in ("post", "reply"):
+            counter = Counter(w for t in roles.loc[roles["role"] == role, "MessageText"]
+                              for w in tokenize_words(t) if w != "ik" and len(w) > 1)
+            assert stats["popular_words"][role] == counter.most_common(10)
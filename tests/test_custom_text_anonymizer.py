@@ -0,0 +1,176 @@
+"""
+Tests for src/custom_text_anonymizer/ — model registry and the batch/cached
+anonymization paths.
+
+No spaCy model is loaded: a small fake pipeline that tags a fixed list of
+names is installed in the registry instead.
+"""
+
+import re
+import sys
+import types
+
+import pytest
+
+from custom_text_anonymizer import core, model
+from utils.ner_cache import EntityCache
+
+
+# ---------------------------------------------------------------------------
+# Fake spaCy pipeline
+# ---------------------------------------------------------------------------
+
+_NAMES = {"Alice": "PER", "Bob": "PER", "Amsterdam": "LOC", "MONEY": "MONEY"}
+
+
+class _Ent:
+    def __init__(self, match, label):
+        self.text = match.group()
+        self.label_ = label
+        self.start_char = match.start()
+        self.end_char = match.end()
+
+
+class _Doc:
+    def __init__(self, text):
+        self.ents = [
+            _Ent(m, _NAMES[m.group()])
+            for m in re.finditer("|".join(_NAMES), text)
+        ]
+
+
+class _Pipe:
+    def __init__(self, listening=()):
+        self.listening_components = list(listening)
+
+
+class FakeNLP:
+    meta = {"lang": "nl", "name": "fake_news", "version": "0.1"}
+
+    def __init__(self):
+        self.pipeline = [
+            ("tok2vec", _Pipe(listening=["tagger", "ner"])),
+            ("tagger", _Pipe()),
+            ("parser", _Pipe()),
+            ("ner", _Pipe()),
+        ]
+        self.pipe_names = [name for name, _ in self.pipeline]
+        self.docs_processed = 0
+        self.last_pipe_kwargs = None
+
+    def __call__(self, text):
+        self.docs_processed += 1
+        return _Doc(text)
+
+    def pipe(self, texts, **kwargs):
+        self.last_pipe_kwargs = kwargs
+        for text in texts:
+            yield self(text)
+
+
+@pytest.fixture
+def fake_nlp():
+    model.clear()
+    nlp = FakeNLP()
+    model.register(nlp)
+    yield nlp
+    model.clear()
+
+
+TEXTS = [
+    "Alice woont in Amsterdam",
+    "geen namen hier",
+    "Bob en Alice, mail bob@example.nl",
+    "Alice woont in Amsterdam",
+    "zie https://example.nl en MONEY",
+]
+
+
+# ---------------------------------------------------------------------------
+# model registry
+# ---------------------------------------------------------------------------
+
+class TestModelRegistry:
+    def test_import_does_not_load_a_model(self):
+        model.clear()
+        assert not model.is_loaded()
+
+    def test_get_nlp_returns_registered_pipeline(self, fake_nlp):
+        assert model.get_nlp() is fake_nlp
+        assert model.get_nlp() is model.get_nlp()
+
+    def test_enable_selection_is_a_separate_entry(self, fake_nlp):
+        other = FakeNLP()
+        model.register(other, enable=["ner"])
+        assert model.get_nlp(enable=["ner"]) is other
+        assert model.get_nlp() is fake_nlp
+
+    def test_warm_up_runs_one_document(self, fake_nlp):
+        seconds = model.warm_up()
+        assert seconds >= 0
+        assert fake_nlp.docs_processed == 1
+
+    def test_load_hook_and_timings(self, monkeypatch):
+        calls = []
+        fake_spacy = types.SimpleNamespace(load=lambda name, **kw: FakeNLP())
+        monkeypatch.setitem(sys.modules, "spacy", fake_spacy)
+        monkeypatch.setattr(model, "_load_hooks", [])
+        model.clear()
+        model.add_load_hook(lambda name, enable, secs: calls.append((name, enable)))
+        model.get_nlp("some_model", enable=["ner"])
+        model.get_nlp("some_model", enable=["ner"])
+        assert calls == [("some_model", ("ner",))]
+        assert ("some_model", ("ner",)) in model.load_times()
+        model.clear()
+
+    def test_model_id(self, fake_nlp):
+        assert core.model_id() == "nl_fake_news-0.1"
+
+
+# ---------------------------------------------------------------------------
+# anonymize / anonymize_batch
+# ---------------------------------------------------------------------------
+
+class TestAnonymizeBatch:
+    def test_ner_disabled_pipes_keeps_listened_tok2vec(self, fake_nlp):
+        assert core.ner_disabled_pipes() == ["tagger", "parser"]
+
+    def test_batch_matches_per_text(self, fake_nlp):
+        expected = [core.anonymize(t) for t in TEXTS]
+        assert list(core.anonymize_batch(TEXTS, batch_size=2)) == expected
+
+    def test_batch_disables_unneeded_pipes(self, fake_nlp):
+        list(core.anonymize_batch(TEXTS, batch_size=2, n_process=1))
+        assert fake_nlp.last_pipe_kwargs["disable"] == ["tagger", "parser"]
+        assert fake_nlp.last_pipe_kwargs["batch_size"] == 2
+
+    def test_placeholders(self, fake_nlp):
+        text, mapping = core.anonymize("Alice en Bob in Amsterdam")
+        assert text == "[ENTITY_PER_2] en [ENTITY_PER_1] in [ENTITY_LOC_1]"
+        assert mapping["[ENTITY_PER_2]"] == "Alice"
+
+    def test_money_not_masked_but_urls_and_emails_are(self, fake_nlp):
+        text, _ = core.anonymize("zie https://example.nl of mail a@b.nl, MONEY")
+        assert "MONEY" in text
+        assert "[ENTITY_URL_1]" in text and "[ENTITY_EMAIL_1]" in text
+
+
+class TestAnonymizeBatchCache:
+    def test_cached_run_matches_cold_run(self, fake_nlp, tmp_path):
+        expected = [core.anonymize(t) for t in TEXTS]
+        with EntityCache(str(tmp_path / "c.sqlite"), core.model_id()) as cache:
+            assert list(core.anonymize_batch(TEXTS, cache=cache, chunk_size=2)) == expected
+            assert list(core.anonymize_batch(TEXTS, cache=cache, chunk_size=2)) == expected
+
+    def test_second_run_skips_ner(self, fake_nlp, tmp_path):
+        with EntityCache(str(tmp_path / "c.sqlite"), core.model_id()) as cache:
+            list(core.anonymize_batch(TEXTS, cache=cache))
+            first = fake_nlp.docs_processed
+            list(core.anonymize_batch(TEXTS, cache=cache))
+            assert fake_nlp.docs_processed == first
+            assert cache.hits == len(TEXTS)
+
+    def test_repeated_texts_run_ner_once(self, fake_nlp, tmp_path):
+        with EntityCache(str(tmp_path / "c.sqlite"), core.model_id()) as cache:
+            list(core.anonymize_batch(TEXTS, cache=cache))
+        assert fake_nlp.docs_processed == len(set(TEXTS))
@@ -0,0 +1,173 @@
+"""Tests for src/dataset_io.py — typed Parquet/CSV stage hand-off."""
+
+import os
+import warnings
+
+import pandas as pd
+import pytest
+
+import dataset_io
+from dataset_io import parquet_path, read_table, to_handoff_dtypes, write_table
+
+
+def _stage_df():
+    """A preprocess-style frame: every cell stringified, NaN as "nan"."""
+    return pd.DataFrame({
+        "ForumMessageID": ["1", "2", "3"],
+        "ForumTopicID":   ["10", "10", "nan"],
+        "PosterID":       ["a", "b", "a"],
+        "GroupName":      ["Steun", "", "Steun"],
+        "PostDate":       ["2020-01-01 10:00:00", "2020-01-02 11:30:00", "nan"],
+        "IsStarter":      ["True", "False", "False"],
+        "MessageText":    ["hallo", "123", "nan"],
+    })
+
+
+# ---------------------------------------------------------------------------
+# to_handoff_dtypes
+# ---------------------------------------------------------------------------
+
+class TestToHandoffDtypes:
+    def test_casts_ids_dates_and_bools(self):
+        df = to_handoff_dtypes(_stage_df())
+        assert str(df["ForumMessageID"].dtype) == "Int64"
+        assert str(df["ForumTopicID"].dtype) == "Int64"
+        assert df["ForumTopicID"].isna().sum() == 1
+        assert pd.api.types.is_datetime64_any_dtype(df["PostDate"])
+        assert df["IsStarter"].tolist() == [True, False, False]
+
+    def test_categoricals(self):
+        df = to_handoff_dtypes(_stage_df())
+        assert isinstance(df["PosterID"].dtype, pd.CategoricalDtype)
+        assert isinstance(df["GroupName"].dtype, pd.CategoricalDtype)
+
+    def test_mixed_text_column_stays_text(self):
+        df = to_handoff_dtypes(_stage_df())
+        assert df["MessageText"].tolist()[:2] == ["hallo", "123"]
+        assert pd.isna(df["MessageText"].iloc[2])
+
+    def test_input_not_modified(self):
+        raw = _stage_df()
+        to_handoff_dtypes(raw)
+        assert raw["ForumMessageID"].tolist() == ["1", "2", "3"]
+
+
+# ---------------------------------------------------------------------------
+# write_table / read_table
+# ---------------------------------------------------------------------------
+
+class TestRoundTrip:
+    def test_parquet_matches_csv_read(self, tmp_path):
+        path = str(tmp_path / "messages_structured.csv")
+        write_table(_stage_df(), path, fmt="parquet", csv=True)
+        assert os.path.exists(path) and os.path.exists(parquet_path(path))
+
+        from_parquet = read_table(path)
+        os.remove(parquet_path(path))
+        from_csv = read_table(path)
+
+        pd.testing.assert_frame_equal(from_parquet, from_csv, check_dtype=False)
+        assert from_parquet["PosterID"].dtype == object
+        assert from_parquet["ForumMessageID"].dtype == "int64"
+
+    def test_column_projection(self, tmp_path):
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df(), path)
+        df = read_table(path, columns=["PosterID", "PostDate"])
+        assert list(df.columns) == ["PosterID", "PostDate"]
+        assert pd.api.types.is_datetime64_any_dtype(df["PostDate"])
+
+    def test_categorical_read(self, tmp_path):
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df(), path)
+        df = read_table(path, categorical=True)
+        assert isinstance(df["PosterID"].dtype, pd.CategoricalDtype)
+
+    def test_parquet_only(self, tmp_path):
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df(), path, fmt="parquet", csv=False)
+        assert not os.path.exists(path)
+        assert len(read_table(path)) == 3
+
+    def test_csv_only_writes_no_parquet(self, tmp_path):
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df(), path, fmt="csv")
+        assert not os.path.exists(parquet_path(path))
+        assert pd.api.types.is_datetime64_any_dtype(read_table(path)["PostDate"])
+
+    def test_newer_csv_wins_over_stale_parquet(self, tmp_path):
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df(), path)
+        _stage_df().iloc[:1].to_csv(path, index=False)
+        pq = parquet_path(path)
+        os.utime(pq, (os.path.getmtime(path) - 10,) * 2)
+        assert len(read_table(path)) == 1
+
+    def test_falls_back_to_csv_without_pyarrow(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(dataset_io, "_PARQUET_AVAILABLE", False)
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df(), path)
+        assert os.path.exists(path)
+        assert not os.path.exists(parquet_path(path))
+
+    def test_unknown_format(self, tmp_path):
+        with pytest.raises(ValueError):
+            write_table(_stage_df(), str(tmp_path / "m.csv"), fmt="feather")
+
+    def test_all_missing_object_column_stays_object(self, tmp_path):
+        path = str(tmp_path / "m.csv")
+        write_table(_stage_df().assign(Note=None), path)
+        with warnings.catch_warnings():
+            warnings.simplefilter("error", FutureWarning)
+            df = read_table(path)
+        assert df["Note"].dtype == object and df["Note"].isna().all()
+
+
+# ---------------------------------------------------------------------------
+# score_once / text_codes
+# ---------------------------------------------------------------------------
+
+def _variants():
+    old = pd.DataFrame({"PosterID": ["a", "b", "c"],
+                        "MessageText": ["ik ben moe", "hallo", "ik ben moe"]})
+    new = pd.DataFrame({"PosterID": ["d", "e"],
+                        "MessageText": ["nieuw bericht", "hallo"]},
+                       index=[7, 9])
+    combined = pd.concat([old, new], ignore_index=True)
+    return {"old": old, "new_only": new, "combined": combined}
+
+
+def _score(df):
+    df = df.reset_index(drop=True)
+    df["n_chars"] = df["MessageText"].str.len()
+    df["has_ik"] = df["MessageText"].str.contains("ik")
+    return df
+
+
+class TestScoreOnce:
+    def test_text_codes(self):
+        unique, codes = dataset_io.text_codes(_variants(), "MessageText")
+        assert list(unique) == ["ik ben moe", "hallo", "nieuw bericht"]
+        assert list(unique.iloc[codes["new_only"]]) == ["nieuw bericht", "hallo"]
+        assert len(codes["combined"]) == 5
+
+    def test_matches_per_variant_scoring(self):
+        frames = _variants()
+        result = dataset_io.score_once(frames, "MessageText", _score)
+        assert list(result) == ["old", "new_only", "combined"]
+        for ds, df in frames.items():
+            pd.testing.assert_frame_equal(result[ds], _score(df))
+
+    def test_scores_each_text_once(self):
+        seen = []
+
+        def counting(df):
+            seen.extend(df["MessageText"])
+            return _score(df)
+
+        dataset_io.score_once(_variants(), "MessageText", counting)
+        assert sorted(seen) == ["hallo", "ik ben moe", "nieuw bericht"]
+
+    def test_row_count_mismatch(self):
+        with pytest.raises(ValueError):
+            dataset_io.score_once(_variants(), "MessageText", lambda df: df.iloc[:1])
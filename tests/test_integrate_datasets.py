@@ -1,10 +1,16 @@
 """Tests for src/integrate_datasets.py."""
 
+import io
+
 import pandas as pd
 import pytest
 
 import integrate_datasets as ids
 
+# Header row of a new-platform export file (semicolon-separated)
+_EXPORT_HEADER = "Content;AuthorID;PostDate;PostModifiedDate;ForumTopicID;ForumGroupID;" \
+                 "ForumMessageID;post_type;Topic_title"
+
 
 # ---------------------------------------------------------------------------
 # _normalize
@@ -38,6 +44,87 @@ class TestNormalize:
         assert result == result.strip()
 
 
+# ---------------------------------------------------------------------------
+# load_new_raw / utils.new_exports
+# ---------------------------------------------------------------------------
+
+class TestLoadNewRaw:
+    HEADER = _EXPORT_HEADER + "\n"
+    FILE_A = HEADER + (
+        '"Hallo; allemaal\ntweede regel";17;2021-03-04 10:00:00.000;;5;2;100;Post;Titel\n'
+        "kapot;1;2;3;4;5;6;7;8;9;10\n"
+        ";18;2021-03-04 11:00:00;2021-03-05 11:00:00;5;2;101;Post;Titel\n"
+        "groep;;;;;2;;Group;\n"
+    )
+    FILE_B = HEADER + "Nog een bericht;19;2022-01-01T08:30:00;;6;2;102;Post;Ander\n"
+
+    @pytest.fixture
+    def exports(self, tmp_path, monkeypatch):
+        new_dir = tmp_path / "new"
+        new_dir.mkdir()
+        (new_dir / "a.csv").write_text(self.FILE_A)
+        (new_dir / "b.csv").write_text(self.FILE_B)
+        monkeypatch.setattr(ids, "NEW_DATA_DIR", str(new_dir))
+        monkeypatch.setattr(ids, "OUTPUT_DIR", str(tmp_path / "out"))
+        return new_dir
+
+    def test_typed_and_renamed_while_reading(self, exports, capsys):
+        df = ids.load_new_raw()
+        assert df["MessageText"].iloc[0] == "Hallo; allemaal\ntweede regel"
+        assert pd.isna(df["MessageText"].iloc[1])
+        assert df["PosterID"].tolist() == ["17", "18", "19"]
+        assert df["source_file"].tolist() == ["a.csv", "a.csv", "b.csv"]
+        assert df["ForumMessageID"].tolist() == [100, 101, 102]
+        assert df["ForumMessageID"].dtype == "Int64"    # the Group row had none
+        assert df["PostDate"].tolist() == pd.to_datetime(
+            ["2021-03-04 10:00", "2021-03-04 11:00", "2022-01-01 08:30"]).tolist()
+        assert df["PostModifiedDate"].isna().tolist() == [True, False, True]
+        assert "a.csv: 3 rows, 1 malformed lines skipped" in capsys.readouterr().out
+
+    def test_cache_reused_until_an_export_changes(self, exports, monkeypatch):
+        from utils import new_exports
+        first = ids.load_new_raw()
+        assert (exports.parent / "out" / new_exports.CACHE_FILE).exists()
+
+        def no_parse(path):
+            raise AssertionError("export parsed again")
+        monkeypatch.setattr(new_exports, "_read_arrow", no_parse)
+        pd.testing.assert_frame_equal(ids.load_new_raw(), first)
+
+        (exports / "b.csv").write_text(self.FILE_B + "Nieuw;20;2022-01-02;;6;2;103;Post;X\n")
+        with pytest.raises(AssertionError, match="parsed again"):
+            ids.load_new_raw()
+
+    def test_pandas_reader_matches_arrow_reader(self, exports):
+        from utils import new_exports
+        for name in ("a.csv", "b.csv"):
+            arrow, arrow_bad = new_exports._read_arrow(str(exports / name))
+            plain, plain_bad = new_exports._read_pandas(str(exports / name))
+            pd.testing.assert_frame_equal(arrow, plain)
+            assert arrow_bad == plain_bad
+
+    def test_each_file_typed_once(self, exports, monkeypatch):
+        from utils import new_exports
+        calls = []
+        apply_schema = new_exports._apply_schema
+        monkeypatch.setattr(new_exports, "_apply_schema",
+                            lambda df: calls.append(len(df)) or apply_schema(df))
+        df = new_exports.load_new_exports(str(exports))
+        assert len(calls) == 2
+        assert df["ForumMessageID"].dtype == "Int64"    # a.csv's Group row has none
+        assert df["ForumTopicID"].dtype == "Int64"
+        assert new_exports.load_new_exports(str(exports), files=["b.csv"])[
+            "ForumMessageID"].dtype == "int64"
+
+    def test_pyarrow_warning_only_on_fallback(self, exports, monkeypatch, capsys):
+        from utils import new_exports
+        first = ids.load_new_raw()
+        assert "pyarrow not installed" not in capsys.readouterr().out
+        monkeypatch.setattr(new_exports, "_PYARROW_AVAILABLE", False)
+        pd.testing.assert_frame_equal(ids.load_new_raw(), first)
+        assert "pyarrow not installed" in capsys.readouterr().out
+
+
 # ---------------------------------------------------------------------------
 # remove_duplicates
 # ---------------------------------------------------------------------------
@@ -75,6 +162,54 @@ class TestRemoveDuplicates:
         assert "PosterID" in result.columns
 
 
+    def test_near_duplicates_removed_only_with_threshold(self):
+        old = pd.DataFrame({"MessageText": [self.LONG + " and then some more words here"]})
+        new = pd.DataFrame({"MessageText": [
+            self.LONG + " and then some other words here",
+            "brand new content not in old at all, nothing alike",
+        ]})
+        assert len(ids.remove_duplicates(old, new)) == 2
+        result = ids.remove_duplicates(old, new, near_threshold=0.6)
+        assert result["MessageText"].tolist() == [new["MessageText"].iloc[1]]
+
+    def test_fingerprint_collisions_confirmed_on_text(self, monkeypatch):
+        """Equal fingerprints alone never make a duplicate."""
+        def colliding(s, strip_html=False, confirm=False):
+            keys = ids.match_key_series(s, strip_html=strip_html)
+            return pd.DataFrame({"fp": 0, "key_len": keys.str.len()}, index=s.index)
+        monkeypatch.setattr(ids, "text_fingerprints", colliding)
+        old = pd.DataFrame({"MessageText": [self.LONG, "another long old message, kept in old"]})
+        new = pd.DataFrame({"MessageText": ["brand new content not in old", self.LONG.upper()]})
+        result = ids.remove_duplicates(old, new)
+        assert result["MessageText"].tolist() == ["brand new content not in old"]
+
+    def test_precomputed_keys(self):
+        old = pd.DataFrame({"MessageText": ["x", self.LONG]}, index=[5, 6])
+        new = pd.DataFrame({"MessageText": [self.LONG, "brand new content not in old"]},
+                           index=[8, 9])
+        new_keys = ids.text_keys(pd.concat([new, new.rename(index=lambda i: i + 10)]))
+        result = ids.remove_duplicates(old, new, old_keys=ids.text_keys(old), new_keys=new_keys)
+        assert result.index.tolist() == [9]
+
+
+class TestNearDuplicatePairs:
+    def test_finds_edited_copies_and_skips_unrelated(self):
+        from utils.near_duplicates import near_duplicate_pairs
+        words = [f"woord{i}" for i in range(400)]
+        left = [" ".join(words[i:i + 30]) for i in range(0, 300, 30)]
+        right = [left[3].replace("woord95", "anders"), " ".join(words[::-1][:30]), "", left[7]]
+        pairs = near_duplicate_pairs(left, right, threshold=0.7)
+        assert pairs[["left", "right"]].values.tolist() == [[3, 0], [7, 3]]
+        assert pairs["similarity"].iloc[1] == 1.0
+
+    def test_lsh_params_use_available_permutations(self):
+        from utils.near_duplicates import lsh_params
+        for threshold in (0.5, 0.7, 0.9):
+            bands, rows = lsh_params(threshold, num_perm=128)
+            assert bands * rows <= 128
+        assert lsh_params(0.9)[1] > lsh_params(0.5)[1]
+
+
 # ---------------------------------------------------------------------------
 # build_id_bridge
 # ---------------------------------------------------------------------------
@@ -156,6 +291,43 @@ class TestBuildIdBridge:
         assert len(bridge) == 0
 
 
+    def test_near_match_edges(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ids, "OUTPUT_DIR", str(tmp_path))
+        base = ("ik heb al weken last van slapeloosheid en weet echt niet meer "
+                "wat ik moet doen om weer een nacht goed door te slapen")
+        edited = base.replace("weken", "maanden")
+        dates = pd.to_datetime(["2020-01-01", "2020-01-02"])
+        old = pd.DataFrame({"PosterID": ["uuid-1", "uuid-2"], "PostDate": dates,
+                            "ForumTopicID": [1, 2], "MessageText": [base, self.LONG_TEXT]})
+        new = pd.DataFrame({"PosterID": ["int-1", "int-2"], "PostDate": dates,
+                            "ForumTopicID": [1, 2], "MessageText": [edited, self.LONG_TEXT]})
+
+        assert set(ids.build_id_bridge(old, new)["confidence"]) == {"HIGH"}
+
+        bridge = ids.build_id_bridge(old, new, near_threshold=0.6)
+        near = bridge[bridge["confidence"] == "NEAR"]
+        assert near[["PosterID_old", "PosterID_new"]].values.tolist() == [["uuid-1", "int-1"]]
+        assert near["overlap_count"].tolist() == [1]
+        # exact pairs are not duplicated as NEAR edges
+        assert len(bridge) == 2
+
+    def test_fingerprint_collisions_do_not_bridge(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ids, "OUTPUT_DIR", str(tmp_path))
+        other = "A different long message that only shares a forced fingerprint here"
+        dates = pd.to_datetime(["2020-01-01", "2020-01-02"])
+        old = pd.DataFrame({"PosterID": ["uuid-1", "uuid-2"], "PostDate": dates,
+                            "ForumTopicID": [1, 2], "MessageText": [self.LONG_TEXT, other]})
+        new = pd.DataFrame({"PosterID": ["int-1"], "PostDate": dates[:1],
+                            "ForumTopicID": [1], "MessageText": [self.LONG_TEXT]})
+        expected = ids.build_id_bridge(old, new)
+
+        keys = ids.text_keys(old).assign(fp=0)
+        bridge = ids.build_id_bridge(old, new, old_keys=keys,
+                                     new_keys=ids.text_keys(new).assign(fp=0))
+        assert bridge[["PosterID_old", "PosterID_new"]].values.tolist() == [["uuid-1", "int-1"]]
+        pd.testing.assert_frame_equal(bridge, expected)
+
+
 # ---------------------------------------------------------------------------
 # detect_new_superusers
 # ---------------------------------------------------------------------------
@@ -200,6 +372,221 @@ class TestDetectNewSuperusers:
         assert (tmp_path / "new_superuser_signals.csv").exists()
 
 
+def _loop_signals(new):
+    """The per-author loop detect_new_superusers used before utils/author_signals."""
+    first = new.sort_values("PostDate").groupby("ForumTopicID")["PosterID"].first()
+    starters = first.value_counts()
+    rows = []
+    for author in new["PosterID"].dropna().unique():
+        posts = new[new["PosterID"] == author]["MessageText"].fillna("").astype(str)
+        words = " ".join(posts).lower().split()
+        threads = starters.get(author, 0)
+        dates = new[new["PosterID"] == author]["PostDate"].dropna()
+        rows.append({
+            "PosterID": author,
+            "post_count": len(posts),
+            "threads_started": threads,
+            "threads_started_pct": round(threads / max(len(posts), 1) * 100, 1),
+            "lexical_diversity": round(len(set(words)) / max(len(words), 1), 3),
+            "hour_std": round(dates.dt.hour.std(), 2) if len(dates) > 5 else None,
+            "total_words": len(words),
+        })
+    return pd.DataFrame(rows)
+
+
+def _random_messages(n=3000, seed=3):
+    import numpy as np
+    rng = np.random.default_rng(seed)
+    words = ["ik", "Ik", "voel", "me", "moe", "goed", "dag", "hoi", "nee", "JA"]
+    texts = [" ".join(rng.choice(words, rng.integers(0, 12))) for _ in range(n)]
+    texts = [None if i % 97 == 0 else t for i, t in enumerate(texts)]
+    dates = pd.to_datetime("2020-01-01") + pd.to_timedelta(rng.integers(0, 10**7, n), unit="s")
+    df = pd.DataFrame({
+        "PosterID": rng.choice([f"u{i}" for i in range(150)], n),
+        "ForumTopicID": rng.integers(0, 400, n),
+        "PostDate": dates,
+        "MessageText": texts,
+    })
+    df.loc[df.index % 53 == 0, "PosterID"] = None
+    df.loc[df.index % 31 == 0, "PostDate"] = pd.NaT
+    return df
+
+
+class TestAuthorSignals:
+    def test_matches_per_author_loop(self):
+        from utils.author_signals import author_signals
+        new = _random_messages()
+        expected = _loop_signals(new)
+        result = author_signals(new)
+        assert list(result.columns) == list(expected.columns)
+        assert result.to_csv(index=False) == expected.to_csv(index=False)
+
+    def test_signals_csv_unchanged(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(ids, "OUTPUT_DIR", str(tmp_path))
+        new = _random_messages()
+        ids.detect_new_superusers(new)
+        expected = _loop_signals(new).sort_values("post_count", ascending=False)
+        written = pd.read_csv(tmp_path / "new_superuser_signals.csv")
+        pd.testing.assert_frame_equal(
+            written.drop(columns=["superuser_flag"]).reset_index(drop=True),
+            pd.read_csv(io.StringIO(expected.to_csv(index=False))),
+        )
+
+
+# ---------------------------------------------------------------------------
+# author_stats / incremental integration
+# ---------------------------------------------------------------------------
+
+class TestAuthorStats:
+    def test_merged_halves_give_the_loop_signals(self):
+        from utils import author_signals as sig
+        messages = _random_messages()
+        half = len(messages) // 2
+        first, second = messages.iloc[:half], messages.iloc[half:]
+        stats, sketch = sig.merge_author_stats(*sig.author_stats(first),
+                                               *sig.author_stats(second))
+        topic_first = sig.topic_first_posts(pd.concat(
+            [sig.topic_first_posts(first), sig.topic_first_posts(second)]))
+        result = sig.signals_from_stats(stats, sketch, topic_first)
+        pd.testing.assert_frame_equal(result, sig.author_signals(messages), check_dtype=False)
+
+    def test_vocabulary_sketch_estimates_large_vocabularies(self):
+        import numpy as np
+        from utils import author_signals as sig
+        rng = np.random.default_rng(0)
+        words = [f"w{i}" for i in rng.integers(0, 30000, 50000)]
+        messages = pd.DataFrame({
+            "PosterID": "a", "ForumTopicID": 1, "PostDate": pd.Timestamp("2020-01-01"),
+            "MessageText": [" ".join(words[i:i + 100]) for i in range(0, 50000, 100)],
+        })
+        stats, sketch = sig.author_stats(messages)
+        assert len(sketch) == sig.VOCAB_SKETCH_SIZE
+        estimate = sig.signals_from_stats(stats, sketch, sig.topic_first_posts(messages))
+        exact = sig.author_signals(messages)
+        assert estimate["lexical_diversity"][0] == pytest.approx(
+            exact["lexical_diversity"][0], rel=0.1)
+
+
+class TestIncrementalIntegration:
+    """
+    run_integration(incremental=True) must end with the rows of a full run.
+    The appended outputs keep the previous file's rows first, followed by the
+    delta sorted by (ForumTopicID, PostDate); a full run sorts the whole file.
+    """
+
+    @staticmethod
+    def _world(seed=5):
+        import numpy as np
+        rng = np.random.default_rng(seed)
+        vocab = [f"woord{i}" for i in range(300)]
+
+        def text():
+            return " ".join(rng.choice(vocab, rng.integers(6, 15)))
+
+        def when(lo, hi):
+            return pd.Timestamp("2021-01-01") + pd.to_timedelta(int(rng.integers(lo, hi)), unit="s")
+
+        old = pd.DataFrame({
+            "PosterID": [f"uuid-{i % 20}" for i in range(300)],
+            "MessageText": [text() for _ in range(300)],
+            "PostDate": pd.Timestamp("2019-01-01"),
+            "ForumTopicID": [i % 30 for i in range(300)],
+            "ForumMessageID": range(1, 301),
+        })
+        topics = pd.DataFrame({"ForumTopicID": range(30), "ForumGroupID": [i % 3 for i in range(30)]})
+        groups = pd.DataFrame({"ForumGroupID": [0, 1, 2], "AccountID": [2, 4, 3]})
+
+        def export(rows):
+            lines = [_EXPORT_HEADER]
+            for content, author, date, topic, msg_id in rows:
+                lines.append(f'"{content}";{author};{date:%Y-%m-%d %H:%M:%S};;{topic};0;{msg_id};'
+                             f'{"Post" if msg_id % 7 else "Topic"};Titel {topic}')
+            return "\n".join(lines) + "\n"
+
+        a_rows = [(text(), f"n{i % 12}", when(0, 10**6), 100 + i % 40, 1000 + i)
+                  for i in range(200)]
+        a_rows += [(old["MessageText"][i], "n1", when(0, 10**6), 100, 1200 + i)
+                   for i in (1, 21, 41)]                              # n1 = uuid-1
+        a_rows += [(text(), "n13", when(0, 10**6), 500 + i, 1300 + i) for i in range(11)]
+        a_rows += [(text(), "n14", when(0, 10**6), 600 + i, 1400 + i) for i in range(12)]
+
+        b_rows = [(text(), f"n{i % 12}", when(10**6, 2 * 10**6), 100 + i % 50, 2000 + i)
+                  for i in range(150)]
+        b_rows += a_rows[:5]                                          # re-exported rows
+        b_rows += [(old["MessageText"][61], "n1", when(10**6, 2 * 10**6), 101, 2200)]
+        b_rows += [(text(), "n13", when(10**6, 2 * 10**6), 100, 2300 + i) for i in range(30)]
+        b_rows += [(text(), "n14", when(10**6, 2 * 10**6), 700 + i, 2400 + i) for i in range(3)]
+        return old, topics, groups, export(a_rows), export(b_rows)
+
+    def _setup(self, root, monkeypatch, files):
+        old, topics, groups, a_csv, b_csv = self._world()
+        data = root / "data"
+        (data / "new").mkdir(parents=True)
+        old.to_csv(data / "messages.csv", index=False)
+        topics.to_csv(data / "topics.csv", index=False)
+        groups.to_csv(data / "groups.csv", index=False)
+        for name in files:
+            (data / "new" / name).write_text({"a.csv": a_csv, "b.csv": b_csv}[name])
+        monkeypatch.setattr(ids, "DATA_DIR", str(data))
+        monkeypatch.setattr(ids, "NEW_DATA_DIR", str(data / "new"))
+        monkeypatch.setattr(ids, "OUTPUT_DIR", str(root / "output"))
+        return data / "new"
+
+    @staticmethod
+    def _read(root, name, key):
+        df = pd.read_csv(root / "output" / name, dtype={"PosterID": str})
+        return df.sort_values(key).reset_index(drop=True)
+
+    def test_matches_full_run(self, tmp_path, monkeypatch, capsys):
+        full, incr = tmp_path / "full", tmp_path / "incr"
+        self._setup(full, monkeypatch, ["a.csv", "b.csv"])
+        ids.run_integration()
+
+        new_dir = self._setup(incr, monkeypatch, ["a.csv"])
+        ids.run_integration()
+        appended = ("integrated_messages.csv", "messages_new_only.csv", "messages_combined.csv")
+        before = {name: pd.read_csv(incr / "output" / name, dtype={"PosterID": str})
+                  for name in appended}
+        (new_dir / "b.csv").write_text(self._world()[4])
+        capsys.readouterr()
+        ids.run_integration(incremental=True)
+        out = capsys.readouterr().out
+        assert "Incremental integration complete" in out
+        assert "Releasing 11 held-back posts" in out
+
+        # Same rows as the full run (compared in ForumMessageID order) ...
+        for name in ("integrated_messages.csv", "messages_new_only.csv", "messages_old.csv"):
+            pd.testing.assert_frame_equal(self._read(incr, name, "ForumMessageID"),
+                                          self._read(full, name, "ForumMessageID"))
+        # ... but in append order: the earlier rows unchanged, then the sorted delta
+        for name in appended:
+            rows = pd.read_csv(incr / "output" / name, dtype={"PosterID": str})
+            head, delta = rows.iloc[:len(before[name])], rows.iloc[len(before[name]):]
+            pd.testing.assert_frame_equal(head, before[name])
+            assert len(delta) and delta.equals(
+                delta.sort_values(["ForumTopicID", "PostDate"], kind="stable"))
+        for name, key in (("id_bridge.csv", ["PosterID_old", "PosterID_new"]),
+                          ("new_superuser_exclusions.csv", "PosterID"),
+                          ("new_superuser_signals.csv", "PosterID")):
+            pd.testing.assert_frame_equal(self._read(incr, name, key), self._read(full, name, key))
+        # n13 was held back after a.csv and released by b.csv; n14 stays out
+        out = self._read(incr, "messages_new_only.csv", "ForumMessageID")
+        assert (out["PosterID"] == "n13").sum() == 41
+        assert "n14" not in set(out["PosterID"])
+
+    def test_nothing_new_and_fallbacks(self, tmp_path, monkeypatch, capsys):
+        new_dir = self._setup(tmp_path, monkeypatch, ["a.csv"])
+        ids.run_integration(incremental=True)
+        assert "Full integration instead of incremental: no state" in capsys.readouterr().out
+
+        ids.run_integration(incremental=True)
+        assert "nothing to do" in capsys.readouterr().out
+
+        (new_dir / "a.csv").write_text(self._world()[3] + "extra;n1;2021-02-01;;100;0;9999;Post;X\n")
+        ids.run_integration(incremental=True)
+        assert "already integrated export changed" in capsys.readouterr().out
+
+
 # ---------------------------------------------------------------------------
 # filter_new_data
 # ---------------------------------------------------------------------------
@@ -6,10 +6,14 @@ import pytest
 from liwc_analysis import (
     _tokenize,
     _match_term,
+    LiwcIndex,
+    compile_liwc,
+    ensure_fps,
     score_text,
     load_liwc_dic,
     load_liwc_csv,
     score_messages,
+    liwc_count_matrix,
     per_user_summary,
 )
 
@@ -110,6 +114,71 @@ class TestScoreText:
         assert result["affect"] == 1
 
 
+# ---------------------------------------------------------------------------
+# LiwcIndex
+# ---------------------------------------------------------------------------
+
+def _linear_lookup(token, term_to_cats):
+    """Reference: the original scan over every term, first match wins."""
+    for term, cats in term_to_cats.items():
+        if _match_term(token, term):
+            return cats
+    return None
+
+
+class TestLiwcIndex:
+    TERMS = {
+        "happ*": ["posemo"],
+        "happy": ["affect"],
+        "ha*": ["short"],
+        "h*": ["h"],
+        "sad": ["negemo"],
+        "sadness*": ["negemo", "affect"],
+        "i": ["i"],
+    }
+
+    def test_exact_lookup(self):
+        assert LiwcIndex(self.TERMS).lookup("sad") == ["negemo"]
+
+    def test_wildcard_lookup(self):
+        assert LiwcIndex({"happ*": ["posemo"]}).lookup("happiness") == ["posemo"]
+
+    def test_wildcard_matches_bare_prefix(self):
+        assert LiwcIndex({"happ*": ["posemo"]}).lookup("happ") == ["posemo"]
+
+    def test_no_match_returns_none(self):
+        assert LiwcIndex(self.TERMS).lookup("zzz") is None
+
+    def test_first_term_in_dict_order_wins(self):
+        index = LiwcIndex({"happy": ["affect"], "happ*": ["posemo"]})
+        assert index.lookup("happy") == ["affect"]
+        assert LiwcIndex(self.TERMS).lookup("happy") == ["posemo"]
+
+    def test_matches_linear_scan(self):
+        index = LiwcIndex(self.TERMS)
+        tokens = ["happy", "happiness", "hat", "h", "hello", "sad", "sadness",
+                  "sadnesses", "sadly", "i", "ik", "", "x"]
+        for tok in tokens:
+            assert index.lookup(tok) == _linear_lookup(tok, self.TERMS), tok
+
+    def test_behaves_like_mapping(self):
+        index = LiwcIndex(self.TERMS)
+        assert list(index) == list(self.TERMS)
+        assert index["sad"] == ["negemo"]
+        assert "happ*" in index
+        assert len(index) == len(self.TERMS)
+
+    def test_compile_is_idempotent(self):
+        index = compile_liwc(self.TERMS)
+        assert compile_liwc(index) is index
+
+    def test_ensure_fps_keeps_index_compiled(self):
+        index, cats = ensure_fps(LiwcIndex({"sad": ["negemo"]}), ["negemo"])
+        assert isinstance(index, LiwcIndex)
+        assert index.lookup("ik") == ["fps_dutch"]
+        assert "fps_dutch" in cats
+
+
 # ---------------------------------------------------------------------------
 # load_liwc_dic
 # ---------------------------------------------------------------------------
@@ -231,6 +300,63 @@ class TestScoreMessages:
         assert abs(result["liwc_posemo_pct"].iloc[0] - 66.667) < 0.1
 
 
+    def test_sparse_matches_loop(self):
+        term_to_cats = {"happ*": ["posemo", "affect"], "happy": ["affect"],
+                        "sad": ["negemo", "affect"], "ik": ["i"]}
+        cats = ["affect", "i", "negemo", "posemo"]
+        df = pd.DataFrame({
+            "PosterID": ["u1", "u2", "u3", "u4"],
+            "MessageText": ["Ik ben happy, zo happy", None, "sad sad happiness", ""],
+        })
+        sparse, cols_s = score_messages(df, term_to_cats, cats, method="sparse")
+        loop, cols_l = score_messages(df, term_to_cats, cats, method="loop")
+        assert cols_s == cols_l
+        pd.testing.assert_frame_equal(sparse, loop)
+
+    def test_unknown_method_raises(self):
+        with pytest.raises(ValueError, match="method"):
+            score_messages(self._make_df(), {}, [], method="dense")
+
+    def test_score_once_matches_per_variant_scoring(self):
+        from dataset_io import score_once
+        term_to_cats = {"happ*": ["posemo"], "sad": ["negemo"]}
+        cats = ["negemo", "posemo"]
+        old = self._make_df()
+        new = pd.DataFrame({"PosterID": ["u3"], "MessageText": ["sad and happy"],
+                            "PostDate": pd.to_datetime(["2023-02-01"])})
+        frames = {"old": old, "new_only": new,
+                  "combined": pd.concat([old, new], ignore_index=True)}
+
+        scored = score_once(frames, "MessageText",
+                            lambda d: score_messages(d, term_to_cats, cats)[0])
+        for ds, df in frames.items():
+            pd.testing.assert_frame_equal(scored[ds], score_messages(df, term_to_cats, cats)[0])
+
+
+# ---------------------------------------------------------------------------
+# liwc_count_matrix
+# ---------------------------------------------------------------------------
+
+class TestLiwcCountMatrix:
+    def test_counts_and_word_count(self):
+        counts, wc = liwc_count_matrix(
+            ["happy happy sad", "niets"], {"happ*": ["posemo"], "sad": ["negemo"]},
+            ["negemo", "posemo"],
+        )
+        assert counts.tolist() == [[1, 2], [0, 0]]
+        assert wc.tolist() == [3, 1]
+
+    def test_duplicate_category_counted_like_score_text(self):
+        term_to_cats = {"happy": ["posemo", "posemo"]}
+        counts, _ = liwc_count_matrix(["happy"], term_to_cats, ["posemo"])
+        assert counts[0, 0] == score_text("happy", term_to_cats, ["posemo"])["posemo"]
+
+    def test_empty_input(self):
+        counts, wc = liwc_count_matrix([], {"a": ["x"]}, ["x"])
+        assert counts.shape == (0, 1)
+        assert len(wc) == 0
+
+
 # ---------------------------------------------------------------------------
 # per_user_summary
 # ---------------------------------------------------------------------------
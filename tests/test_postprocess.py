@@ -242,3 +242,103 @@ class TestPathHelpers:
 
     def test_new_only_dataset_output_name(self):
         assert postprocess.get_output_name("new_only") == "messages_structured_new_only.csv"
+
+
+# ---------------------------------------------------------------------------
+# Incremental runs
+# ---------------------------------------------------------------------------
+
+def _community(rows):
+    """(message id, topic, poster, day, text) rows as a community frame."""
+    return pd.DataFrame({
+        "ForumMessageID": [r[0] for r in rows],
+        "ForumTopicID":   [r[1] for r in rows],
+        "PosterID":       [r[2] for r in rows],
+        "PostDate":       [f"2021-02-{r[3]:02d} 10:00:00" for r in rows],
+        "MessageText":    [r[4] for r in rows],
+        "GroupName":      "Steun",
+    })
+
+
+# u1 and u2 have 5+ posts, u3 has 4 and is filtered out
+_BASE = [
+    (1, 1, "u1", 1, "Eerste vraag over slapen"),
+    (2, 1, "u2", 2, "Antwoord een"),
+    (3, 1, "u1", 3, "Dank je"),
+    (4, 2, "u2", 4, "Nieuwe draad"),
+    (5, 2, "u3", 5, "Reactie van u3"),
+    (6, 3, "u1", 6, "Derde draad ZOOOOO moe"),
+    (7, 3, "u2", 7, "Sterkte"),
+    (8, 4, "u1", 8, "Vierde draad"),
+    (9, 4, "u2", 9, "Ik ook"),
+    (10, 5, "u1", 10, "Vijfde draad zonder reacties"),
+    (11, 6, "u3", 11, "Draad van u3"),
+    (12, 6, "u1", 12, "Reactie"),
+    (13, 6, "u3", 13, "Nog een"),
+    (14, 7, "u2", 14, "Laatste draad"),
+    (15, 7, "u1", 15, "Laatste reactie"),
+    (16, 7, "u3", 16, "Ook van u3"),
+]
+
+
+class TestIncrementalPostprocess:
+    def _run(self, tmp_path, monkeypatch, name, rows, incremental=False):
+        pre = tmp_path / name / "preprocessed"
+        pre.mkdir(parents=True, exist_ok=True)
+        _community(rows).to_csv(pre / "messages_community.csv", index=False)
+        monkeypatch.setattr(postprocess, "PREPROCESS_DIR", str(pre))
+        monkeypatch.setattr(postprocess, "OUTPUT_DIR", str(tmp_path / name))
+        postprocess.run(incremental=incremental)
+        return pd.read_csv(tmp_path / name / "messages_structured.csv")
+
+    def _spy_threads(self, monkeypatch):
+        seen = []
+        original = postprocess.build_thread_structure
+
+        def spy(messages):
+            seen.append(set(messages["ForumTopicID"]))
+            return original(messages)
+
+        monkeypatch.setattr(postprocess, "build_thread_structure", spy)
+        return seen
+
+    def test_matches_full_run_and_rebuilds_affected_threads_only(self, tmp_path, monkeypatch):
+        self._run(tmp_path, monkeypatch, "out", _BASE)
+        rows = [r for r in _BASE if r[0] != 8]                     # removed from thread 4
+        rows[5] = (6, 3, "u1", 6, "Derde draad, aangepast")        # edited in thread 3
+        rows.append((17, 8, "u3", 17, "Vijfde post van u3"))       # u3 reaches 5 posts
+
+        seen = self._spy_threads(monkeypatch)
+        incremental = self._run(tmp_path, monkeypatch, "out", rows, incremental=True)
+        # u3's posts in threads 2, 6 and 7 come back; 1 and 5 are untouched
+        assert seen == [{2, 3, 4, 6, 7, 8}]
+
+        full = self._run(tmp_path, monkeypatch, "full", rows)
+        pd.testing.assert_frame_equal(incremental, full)
+
+    def test_unchanged_input_rebuilds_nothing(self, tmp_path, monkeypatch):
+        first = self._run(tmp_path, monkeypatch, "out", _BASE)
+        seen = self._spy_threads(monkeypatch)
+        again = self._run(tmp_path, monkeypatch, "out", _BASE, incremental=True)
+        assert seen == [set()]
+        pd.testing.assert_frame_equal(again, first)
+
+    def test_falls_back_to_full_run_without_state(self, tmp_path, monkeypatch):
+        result = self._run(tmp_path, monkeypatch, "out", _BASE, incremental=True)
+        assert set(result["PosterID"]) == {"u1", "u2"}
+        assert (tmp_path / "out" / "incremental" / "structured_default.npz").exists()
+
+    def test_writes_tokenised_corpus(self, tmp_path, monkeypatch):
+        from utils.corpus import load_corpus
+        rows = _BASE[:-1] + [(16, 7, "u3", 16, "Ook [ENTITY_PERSON_1] van u3")]
+        self._run(tmp_path, monkeypatch, "out", rows)
+        corpus = load_corpus(str(tmp_path / "out" / "corpus" / "combined"))
+        kept = [r[4] for r in rows if r[2] != "u3"]
+        assert len(corpus) == len(set(t.lower() for t in kept))
+        assert "entity_person_1" not in corpus.vocab
+
+        rows.append((17, 8, "u1", 17, "Nieuw bericht"))
+        self._run(tmp_path, monkeypatch, "out", rows, incremental=True)
+        corpus = load_corpus(str(tmp_path / "out" / "corpus" / "combined"))
+        assert len(corpus) == len(set(t.lower() for t in kept)) + 1
+        assert {"nieuw", "bericht"} <= set(corpus.vocab)
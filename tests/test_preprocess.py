@@ -7,10 +7,15 @@ exercise anonymization therefore inject a lightweight fake anonymizer via
 monkeypatch instead of loading the real NLP model.
 """
 
+import os
+
 import pandas as pd
 import pytest
 
 import preprocess
+from utils import language_id
+from utils.language_id import LANGDETECT_AVAILABLE, cache_namespace, detect_languages, looks_dutch
+from utils.ner_cache import EntityCache
 
 
 # ---------------------------------------------------------------------------
@@ -23,6 +28,18 @@ def _fake_anonymize(text: str):
     return result, {}
 
 
+@pytest.fixture(autouse=True)
+def _batch_anonymizer_uses_fake(monkeypatch):
+    """Route the nlp.pipe batch path through whatever ta_anonymize the test
+    patched in, so no test ever loads the real spaCy model."""
+    monkeypatch.setattr(
+        preprocess, "ta_anonymize_batch",
+        lambda texts, **kwargs: (preprocess.ta_anonymize(t) for t in texts),
+        raising=False,
+    )
+    monkeypatch.setattr(preprocess, "ta_model_id", lambda: "fake-model", raising=False)
+
+
 # ---------------------------------------------------------------------------
 # clean_dataframe
 # ---------------------------------------------------------------------------
@@ -60,6 +77,48 @@ class TestCleanDataframe:
         assert len(result) == 1
         assert "hello" in result["MessageText"].iloc[0]
 
+    def test_non_text_columns_keep_dtype(self):
+        df = pd.DataFrame({
+            "MessageText": ["<i>a</i>", "b"],
+            "ForumMessageID": [1, 2],
+            "PosterID": ["<u1>", "u2"],
+        })
+        result = preprocess.clean_dataframe(df)
+        assert result["ForumMessageID"].dtype == "int64"
+        assert result["PosterID"].tolist() == ["<u1>", "u2"]
+
+    def test_missing_text_stays_missing(self):
+        df = pd.DataFrame({"MessageText": [None, "hallo"], "PosterID": ["u1", "u2"]})
+        result = preprocess.clean_dataframe(df)
+        assert pd.isna(result["MessageText"].iloc[0])
+
+
+class TestStripHtml:
+    SAMPLES = [
+        "<p>Hello <b>World</b></p>",
+        "geen markup, alleen tekst  ",
+        "Tom &amp; Jerry &lt;3 &eacute;&#233;",
+        "a < b en c > d",
+        "<a href=\"x?a=1&b=2\" title='>'>link</a> na",
+        "voor<br/>na<br>",
+        "<!-- commentaar -->zichtbaar",
+        "<script>var x = '<b>';</script>tekst",
+        "regel 1<p>regel 2</p>\n<ul><li>een</li><li>twee</li></ul>",
+        "&nbsp;spatie&nbsp;",
+    ]
+
+    def test_matches_beautifulsoup(self):
+        bs4 = pytest.importorskip("bs4")
+        for text in self.SAMPLES:
+            expected = bs4.BeautifulSoup(text, "html.parser").get_text(separator=" ").strip()
+            assert preprocess._parse_html(text) == expected, text
+
+    def test_column_fast_path(self):
+        s = pd.Series(["  plain  ", "<b>x</b>", "&amp;", float("nan")])
+        result = preprocess.strip_html_column(s)
+        assert result.tolist()[:3] == ["plain", "x", "&"]
+        assert pd.isna(result.iloc[3])
+
 
 # ---------------------------------------------------------------------------
 # filter_text_quality
@@ -88,6 +147,51 @@ class TestFilterTextQuality:
         assert len(result) == len(df)
 
 
+_LANG_TEXTS = pd.Series([
+    "ik voel me vandaag echt heel erg somber en moe",
+    "I have been feeling really down lately and cannot sleep",
+    "Je me sens très fatigué aujourd'hui et je ne dors pas",
+    "De dokter zei dat de medicatie helpt",
+    None,
+] * 3, index=range(10, 25))
+
+
+@pytest.mark.skipif(not LANGDETECT_AVAILABLE, reason="langdetect not installed")
+class TestLanguageDetection:
+    def test_prefilter_marks_marker_rich_text_dutch(self):
+        dutch = looks_dutch(_LANG_TEXTS.iloc[:5])
+        assert dutch.tolist() == [True, False, False, False, False]
+
+    def test_same_result_for_any_worker_count(self):
+        serial = detect_languages(_LANG_TEXTS, n_jobs=1, prefilter=False)
+        pooled = detect_languages(_LANG_TEXTS, n_jobs=2, prefilter=False, chunk_size=1)
+        pd.testing.assert_series_equal(serial, pooled)
+        assert serial.index.equals(_LANG_TEXTS.index)
+        assert serial.iloc[:5].tolist() == ["nl", "en", "fr", "nl", "unknown"]
+
+    def test_cache_skips_the_detector(self, tmp_path, monkeypatch):
+        cache = EntityCache(str(tmp_path / "lang.sqlite"), namespace=cache_namespace(0))
+        first = detect_languages(_LANG_TEXTS, n_jobs=1, cache=cache)
+
+        def fail(texts):
+            raise AssertionError("detector called despite cache")
+
+        monkeypatch.setattr(language_id, "_detect_chunk", fail)
+        again = detect_languages(_LANG_TEXTS, n_jobs=1, cache=cache)
+        cache.close()
+        pd.testing.assert_series_equal(first, again)
+
+    def test_filter_keeps_target_language(self, tmp_path, monkeypatch):
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(tmp_path))
+        monkeypatch.setattr(preprocess, "_LANGDETECT_AVAILABLE", True)
+        monkeypatch.setattr(preprocess, "LANGUAGE_N_JOBS", 1)
+        df = pd.DataFrame({"MessageText": _LANG_TEXTS.iloc[:4].tolist()})
+        result = preprocess.filter_text_quality(df, min_words=1, language_filter=True,
+                                                target_lang="nl")
+        assert result.index.tolist() == [0, 3]
+        assert (tmp_path / "language_cache.sqlite").exists()
+
+
 # ---------------------------------------------------------------------------
 # anonymize_ids
 # ---------------------------------------------------------------------------
@@ -134,6 +238,47 @@ class TestAnonymizeIds:
         assert not set(dfs["messages"]["PosterID"]) & original_ids
 
 
+class TestStablePseudonyms:
+    @pytest.mark.parametrize("mode", ["persistent", "hmac"])
+    def test_new_poster_does_not_change_existing_tokens(self, tmp_path, monkeypatch, mode):
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(tmp_path))
+        monkeypatch.setattr(preprocess, "ID_PSEUDONYMS", mode)
+        first = {"messages": pd.DataFrame({"PosterID": ["id-B", "id-C", "id-B"]})}
+        preprocess.anonymize_ids(first)
+
+        # "id-A" sorts first: the sorted numbering would shift B and C
+        second = {"messages": pd.DataFrame({"PosterID": ["id-A", "id-C", None, "id-B"]})}
+        preprocess.anonymize_ids(second)
+        before = dict(zip(["id-B", "id-C"], first["messages"]["PosterID"].iloc[:2]))
+        after = second["messages"]["PosterID"]
+        assert after.iloc[1] == before["id-C"] and after.iloc[3] == before["id-B"]
+        assert pd.isna(after.iloc[2])
+        assert after.iloc[0] not in before.values()
+
+        mapping = pd.read_csv(tmp_path / "anonymization_mapping.csv")
+        assert mapping["OriginalID"].tolist() == ["id-B", "id-C", "id-A"]
+        if mode == "persistent":
+            assert mapping["AnonymizedID"].tolist() == ["user_1", "user_2", "user_3"]
+
+    def test_hmac_tokens_depend_on_the_key_only(self, tmp_path):
+        from utils.pseudonyms import Pseudonymizer
+        ids = pd.Series(["id-A", "id-B"])
+        key = tmp_path / "k1" / "pseudonym.key"
+        a = Pseudonymizer(str(tmp_path / "m1.csv"), "hmac", key_path=str(key)).tokens(ids)
+        b = Pseudonymizer(str(tmp_path / "m2.csv"), "hmac", key_path=str(key)).tokens(ids)
+        c = Pseudonymizer(str(tmp_path / "m3.csv"), "hmac",
+                          key_path=str(tmp_path / "k2" / "pseudonym.key")).tokens(ids)
+        assert a.tolist() == b.tolist()
+        assert a.str.fullmatch(r"user_[0-9a-f]{16}").all()
+        assert not set(a) & set(c)
+        assert (key.stat().st_mode & 0o777) == 0o600
+
+    def test_unknown_mode(self, tmp_path):
+        from utils.pseudonyms import Pseudonymizer
+        with pytest.raises(ValueError):
+            Pseudonymizer(str(tmp_path / "m.csv"), "sorted")
+
+
 # ---------------------------------------------------------------------------
 # anonymize_text_column — replace_original=True (default)
 # ---------------------------------------------------------------------------
@@ -223,6 +368,96 @@ class TestAnonymizeTextColumnKeepBoth:
         assert "Alice" not in result["MessageText_anon"].iloc[0]
 
 
+# ---------------------------------------------------------------------------
+# anonymize_text_column — batched vs per-message path
+# ---------------------------------------------------------------------------
+
+class TestAnonymizeTextColumnBatching:
+    def _run(self, tmp_path, monkeypatch, batch_size):
+        monkeypatch.setattr(preprocess, "_ANON_AVAILABLE", True)
+        monkeypatch.setattr(preprocess, "ta_anonymize", _fake_anonymize, raising=False)
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(tmp_path))
+        df = pd.DataFrame({
+            "ForumMessageID": [1, 2, 3],
+            "MessageText": ["Alice lives in Amsterdam", None, "@Alice_B hoi"],
+        })
+        result = preprocess.anonymize_text_column(
+            df, "MessageText", export_review=False, batch_size=batch_size
+        )
+        entities = pd.read_csv(tmp_path / "entities_MessageText.csv")
+        return result, entities
+
+    def test_batch_and_per_message_paths_agree(self, tmp_path, monkeypatch):
+        batched, ents_b = self._run(tmp_path, monkeypatch, batch_size=2)
+        single, ents_s = self._run(tmp_path, monkeypatch, batch_size=None)
+        pd.testing.assert_frame_equal(batched, single)
+        pd.testing.assert_frame_equal(ents_b, ents_s)
+
+    def test_batch_options_forwarded(self, tmp_path, monkeypatch):
+        seen = {}
+
+        def fake_batch(texts, batch_size, n_process, cache=None):
+            seen.update(batch_size=batch_size, n_process=n_process)
+            return [_fake_anonymize(t) for t in texts]
+
+        monkeypatch.setattr(preprocess, "ta_anonymize_batch", fake_batch, raising=False)
+        self._run(tmp_path, monkeypatch, batch_size=16)
+        assert seen == {"batch_size": 16, "n_process": preprocess.NER_N_PROCESS}
+
+
+    def test_cache_file_written_under_preprocess_dir(self, tmp_path, monkeypatch):
+        self._run(tmp_path, monkeypatch, batch_size=8)
+        assert (tmp_path / preprocess.NER_CACHE_FILE).exists()
+
+
+# ---------------------------------------------------------------------------
+# EntityCache  (utils/ner_cache.py)
+# ---------------------------------------------------------------------------
+
+_ENTS = [{"type": "PER", "start": 0, "end": 5, "text": "Alice"}]
+
+
+class TestEntityCache:
+    def test_miss_then_hit(self, tmp_path):
+        with EntityCache(str(tmp_path / "c.sqlite"), namespace="m-1") as cache:
+            assert cache.get_many(["Alice hoi"]) == [None]
+            cache.put_many(["Alice hoi"], [_ENTS])
+            assert cache.get_many(["Alice hoi"]) == [_ENTS]
+            assert (cache.hits, cache.misses) == (1, 1)
+
+    def test_persists_across_instances(self, tmp_path):
+        path = str(tmp_path / "c.sqlite")
+        with EntityCache(path, namespace="m-1") as cache:
+            cache.put_many(["Alice hoi", "geen namen"], [_ENTS, []])
+        with EntityCache(path, namespace="m-1") as cache:
+            assert cache.get_many(["geen namen", "Alice hoi"]) == [[], _ENTS]
+
+    def test_namespace_isolates_models(self, tmp_path):
+        path = str(tmp_path / "c.sqlite")
+        with EntityCache(path, namespace="m-1") as cache:
+            cache.put_many(["Alice hoi"], [_ENTS])
+        with EntityCache(path, namespace="m-2") as cache:
+            assert cache.get_many(["Alice hoi"]) == [None]
+
+    def test_evicts_least_recently_used(self, tmp_path, monkeypatch):
+        clock = iter(range(100))
+        monkeypatch.setattr("utils.ner_cache.time.time", lambda: next(clock))
+        with EntityCache(str(tmp_path / "c.sqlite"), namespace="m", max_entries=2) as cache:
+            cache.put_many(["a"], [[]])
+            cache.put_many(["b"], [[]])
+            cache.get_many(["a"])            # "a" now more recent than "b"
+            cache.put_many(["c"], [[]])
+            assert len(cache) == 2
+            assert cache.get_many(["a", "b", "c"]) == [[], None, []]
+
+    def test_stats(self, tmp_path):
+        with EntityCache(str(tmp_path / "c.sqlite"), namespace="m") as cache:
+            cache.put_many(["a"], [[]])
+            cache.get_many(["a", "a", "b"])
+            st = cache.stats()
+        assert st["hits"] == 2 and st["misses"] == 1 and st["entries"] == 1
+
+
 # ---------------------------------------------------------------------------
 # anonymize_text_column — anonymizer unavailable
 # ---------------------------------------------------------------------------
@@ -301,3 +536,384 @@ class TestNormalizedColumnDoesNotLeakPII:
         assert "alice" in df["MessageText_normalized"].iloc[0], (
             "This confirms the pre-fix state: _normalized retains PII"
         )
+
+
+# ---------------------------------------------------------------------------
+# Streaming (chunked) pipeline
+# ---------------------------------------------------------------------------
+
+MOD = "22047A60-621D-4CB5-AC22-D68C649B3990"   # in config.MODERATOR_POSTER_IDS
+
+
+@pytest.fixture
+def export_dir(tmp_path, monkeypatch):
+    """A tiny single-export data/ directory with every removal rule exercised."""
+    data = tmp_path / "data"
+    data.mkdir()
+    pd.DataFrame({
+        "ForumMessageID": range(1, 11),
+        "ForumTopicID":   [1, 1, 1, 2, 2, 3, 3, 4, 4, 1],
+        "PosterID":       ["p1", "p2", "p3", MOD, "p1", "p9", "p2", "p1", MOD, "p3"],
+        "PostDate":       [f"2021-01-0{d} 10:00:00" for d in range(1, 10)]
+                          + ["2021-01-09 12:00:00"],
+        "MessageText":    [
+            "<p>Alice woont in Amsterdam en is moe</p>",
+            "ik voel me vandaag echt heel erg somber",
+            "te kort",
+            "welkom op het forum, stel je gerust voor",
+            "dank je wel voor het fijne welkom hier",
+            "dit is een bericht van een testaccount hoor",
+            "nog een bericht van iemand in het testforum",
+            "hoe gaan jullie om met slapeloze nachten?",
+            "probeer eens een vast slaapritme aan te houden",
+            "Alice zegt dat het morgen beter gaat worden",
+        ],
+    }).to_csv(data / "messages.csv", index=False)
+    pd.DataFrame({"ForumTopicID": [1, 2, 3, 4], "ForumGroupID": [10, 10, 20, 10],
+                  "Name": ["Slapen", "Welkom", "Test", "Alice"]}).to_csv(
+        data / "topics.csv", index=False)
+    pd.DataFrame({"ForumGroupID": [10, 20], "AccountID": [2, 1],
+                  "Name": ["Steun", "Test"]}).to_csv(data / "groups.csv", index=False)
+    pd.DataFrame({"AccountID": [1, 2], "Name": ["test", "community"]}).to_csv(
+        data / "accounts.csv", index=False)
+
+    monkeypatch.chdir(tmp_path)
+    monkeypatch.setattr(preprocess, "DATA_DIR", "data")
+    monkeypatch.setattr(preprocess, "OUTPUT_DIR", "output")
+    monkeypatch.setattr(preprocess, "_ANON_AVAILABLE", True)
+    monkeypatch.setattr(preprocess, "ta_anonymize", _fake_anonymize, raising=False)
+    monkeypatch.setattr(preprocess, "ta_warm_up", lambda: 0.0, raising=False)
+    return tmp_path
+
+
+def _run(export_dir, monkeypatch, name, chunk_size, **options):
+    out = export_dir / name
+    monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(out))
+    preprocess.run_pipeline(chunk_size=chunk_size, **options)
+    return out
+
+
+class TestChunkedPipeline:
+    @pytest.mark.parametrize("chunk_size", [1, 3, 100])
+    def test_same_outputs_as_in_memory(self, export_dir, monkeypatch, chunk_size):
+        full = _run(export_dir, monkeypatch, "full", None)
+        chunked = _run(export_dir, monkeypatch, "chunked", chunk_size)
+        for name in ["messages_community.csv", "messages_cleaned.csv",
+                     "anonymization_mapping.csv", "topics_cleaned.csv"]:
+            pd.testing.assert_frame_equal(
+                pd.read_csv(chunked / name), pd.read_csv(full / name), obj=name
+            )
+
+    @pytest.mark.parametrize("mode", ["persistent", "hmac"])
+    def test_stable_pseudonyms_match_in_memory(self, export_dir, monkeypatch, mode):
+        monkeypatch.setattr(preprocess, "ID_PSEUDONYMS", mode)
+        monkeypatch.setattr(preprocess, "PSEUDONYM_KEY_FILE", str(export_dir / "pseudonym.key"))
+        full = _run(export_dir, monkeypatch, "full", None)
+        chunked = _run(export_dir, monkeypatch, "chunked", 2)
+        for name in ["messages_community.csv", "anonymization_mapping.csv"]:
+            pd.testing.assert_frame_equal(
+                pd.read_csv(chunked / name), pd.read_csv(full / name), obj=name
+            )
+        assert not any(p.name.startswith("_stream") for p in chunked.iterdir())
+
+    def test_removals_applied(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "chunked", 2)
+        community = pd.read_csv(out / "messages_community.csv")
+        # topic 2 (moderator thread), everyone who posted in topic 3 (test
+        # account: p9, p2), the moderator's reply in topic 4 and the short
+        # post are all gone
+        assert sorted(community["ForumMessageID"]) == [1, 8, 10]
+        assert not community["MessageText"].str.contains("Alice").any()
+
+    def test_entity_log_has_every_chunk(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "chunked", 1)
+        entities = pd.read_csv(out / "entities_MessageText.csv")
+        assert sorted(entities["ForumMessageID"]) == [1, 8, 10]
+
+    def test_spool_removed(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "chunked", 2)
+        assert not any(p.name.startswith("_stream") for p in out.iterdir())
+
+
+# ---------------------------------------------------------------------------
+# Resumable checkpoints
+# ---------------------------------------------------------------------------
+
+class TestCheckpoints:
+    def _spy(self, monkeypatch, name):
+        calls = []
+        original = getattr(preprocess, name)
+
+        def spy(*args, **kwargs):
+            calls.append(name)
+            return original(*args, **kwargs)
+
+        monkeypatch.setattr(preprocess, name, spy)
+        return calls
+
+    def test_rerun_resumes_after_last_step(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "out", None, checkpoints=True)
+        first = pd.read_csv(out / "messages_community.csv")
+        assert (out / "checkpoints" / "default" / "step_7.pkl").exists()
+
+        loads = self._spy(monkeypatch, "load_raw_data")
+        anon = self._spy(monkeypatch, "anonymize_text_columns")
+        _run(export_dir, monkeypatch, "out", None, checkpoints=True)
+        assert loads == [] and anon == []
+        pd.testing.assert_frame_equal(pd.read_csv(out / "messages_community.csv"), first)
+
+    def test_setting_change_invalidates_from_that_step(self, export_dir, monkeypatch):
+        _run(export_dir, monkeypatch, "out", None, checkpoints=True)
+        monkeypatch.setattr(preprocess, "MIN_WORD_COUNT", 6)
+        cleans = self._spy(monkeypatch, "clean_dataframe")
+        filters = self._spy(monkeypatch, "filter_text_quality")
+        _run(export_dir, monkeypatch, "out", None, checkpoints=True)
+        assert cleans == [] and filters == ["filter_text_quality"]
+
+    def test_input_change_invalidates_everything(self, export_dir, monkeypatch):
+        _run(export_dir, monkeypatch, "out", None, checkpoints=True)
+        with open(export_dir / "data" / "topics.csv", "a") as f:
+            f.write("5,10,Nieuw\n")
+        loads = self._spy(monkeypatch, "load_raw_data")
+        _run(export_dir, monkeypatch, "out", None, checkpoints=True)
+        assert loads == ["load_raw_data"]
+
+    def test_from_step_and_force(self, export_dir, monkeypatch):
+        out = export_dir / "out"
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(out))
+        preprocess.run_pipeline(checkpoints=True)
+
+        ids = self._spy(monkeypatch, "anonymize_ids")
+        filters = self._spy(monkeypatch, "filter_text_quality")
+        preprocess.run_pipeline(from_step="6", checkpoints=True)
+        assert ids == ["anonymize_ids"] and filters == []
+
+        loads = self._spy(monkeypatch, "load_raw_data")
+        preprocess.run_pipeline(force=True, checkpoints=True)
+        assert loads == ["load_raw_data"]
+
+    def test_crash_in_step_7_resumes_from_step_6(self, export_dir, monkeypatch):
+        out = export_dir / "out"
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(out))
+
+        def crash(*args, **kwargs):
+            raise KeyboardInterrupt
+
+        with monkeypatch.context() as m:
+            m.setattr(preprocess, "anonymize_text_columns", crash)
+            with pytest.raises(KeyboardInterrupt):
+                preprocess.run_pipeline(checkpoints=True)
+
+        ckpt = preprocess.open_checkpoints(None, enabled=True)
+        assert ckpt.resume_step == "6"
+        ids = self._spy(monkeypatch, "anonymize_ids")
+        preprocess.run_pipeline(checkpoints=True)
+        assert ids == []
+        assert (out / "messages_community.csv").exists()
+
+    def test_unknown_from_step(self, export_dir, monkeypatch):
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(export_dir / "out"))
+        with pytest.raises(ValueError):
+            preprocess.open_checkpoints(None, from_step="9")
+
+    def test_disabled_writes_nothing(self, export_dir, monkeypatch):
+        out = export_dir / "out"
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(out))
+        preprocess.run_pipeline(checkpoints=False)
+        assert not (out / "checkpoints").exists()
+
+    def test_off_by_default(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "out", None)
+        assert not (out / "checkpoints").exists()
+
+    def test_ner_model_upgrade_invalidates_step_7(self, monkeypatch):
+        monkeypatch.setattr(preprocess, "_ANON_AVAILABLE", True)
+        monkeypatch.setattr(preprocess, "ta_installed_id", lambda: "nl_core_news_lg-3.7.0",
+                            raising=False)
+        before = dict(preprocess.step_settings(None))
+        monkeypatch.setattr(preprocess, "ta_installed_id", lambda: "nl_core_news_lg-3.8.0")
+        after = dict(preprocess.step_settings(None))
+        assert before["7"] != after["7"]
+        assert {k: v for k, v in before.items() if k != "7"} == \
+               {k: v for k, v in after.items() if k != "7"}
+
+    def test_text_columns_to_clean_invalidates_step_4(self, monkeypatch):
+        before = dict(preprocess.step_settings(None))
+        monkeypatch.setattr(preprocess, "TEXT_COLUMNS_TO_CLEAN", {"MessageText"})
+        assert dict(preprocess.step_settings(None))["4"] != before["4"]
+
+
+# ---------------------------------------------------------------------------
+# strip_forum_quotes / strip_quote_column
+# ---------------------------------------------------------------------------
+
+class TestStripForumQuotes:
+    def test_nested_quotes_removed_whole(self):
+        text, removed = preprocess.strip_forum_quotes(
+            "[quote=a]eerst [quote=b]diep[/quote] weer a[/quote]\nmijn antwoord"
+        )
+        assert text == "mijn antwoord"
+        assert removed == len("[quote=a]eerst [quote=b]diep[/quote] weer a[/quote]")
+
+    def test_unclosed_and_stray_tags_keep_surrounding_text(self):
+        text, _ = preprocess.strip_forum_quotes("[quote]begin [quote]x[/quote] eigen tekst")
+        assert text == "begin  eigen tekst"
+        text, removed = preprocess.strip_forum_quotes("tekst[/quote] meer")
+        assert text == "tekst meer"
+        assert removed == len("[/quote]")
+
+    def test_gt_lines_and_blank_lines(self):
+        text, removed = preprocess.strip_forum_quotes("> geciteerd\n\n\n\nantwoord")
+        assert text == "antwoord"
+        assert removed == len("> geciteerd")
+
+    def test_case_insensitive_tags(self):
+        assert preprocess._strip_forum_quotes("[QUOTE author=x]q[/Quote] r") == "r"
+
+    def test_many_unclosed_tags_is_linear(self):
+        import time
+        text = "[quote] woord " * 20000
+        start = time.perf_counter()
+        result, removed = preprocess.strip_forum_quotes(text)
+        assert time.perf_counter() - start < 1.0
+        assert "[quote]" not in result
+        assert removed == len("[quote]") * 20000
+
+    def test_column_entry_point(self):
+        s = pd.Series(
+            ["[quote]q[/quote]\nr", "gewoon\n\n\n\nbericht ", None, "> x\ny"],
+            index=[5, 6, 7, 8],
+        )
+        text, removed = preprocess.strip_quote_column(s)
+        assert text.tolist()[:2] == ["r", "gewoon\n\nbericht"]
+        assert pd.isna(text.loc[7])
+        assert text.loc[8] == "y"
+        assert removed.to_dict() == {5: len("[quote]q[/quote]"), 6: 0, 7: 0, 8: 3}
+
+    def test_clean_dataframe_reports_quote_chars(self):
+        df = pd.DataFrame({"MessageText": ["[quote]abc[/quote] hoi", "hoi"],
+                           "PosterID": ["u1", "u2"]})
+        result = preprocess.clean_dataframe(df, quote_chars_column="QuotedChars")
+        assert result["QuotedChars"].tolist() == [len("[quote]abc[/quote]"), 0]
+        assert "QuotedChars" not in preprocess.clean_dataframe(df).columns
+
+    @pytest.mark.parametrize("chunk_size", [None, 2])
+    def test_pipeline_reports_quote_chars(self, export_dir, monkeypatch, capsys, chunk_size):
+        messages = pd.read_csv(export_dir / "data" / "messages.csv")
+        messages.loc[0, "MessageText"] = "[quote]eerder[/quote]" + messages.loc[0, "MessageText"]
+        messages.to_csv(export_dir / "data" / "messages.csv", index=False)
+        out = _run(export_dir, monkeypatch, "out", chunk_size)
+
+        cleaned = pd.read_csv(out / "messages_cleaned.csv")
+        quoted = cleaned.set_index("ForumMessageID")[preprocess.QUOTE_CHARS_COLUMN]
+        assert quoted.loc[messages.loc[0, "ForumMessageID"]] == len("[quote]eerder[/quote]")
+        assert quoted.drop(messages.loc[0, "ForumMessageID"]).eq(0).all()
+        community = pd.read_csv(out / "messages_community.csv")
+        assert preprocess.QUOTE_CHARS_COLUMN not in community.columns
+        topic = messages.loc[0, "ForumTopicID"]
+        assert f"ForumTopicID {topic}: 21 chars in 1/" in capsys.readouterr().out
+
+
+# ---------------------------------------------------------------------------
+# Incremental runs
+# ---------------------------------------------------------------------------
+
+def _deanonymized(out, name):
+    """`name` with PosterID mapped back to the original IDs (tokens differ
+    between a fresh and an incremental run)."""
+    mapping = pd.read_csv(out / "anonymization_mapping.csv", dtype=str)
+    back = dict(zip(mapping["AnonymizedID"], mapping["OriginalID"]))
+    df = pd.read_csv(out / name)
+    df["PosterID"] = df["PosterID"].map(back)
+    return df
+
+
+class TestIncrementalPipeline:
+    def _next_export(self, export_dir):
+        """Message 8 edited, 10 deleted, 11 (new poster) and 12 (new topic) added."""
+        data = export_dir / "data"
+        messages = pd.read_csv(data / "messages.csv")
+        messages.loc[messages["ForumMessageID"] == 8, "MessageText"] = (
+            "hoe gaan jullie om met slapeloze nachten en piekeren?"
+        )
+        messages = messages[messages["ForumMessageID"] != 10]
+        messages = pd.concat([messages, pd.DataFrame({
+            "ForumMessageID": [11, 12],
+            "ForumTopicID":   [4, 5],
+            "PosterID":       ["p0", "p1"],
+            "PostDate":       ["2021-01-10 10:00:00", "2021-01-11 10:00:00"],
+            "MessageText":    ["Alice helpt mij ook altijd heel erg goed",
+                               "een nieuw onderwerp over medicatie en bijwerkingen"],
+        })], ignore_index=True)
+        messages.to_csv(data / "messages.csv", index=False)
+        with open(data / "topics.csv", "a") as f:
+            f.write("5,10,Medicatie\n")
+
+    def _count_ner(self, monkeypatch):
+        texts = []
+
+        def counting(text):
+            texts.append(text)
+            return _fake_anonymize(text)
+
+        monkeypatch.setattr(preprocess, "ta_anonymize", counting, raising=False)
+        return texts
+
+    def test_matches_full_run_and_processes_only_the_delta(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "out", None, save_state=True)
+        tokens = pd.read_csv(out / "anonymization_mapping.csv")
+        self._next_export(export_dir)
+
+        texts = self._count_ner(monkeypatch)
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(out))
+        preprocess.run_pipeline(incremental=True)
+        assert len(texts) == 3           # 8, 11 and 12
+
+        full = _run(export_dir, monkeypatch, "full", None)
+        pd.testing.assert_frame_equal(
+            _deanonymized(out, "messages_community.csv"),
+            _deanonymized(full, "messages_community.csv"),
+        )
+        assert sorted(pd.read_csv(out / "messages_community.csv")["ForumMessageID"]) == [1, 8, 11, 12]
+
+        # known posters keep their tokens, the new one is numbered after them
+        mapping = pd.read_csv(out / "anonymization_mapping.csv")
+        assert mapping.iloc[:len(tokens)].equals(tokens)
+        assert mapping.iloc[-1].tolist() == ["p0", f"user_{len(tokens) + 1}"]
+
+    def test_unchanged_export_processes_nothing(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "out", None, save_state=True)
+        first = pd.read_csv(out / "messages_community.csv")
+        texts = self._count_ner(monkeypatch)
+        preprocess.run_pipeline(incremental=True)
+        assert texts == []
+        pd.testing.assert_frame_equal(pd.read_csv(out / "messages_community.csv"), first)
+
+    def test_falls_back_to_full_run_without_state(self, export_dir, monkeypatch):
+        out = export_dir / "out"
+        monkeypatch.setattr(preprocess, "PREPROCESS_DIR", str(out))
+        preprocess.run_pipeline(incremental=True)
+        assert (out / "incremental" / "default.npz").exists()
+        assert sorted(pd.read_csv(out / "messages_community.csv")["ForumMessageID"]) == [1, 8, 10]
+
+    def test_full_run_stores_state_only_when_asked(self, export_dir, monkeypatch):
+        reads = []
+        read_csv = pd.read_csv
+
+        def counting(path, *args, **kwargs):
+            reads.append(os.path.basename(str(path)))
+            return read_csv(path, *args, **kwargs)
+
+        monkeypatch.setattr(preprocess.pd, "read_csv", counting)
+        out = _run(export_dir, monkeypatch, "out", None)
+        assert not (out / "incremental").exists()
+        reads.clear()
+        _run(export_dir, monkeypatch, "out", None, save_state=True)
+        assert (out / "incremental" / "default.npz").exists()
+        assert reads.count("messages.csv") == 1     # the state reuses step 1's rows
+
+    def test_chunked_run_clears_state(self, export_dir, monkeypatch):
+        out = _run(export_dir, monkeypatch, "out", None, save_state=True)
+        assert (out / "incremental" / "default.npz").exists()
+        _run(export_dir, monkeypatch, "out", 2)
+        assert not (out / "incremental" / "default.npz").exists()
@@ -0,0 +1,124 @@
+"""
+Tests for src/utils/text_normalize.py — the kernels, per message and batched
+over a Series, must give exactly what the re.sub chains they replaced gave.
+"""
+
+import random
+import re
+
+import pandas as pd
+
+from utils import text_normalize as tn
+
+
+# ---------------------------------------------------------------------------
+# The original chains
+# ---------------------------------------------------------------------------
+
+def _standardize_chain(t):
+    t = re.sub(r"https?://\S+|www\.\S+", "", t)
+    t = re.sub(r"([!?.]){2,}", r"\1", t)
+    t = re.sub(r"[\r\n\t]+", " ", t)
+    t = re.sub(r" {2,}", " ", t)
+    return t.strip()
+
+
+def _liwc_chain(t):
+    t = t.lower()
+    t = re.sub(r"\[entity_[a-z_]+_\d+\]", " ", t)
+    t = re.sub(r"(.)\1{3,}", r"\1\1", t)
+    t = re.sub(r"[ \t]+", " ", t)
+    t = re.sub(r"\n{3,}", "\n\n", t)
+    return t.strip()
+
+
+def _match_chain(t, strip_html):
+    t = t.lower().strip()
+    if strip_html:
+        t = re.sub(r"<[^>]+>", " ", t)
+        t = t.replace("&amp;", "&").replace("&nbsp;", " ").replace("&quot;", '"')
+        t = re.sub(r"&[a-z]+;", " ", t)
+    t = re.sub(r"\s+", " ", t)
+    t = re.sub(r"[^\w\s]", "", t)
+    return t.strip()
+
+
+_PIECES = [
+    "ik", "voel", "me", "Heeeeeel", "MOE", "zzzz", " ", "  ", "\t", "\n", "\n\n\n",
+    "\r\n", "!", "!!", "?!", "...", ".", ",", "https://x.nl/a?b=1", "www.site.nl",
+    "awww.x", "[ENTITY_PER_1]", "[[[[entity_x_1]", "[entity_loc_12]", "<p>", "</b>",
+    "&amp;", "&nbsp;", "&quot;", "&lt;", "&amp;lt;", "é", "😊", "____", "    ",
+]
+
+
+def _corpus(n=3000, seed=7):
+    rng = random.Random(seed)
+    return ["".join(rng.choice(_PIECES) for _ in range(rng.randint(0, 14))) for _ in range(n)]
+
+
+class TestMatchesChains:
+    def test_standardize(self):
+        for t in _corpus():
+            assert tn.standardize(t) == _standardize_chain(t), repr(t)
+
+    def test_normalize_liwc(self):
+        for t in _corpus():
+            assert tn.normalize_liwc(t) == _liwc_chain(t), repr(t)
+
+    def test_match_key(self):
+        for t in _corpus():
+            assert tn.match_key(t) == _match_chain(t, False), repr(t)
+            assert tn.match_key(t, strip_html=True) == _match_chain(t, True), repr(t)
+
+
+class TestSeries:
+    def test_batched_matches_chains(self):
+        s = pd.Series(_corpus(1000) + ["", "", "", ""])
+        expected = {
+            "standardize": [_standardize_chain(t) for t in s],
+            "liwc": [_liwc_chain(t) for t in s],
+            "match": [_match_chain(t, True) for t in s],
+        }
+        for batch_size in (1, 7, 10_000):
+            assert tn._normalize_series(s, tn._STANDARDIZE, batch_size=batch_size).tolist() \
+                == expected["standardize"]
+            assert tn._normalize_series(s, tn._LIWC, lower=True,
+                                        batch_size=batch_size).tolist() == expected["liwc"]
+            assert tn._normalize_series(s, tn._match_rules(True), lower=True,
+                                        batch_size=batch_size).tolist() == expected["match"]
+
+    def test_text_containing_separator_falls_back(self):
+        s = pd.Series(["a\x00b!!", "c  d"])
+        assert tn.standardize_series(s).tolist() == ["a\x00b!", "c d"]
+
+    def test_missing_values_become_empty_and_index_kept(self):
+        s = pd.Series(["Hallo!!  wereld", None, float("nan")], index=[3, 1, 2], name="MessageText")
+        result = tn.standardize_series(s)
+        assert result.tolist() == ["Hallo! wereld", "", ""]
+        assert list(result.index) == [3, 1, 2]
+        assert result.name == "MessageText"
+
+    def test_match_key_series(self):
+        s = pd.Series(["<b>Hoi</b> &amp; doei!", "A, b"])
+        assert tn.match_key_series(s, strip_html=True).tolist() == ["hoi  doei", "a b"]
+        assert tn.normalize_liwc_series(s).tolist() == ["<b>hoi</b> &amp; doei!", "a, b"]
+
+
+class TestTextFingerprints:
+    def test_equal_keys_equal_fingerprints(self):
+        s = pd.Series(["Hoi,  Doei!", "hoi doei", "<b>hoi</b> doei", None, "iets anders"],
+                      index=[4, 3, 2, 1, 0])
+        fp = tn.text_fingerprints(s, strip_html=True)
+        assert list(fp.index) == [4, 3, 2, 1, 0]
+        assert fp["fp"].dtype == "int64"
+        assert fp["key_len"].tolist() == [len(tn.match_key(str(t), True)) if t else 0 for t in s]
+        assert fp["fp"].iloc[0] == fp["fp"].iloc[1] != fp["fp"].iloc[4]
+        assert fp["fp"].iloc[4] != fp["fp"].iloc[3]
+
+    def test_stable_across_batches_and_calls(self):
+        s = pd.Series(_corpus(500))
+        one = tn.text_fingerprints(s)
+        pd.testing.assert_frame_equal(tn.text_fingerprints(s, batch_size=7), one)
+        # fixed hash key: the same text gets the same fingerprint every run
+        assert tn.text_fingerprints(pd.Series(["abc"]))["fp"].iloc[0] == \
+            pd.util.hash_array(pd.Series(["abc"]).to_numpy(dtype=object)).view("int64")[0]